@@ -0,0 +1,3 @@
+"""
+API Layer - Exposes the service layer to other processes (HTTP/JSON)
+"""
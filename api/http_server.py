@@ -0,0 +1,464 @@
+"""
+POS HTTP API Server
+Asyncio HTTP/1.1 JSON server exposing the service layer to many terminals
+
+Endpoints (JSON bodies, amounts as decimal strings such as "12.50"):
+    GET  /products/{product_id}             product lookup
+    POST /inventory/restock                 {"items": [[product_id, quantity], ...]}
+    POST /sales                             open a sale
+    GET  /sales/{sale_id}                   open or completed sale
+    POST /sales/{sale_id}/items             {"product_id": ..., "quantity": ...}
+                                            or {"barcode": ..., "quantity": scans}
+    POST /sales/{sale_id}/complete          {"payment_method": ..., "payment_amount": ...}
+    POST /sales/{sale_id}/cancel
+    POST /returns                           {"original_sale_id": ...} (optional)
+    POST /returns/{return_id}/items         {"product_id": ..., "quantity": ...}
+    POST /returns/{return_id}/complete
+    GET  /metrics                           operation metrics and lookup counters
+
+Sales and returns left open longer than the stock hold period are
+dropped (an abandoned sale is cancelled), by the expiry sweep and when a
+new one is opened.
+
+Connections are kept alive (HTTP/1.1 default) and pipelined requests are
+answered in order. Bodies must be sent with Content-Length; chunked
+transfer encoding is answered with 501. Handlers and the periodic
+expiry of idle stock holds run on the event loop thread, so the services
+(built without concurrent locking) only change stock from that thread;
+snapshots and asynchronous event delivery run on their own threads but
+only read.
+"""
+
+import asyncio
+import json
+import re
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from typing import Callable, Dict, List, Optional, Tuple
+
+from domain.money import Money
+from domain.return_transaction import ReturnTransaction
+from domain.sale import Sale
+from service.inventory_service import InventoryService
+from service.metrics import metrics
+from service.reservations import DEFAULT_SWEEP_SECONDS
+from service.return_service import ReturnService
+from service.sale_service import SaleService
+
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class APIError(Exception):
+    """Error answered with an HTTP status and a JSON message"""
+
+    def __init__(self, status: int, message: str):
+        """
+        Initialize error
+
+        Args:
+            status: HTTP status code
+            message: Error message
+        """
+        super().__init__(message)
+        self.status = status
+
+
+class POSServer:
+    """
+    Request routing over the service layer
+
+    handle() maps (method, path, body) to a (status, JSON object) pair and
+    is independent of the transport; serve() runs it behind HTTP.
+    """
+
+    def __init__(self, sale_service: SaleService, return_service: ReturnService,
+                 inventory_service: InventoryService,
+                 sweep_seconds: float = DEFAULT_SWEEP_SECONDS,
+                 idle_seconds: Optional[float] = None):
+        """
+        Initialize server
+
+        Args:
+            sale_service: Sale service
+            return_service: Return service
+            inventory_service: Inventory service
+            sweep_seconds: Interval between expiry sweeps while serving
+            idle_seconds: Idle time after which an open sale or return is
+                          dropped (a sale is cancelled); defaults to the
+                          stock hold period
+        """
+        self.sale_service = sale_service
+        self.return_service = return_service
+        self.inventory_service = inventory_service
+        self.sweep_seconds = sweep_seconds
+        self.idle_seconds = (inventory_service.reservations.hold_seconds
+                             if idle_seconds is None else idle_seconds)
+        # Sales and returns opened over the API and not yet completed
+        self.open_sales: Dict[str, Sale] = {}
+        self.open_returns: Dict[str, ReturnTransaction] = {}
+        # Open sale or return ID -> last use (monotonic), least recent first
+        self._last_used: "OrderedDict[str, float]" = OrderedDict()
+        self._routes: List[Tuple[str, "re.Pattern", Callable]] = [
+            ("GET", re.compile(r"/products/([^/]+)"), self.get_product),
+            ("POST", re.compile(r"/inventory/restock"), self.restock),
+            ("POST", re.compile(r"/sales"), self.create_sale),
+            ("GET", re.compile(r"/sales/([^/]+)"), self.get_sale),
+            ("POST", re.compile(r"/sales/([^/]+)/items"), self.add_sale_item),
+            ("POST", re.compile(r"/sales/([^/]+)/complete"), self.complete_sale),
+            ("POST", re.compile(r"/sales/([^/]+)/cancel"), self.cancel_sale),
+            ("POST", re.compile(r"/returns"), self.create_return),
+            ("POST", re.compile(r"/returns/([^/]+)/items"), self.add_return_item),
+            ("POST", re.compile(r"/returns/([^/]+)/complete"), self.complete_return),
+            ("GET", re.compile(r"/metrics"), self.get_metrics),
+        ]
+
+    def handle(self, method: str, path: str, body: bytes = b"") -> Tuple[int, dict]:
+        """
+        Handle one request
+
+        Args:
+            method: HTTP method
+            path: Request path (query string ignored)
+            body: Request body (JSON or empty)
+
+        Returns:
+            tuple: (HTTP status, JSON-serializable response)
+        """
+        path = path.split("?", 1)[0]
+        allowed = False
+        for route_method, pattern, handler in self._routes:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            try:
+                payload = json.loads(body) if body else {}
+                if not isinstance(payload, dict):
+                    raise APIError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+                return HTTPStatus.OK, handler(payload, *match.groups())
+            except APIError as error:
+                return error.status, {"error": str(error)}
+            except json.JSONDecodeError as error:
+                return HTTPStatus.BAD_REQUEST, {"error": f"Invalid JSON: {error.msg}"}
+            except Exception as error:
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Internal error: {error}"}
+        if allowed:
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"{method} not allowed on {path}"}
+        return HTTPStatus.NOT_FOUND, {"error": f"No route for {path}"}
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+        """
+        Start serving HTTP on host:port, and sweeping expired stock holds
+        every sweep_seconds on the same event loop
+
+        Args:
+            host: Bind address
+            port: TCP port (0 picks a free port)
+
+        Returns:
+            asyncio.AbstractServer: Running server
+        """
+        loop = asyncio.get_running_loop()
+        http_server = await loop.create_server(lambda: HTTPProtocol(self), host, port,
+                                               reuse_address=True)
+
+        def sweep():
+            try:
+                self.sweep()
+            finally:
+                if http_server.is_serving():
+                    loop.call_later(self.sweep_seconds, sweep)
+
+        loop.call_later(self.sweep_seconds, sweep)
+        return http_server
+
+    def sweep(self):
+        """
+        Release the stock held by sales idle past their deadline, and drop
+        open sales and returns idle longer than idle_seconds
+        """
+        self.inventory_service.reservations.expire()
+        self._prune()
+
+    # Handlers
+
+    def get_product(self, payload: dict, product_id: str) -> dict:
+        product = self.inventory_service.get_product(product_id)
+        if product is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"Unknown product: {product_id}")
+        on_hand, _ = self.inventory_service.get_stock_levels(product_id)
+        return _product_to_json(product, on_hand)
+
+    def restock(self, payload: dict) -> dict:
+        result = self.inventory_service.bulk_restock(_field(payload, "items", list))
+        return {"restocked": result.succeeded,
+                "errors": [{"row": row, "error": message} for row, message in result.errors]}
+
+    def create_sale(self, payload: dict) -> dict:
+        self._prune()
+        sale = self.sale_service.create_sale()
+        self.open_sales[sale.sale_id] = sale
+        self._touch(sale.sale_id)
+        return _sale_to_json(sale)
+
+    def get_sale(self, payload: dict, sale_id: str) -> dict:
+        sale = self.open_sales.get(sale_id) or self.sale_service.get_sale(sale_id)
+        if sale is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"Unknown sale: {sale_id}")
+        return _sale_to_json(sale)
+
+    def add_sale_item(self, payload: dict, sale_id: str) -> dict:
+        sale = self._open_sale(sale_id)
+        if "barcode" in payload:
+            code = _field(payload, "barcode", str)
+            count = _field(payload, "quantity", int) if "quantity" in payload else 1
+            if count <= 0:
+                raise APIError(HTTPStatus.BAD_REQUEST, "Quantity must be greater than 0")
+            added = self.sale_service.add_scanned_item(sale, code, count)
+        else:
+            product_id, quantity = _item_fields(payload)
+            added = self.sale_service.add_item_to_sale(sale, product_id, quantity)
+        if not added:
+            raise APIError(HTTPStatus.CONFLICT, "Product not found or insufficient stock")
+        return _sale_to_json(sale)
+
+    def complete_sale(self, payload: dict, sale_id: str) -> dict:
+        sale = self._open_sale(sale_id)
+        if not sale.items:
+            raise APIError(HTTPStatus.CONFLICT, "Sale is empty")
+        payment_method = _field(payload, "payment_method", str)
+        try:
+            payment_amount = Money.of(_field(payload, "payment_amount", (str, int, float)))
+        except ValueError as error:
+            raise APIError(HTTPStatus.BAD_REQUEST, str(error))
+        if payment_amount < sale.get_total():
+            raise APIError(HTTPStatus.CONFLICT, "Insufficient payment amount")
+        if not self.sale_service.complete_sale(sale, payment_method, payment_amount):
+            raise APIError(HTTPStatus.CONFLICT, "Reserved stock expired and is no longer available")
+        self._close(sale_id)
+        return _sale_to_json(sale)
+
+    def cancel_sale(self, payload: dict, sale_id: str) -> dict:
+        sale = self._open_sale(sale_id)
+        self.sale_service.cancel_sale(sale)
+        self._close(sale_id)
+        return {"sale_id": sale_id, "cancelled": True}
+
+    def create_return(self, payload: dict) -> dict:
+        original_sale_id = payload.get("original_sale_id")
+        if original_sale_id is not None and self.sale_service.get_sale(original_sale_id) is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"Unknown sale: {original_sale_id}")
+        self._prune()
+        return_transaction = self.return_service.create_return(original_sale_id)
+        self.open_returns[return_transaction.return_id] = return_transaction
+        self._touch(return_transaction.return_id)
+        return _return_to_json(return_transaction)
+
+    def add_return_item(self, payload: dict, return_id: str) -> dict:
+        return_transaction = self._open_return(return_id)
+        product_id, quantity = _item_fields(payload)
+        if not self.return_service.add_item_to_return(return_transaction, product_id, quantity):
+            raise APIError(HTTPStatus.CONFLICT, "Product not found or not returnable")
+        return _return_to_json(return_transaction)
+
+    def complete_return(self, payload: dict, return_id: str) -> dict:
+        return_transaction = self._open_return(return_id)
+        if not return_transaction.items:
+            raise APIError(HTTPStatus.CONFLICT, "Return is empty")
+        if not self.return_service.complete_return(return_transaction):
+            raise APIError(HTTPStatus.CONFLICT, "Return exceeds returnable quantity")
+        self._close(return_id)
+        return _return_to_json(return_transaction)
+
+    def get_metrics(self, payload: dict) -> dict:
+        snapshot = metrics.snapshot()
+        snapshot["lookups"] = self.inventory_service.lookup_stats()
+        snapshot["reservations"] = self.inventory_service.reservations.stats()
+        snapshot["events"] = self.inventory_service.events.stats()
+        return snapshot
+
+    def _open_sale(self, sale_id: str) -> Sale:
+        """Get an open sale or raise 404"""
+        sale = self.open_sales.get(sale_id)
+        if sale is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"No open sale: {sale_id}")
+        self._touch(sale_id)
+        return sale
+
+    def _open_return(self, return_id: str) -> ReturnTransaction:
+        """Get an open return or raise 404"""
+        return_transaction = self.open_returns.get(return_id)
+        if return_transaction is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"No open return: {return_id}")
+        self._touch(return_id)
+        return return_transaction
+
+    def _touch(self, transaction_id: str):
+        """Record use of an open sale or return"""
+        self._last_used[transaction_id] = time.monotonic()
+        self._last_used.move_to_end(transaction_id)
+
+    def _close(self, transaction_id: str):
+        """Forget a completed or cancelled sale or return"""
+        self.open_sales.pop(transaction_id, None)
+        self.open_returns.pop(transaction_id, None)
+        self._last_used.pop(transaction_id, None)
+
+    def _prune(self):
+        """Drop open sales and returns idle longer than idle_seconds (sales are cancelled)"""
+        last_used = self._last_used
+        deadline = time.monotonic() - self.idle_seconds
+        while last_used:
+            transaction_id, used = next(iter(last_used.items()))
+            if used > deadline:
+                break
+            del last_used[transaction_id]
+            sale = self.open_sales.pop(transaction_id, None)
+            if sale is not None:
+                self.sale_service.cancel_sale(sale)
+            else:
+                self.open_returns.pop(transaction_id, None)
+
+
+class HTTPProtocol(asyncio.Protocol):
+    """
+    Minimal HTTP/1.1 server protocol
+
+    Parses every complete request in the receive buffer (pipelining),
+    answers them in order with one write, and keeps the connection open
+    unless the client asks to close it.
+    """
+
+    def __init__(self, server: POSServer):
+        """
+        Initialize protocol
+
+        Args:
+            server: Request router
+        """
+        self.server = server
+        self.transport: Optional[asyncio.Transport] = None
+        self._buffer = bytearray()
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+
+    def data_received(self, data: bytes):
+        self._buffer += data
+        responses = []
+        close = False
+        while not close:
+            request = self._next_request()
+            if request is None:
+                break
+            status, response, close = request
+            responses.append(_encode_response(status, response, close))
+        if responses:
+            self.transport.write(b"".join(responses))
+        if close:
+            self.transport.close()
+
+    def _next_request(self):
+        """Handle the next complete request in the buffer, or return None"""
+        buffer = self._buffer
+        header_end = buffer.find(b"\r\n\r\n")
+        if header_end < 0:
+            if len(buffer) > MAX_HEADER_BYTES:
+                return HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, {"error": "Headers too large"}, True
+            return None
+
+        lines = bytes(buffer[:header_end]).decode("latin-1").split("\r\n")
+        try:
+            method, path, version = lines[0].split(" ")
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {"error": "Malformed request line"}, True
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "transfer-encoding" in headers:
+            # Body framing would be unknown, so the connection is closed
+            return HTTPStatus.NOT_IMPLEMENTED, {"error": "Transfer-Encoding not supported"}, True
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length"}, True
+        if length < 0:
+            return HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length"}, True
+        if length > MAX_BODY_BYTES:
+            return HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Body too large"}, True
+        body_start = header_end + 4
+        if len(buffer) < body_start + length:
+            return None
+        body = bytes(buffer[body_start:body_start + length])
+        del buffer[:body_start + length]
+
+        connection = headers.get("connection", "").lower()
+        close = connection == "close" or (version == "HTTP/1.0" and connection != "keep-alive")
+        status, response = self.server.handle(method, path, body)
+        return status, response, close
+
+
+def _encode_response(status: int, response: dict, close: bool) -> bytes:
+    """Encode a JSON response"""
+    body = json.dumps(response, separators=(",", ":")).encode("utf-8")
+    status = HTTPStatus(status)
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"{'Connection: close' if close else 'Connection: keep-alive'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+def _field(payload: dict, name: str, types):
+    """Get a required field of the given type(s) or raise 400"""
+    value = payload.get(name)
+    if value is None or isinstance(value, bool) or not isinstance(value, types):
+        raise APIError(HTTPStatus.BAD_REQUEST, f"Missing or invalid field: {name}")
+    return value
+
+
+def _item_fields(payload: dict) -> Tuple[str, int]:
+    """Get product_id and a positive quantity or raise 400"""
+    product_id = _field(payload, "product_id", str)
+    quantity = _field(payload, "quantity", int)
+    if quantity <= 0:
+        raise APIError(HTTPStatus.BAD_REQUEST, "Quantity must be greater than 0")
+    return product_id, quantity
+
+
+def _product_to_json(product, on_hand: int) -> dict:
+    # "stock" is the available stock (kept for existing clients)
+    return {"product_id": product.product_id, "name": product.name,
+            "price": str(product.price), "stock": product.stock,
+            "available": product.stock, "on_hand": on_hand}
+
+
+def _items_to_json(transaction) -> list:
+    return [{"product_id": item.product_id, "name": item.name,
+             "quantity": item.quantity, "subtotal": str(item.get_subtotal())}
+            for item in transaction.items]
+
+
+def _sale_to_json(sale: Sale) -> dict:
+    response = {"sale_id": sale.sale_id, "completed": sale.is_completed,
+                "items": _items_to_json(sale), "total": str(sale.get_total())}
+    if sale.is_completed:
+        response["payment_method"] = sale.payment_method
+        response["payment_amount"] = str(sale.payment_amount)
+        response["change"] = str(sale.get_change())
+    return response
+
+
+def _return_to_json(return_transaction: ReturnTransaction) -> dict:
+    return {"return_id": return_transaction.return_id,
+            "original_sale_id": return_transaction.original_sale_id,
+            "completed": return_transaction.is_completed,
+            "items": _items_to_json(return_transaction),
+            "refund": str(return_transaction.get_total_refund())}
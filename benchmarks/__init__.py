@@ -0,0 +1,3 @@
+"""
+Benchmarks - Performance measurement scripts for the POS system
+"""
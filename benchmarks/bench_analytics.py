@@ -0,0 +1,65 @@
+"""
+Sales Analytics Benchmark
+Aggregates synthetic line-item columns (default 5M lines) with each report.
+
+Usage:
+    python -m benchmarks.bench_analytics [--lines 5000000] [--products 20000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from service.analytics_service import SalesAnalytics, SalesColumns
+
+
+def make_columns(lines: int, products: int, seed: int = 0) -> SalesColumns:
+    """Build columns for ~lines line items spread over 90 days"""
+    rng = np.random.default_rng(seed)
+    basket = rng.integers(1, 8, size=lines // 3)
+    sale = np.repeat(np.arange(len(basket)), basket)[:lines]
+    sale_times = np.sort(rng.integers(0, 90 * 86400, size=len(basket))) + 1_700_000_000
+    return SalesColumns(
+        sale=sale,
+        timestamp=sale_times[sale],
+        product=rng.zipf(1.3, size=len(sale)) % products,
+        quantity=rng.integers(1, 5, size=len(sale)),
+        unit_cents=rng.integers(50, 5000, size=len(sale)),
+        payment=rng.integers(0, 3, size=len(basket))[sale],
+        product_ids=[f"SKU{i:06d}" for i in range(products)],
+        payment_methods=["Cash", "Card", "Mobile"],
+    )
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Vectorized sales analytics")
+    parser.add_argument("--lines", type=int, default=5_000_000)
+    parser.add_argument("--products", type=int, default=20_000)
+    args = parser.parse_args()
+
+    columns = make_columns(args.lines, args.products)
+    analytics = SalesAnalytics()
+    analytics.load_columns(columns)
+    print(f"{len(columns):,} line items, {int(columns.sale[-1]) + 1:,} sales")
+
+    reports = [
+        ("revenue_by_hour", analytics.revenue_by_hour),
+        ("revenue_by_day", analytics.revenue_by_day),
+        ("top_products", lambda: analytics.top_products(10)),
+        ("basket_sizes", analytics.basket_size_distribution),
+        ("payment_mix", analytics.payment_mix),
+    ]
+    total = 0.0
+    for name, report in reports:
+        start = time.perf_counter()
+        report()
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        print(f"{name:<16} {elapsed * 1000:8.1f} ms")
+    print(f"{'all reports':<16} {total * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Barcode Scan Benchmark
+Loads EAN-13 aliases (two barcodes per product, every fifth one a 6-pack)
+for a memory-mapped catalog, then scans a skewed stream of codes into
+sales and reports scan-to-line latency, alias table memory and the hit
+rate of the bounded hot-product cache.
+
+Usage:
+    python -m benchmarks.bench_barcode [--products 200000] [--scans 200000] [--cache 20000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from domain.product import Product
+from persistence.catalog_file import MappedCatalogStore, write_catalog
+from service.barcode_index import BarcodeIndex
+from service.inventory_service import InventoryService
+from service.sale_service import SaleService
+
+
+def ean13(number: int) -> str:
+    """EAN-13 code with a valid check digit for a 12-digit number"""
+    digits = f"{number:012d}"
+    total = sum(int(digit) * (3 if index % 2 else 1) for index, digit in enumerate(digits))
+    return digits + str((10 - total % 10) % 10)
+
+
+def alias_rows(count: int) -> list:
+    """Two barcodes per product; every fifth product also sells as a 6-pack"""
+    rows = []
+    for index in range(count):
+        product_id = f"P{index:08d}"
+        rows.append({"barcode": ean13(400_000_000_000 + index), "product_id": product_id})
+        rows.append({"barcode": ean13(500_000_000_000 + index), "product_id": product_id,
+                     "multiplier": 6 if index % 5 == 0 else 1})
+    return rows
+
+
+def table_bytes(count: int, numeric: bool) -> int:
+    """Memory held by a barcode table of count products, keys included"""
+    tracemalloc.start()
+    rows = alias_rows(count)
+    if numeric:
+        table = BarcodeIndex()
+        for row in rows:
+            table.add(row["barcode"], row["product_id"], row.get("multiplier") or 1)
+    else:
+        table = {row["barcode"]: (row["product_id"], row.get("multiplier") or 1) for row in rows}
+    del rows
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Barcode scan-to-line latency")
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--scans", type=int, default=200_000)
+    parser.add_argument("--cache", type=int, default=20_000,
+                        help="hot product cache size of the catalog store")
+    args = parser.parse_args()
+    rng = random.Random(0)
+    rows = alias_rows(args.products)
+
+    print(f"alias table ({len(rows):,} barcodes)")
+    print(f"  dict of str -> tuple  {table_bytes(args.products, False) / 1e6:8.1f} MB")
+    print(f"  BarcodeIndex          {table_bytes(args.products, True) / 1e6:8.1f} MB")
+
+    with tempfile.TemporaryDirectory() as directory:
+        catalog_path = os.path.join(directory, "catalog.bin")
+        write_catalog((Product(f"P{index:08d}", f"Product {index}", 1.0, 10 ** 9)
+                       for index in range(args.products)), catalog_path)
+        store = MappedCatalogStore(catalog_path, cache_size=args.cache)
+        inventory_service = InventoryService(store=store)
+        inventory_service.import_barcodes(rows)
+        sale_service = SaleService(inventory_service)
+
+        # Skewed demand: a few SKUs are scanned far more often than the rest
+        codes = [rows[int(len(rows) * rng.random() ** 4)]["barcode"] for _ in range(args.scans)]
+        sale = sale_service.create_sale()
+        start = time.perf_counter()
+        for index, code in enumerate(codes):
+            sale_service.add_scanned_item(sale, code)
+            if index % 20 == 19:
+                sale = sale_service.create_sale()
+        elapsed = time.perf_counter() - start
+        store.close()
+
+    stats = inventory_service.lookup_stats()
+    cache = stats["product_cache"]
+    print(f"scan to line          {elapsed / args.scans * 1e6:8.2f} us/scan")
+    print(f"barcode hits          {stats['barcodes']['hits']:,} of {stats['barcodes']['lookups']:,}")
+    print(f"product cache         {cache['hits'] / (cache['hits'] + cache['misses']):8.1%} hit rate "
+          f"({cache['size']:,} hot of {args.products:,})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Catalog File Benchmark
+Compiles a synthetic 1M-SKU catalog from CSV, then measures cold start
+(opening the memory-mapped catalog), lookup latency and memory growth.
+
+Usage:
+    python -m benchmarks.bench_catalog_file [--skus 1000000] [--touch 10000]
+"""
+
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+
+from persistence.catalog_file import MappedCatalogStore, compile_catalog
+from service.inventory_service import InventoryService
+
+
+def rss_mb() -> float:
+    """
+    Private resident memory in MB on Linux (excludes the shared, reclaimable
+    page cache backing the mapped file), or peak RSS elsewhere
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            fields = statm.read().split()
+            return (int(fields[1]) - int(fields[2])) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Memory-mapped catalog cold start")
+    parser.add_argument("--skus", type=int, default=1_000_000)
+    parser.add_argument("--touch", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "products.csv")
+        catalog_path = os.path.join(directory, "catalog.bin")
+        with open(csv_path, "w", encoding="utf-8") as csv_file:
+            csv_file.write("product_id,name,price,stock\n")
+            for i in range(args.skus):
+                csv_file.write(f"SKU{i:08d},Product {i},{i % 100}.{i % 97:02d},{i % 500}\n")
+
+        start = time.perf_counter()
+        compile_catalog(csv_path, catalog_path)
+        print(f"compile       {args.skus:,} SKUs in {time.perf_counter() - start:.2f} s "
+              f"({os.path.getsize(catalog_path) / 2 ** 20:.0f} MB)")
+
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        store = MappedCatalogStore(catalog_path)
+        inventory_service = InventoryService(store=store)
+        first = inventory_service.get_product(f"SKU{args.skus // 2:08d}")
+        cold_ms = (time.perf_counter() - start) * 1000
+        print(f"cold start    {cold_ms:.2f} ms (open + first lookup of {first.product_id})")
+
+        rng = random.Random(0)
+        keys = [f"SKU{rng.randrange(args.skus):08d}" for _ in range(args.touch)]
+        start = time.perf_counter()
+        for key in keys:
+            inventory_service.get_product(key)
+        first_us = (time.perf_counter() - start) / len(keys) * 1e6
+        start = time.perf_counter()
+        for key in keys:
+            inventory_service.get_product(key)
+        cached_us = (time.perf_counter() - start) / len(keys) * 1e6
+        print(f"get_product   first access {first_us:.2f} us, decoded {cached_us:.2f} us")
+        print(f"memory        +{rss_mb() - rss_before:.1f} MB private RSS for "
+              f"{store.decoded_count():,} decoded products")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Domain Object Memory Benchmark
+Measures with tracemalloc the memory held by archived sales: 1M line items
+(250k completed sales of 4 items over a 10k product catalog), and 1M bare
+sale items, reported per line item. The catalog is allocated before
+measuring, so only the history is counted.
+
+Usage:
+    python -m benchmarks.bench_domain_memory [--items 1000000] [--basket 4]
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from domain.money import Money
+from domain.product import Product
+from domain.sale import Sale
+from domain.sale_item import SaleItem
+
+
+def measure(build):
+    """Run build() under tracemalloc; returns (result, bytes held, seconds)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, held, elapsed
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Memory per archived line item")
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--basket", type=int, default=4)
+    parser.add_argument("--products", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    catalog = [Product(f"P{index:06d}", f"Product {index}", Money(50 + index % 5_000), 10 ** 9)
+               for index in range(args.products)]
+    picks = [rng.choice(catalog) for _ in range(args.items)]
+    quantities = [rng.randint(1, 3) for _ in range(args.items)]
+
+    def build_history():
+        sales = []
+        for start in range(0, args.items, args.basket):
+            sale = Sale()
+            for index in range(start, min(start + args.basket, args.items)):
+                sale.add_item(SaleItem(picks[index], quantities[index]))
+            sale.complete("Cash", sale.get_total())
+            sales.append(sale)
+        return sales
+
+    def build_items():
+        return [SaleItem(product, quantity) for product, quantity in zip(picks, quantities)]
+
+    gc.disable()
+    try:
+        sales, history_bytes, history_seconds = measure(build_history)
+        del sales
+        items, item_bytes, item_seconds = measure(build_items)
+        del items
+    finally:
+        gc.enable()
+
+    print(f"archived history: {args.items:,} line items in {-(-args.items // args.basket):,} sales")
+    print(f"  {history_bytes / 2 ** 20:8.1f} MiB  {history_bytes / args.items:6.1f} bytes per line item"
+          f"  ({history_seconds:.2f}s to build)")
+    print(f"bare sale items: {args.items:,}")
+    print(f"  {item_bytes / 2 ** 20:8.1f} MiB  {item_bytes / args.items:6.1f} bytes per item"
+          f"  ({item_seconds:.2f}s to build)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Event Bus Benchmark
+Rings up the same checkouts with no subscribers, a synchronous subscriber,
+an asynchronous subscriber, and a slow asynchronous subscriber behind a
+small queue, and reports the checkout cost and delivery counters of each,
+so the publishing overhead on the sale path can be read off directly.
+
+Usage:
+    python -m benchmarks.bench_events [--sales 20000] [--max-queue 1000]
+"""
+
+import argparse
+import time
+
+from domain.product import Product
+from persistence.product_store import DictProductStore
+from service.events import EventBus, LowStock, SaleCompleted, StockChanged
+from service.inventory_service import InventoryService
+from service.sale_service import SaleService
+
+
+def run(sales: int, subscriber: str, max_queue: int, products: int = 100) -> dict:
+    """Complete sales checkouts; returns microseconds per sale and bus stats"""
+    store = DictProductStore()
+    store.add_many(Product(f"P{index:04d}", f"Product {index}", 1.0, 10 ** 9)
+                   for index in range(products))
+    events = EventBus(max_queue=max_queue)
+    inventory_service = InventoryService(store=store, events=events)
+    sale_service = SaleService(inventory_service)
+
+    def handler(event):
+        pass
+
+    def slow(event):
+        time.sleep(0.001)
+
+    if subscriber == "sync":
+        for event_type in (SaleCompleted, StockChanged, LowStock):
+            events.subscribe(event_type, handler)
+    elif subscriber in ("async", "slow"):
+        for event_type in (SaleCompleted, StockChanged, LowStock):
+            events.subscribe(event_type, slow if subscriber == "slow" else handler,
+                             asynchronous=True)
+
+    start = time.perf_counter()
+    for index in range(sales):
+        sale = sale_service.create_sale()
+        sale_service.add_item_to_sale(sale, f"P{index % products:04d}", 1)
+        sale_service.add_item_to_sale(sale, f"P{(index * 7) % products:04d}", 2)
+        sale_service.complete_sale(sale, "Cash", 100)
+    elapsed = time.perf_counter() - start
+    stats = events.stats()
+    events.close(timeout=0 if subscriber == "slow" else None)
+    stats["sale_us"] = elapsed / sales * 1e6
+    return stats
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Checkout cost of publishing events")
+    parser.add_argument("--sales", type=int, default=20_000)
+    parser.add_argument("--max-queue", type=int, default=1_000)
+    args = parser.parse_args()
+
+    print(f"{'subscriber':<12} {'per sale':>10} {'published':>10} {'dropped':>8}")
+    for subscriber in ("none", "sync", "async", "slow"):
+        result = run(args.sales, subscriber, args.max_queue)
+        print(f"{subscriber:<12} {result['sale_us']:>8.2f}us {result['published']:>10,} "
+              f"{result['dropped']:>8,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+History Window Benchmark
+Fills a sale history (default 1M sales) and measures what opening the
+history window costs: the index query for the first page and formatting
+the visible page plus its prefetch window. Headless (no Tk needed).
+
+Usage:
+    python -m benchmarks.bench_history [--sales 1000000] [--page 20] [--prefetch 200]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from domain.money import Money
+from domain.sale import Sale
+from domain.sale_item import SaleItem
+from service.history_index import SORT_BY_AMOUNT, SORT_BY_PAYMENT
+from service.inventory_service import InventoryService
+from service.sale_service import SaleService
+from ui.virtual_list import PageLoader
+
+
+def fill_history(sale_service, count: int):
+    """Record count completed sales over the last 90 days"""
+    rng = random.Random(0)
+    products = sale_service.inventory_service.get_all_products()
+    start = datetime.now() - timedelta(days=90)
+    step = timedelta(days=90) / count
+    for i in range(count):
+        sale = Sale()
+        sale.transaction_time = start + step * i
+        for product in rng.sample(products, rng.randint(1, 3)):
+            sale.add_item(SaleItem(product, rng.randint(1, 4)))
+        sale.complete(rng.choice(("Cash", "Card", "Mobile")), Money(100000))
+        sale_service.restore_sale(sale)
+
+
+def open_page(index, loader, **conditions) -> float:
+    """Query, then format the first page and its prefetch window; returns ms"""
+    start = time.perf_counter()
+    rows = index.query(**conditions)
+    loader.request(rows, 0)
+    while loader.busy():
+        loader.collect()
+        time.sleep(0.0005)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="History window open latency")
+    parser.add_argument("--sales", type=int, default=1_000_000)
+    parser.add_argument("--page", type=int, default=20)
+    parser.add_argument("--prefetch", type=int, default=200)
+    args = parser.parse_args()
+
+    inventory_service = InventoryService()
+    for product in inventory_service.get_all_products():
+        product.stock = 10 ** 9
+    sale_service = SaleService(inventory_service)
+    start = time.perf_counter()
+    fill_history(sale_service, args.sales)
+    print(f"history  {args.sales:,} sales recorded in {time.perf_counter() - start:.1f} s")
+
+    index = sale_service.history_index
+    day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=30)
+    cases = [
+        ("open (newest first)", {}),
+        ("one day", {"start": day, "end": day + timedelta(days=1)}),
+        ("payment = Card", {"payment_method": "Card"}),
+        ("card, one day", {"payment_method": "Card", "start": day,
+                           "end": day + timedelta(days=1)}),
+        ("sort by payment", {"sort_by": SORT_BY_PAYMENT}),
+        ("sort by amount (build)", {"sort_by": SORT_BY_AMOUNT}),
+        ("sort by amount", {"sort_by": SORT_BY_AMOUNT, "descending": False}),
+        ("amount >= $150", {"min_amount": Money(15000)}),
+    ]
+    for name, conditions in cases:
+        loader = PageLoader(lambda position: format_sale(index.records[position]),
+                            args.page, args.prefetch)
+        elapsed = open_page(index, loader, **conditions)
+        loader.close()
+        print(f"{name:<24} {elapsed:8.1f} ms")
+
+
+def format_sale(sale) -> tuple:
+    """Row values as the history window shows them"""
+    return (sale.sale_id, sale.transaction_time.strftime('%Y-%m-%d %H:%M:%S'),
+            len(sale.items), f"${sale.get_total():.2f}", sale.payment_method)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+HTTP API Load Generator
+Drives the POS HTTP API with many keep-alive connections running a
+checkout workload (product lookups, open sale, add items, complete) and
+reports throughput and latency percentiles.
+
+Starts its own server (python main_server.py, temporary journal) unless
+--port is given.
+
+Usage:
+    python -m benchmarks.bench_http_api [--connections 16] [--seconds 5]
+                                        [--pipeline] [--host 127.0.0.1 --port 8080]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+PRODUCT_IDS = ["P001", "P002", "P003", "P004", "P005"]
+
+
+def encode_request(method: str, path: str, body=None) -> bytes:
+    """Encode one HTTP/1.1 keep-alive request"""
+    payload = b"" if body is None else json.dumps(body).encode("utf-8")
+    head = (f"{method} {path} HTTP/1.1\r\nHost: pos\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n")
+    return head.encode("latin-1") + payload
+
+
+class Connection:
+    """Keep-alive client connection that can pipeline requests"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 latencies: List[float]):
+        self.reader = reader
+        self.writer = writer
+        self.latencies = latencies
+        self.errors = 0
+
+    async def send(self, *requests: bytes) -> List[Tuple[int, dict]]:
+        """Write all requests at once, then read their responses in order"""
+        start = time.perf_counter()
+        self.writer.write(b"".join(requests))
+        responses = []
+        for _ in requests:
+            head = await self.reader.readuntil(b"\r\n\r\n")
+            status = int(head[9:12])
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line[:15].lower() == b"content-length:":
+                    length = int(line[15:])
+            body = await self.reader.readexactly(length)
+            self.latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                self.errors += 1
+            responses.append((status, json.loads(body)))
+        return responses
+
+
+async def checkout_loop(host: str, port: int, deadline: float, pipeline: bool,
+                        latencies: List[float], worker: int) -> int:
+    """Run checkouts on one connection until the deadline; returns error count"""
+    reader, writer = await asyncio.open_connection(host, port)
+    connection = Connection(reader, writer, latencies)
+    turn = worker
+    while time.perf_counter() < deadline:
+        turn += 1
+        first, second = PRODUCT_IDS[turn % 5], PRODUCT_IDS[(turn + 2) % 5]
+        lookups = [encode_request("GET", f"/products/{first}"),
+                   encode_request("GET", f"/products/{second}")]
+        if pipeline:
+            await connection.send(*lookups)
+        else:
+            for request in lookups:
+                await connection.send(request)
+
+        _, sale = (await connection.send(encode_request("POST", "/sales")))[0]
+        sale_path = f"/sales/{sale['sale_id']}"
+        items = [encode_request("POST", sale_path + "/items",
+                                {"product_id": product_id, "quantity": 1})
+                 for product_id in (first, second)]
+        if pipeline:
+            await connection.send(*items)
+        else:
+            for request in items:
+                await connection.send(request)
+        await connection.send(encode_request("POST", sale_path + "/complete",
+                                             {"payment_method": "Card", "payment_amount": "100"}))
+    writer.close()
+    return connection.errors
+
+
+def start_server(directory: str) -> Tuple[subprocess.Popen, int]:
+    """Start main_server.py on a free port with a temporary journal"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(root, "main_server.py"), "--port", "0",
+         "--journal", os.path.join(directory, "transactions.journal")],
+        cwd=directory, stdout=subprocess.PIPE, text=True,
+        env=dict(os.environ, PYTHONPATH=root))
+    line = process.stdout.readline()
+    return process, int(line.rsplit(":", 1)[1])
+
+
+async def run(host: str, port: int, connections: int, seconds: float, pipeline: bool):
+    """Restock, run the workload and print the results"""
+    reader, writer = await asyncio.open_connection(host, port)
+    await Connection(reader, writer, []).send(encode_request(
+        "POST", "/inventory/restock", {"items": [[pid, 10 ** 8] for pid in PRODUCT_IDS]}))
+    writer.close()
+
+    latencies: List[float] = []
+    start = time.perf_counter()
+    errors = await asyncio.gather(*(checkout_loop(host, port, start + seconds, pipeline,
+                                                  latencies, worker)
+                                    for worker in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(fraction):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+    print(f"connections {connections}, pipelining {'on' if pipeline else 'off'}")
+    print(f"requests    {len(latencies):,} in {elapsed:.1f} s = "
+          f"{len(latencies) / elapsed:,.0f} req/s ({sum(errors)} errors)")
+    print(f"latency     p50 {percentile(0.50):.2f} ms, p99 {percentile(0.99):.2f} ms, "
+          f"max {latencies[-1] * 1000:.2f} ms")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="POS HTTP API load generator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="Existing server (default: start one)")
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Pipeline independent requests (lookups, item adds)")
+    args = parser.parse_args()
+
+    if args.port is not None:
+        asyncio.run(run(args.host, args.port, args.connections, args.seconds, args.pipeline))
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        process, port = start_server(directory)
+        try:
+            asyncio.run(run(args.host, port, args.connections, args.seconds, args.pipeline))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Transaction ID Generator Benchmark
+Measures SnowflakeIdGenerator throughput, single-threaded and contended.
+
+Usage:
+    python -m benchmarks.bench_id_generator [--count 2000000] [--threads 4]
+"""
+
+import argparse
+import threading
+import time
+
+from domain.id_generator import SnowflakeIdGenerator
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Transaction ID generator throughput")
+    parser.add_argument("--count", type=int, default=2_000_000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    generator = SnowflakeIdGenerator(terminal_id=1)
+    next_id = generator.next_id
+    start = time.perf_counter()
+    for _ in range(args.count):
+        next_id()
+    elapsed = time.perf_counter() - start
+    print(f"next_id            {args.count / elapsed / 1e6:6.2f} M ids/s")
+
+    generate = generator.generate
+    start = time.perf_counter()
+    for _ in range(args.count):
+        generate("SALE")
+    elapsed = time.perf_counter() - start
+    print(f"generate('SALE')   {args.count / elapsed / 1e6:6.2f} M ids/s")
+
+    start = time.perf_counter()
+    batch = 4096
+    for _ in range(args.count // batch):
+        generator.next_ids(batch)
+    elapsed = time.perf_counter() - start
+    print(f"next_ids({batch})     {args.count // batch * batch / elapsed / 1e6:6.2f} M ids/s")
+
+    per_thread = args.count // args.threads
+    results = []
+
+    def worker():
+        results.append([next_id() for _ in range(per_thread)])
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    all_ids = [value for ids in results for value in ids]
+    print(f"{args.threads} threads          {len(all_ids) / elapsed / 1e6:6.2f} M ids/s, "
+          f"unique={len(set(all_ids)) == len(all_ids)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Bulk Import Benchmark
+Writes a synthetic 1M-row product CSV and measures streaming import time
+and memory, followed by a bulk restock of every product.
+
+Usage:
+    python -m benchmarks.bench_import [--rows 1000000] [--chunk-size 10000]
+"""
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from persistence.product_store import DictProductStore
+from service.inventory_service import InventoryService
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory in MB (Linux reports ru_maxrss in KB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Streaming product import")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "products.csv")
+        with open(csv_path, "w", encoding="utf-8") as csv_file:
+            csv_file.write("product_id,name,price,stock\n")
+            for i in range(args.rows):
+                csv_file.write(f"SKU{i:08d},Product {i},{i % 100}.{i % 97:02d},{i % 500}\n")
+
+        inventory_service = InventoryService(store=DictProductStore())
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        result = inventory_service.import_products(csv_path, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - start
+        print(f"import   {result.succeeded:,} rows in {elapsed:.2f} s "
+              f"({result.succeeded / elapsed:,.0f} rows/s, {len(result.errors)} errors)")
+        print(f"memory   peak RSS {peak_rss_mb():.0f} MB (+{peak_rss_mb() - rss_before:.0f} MB)")
+
+        start = time.perf_counter()
+        result = inventory_service.bulk_restock((f"SKU{i:08d}", 10) for i in range(args.rows))
+        elapsed = time.perf_counter() - start
+        print(f"restock  {result.succeeded:,} rows in {elapsed:.2f} s "
+              f"({result.succeeded / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Inventory Locking Benchmark
+Compares striped per-product locks with a single global lock when many
+terminal threads reserve stock from one shared InventoryService.
+
+Usage:
+    python -m benchmarks.bench_inventory_locking [--threads 32] [--skus 20]
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from domain.product import Product
+from service.inventory_service import InventoryService
+
+
+def run(lock_stripes: int, threads: int, operations: int, skus: int) -> dict:
+    """
+    Hammer a shared inventory from several threads
+
+    Args:
+        lock_stripes: Number of lock stripes (1 = global lock)
+        threads: Number of terminal threads
+        operations: Operations per thread
+        skus: Number of contended SKUs
+
+    Returns:
+        dict: Throughput and invariant results
+    """
+    inventory_service = InventoryService(concurrent=True, lock_stripes=lock_stripes)
+    product_ids = [f"HOT{i:03d}" for i in range(skus)]
+    for product_id in product_ids:
+        inventory_service.add_product(Product(product_id, product_id, 1.0, threads * operations))
+    initial = sum(inventory_service.get_product(p).stock for p in product_ids)
+    sold = [0] * threads
+
+    def worker(index):
+        rng = random.Random(index)
+        for _ in range(operations):
+            if rng.random() < 0.7:
+                if inventory_service.try_reserve(rng.choice(product_ids), 1):
+                    sold[index] += 1
+            else:
+                items = [(rng.choice(product_ids), 1) for _ in range(4)]
+                if inventory_service.reserve_many(items):
+                    sold[index] += 4
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    final = sum(inventory_service.get_product(p).stock for p in product_ids)
+    return {
+        "ops_per_sec": threads * operations / elapsed,
+        "consistent": sum(sold) == initial - final,
+        "non_negative": all(inventory_service.get_product(p).stock >= 0 for p in product_ids),
+    }
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Striped vs global inventory locking")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--operations", type=int, default=5000)
+    parser.add_argument("--skus", type=int, default=20)
+    args = parser.parse_args()
+
+    for stripes in (1, 64):
+        result = run(stripes, args.threads, args.operations, args.skus)
+        label = "global lock" if stripes == 1 else f"{stripes} stripes"
+        print(f"{label:<12} {result['ops_per_sec']:>12,.0f} ops/s  "
+              f"consistent={result['consistent']} non_negative={result['non_negative']}")
+
+
+if __name__ == "__main__":
+    main()
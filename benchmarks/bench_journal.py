@@ -0,0 +1,89 @@
+"""
+Transaction Journal Benchmark
+Measures per-commit latency of SaleService.complete_sale with a journal
+at a paced checkout rate, for each fsync policy.
+
+Usage:
+    python -m benchmarks.bench_journal [--rate 500] [--seconds 4]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from domain.product import Product
+from service.inventory_service import InventoryService
+from service.sale_service import SaleService
+from persistence.transaction_journal import (TransactionJournal, FSYNC_ALWAYS,
+                                             FSYNC_GROUP, FSYNC_NONE)
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """Return the given percentile of sorted samples"""
+    index = min(len(samples) - 1, int(len(samples) * fraction))
+    return samples[index]
+
+
+def run_policy(policy: str, rate: int, seconds: float, directory: str) -> dict:
+    """
+    Run paced checkouts against one fsync policy
+
+    Args:
+        policy: Fsync policy
+        rate: Checkouts per second
+        seconds: Duration in seconds
+        directory: Directory for the journal file
+
+    Returns:
+        dict: Latency statistics in milliseconds
+    """
+    journal = TransactionJournal(os.path.join(directory, f"{policy}.journal"), policy)
+    inventory_service = InventoryService()
+    inventory_service.add_product(Product("BENCH", "Bench Item", 1.25, 10 ** 9))
+    sale_service = SaleService(inventory_service, journal)
+
+    interval = 1.0 / rate
+    latencies = []
+    next_start = time.perf_counter()
+    for _ in range(int(rate * seconds)):
+        sale = sale_service.create_sale()
+        sale_service.add_item_to_sale(sale, "BENCH", 3)
+        sale_service.add_item_to_sale(sale, "BENCH", 1)
+
+        start = time.perf_counter()
+        sale_service.complete_sale(sale, "Cash", 100.0)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+
+        next_start += interval
+        delay = next_start - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    journal.close()
+
+    latencies.sort()
+    return {
+        "commits": len(latencies),
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": latencies[-1],
+    }
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Transaction journal commit latency")
+    parser.add_argument("--rate", type=int, default=500, help="checkouts per second")
+    parser.add_argument("--seconds", type=float, default=4.0, help="duration per policy")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for policy in (FSYNC_NONE, FSYNC_GROUP, FSYNC_ALWAYS):
+            stats = run_policy(policy, args.rate, args.seconds, directory)
+            print(f"{policy:<8} commits={stats['commits']:<6} "
+                  f"p50={stats['p50_ms']:.3f}ms p99={stats['p99_ms']:.3f}ms "
+                  f"max={stats['max_ms']:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Metrics Overhead Benchmark
+Runs the checkout loop (create_sale / add_item_to_sale / complete_sale)
+with operation metrics disabled and enabled, alternating rounds with the
+GC paused, and reports the overhead of recording (best round of each).
+
+Usage:
+    python -m benchmarks.bench_metrics [--orders 30000] [--rounds 15] [--journal]
+"""
+
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.bench_sales_batch import make_orders, make_service, per_call
+from service.metrics import metrics
+
+
+def timed_checkouts(orders, journal_path=None) -> float:
+    """Seconds to complete orders one call at a time on a fresh service"""
+    sale_service = make_service(journal_path)
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        per_call(sale_service, orders)
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+        if sale_service.journal:
+            sale_service.journal.close()
+            os.remove(journal_path)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Checkout overhead of operation metrics")
+    parser.add_argument("--orders", type=int, default=30_000)
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--journal", action="store_true",
+                        help="journal every sale, as the applications do")
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    journal_path = os.path.join(directory, "transactions.journal") if args.journal else None
+
+    product_ids = ["P001", "P002", "P003", "P004", "P005"]
+    orders = make_orders(args.orders, product_ids)
+    best = {"disabled": float("inf"), "enabled": float("inf")}
+    for _ in range(args.rounds):
+        for mode in ("disabled", "enabled"):
+            if mode == "enabled":
+                metrics.enable()
+            else:
+                metrics.disable()
+            best[mode] = min(best[mode], timed_checkouts(orders, journal_path))
+    metrics.disable()
+    os.rmdir(directory)
+
+    for mode, seconds in best.items():
+        print(f"{mode:<9} {seconds * 1e6 / args.orders:7.2f} us/checkout")
+    print(f"overhead  {best['enabled'] / best['disabled'] - 1:+.1%}")
+    print(json.dumps(metrics.snapshot()["operations"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
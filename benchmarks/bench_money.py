@@ -0,0 +1,61 @@
+"""
+Money Aggregation Benchmark
+Sums line-item amounts as floats (today's path) and as integer cents
+(the Money bulk paths), and reports speed and rounding drift.
+
+Usage:
+    python -m benchmarks.bench_money [--items 10000000]
+"""
+
+import argparse
+import random
+import time
+from array import array
+
+from domain.money import Money
+
+
+def timed(func):
+    """Return (result, seconds) of func()"""
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Float vs integer-cents aggregation")
+    parser.add_argument("--items", type=int, default=10_000_000)
+    parser.add_argument("--money-items", type=int, default=1_000_000,
+                        help="line items for the Money object path (memory bound)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # Typical supermarket prices: 0.01 .. 99.99
+    cents = array("q", (rng.randrange(1, 10000) for _ in range(args.items)))
+    floats = [value / 100 for value in cents]
+
+    cents_list = list(cents)
+
+    Money.sum_cents(array("q"))  # load the optional NumPy path before timing
+
+    float_total, float_seconds = timed(lambda: sum(floats))
+    exact, bulk_seconds = timed(lambda: Money.sum_cents(cents))
+    list_total, list_seconds = timed(lambda: Money.sum_cents(cents_list))
+    assert list_total == exact
+
+    print(f"{args.items:,} line items")
+    print(f"float sum()              {float_seconds * 1000:8.1f} ms  total={float_total!r}")
+    print(f"Money.sum_cents(array)   {bulk_seconds * 1000:8.1f} ms  total={exact}")
+    print(f"Money.sum_cents(list)    {list_seconds * 1000:8.1f} ms  total={list_total}")
+    print(f"float drift              {abs(float_total * 100 - exact.cents):.6f} cents "
+          f"(float == exact: {float_total == exact})")
+
+    moneys = [Money(value) for value in cents[:args.money_items]]
+    money_total, money_seconds = timed(lambda: Money.sum(moneys))
+    print(f"Money.sum()              {money_seconds * 1000:8.1f} ms  "
+          f"for {len(moneys):,} Money objects, total={money_total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Product Search Benchmark
+Builds the search index over a synthetic catalog (default 500k SKUs) and
+measures top-10 search-as-you-type queries: ID prefix, name prefix, word
+prefix and misspelled (fuzzy) names, plus incremental adds.
+
+Usage:
+    python -m benchmarks.bench_product_search [--products 500000] [--queries 2000]
+"""
+
+import argparse
+import random
+import string
+import time
+
+from domain.product import Product
+from service.product_search import ProductSearchIndex
+
+
+def make_catalog(count: int, rng: random.Random) -> list:
+    """Products named with 1-4 words drawn from a 20k-word vocabulary"""
+    vocabulary = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+                  for _ in range(20_000)]
+    return [Product(f"P{index:08d}",
+                    " ".join(rng.choice(vocabulary).capitalize()
+                             for _ in range(rng.randint(1, 4))),
+                    1.0, 1)
+            for index in range(count)]
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    """Replace one letter of word"""
+    position = rng.randrange(len(word))
+    return word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1:]
+
+
+def time_queries(index: ProductSearchIndex, queries: list) -> tuple:
+    """Mean and worst milliseconds per top-10 search"""
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, 10)
+        times.append(time.perf_counter() - start)
+    return sum(times) / len(times) * 1000, max(times) * 1000
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Product search index")
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    products = make_catalog(args.products, rng)
+    start = time.perf_counter()
+    index = ProductSearchIndex(products)
+    print(f"build             {args.products:>9,} products  {time.perf_counter() - start:7.2f} s")
+
+    sample = [rng.choice(products) for _ in range(args.queries)]
+    workloads = {
+        "id prefix": [product.product_id[:rng.randint(3, 9)] for product in sample],
+        "name prefix": [product.name[:rng.randint(1, 8)] for product in sample],
+        "word prefix": [product.name.split()[-1][:rng.randint(2, 6)] for product in sample],
+        "misspelled": [misspell(product.name.split()[0], rng) for product in sample],
+    }
+    for name, queries in workloads.items():
+        mean, worst = time_queries(index, queries)
+        print(f"{name:<17} {mean:9.3f} ms mean  {worst:7.3f} ms max")
+
+    added = make_catalog(1_000, rng)
+    start = time.perf_counter()
+    for offset, product in enumerate(added):
+        product.product_id = f"N{offset:08d}"
+        index.add(product)
+    print(f"incremental add   {(time.perf_counter() - start) / len(added) * 1000:9.3f} ms each")
+
+
+if __name__ == "__main__":
+    main()
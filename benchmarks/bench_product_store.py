@@ -0,0 +1,84 @@
+"""
+Product Store Benchmark
+Measures InventoryService.get_product latency for the in-memory store and
+the SQLite store (cached and uncached SKUs), and per-sale stock commits.
+
+Usage:
+    python -m benchmarks.bench_product_store [--skus 200000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from domain.product import Product
+from persistence.product_store import DictProductStore, SQLiteProductStore
+from service.inventory_service import InventoryService
+from service.sale_service import SaleService
+
+
+def per_call_us(func, keys: list) -> float:
+    """Return average microseconds per call of func over keys"""
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def catalog(skus: int):
+    """Generate a synthetic catalog"""
+    return (Product(f"SKU{i:07d}", f"Product {i}", (i % 5000) / 100 + 0.99, 1_000_000)
+            for i in range(skus))
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Product store latency")
+    parser.add_argument("--skus", type=int, default=200_000)
+    parser.add_argument("--hot", type=int, default=5_000, help="hot SKU working set")
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--sales", type=int, default=2_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    hot_keys = [f"SKU{rng.randrange(args.skus):07d}" for _ in range(args.hot)]
+    lookups = [rng.choice(hot_keys) for _ in range(args.lookups)]
+    cold_keys = [f"SKU{rng.randrange(args.skus):07d}" for _ in range(10_000)]
+
+    dict_store = DictProductStore()
+    dict_store.add_many(catalog(args.skus))
+    inventory_service = InventoryService(store=dict_store)
+    print(f"dict store        get_product {per_call_us(inventory_service.get_product, lookups):8.2f} us")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteProductStore(os.path.join(directory, "catalog.db"),
+                                   cache_size=args.hot * 2)
+        start = time.perf_counter()
+        store.add_many(catalog(args.skus))
+        print(f"sqlite load       {args.skus:,} SKUs in {time.perf_counter() - start:.2f} s")
+
+        inventory_service = InventoryService(store=store)
+        for key in hot_keys:
+            inventory_service.get_product(key)
+        print(f"sqlite cached     get_product {per_call_us(inventory_service.get_product, lookups):8.2f} us")
+
+        uncached = SQLiteProductStore(os.path.join(directory, "catalog.db"), cache_size=1)
+        print(f"sqlite uncached   get_product {per_call_us(uncached.get, cold_keys):8.2f} us")
+        uncached.close()
+
+        sale_service = SaleService(inventory_service)
+        start = time.perf_counter()
+        for _ in range(args.sales):
+            sale = sale_service.create_sale()
+            for _ in range(5):
+                sale_service.add_item_to_sale(sale, rng.choice(hot_keys), 1)
+            sale_service.complete_sale(sale, "Card", 1000)
+        elapsed = time.perf_counter() - start
+        print(f"sqlite checkout   {args.sales / elapsed:8.0f} sales/s (5 lines, one stock transaction each)")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
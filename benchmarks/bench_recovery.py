@@ -0,0 +1,92 @@
+"""
+Recovery Benchmark
+Journals N sales (default 200k), then measures startup recovery from the
+journal alone and from a snapshot plus a short journal tail, and the first
+history lookup after it (which decodes the history the snapshot covers).
+
+Usage:
+    python -m benchmarks.bench_recovery [--sales 200000] [--tail 10000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_sales_batch import make_orders
+from persistence.snapshot import SnapshotManager, recover
+from persistence.transaction_journal import FSYNC_NONE, TransactionJournal
+from service.inventory_service import InventoryService
+from service.return_service import ReturnService
+from service.sale_service import SaleService
+
+
+def open_services(path: str):
+    """Journal and services over the sample catalog with plenty of stock"""
+    journal = TransactionJournal(path, fsync_policy=FSYNC_NONE)
+    inventory_service = InventoryService()
+    for product in inventory_service.get_all_products():
+        product.stock = 10 ** 9
+    sale_service = SaleService(inventory_service, journal)
+    return journal, sale_service, ReturnService(inventory_service, sale_service, journal)
+
+
+def write_sales(sale_service, count: int):
+    """Complete count random sales through the batch API"""
+    product_ids = [product.product_id
+                   for product in sale_service.inventory_service.get_all_products()]
+    orders = make_orders(count, product_ids)
+    for start in range(0, count, 10_000):
+        sale_service.complete_sales_batch(orders[start:start + 10_000])
+
+
+def timed_recovery(path: str):
+    """
+    Recover into fresh services; returns (seconds, records replayed,
+    stock of P001, seconds of the first history lookup)
+    """
+    journal, sale_service, return_service = open_services(path)
+    start = time.perf_counter()
+    count = recover(journal, sale_service, return_service)
+    elapsed = time.perf_counter() - start
+    stock = sale_service.inventory_service.get_product("P001").stock
+    start = time.perf_counter()
+    sale_service.get_sale("SALE-0")
+    lookup = time.perf_counter() - start
+    journal.close()
+    return elapsed, count, stock, lookup
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Journal replay vs snapshot recovery")
+    parser.add_argument("--sales", type=int, default=200_000)
+    parser.add_argument("--tail", type=int, default=10_000)
+    args = parser.parse_args()
+    random.seed(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "transactions.journal")
+        journal, sale_service, _ = open_services(path)
+        write_sales(sale_service, args.sales)
+        journal.close()
+
+        elapsed, count, stock, _ = timed_recovery(path)
+        print(f"journal only       {count:>9,} records  {elapsed:6.2f} s  P001 stock {stock:,}")
+
+        journal, sale_service, _ = open_services(path)
+        start = time.perf_counter()
+        SnapshotManager(journal).snapshot()
+        print(f"snapshot written   {os.path.getsize(path + '.snapshot') / 1e3:9.1f} kB  "
+              f"{time.perf_counter() - start:6.2f} s")
+        write_sales(sale_service, args.tail)
+        journal.close()
+
+        elapsed, count, stock, lookup = timed_recovery(path)
+        print(f"snapshot + tail    {count:>9,} records  {elapsed:6.2f} s  P001 stock {stock:,}")
+        print(f"first history use  {lookup:26.2f} s  (decodes the snapshot's history)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Reorder Report Benchmark
+Builds the reorder priority index over a large catalog (default 500k
+products), then reports the cost of a stock change with and without the
+index, and the latency of the top-50 report against a full scan and sort.
+
+Usage:
+    python -m benchmarks.bench_reorder [--products 500000] [--changes 100000]
+"""
+
+import argparse
+import random
+import time
+
+from domain.product import Product
+from persistence.product_store import DictProductStore
+from service.inventory_service import InventoryService
+from service.reorder_index import urgency
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Reorder priority index cost")
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--changes", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    store = DictProductStore()
+    store.add_many(Product(f"P{index:07d}", f"Product {index}", 1.0, rng.randrange(10, 500))
+                   for index in range(args.products))
+    inventory_service = InventoryService(store=store)
+    for index in rng.sample(range(args.products), args.products // 10):
+        inventory_service.set_low_stock_threshold(f"P{index:07d}", rng.randrange(5, 50))
+    changes = [(f"P{rng.randrange(args.products):07d}", rng.randrange(1, 5))
+               for _ in range(args.changes)]
+
+    def apply_changes():
+        start = time.perf_counter()
+        for product_id, quantity in changes:
+            inventory_service.reserve_product(product_id, quantity)
+            inventory_service.restore_stock(product_id, quantity - 1)
+        return (time.perf_counter() - start) / (2 * len(changes)) * 1e6
+
+    plain_us = apply_changes()
+    start = time.perf_counter()
+    index = inventory_service.reorder_index()
+    build = time.perf_counter() - start
+    indexed_us = apply_changes()
+
+    # Top report from the index, and from a scan and sort of the catalog
+    start = time.perf_counter()
+    for _ in range(100):
+        lines = inventory_service.reorder_report(args.limit)
+    top_ms = (time.perf_counter() - start) / 100 * 1e3
+    start = time.perf_counter()
+    scanned = sorted(inventory_service.get_all_products(),
+                     key=lambda product: urgency(
+                         product.stock, inventory_service.get_low_stock_threshold(product.product_id),
+                         inventory_service.get_daily_demand(product.product_id)))[:args.limit]
+    scan_ms = (time.perf_counter() - start) * 1e3
+    assert [urgency(line.stock, line.reorder_point, line.daily_demand) for line in lines] == \
+        [urgency(product.stock, inventory_service.get_low_stock_threshold(product.product_id), 0)
+         for product in scanned]
+
+    print(f"products: {args.products:,} ({index.below_count:,} below reorder point)")
+    print(f"index build: {build:.2f}s")
+    print(f"stock change: {plain_us:.2f}us without index, {indexed_us:.2f}us with index")
+    print(f"top {args.limit}: {top_ms:.3f}ms from index, {scan_ms:.0f}ms scan and sort")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Stock Reservation Benchmark
+Opens many carts holding stock (default 10k and 100k live holds) under a
+simulated clock, then reports the cost of adding a held line, renewing a
+cart, and expiring every cart in one-second sweeps, so the growth of the
+expiry cost with the number of live holds can be read off directly.
+
+Usage:
+    python -m benchmarks.bench_reservations [--holds 10000 100000] [--ttl 900]
+"""
+
+import argparse
+import random
+import time
+
+from domain.product import Product
+from domain.sale_item import SaleItem
+from persistence.product_store import DictProductStore
+from service.inventory_service import InventoryService
+from service.reservations import ReservationBook
+from service.sale_service import SaleService
+
+
+def run(holds: int, ttl: float, products: int = 1_000) -> dict:
+    """Open holds carts and expire them all; returns microseconds per step"""
+    rng = random.Random(0)
+    store = DictProductStore()
+    store.add_many(Product(f"P{index:06d}", f"Product {index}", 1.0, 10 ** 9)
+                   for index in range(products))
+    inventory_service = InventoryService(store=store)
+    now = [0.0]
+    inventory_service.reservations = ReservationBook(inventory_service, ttl,
+                                                     clock=lambda: now[0])
+    sale_service = SaleService(inventory_service)
+    product_ids = [f"P{rng.randrange(products):06d}" for _ in range(holds)]
+
+    # Carts opened over half a hold period: all still live at the end
+    step = ttl / 2 / holds
+    sales = []
+    start = time.perf_counter()
+    for index, product_id in enumerate(product_ids):
+        now[0] = index * step
+        sale = sale_service.create_sale()
+        sale_service.add_item_to_sale(sale, product_id, 1)
+        sales.append(sale)
+    add = time.perf_counter() - start
+    assert len(inventory_service.reservations) == holds
+
+    # Baseline: the same line without hold bookkeeping
+    start = time.perf_counter()
+    for product_id in product_ids:
+        sale = sale_service.create_sale()
+        product = inventory_service.reserve_product(product_id, 1)
+        sale.add_item(SaleItem(product, 1))
+    plain = time.perf_counter() - start
+
+    # Renew a random tenth of the carts by adding another line, over the
+    # next half hold period
+    renewed = rng.sample(sales, holds // 10)
+    opened = now[0]
+    start = time.perf_counter()
+    for index, sale in enumerate(renewed):
+        now[0] = opened + index * step * 10
+        sale_service.add_item_to_sale(sale, product_ids[0], 1)
+    renew = time.perf_counter() - start
+
+    # Sweep once per simulated second until every cart expired
+    sweeps = 0
+    worst = 0.0
+    start = time.perf_counter()
+    while len(inventory_service.reservations):
+        now[0] += 1.0
+        sweep_start = time.perf_counter()
+        inventory_service.reservations.expire()
+        worst = max(worst, time.perf_counter() - sweep_start)
+        sweeps += 1
+    expire = time.perf_counter() - start
+    return {
+        "add_line_us": add / holds * 1e6,
+        "plain_line_us": plain / holds * 1e6,
+        "renew_us": renew / len(renewed) * 1e6,
+        "expire_us": expire / holds * 1e6,
+        "worst_sweep_ms": worst * 1e3,
+        "sweeps": sweeps,
+    }
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Stock hold bookkeeping and expiry cost")
+    parser.add_argument("--holds", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--ttl", type=float, default=900.0, help="hold period in seconds")
+    args = parser.parse_args()
+
+    print(f"{'holds':>8} {'add line':>10} {'no holds':>10} {'renew':>8} "
+          f"{'expire':>8} {'worst sweep':>12}")
+    for holds in args.holds:
+        result = run(holds, args.ttl)
+        print(f"{holds:>8,} {result['add_line_us']:>8.2f}us {result['plain_line_us']:>8.2f}us "
+              f"{result['renew_us']:>6.2f}us {result['expire_us']:>6.2f}us "
+              f"{result['worst_sweep_ms']:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Sale Index Benchmark
+Shows that SaleService.get_sale and ReturnService.find_sale_by_id stay
+constant-time as sales history grows, compared with a linear scan.
+
+Usage:
+    python -m benchmarks.bench_sale_index [--max-sales 1000000]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from domain.sale import Sale
+from service.inventory_service import InventoryService
+from service.sale_service import SaleService
+from service.return_service import ReturnService
+
+
+def time_per_call(func, keys: list) -> float:
+    """Return average microseconds per call of func over keys"""
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def linear_find(sale_service: SaleService, sale_id: str):
+    """Linear scan lookup, as find_sale_by_id used to do"""
+    for sale in sale_service.get_sales_history():
+        if sale.sale_id == sale_id:
+            return sale
+    return None
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Sale lookup scaling")
+    parser.add_argument("--max-sales", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    args = parser.parse_args()
+
+    inventory_service = InventoryService()
+    sale_service = SaleService(inventory_service)
+    return_service = ReturnService(inventory_service, sale_service)
+    base_time = datetime(2025, 1, 1)
+
+    print(f"{'sales':>10} {'get_sale us':>12} {'find_sale_by_id us':>19} "
+          f"{'sales_between(1h) us':>21} {'linear scan us':>15}")
+    size = 1000
+    count = 0
+    while size <= args.max_sales:
+        while count < size:
+            sale = Sale(f"SALE-{count:010d}")
+            sale.transaction_time = base_time + timedelta(seconds=count)
+            sale_service.complete_sale(sale, "Cash", 0.0)
+            count += 1
+
+        keys = [f"SALE-{random.randrange(count):010d}" for _ in range(args.lookups)]
+        get_us = time_per_call(sale_service.get_sale, keys)
+        find_us = time_per_call(return_service.find_sale_by_id, keys)
+        starts = [base_time + timedelta(seconds=random.randrange(count)) for _ in range(1000)]
+        range_us = time_per_call(
+            lambda start: sale_service.sales_between(start, start + timedelta(hours=1)), starts)
+        linear_keys = keys[:max(1, 2_000_000 // count)]
+        linear_us = time_per_call(lambda key: linear_find(sale_service, key), linear_keys)
+
+        print(f"{count:>10} {get_us:>12.3f} {find_us:>19.3f} {range_us:>21.3f} {linear_us:>15.1f}")
+        size *= 10
+
+
+if __name__ == "__main__":
+    main()
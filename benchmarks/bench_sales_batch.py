@@ -0,0 +1,97 @@
+"""
+Batch Checkout Benchmark
+Completes the same orders (default 100k, 1-4 items each) once through the
+per-call API (create_sale / add_item_to_sale / complete_sale) and once
+through SaleService.complete_sales_batch, optionally with a journal.
+
+Usage:
+    python -m benchmarks.bench_sales_batch [--orders 100000] [--batch 10000] [--journal]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from persistence.transaction_journal import FSYNC_GROUP, TransactionJournal
+from service.inventory_service import InventoryService
+from service.sale_service import SaleService
+
+
+def make_orders(count: int, product_ids):
+    """Random orders with enough payment"""
+    rng = random.Random(0)
+    orders = []
+    for _ in range(count):
+        items = [(product_id, rng.randint(1, 4))
+                 for product_id in rng.sample(product_ids, rng.randint(1, 4))]
+        orders.append({"items": items, "payment_method": rng.choice(("Cash", "Card", "Mobile")),
+                       "payment_amount": 1000})
+    return orders
+
+
+def make_service(journal_path=None) -> SaleService:
+    """Sale service over the sample catalog with plenty of stock"""
+    inventory_service = InventoryService()
+    for product in inventory_service.get_all_products():
+        product.stock = 10 ** 9
+    journal = None
+    if journal_path:
+        journal = TransactionJournal(journal_path, fsync_policy=FSYNC_GROUP)
+    return SaleService(inventory_service, journal=journal)
+
+
+def per_call(sale_service, orders) -> int:
+    """Complete orders one API call at a time"""
+    completed = 0
+    for order in orders:
+        sale = sale_service.create_sale()
+        if all(sale_service.add_item_to_sale(sale, product_id, quantity)
+               for product_id, quantity in order["items"]):
+            completed += sale_service.complete_sale(sale, order["payment_method"],
+                                                    order["payment_amount"])
+    return completed
+
+
+def batched(sale_service, orders, batch_size: int) -> int:
+    """Complete orders through complete_sales_batch"""
+    completed = 0
+    for start in range(0, len(orders), batch_size):
+        results = sale_service.complete_sales_batch(orders[start:start + batch_size])
+        completed += sum(result.success for result in results)
+    return completed
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Per-call vs batch checkout")
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--journal", action="store_true", help="journal every sale")
+    args = parser.parse_args()
+
+    product_ids = [product.product_id for product in InventoryService().get_all_products()]
+    orders = make_orders(args.orders, product_ids)
+
+    with tempfile.TemporaryDirectory() as directory:
+        timings = {}
+        for name in ("per-call", "batch"):
+            journal_path = os.path.join(directory, f"{name}.log") if args.journal else None
+            sale_service = make_service(journal_path)
+            start = time.perf_counter()
+            if name == "per-call":
+                completed = per_call(sale_service, orders)
+            else:
+                completed = batched(sale_service, orders, args.batch)
+            timings[name] = time.perf_counter() - start
+            if sale_service.journal:
+                sale_service.journal.close()
+            print(f"{name:<9} {completed:>8,} sales  {timings[name]:7.2f} s  "
+                  f"{completed / timings[name]:>10,.0f} sales/s  "
+                  f"revenue {sale_service.get_total_revenue()}")
+        print(f"speedup  {timings['per-call'] / timings['batch']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
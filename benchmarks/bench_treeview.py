@@ -0,0 +1,139 @@
+"""
+Treeview Refresh Benchmark
+Measures the cost of refreshing a sale list after one change, for the old
+full rebuild (delete all rows, insert all rows) and for TreeviewSync.
+
+Runs against a real (withdrawn) Tk window when a display is available,
+otherwise against an in-memory tree with the same item API, in which case
+the widget operation counts are the meaningful figure.
+
+Usage:
+    python -m benchmarks.bench_treeview [--sizes 10,50,150,500] [--repeat 50]
+"""
+
+import argparse
+import time
+
+from ui.tree_sync import TreeviewSync
+
+
+class HeadlessTree:
+    """In-memory stand-in for ttk.Treeview that counts item operations"""
+
+    def __init__(self):
+        self.children = []
+        self.values = {}
+        self.operations = 0
+        self._next_iid = 0
+
+    def get_children(self, item=""):
+        return tuple(self.children)
+
+    def insert(self, parent, index, iid=None, values=()):
+        self.operations += 1
+        if iid is None:
+            self._next_iid += 1
+            iid = f"I{self._next_iid}"
+        self.children.insert(len(self.children) if index == "end" else index, iid)
+        self.values[iid] = tuple(values)
+        return iid
+
+    def delete(self, *items):
+        self.operations += 1
+        for iid in items:
+            self.children.remove(iid)
+            del self.values[iid]
+
+    def item(self, iid, values=()):
+        self.operations += 1
+        self.values[iid] = tuple(values)
+
+    def move(self, iid, parent, index):
+        self.operations += 1
+        self.children.remove(iid)
+        self.children.insert(index, iid)
+
+    def after_idle(self, callback):
+        callback()
+
+    def winfo_exists(self):
+        return True
+
+
+def open_root():
+    """Open a withdrawn Tk root, or return None when there is no display"""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception:
+        return None
+    root.withdraw()
+    return root
+
+
+def make_tree(root):
+    """Create a Treeview in root, or a HeadlessTree when root is None"""
+    if root is None:
+        return HeadlessTree()
+    from tkinter import ttk
+    return ttk.Treeview(root, columns=("name", "quantity", "price", "subtotal"),
+                        show="headings")
+
+
+def cart_rows(cart):
+    """Rows as the sale window builds them"""
+    for line in cart:
+        name, quantity, price = line
+        yield id(line), (name, quantity, f"${price:.2f}", f"${price * quantity:.2f}")
+
+
+def rebuild(tree, cart):
+    """Old refresh: delete every row and insert them all again"""
+    for item in tree.get_children():
+        tree.delete(item)
+    for _, values in cart_rows(cart):
+        tree.insert("", "end", values=values)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Treeview refresh cost vs cart size")
+    parser.add_argument("--sizes", default="10,50,150,500")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    root = open_root()
+    headless = root is None
+    print("backend: " + ("headless (no display)" if headless else "Tk"))
+    print(f"{'lines':>6} {'rebuild ms':>11} {'ops':>6} {'sync ms':>9} {'ops':>5}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        results = []
+        for strategy in ("rebuild", "sync"):
+            tree = make_tree(root)
+            cart = [[f"Product {i}", 1, 1.25 + i] for i in range(size)]
+            if strategy == "rebuild":
+                refresh = lambda: rebuild(tree, cart)
+            else:
+                refresh = TreeviewSync(tree, lambda: cart_rows(cart)).refresh
+            refresh()
+            operations = getattr(tree, "operations", 0)
+            start = time.perf_counter()
+            for i in range(args.repeat):
+                # One scan: bump a quantity, then refresh
+                cart[i % size][1] += 1
+                refresh()
+                if not headless:
+                    root.update_idletasks()
+            elapsed = (time.perf_counter() - start) / args.repeat
+            operations = (getattr(tree, "operations", 0) - operations) / args.repeat
+            results.append((f"{elapsed * 1000:.3f}", f"{operations:.0f}" if headless else "-"))
+            if not headless:
+                tree.destroy()
+        (rebuild_ms, rebuild_ops), (sync_ms, sync_ops) = results
+        print(f"{size:>6} {rebuild_ms:>11} {rebuild_ops:>6} {sync_ms:>9} {sync_ops:>5}")
+    if not headless:
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
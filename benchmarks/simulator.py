@@ -0,0 +1,550 @@
+"""
+Terminal Simulator
+Spawns worker processes that each act as a checkout terminal with its own
+service stack (as the CLI and GUI lanes run), driving SaleService and
+ReturnService through a configurable mix of barcode scans, voids,
+cancels, abandoned carts, completions and returns over a Zipf-skewed
+catalog, open loop at a given arrival rate or closed loop. Reports
+throughput, latency percentiles per operation and invariant violations
+(negative stock, stock not conserved, sale totals, revenue or refunds not
+matching an independent ledger, journal replay diverging); the exit status
+is 1 on any violation, so a long run doubles as a soak test. Fully offline.
+
+Usage:
+    python -m benchmarks.simulator [--terminals 4] [--duration 30] [--rate 0]
+                                   [--products 10000] [--zipf 1.1] [--basket 8]
+                                   [--mix complete=80,cancel=5,abandon=5,return=10]
+                                   [--journal] [--check-every 10] [--output results.json]
+    python -m benchmarks.simulator --terminals 8 --duration 3600 --rate 2 --journal   # soak
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import traceback
+from collections import Counter, deque
+from time import perf_counter_ns
+from typing import Callable, Dict, List, Optional
+
+from domain.id_generator import SnowflakeIdGenerator
+from domain.money import Money
+from domain.product import Product
+from domain.transaction import Transaction
+from persistence.product_store import DictProductStore
+from persistence.transaction_journal import FSYNC_GROUP, TransactionJournal, replay_journal
+from service.inventory_service import InventoryService
+from service.metrics import PERCENTILES, LatencyHistogram
+from service.return_service import ReturnService
+from service.sale_service import SaleService
+
+
+# Customer kinds and their default weights
+DEFAULT_MIX = {"complete": 80, "cancel": 5, "abandon": 5, "return": 10}
+
+# Timed operations
+OPERATIONS = ("scan", "void", "complete", "cancel", "return")
+
+PAYMENT_METHODS = ("Cash", "Card", "Mobile")
+
+# Violations kept per terminal (all are counted)
+MAX_VIOLATIONS = 20
+
+# Completed sales a terminal may later see returned
+RECENT_SALES = 1_000
+
+
+class SimulationConfig:
+    """Workload of every simulated terminal"""
+
+    def __init__(self, products: int = 10_000, stock: int = 10_000, zipf: float = 1.1,
+                 basket: int = 8, void_rate: float = 0.05, mix: Optional[Dict[str, float]] = None,
+                 rate: float = 0.0, duration: Optional[float] = 30.0,
+                 customers: Optional[int] = None, hold_seconds: float = 60.0,
+                 check_every: float = 10.0, journal_dir: Optional[str] = None, seed: int = 0):
+        """
+        Initialize configuration
+
+        Args:
+            products: Catalog size (the same catalog on every terminal)
+            stock: Initial stock of every product
+            zipf: Zipf exponent of product popularity (0 is uniform)
+            basket: Mean number of scans per customer
+            void_rate: Probability that a customer has one line voided
+            mix: Weights of customer kinds (complete, cancel, abandon, return)
+            rate: Customers per second per terminal (0: as fast as possible)
+            duration: Seconds to run (None: until customers is reached)
+            customers: Customers per terminal (None: until duration elapses)
+            hold_seconds: Idle time after which abandoned carts release stock
+            check_every: Seconds between invariant checks and progress reports
+            journal_dir: Journal every terminal's transactions in this directory
+            seed: Random seed (terminal n uses seed + n)
+        """
+        self.products = products
+        self.stock = stock
+        self.zipf = zipf
+        self.basket = basket
+        self.void_rate = void_rate
+        self.mix = dict(DEFAULT_MIX if mix is None else mix)
+        self.rate = rate
+        self.duration = duration
+        self.customers = customers
+        self.hold_seconds = hold_seconds
+        self.check_every = check_every
+        self.journal_dir = journal_dir
+        self.seed = seed
+
+
+class Terminal:
+    """
+    One simulated checkout lane
+
+    Keeps its own ledger of what the services should have recorded (units
+    sold and returned per product, revenue and refunds in cents) and
+    checks the services against it.
+    """
+
+    def __init__(self, number: int, config: SimulationConfig):
+        """
+        Initialize terminal
+
+        Args:
+            number: Terminal number
+            config: Workload configuration
+        """
+        self.number = number
+        self.config = config
+        self.rng = random.Random(config.seed + number)
+        catalog = build_catalog(config.products, config.stock)
+        self.product_ids = [product.product_id for product in catalog]
+        self.barcodes = [barcode_for(index) for index in range(len(catalog))]
+        self.cumulative_weights = zipf_weights(len(catalog), config.zipf)
+        self.kinds = list(config.mix)
+        self.kind_weights = list(itertools.accumulate(config.mix.values()))
+
+        self.inventory_service = self._inventory(catalog)
+        for code, product_id in zip(self.barcodes, self.product_ids):
+            self.inventory_service.barcodes.add(code, product_id)
+        self.journal = None
+        if config.journal_dir:
+            self.journal = TransactionJournal(
+                os.path.join(config.journal_dir, f"terminal-{number}.journal"),
+                fsync_policy=FSYNC_GROUP)
+        self.sale_service = SaleService(self.inventory_service, self.journal)
+        self.return_service = ReturnService(self.inventory_service, self.sale_service, self.journal)
+
+        self.histograms = {operation: LatencyHistogram() for operation in OPERATIONS}
+        self.counts: Counter = Counter()
+        self.violations: List[str] = []
+        self.violation_count = 0
+        # Ledger
+        self.prices = {product.product_id: product.price.cents for product in catalog}
+        self.initial_stock = {product.product_id: product.stock for product in catalog}
+        self.sold: Counter = Counter()
+        self.returned: Counter = Counter()
+        self.revenue_cents = 0
+        self.refund_cents = 0
+        self.recent_sales = deque(maxlen=RECENT_SALES)
+
+    def _inventory(self, catalog: List[Product]) -> InventoryService:
+        """Inventory service over a fresh copy of the catalog"""
+        store = DictProductStore()
+        store.add_many(catalog)
+        return InventoryService(store=store, hold_seconds=self.config.hold_seconds)
+
+    def run(self, progress: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Serve customers until the duration or customer count is reached
+
+        Args:
+            progress: Called with interim results after every invariant check
+
+        Returns:
+            dict: Terminal results (see result())
+        """
+        config = self.config
+        start = time.perf_counter()
+        deadline = start + config.duration if config.duration is not None else float("inf")
+        next_check = start + config.check_every
+        next_arrival = start
+        customers = 0
+        while time.perf_counter() < deadline and (config.customers is None
+                                                 or customers < config.customers):
+            if config.rate > 0:
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_arrival += self.rng.expovariate(config.rate)
+            self.serve_customer()
+            customers += 1
+            if time.perf_counter() >= next_check:
+                self.check_invariants()
+                next_check += config.check_every
+                if progress is not None:
+                    progress(self.result(time.perf_counter() - start))
+        elapsed = time.perf_counter() - start
+        self.close_out()
+        return self.result(elapsed)
+
+    def serve_customer(self):
+        """Serve one customer of a random kind"""
+        kind = self.rng.choices(self.kinds, cum_weights=self.kind_weights)[0]
+        self.counts["customers"] += 1
+        if kind == "return":
+            self.return_visit()
+            return
+        rng = self.rng
+        sale_service = self.sale_service
+        sale = sale_service.create_sale()
+        scans = rng.randint(1, 2 * self.config.basket - 1)
+        for index in rng.choices(range(len(self.product_ids)),
+                                 cum_weights=self.cumulative_weights, k=scans):
+            start = perf_counter_ns()
+            added = sale_service.add_scanned_item(sale, self.barcodes[index])
+            self.histograms["scan"].record(perf_counter_ns() - start)
+            if not added:
+                self.counts["out_of_stock"] += 1
+        if sale.items and rng.random() < self.config.void_rate:
+            item = rng.choice(sale.items)
+            start = perf_counter_ns()
+            sale_service.remove_item_from_sale(sale, item)
+            self.histograms["void"].record(perf_counter_ns() - start)
+
+        if kind == "abandon":
+            # Left open: its holds expire after hold_seconds
+            self.counts["abandoned"] += 1
+        elif kind == "cancel" or not sale.items:
+            start = perf_counter_ns()
+            sale_service.cancel_sale(sale)
+            self.histograms["cancel"].record(perf_counter_ns() - start)
+            self.counts["cancelled"] += 1
+        else:
+            self.checkout(sale)
+
+    def checkout(self, sale):
+        """Pay the exact total and check the sale against the ledger"""
+        expected = sum(self.prices[item.product_id] * item.quantity for item in sale.items)
+        total = sale.get_total()
+        start = perf_counter_ns()
+        completed = self.sale_service.complete_sale(sale, self.rng.choice(PAYMENT_METHODS), total)
+        self.histograms["complete"].record(perf_counter_ns() - start)
+        if not completed:
+            self.sale_service.cancel_sale(sale)
+            self.counts["checkout_failed"] += 1
+            return
+        self.counts["completed"] += 1
+        if total.cents != expected:
+            self.violation(f"sale {sale.sale_id} total {total} != ledger {Money(expected)}")
+        try:
+            sale.check_totals()
+        except AssertionError as error:
+            self.violation(f"sale {sale.sale_id}: {error}")
+        for item in sale.items:
+            self.sold[item.product_id] += item.quantity
+        self.revenue_cents += total.cents
+        self.recent_sales.append(sale)
+
+    def return_visit(self):
+        """Return one unit of a line of a recent sale"""
+        if not self.recent_sales:
+            self.counts["return_skipped"] += 1
+            return
+        sale = self.rng.choice(self.recent_sales)
+        product_id = self.rng.choice(sale.items).product_id
+        start = perf_counter_ns()
+        return_transaction = self.return_service.create_return(sale.sale_id)
+        returned = (self.return_service.add_item_to_return(return_transaction, product_id, 1)
+                    and self.return_service.complete_return(return_transaction))
+        self.histograms["return"].record(perf_counter_ns() - start)
+        if not returned:
+            # Fully returned already
+            self.counts["return_rejected"] += 1
+            return
+        self.counts["returned"] += 1
+        refund = return_transaction.get_total_refund().cents
+        if refund != self.prices[product_id]:
+            self.violation(f"return {return_transaction.return_id} refund {Money(refund)} "
+                           f"!= ledger {Money(self.prices[product_id])}")
+        self.returned[product_id] += 1
+        self.refund_cents += refund
+
+    def check_invariants(self, final: bool = False):
+        """
+        Check the services against the ledger
+
+        Args:
+            final: Also require that no stock is held (after close_out())
+        """
+        inventory_service = self.inventory_service
+        for product_id in self.product_ids:
+            on_hand, available = inventory_service.get_stock_levels(product_id)
+            if available < 0:
+                self.violation(f"{product_id} negative stock {available}")
+            expected = (self.initial_stock[product_id] - self.sold[product_id]
+                        + self.returned[product_id])
+            if on_hand != expected:
+                self.violation(f"{product_id} on hand {on_hand} != ledger {expected}")
+        revenue = self.sale_service.get_total_revenue().cents
+        if revenue != self.revenue_cents:
+            self.violation(f"revenue {Money(revenue)} != ledger {Money(self.revenue_cents)}")
+        refunds = self.return_service.get_total_refunds().cents
+        if refunds != self.refund_cents:
+            self.violation(f"refunds {Money(refunds)} != ledger {Money(self.refund_cents)}")
+        if final:
+            held = inventory_service.reservations.stats()["units"]
+            if held:
+                self.violation(f"{held} units still held after close out")
+
+    def close_out(self):
+        """Expire abandoned carts, run the final checks and verify the journal"""
+        self.inventory_service.reservations.expire(float("inf"))
+        self.check_invariants(final=True)
+        if self.journal is None:
+            return
+        self.journal.close()
+        journal = TransactionJournal(self.journal.path, fsync_policy=FSYNC_GROUP)
+        try:
+            inventory_service = self._inventory(build_catalog(self.config.products,
+                                                              self.config.stock))
+            sale_service = SaleService(inventory_service)
+            return_service = ReturnService(inventory_service, sale_service)
+            replay_journal(journal, sale_service, return_service)
+        finally:
+            journal.close()
+        if sale_service.get_total_revenue().cents != self.revenue_cents:
+            self.violation(f"replayed revenue {sale_service.get_total_revenue()} "
+                           f"!= ledger {Money(self.revenue_cents)}")
+        for product_id in self.product_ids:
+            replayed = inventory_service.get_product(product_id).stock
+            live = self.inventory_service.get_product(product_id).stock
+            if replayed != live:
+                self.violation(f"{product_id} replayed stock {replayed} != live {live}")
+
+    def violation(self, message: str):
+        """Record an invariant violation"""
+        self.violation_count += 1
+        if len(self.violations) < MAX_VIOLATIONS:
+            self.violations.append(f"terminal {self.number}: {message}")
+
+    def result(self, elapsed: float) -> dict:
+        """
+        Get the results so far
+
+        Args:
+            elapsed: Seconds run
+
+        Returns:
+            dict: terminal, elapsed, counts, histograms (LatencyHistogram
+                  per operation), violations (first few) and violation_count
+        """
+        return {"terminal": self.number, "elapsed": elapsed, "counts": dict(self.counts),
+                "histograms": self.histograms, "violations": list(self.violations),
+                "violation_count": self.violation_count}
+
+
+def build_catalog(count: int, stock: int) -> List[Product]:
+    """Products P000000.. with prices from 0.50 to 50.25"""
+    return [Product(f"P{index:06d}", f"Product {index}", Money(50 + (index % 200) * 25), stock)
+            for index in range(count)]
+
+
+def barcode_for(index: int) -> str:
+    """In-store (prefix 2) 12-digit barcode of a product"""
+    return f"2{index:011d}"
+
+
+def zipf_weights(count: int, exponent: float) -> List[float]:
+    """Cumulative Zipf weights: product k is drawn in proportion to 1 / (k + 1)^exponent"""
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """
+    Parse a customer mix such as "complete=80,cancel=5,abandon=5,return=10"
+
+    Args:
+        text: Comma separated kind=weight pairs (kinds left out get 0)
+
+    Returns:
+        dict: Weight per kind
+
+    Raises:
+        ValueError: On unknown kinds, negative weights or an all-zero mix
+    """
+    mix = dict.fromkeys(DEFAULT_MIX, 0.0)
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in mix:
+            raise ValueError(f"Unknown customer kind: {kind} (expected {', '.join(DEFAULT_MIX)})")
+        mix[kind] = float(weight)
+        if mix[kind] < 0:
+            raise ValueError(f"Negative weight for {kind}")
+    if not sum(mix.values()):
+        raise ValueError("Customer mix is empty")
+    return mix
+
+
+def _terminal_process(number: int, config: SimulationConfig, queue):
+    """Worker process: run one terminal and send its results"""
+    try:
+        # Terminal n stamps its transaction IDs with terminal ID n
+        Transaction.set_id_generator(SnowflakeIdGenerator(number))
+        terminal = Terminal(number, config)
+        result = terminal.run(lambda interim: queue.put(("progress", number, interim)))
+    except Exception:
+        result = {"terminal": number, "error": traceback.format_exc()}
+    queue.put(("done", number, result))
+
+
+def simulate(config: SimulationConfig, terminals: int = 4,
+             report: Optional[Callable[[dict], None]] = None) -> dict:
+    """
+    Run terminals in worker processes and aggregate their results
+
+    Args:
+        config: Workload of every terminal
+        terminals: Number of worker processes
+        report: Called with an interim summary whenever a terminal reports
+
+    Returns:
+        dict: Summary (see summarize())
+    """
+    if not 0 < terminals <= SnowflakeIdGenerator.MAX_TERMINAL_ID + 1:
+        raise ValueError(f"terminals must be between 1 and {SnowflakeIdGenerator.MAX_TERMINAL_ID + 1}")
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_terminal_process, args=(number, config, queue),
+                                         name=f"terminal-{number}", daemon=True)
+                 for number in range(terminals)]
+    for process in processes:
+        process.start()
+    latest: Dict[int, dict] = {}
+    running = terminals
+    while running:
+        kind, number, result = queue.get()
+        latest[number] = result
+        if kind == "done":
+            running -= 1
+        elif report is not None:
+            report(summarize(list(latest.values())))
+    for process in processes:
+        process.join()
+    return summarize([latest[number] for number in range(terminals)])
+
+
+def summarize(results: List[dict]) -> dict:
+    """
+    Merge terminal results
+
+    Args:
+        results: Results of terminal runs
+
+    Returns:
+        dict: terminals, elapsed (slowest terminal), customers and
+              customers_per_second, counts, operations (count and
+              latency percentiles in microseconds per operation),
+              violations, violation_count and errors
+    """
+    counts: Counter = Counter()
+    histograms = {operation: LatencyHistogram() for operation in OPERATIONS}
+    violations: List[str] = []
+    violation_count = 0
+    errors = []
+    elapsed = 0.0
+    for result in results:
+        if "error" in result:
+            errors.append(result["error"])
+            continue
+        elapsed = max(elapsed, result["elapsed"])
+        counts.update(result["counts"])
+        for operation, histogram in result["histograms"].items():
+            histograms[operation].merge(histogram)
+        violations.extend(result["violations"])
+        violation_count += result["violation_count"]
+    operations = {}
+    for operation, histogram in histograms.items():
+        values = {"count": histogram.count,
+                  "mean_us": round(histogram.total / histogram.count / 1000, 1)
+                  if histogram.count else 0}
+        for percent in PERCENTILES:
+            values[f"p{percent:g}_us"] = round(histogram.percentile(percent) / 1000, 1)
+        values["max_us"] = round(histogram.max / 1000, 1)
+        operations[operation] = values
+    return {"terminals": len(results), "elapsed": round(elapsed, 3),
+            "customers": counts["customers"],
+            "customers_per_second": round(counts["customers"] / elapsed, 1) if elapsed else 0,
+            "counts": dict(counts), "operations": operations,
+            "violations": violations, "violation_count": violation_count, "errors": errors}
+
+
+def print_summary(summary: dict):
+    """Print a summary as a table"""
+    print(f"{summary['terminals']} terminals, {summary['customers']:,} customers in "
+          f"{summary['elapsed']:.1f} s = {summary['customers_per_second']:,.0f} customers/s")
+    print("  " + ", ".join(f"{kind} {count:,}" for kind, count in sorted(summary["counts"].items())))
+    print(f"{'operation':<10} {'count':>10} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} "
+          f"{'p99.9 us':>9} {'max us':>9}")
+    for operation, values in summary["operations"].items():
+        print(f"{operation:<10} {values['count']:>10,} {values['mean_us']:>9.1f} "
+              f"{values['p50_us']:>9.1f} {values['p99_us']:>9.1f} {values['p99.9_us']:>9.1f} "
+              f"{values['max_us']:>9.1f}")
+    print(f"invariant violations: {summary['violation_count']}")
+    for message in summary["violations"]:
+        print(f"  {message}")
+    for error in summary["errors"]:
+        print(error, file=sys.stderr)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Multi-process checkout terminal simulator")
+    parser.add_argument("--terminals", type=int, default=4, help="worker processes")
+    parser.add_argument("--duration", type=float,
+                        help="seconds to run (default 30, or unlimited with --customers)")
+    parser.add_argument("--customers", type=int, help="stop after this many customers per terminal")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="customers per second per terminal (0: closed loop)")
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--stock", type=int, default=10_000, help="initial stock per product")
+    parser.add_argument("--zipf", type=float, default=1.1, help="popularity skew (0: uniform)")
+    parser.add_argument("--basket", type=int, default=8, help="mean scans per customer")
+    parser.add_argument("--void-rate", type=float, default=0.05)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="customer kinds, e.g. complete=80,cancel=5,abandon=5,return=10")
+    parser.add_argument("--hold-seconds", type=float, default=60.0,
+                        help="idle time before abandoned carts release stock")
+    parser.add_argument("--check-every", type=float, default=10.0,
+                        help="seconds between invariant checks and progress reports")
+    parser.add_argument("--journal", action="store_true",
+                        help="journal transactions and verify replay at the end")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the summary as JSON")
+    args = parser.parse_args()
+
+    def report(summary):
+        print(f"... {summary['customers']:,} customers, "
+              f"{summary['violation_count']} violations", flush=True)
+
+    with tempfile.TemporaryDirectory() as directory:
+        config = SimulationConfig(
+            products=args.products, stock=args.stock, zipf=args.zipf, basket=args.basket,
+            void_rate=args.void_rate, mix=args.mix, rate=args.rate,
+            duration=args.duration if args.duration is not None or args.customers else 30.0,
+            customers=args.customers, hold_seconds=args.hold_seconds,
+            check_every=args.check_every, journal_dir=directory if args.journal else None,
+            seed=args.seed)
+        summary = simulate(config, args.terminals, report)
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(summary, output_file, indent=2)
+    sys.exit(1 if summary["violation_count"] or summary["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Benchmark Suite
+Measures the domain and service layers over synthetic catalogs and
+histories of increasing size (10^3 .. 10^7) and writes the metrics as
+JSON. With --baseline the run is compared against stored results and the
+exit status is 1 when a metric regressed more than the threshold.
+
+Usage:
+    python -m benchmarks.suite [--scales 1000,10000,100000] [--output results.json]
+    python -m benchmarks.suite --baseline baseline.json [--threshold 0.25]
+    python -m benchmarks.suite --current results.json --baseline baseline.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from domain.money import Money
+from domain.product import Product
+from domain.sale import Sale
+from domain.sale_item import SaleItem
+from persistence.product_store import DictProductStore
+from service.inventory_service import InventoryService
+from service.return_service import ReturnService
+from service.sale_service import SaleService
+
+
+# Metric units; every metric is "lower is better"
+MICROSECONDS_PER_OPERATION = "us/op"
+MILLISECONDS = "ms"
+
+DEFAULT_SCALES = (1_000, 10_000, 100_000)
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_REPEAT = 5
+
+# Operations timed per metric (bounded so large scales stay affordable)
+OPERATIONS = 2_000
+
+
+def build_services(scale: int, seed: int = 0) -> Tuple[InventoryService, SaleService,
+                                                       ReturnService]:
+    """
+    Services over a catalog of scale products and a history of scale sales
+
+    Args:
+        scale: Number of products and of completed sales
+        seed: Random seed
+
+    Returns:
+        tuple: (inventory_service, sale_service, return_service)
+    """
+    rng = random.Random(seed)
+    store = DictProductStore()
+    store.add_many(Product(f"P{index:08d}", f"Product {index}",
+                           Money(rng.randrange(50, 10_000)), 10 ** 9)
+                   for index in range(scale))
+    inventory_service = InventoryService(store=store)
+    sale_service = SaleService(inventory_service)
+    return_service = ReturnService(inventory_service, sale_service)
+
+    start = datetime(2025, 1, 1)
+    step = timedelta(days=90) / scale
+    methods = ("Cash", "Card", "Mobile")
+    for offset in range(0, scale, 10_000):
+        orders = []
+        for index in range(offset, min(scale, offset + 10_000)):
+            # Quantities leave room for the repeated single-unit returns timed
+            # by measure_scale (returns are checked against the quantity sold)
+            items = [(f"P{rng.randrange(scale):08d}", rng.randint(1, 4) * 100)
+                     for _ in range(rng.randint(1, 4))]
+            orders.append({"items": items, "payment_method": methods[index % 3],
+                           "payment_amount": 10 ** 8, "time": start + step * index})
+        sale_service.complete_sales_batch(orders)
+    return inventory_service, sale_service, return_service
+
+
+def per_operation(func: Callable[[int], object], count: int = OPERATIONS,
+                  repeat: int = DEFAULT_REPEAT) -> float:
+    """
+    Best-of-repeat average microseconds per call of func(i) for i in range(count)
+    """
+    def run():
+        for index in range(count):
+            func(index)
+    return best_of(run, repeat) / count * 1e6
+
+
+def once(func: Callable[[], object], repeat: int = DEFAULT_REPEAT) -> float:
+    """Best-of-repeat milliseconds of func()"""
+    return best_of(func, repeat) * 1000
+
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+    """Fastest of repeat runs of func() in seconds, with the GC paused as timeit does"""
+    best = float("inf")
+    gc.collect()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+    return best
+
+
+def measure_scale(scale: int, repeat: int = DEFAULT_REPEAT) -> Dict[str, Tuple[float, str]]:
+    """
+    Run every benchmark at one scale
+
+    Args:
+        scale: Catalog and history size
+        repeat: Repetitions per metric (the best is kept)
+
+    Returns:
+        dict: Metric name -> (value, unit)
+    """
+    inventory_service, sale_service, return_service = build_services(scale)
+    rng = random.Random(1)
+    product_ids = [f"P{rng.randrange(scale):08d}" for _ in range(OPERATIONS)]
+    sale_ids = [sale.sale_id for sale in rng.sample(sale_service.sales_history,
+                                                    min(OPERATIONS, scale))]
+    metrics: Dict[str, Tuple[float, str]] = {}
+
+    def checkout(index):
+        sale = sale_service.create_sale()
+        sale_service.add_item_to_sale(sale, product_ids[index], 1)
+        sale_service.add_item_to_sale(sale, product_ids[index - 1], 2)
+        sale_service.complete_sale(sale, "Cash", 10 ** 6)
+
+    def handle_return(index):
+        sale = return_service.find_sale_by_id(sale_ids[index % len(sale_ids)])
+        item = sale.items[0]
+        return_transaction = return_service.create_return(sale.sale_id)
+        assert return_service.add_item_to_return(return_transaction, item.product_id, 1)
+        return_service.complete_return(return_transaction)
+
+    metrics["checkout"] = (per_operation(checkout, repeat=repeat), MICROSECONDS_PER_OPERATION)
+    metrics["return"] = (per_operation(handle_return, repeat=repeat), MICROSECONDS_PER_OPERATION)
+    metrics["product_lookup"] = (
+        per_operation(lambda index: inventory_service.get_product(product_ids[index]),
+                      repeat=repeat), MICROSECONDS_PER_OPERATION)
+    search_queries = [inventory_service.get_product(product_id).name[:-1]
+                      for product_id in product_ids]
+    inventory_service.search_index()
+    metrics["product_search"] = (
+        per_operation(lambda index: inventory_service.search_products(search_queries[index]),
+                      repeat=repeat), MICROSECONDS_PER_OPERATION)
+    metrics["sale_lookup"] = (
+        per_operation(lambda index: sale_service.get_sale(sale_ids[index % len(sale_ids)]),
+                      repeat=repeat), MICROSECONDS_PER_OPERATION)
+
+    day = datetime(2025, 2, 1)
+    days = [day + timedelta(hours=index % 720) for index in range(OPERATIONS)]
+    metrics["history_list"] = (once(sale_service.get_sales_history, repeat), MILLISECONDS)
+    metrics["history_first_page"] = (
+        per_operation(lambda index: [sale_service.history_index.records[position]
+                                     for position in sale_service.history_index.query()[:20]],
+                      repeat=repeat), MICROSECONDS_PER_OPERATION)
+    metrics["history_one_day"] = (
+        per_operation(lambda index: sale_service.sales_between(
+            days[index], days[index] + timedelta(days=1)), count=200, repeat=repeat),
+        MICROSECONDS_PER_OPERATION)
+
+    large_sale = Sale()
+    for product_id in product_ids[:100]:
+        large_sale.add_item(SaleItem(inventory_service.get_product(product_id), 1))
+    metrics["sale_total"] = (
+        per_operation(lambda index: large_sale.get_total_amount(), repeat=repeat),
+        MICROSECONDS_PER_OPERATION)
+    metrics["total_revenue"] = (
+        per_operation(lambda index: sale_service.get_total_revenue(), repeat=repeat),
+        MICROSECONDS_PER_OPERATION)
+    metrics["revenue_one_day"] = (
+        per_operation(lambda index: sale_service.revenue_between(
+            days[index], days[index] + timedelta(days=1)), count=200, repeat=repeat),
+        MICROSECONDS_PER_OPERATION)
+    return metrics
+
+
+def run_suite(scales=DEFAULT_SCALES, repeat: int = DEFAULT_REPEAT) -> dict:
+    """
+    Run the suite at every scale
+
+    Args:
+        scales: Catalog and history sizes
+        repeat: Repetitions per metric
+
+    Returns:
+        dict: JSON-serializable results ("metrics" maps "name@scale" to
+              {"value", "unit"})
+    """
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "metrics": {},
+    }
+    for scale in scales:
+        for name, (value, unit) in measure_scale(scale, repeat).items():
+            results["metrics"][f"{name}@{scale}"] = {"value": round(value, 4), "unit": unit}
+    return results
+
+
+def compare_results(baseline: dict, current: dict,
+                    threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, float, float, float]]:
+    """
+    Find metrics that regressed against a baseline
+
+    Args:
+        baseline: Stored results
+        current: New results
+        threshold: Allowed slowdown as a fraction (0.25 = 25% slower)
+
+    Returns:
+        list: (metric, baseline value, current value, change) of each
+              regression; metrics missing on either side are ignored
+    """
+    regressions = []
+    for name, metric in current["metrics"].items():
+        previous = baseline["metrics"].get(name)
+        if previous is None or previous["value"] <= 0:
+            continue
+        change = metric["value"] / previous["value"] - 1
+        if change > threshold:
+            regressions.append((name, previous["value"], metric["value"], change))
+    return regressions
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="POS benchmark suite")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="comma-separated sizes, e.g. 1000,10000,1000000,10000000")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--current", help="compare these stored results instead of running")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown as a fraction (default 0.25)")
+    args = parser.parse_args()
+
+    if args.current:
+        with open(args.current, encoding="utf-8") as results_file:
+            results = json.load(results_file)
+    else:
+        scales = [int(float(scale)) for scale in args.scales.split(",")]
+        results = run_suite(scales, args.repeat)
+        text = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as results_file:
+                results_file.write(text + "\n")
+        elif not args.baseline:
+            print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare_results(baseline, results, args.threshold)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name:<32} {before:>12.4f} -> {after:>12.4f}  (+{change:.0%})")
+        print(f"{len(regressions)} of {len(results['metrics'])} metrics regressed "
+              f"more than {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Transaction ID Generators
+Snowflake-style IDs: timestamp + terminal ID + per-millisecond sequence
+"""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+# 终端ID环境变量（多终端部署时每台终端设置不同的值）
+TERMINAL_ID_ENV = "POS_TERMINAL_ID"
+
+# 0000-9999 的四位十进制字符串，generate 用查表代替逐个格式化
+_DIGITS = tuple(f"{number:04d}" for number in range(10000))
+
+# 已用尽的号段：(截止时间纳秒, 迭代器)
+_NO_BLOCK = (0, iter(()))
+
+
+class IdGenerator(ABC):
+    """
+    交易ID生成器抽象基类
+    所有 Transaction 子类共享同一个生成器，可通过 Transaction.set_id_generator 替换
+    """
+
+    @abstractmethod
+    def next_id(self) -> int:
+        """
+        生成下一个数字ID
+
+        Returns:
+            int: 唯一且按时间递增的ID
+        """
+        pass
+
+    def generate(self, prefix: str) -> str:
+        """
+        生成带前缀的交易ID
+
+        Args:
+            prefix: ID前缀，例如 "SALE" 或 "RET"
+
+        Returns:
+            str: 交易ID，定长数字部分保证字符串顺序与时间顺序一致
+        """
+        return f"{prefix}-{self.next_id():019d}"
+
+    def next_ids(self, count: int) -> list[int]:
+        """
+        批量生成数字ID
+
+        Args:
+            count: ID数量
+
+        Returns:
+            list: 按时间递增的ID列表
+        """
+        return [self.next_id() for _ in range(count)]
+
+    def generate_many(self, prefix: str, count: int) -> list[str]:
+        """
+        批量生成带前缀的交易ID
+
+        Args:
+            prefix: ID前缀
+            count: ID数量
+
+        Returns:
+            list: 交易ID列表
+        """
+        return [f"{prefix}-{value:019d}" for value in self.next_ids(count)]
+
+
+class SnowflakeIdGenerator(IdGenerator):
+    """
+    Snowflake 风格ID生成器（线程安全）
+
+    位布局（63位）：41位毫秒时间戳 | 10位终端ID | 12位毫秒内序列号
+
+    每毫秒在锁内分配一次号段（该毫秒剩余的全部序列号），之后的ID直接从号段
+    迭代器中取（range 迭代器的 next 在 GIL 下是原子的），热路径不加锁；
+    时钟走到下一毫秒或号段用尽时重新分配。
+    """
+
+    TERMINAL_BITS = 10
+    SEQUENCE_BITS = 12
+    MAX_TERMINAL_ID = (1 << TERMINAL_BITS) - 1
+    SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+    # 2024-01-01 00:00:00 UTC
+    DEFAULT_EPOCH_MS = 1704067200000
+
+    def __init__(self, terminal_id: int = 0, epoch_ms: int = DEFAULT_EPOCH_MS):
+        """
+        初始化ID生成器
+
+        Args:
+            terminal_id: 终端ID（0-1023），多终端部署时必须唯一
+            epoch_ms: 自定义纪元（毫秒）
+        """
+        if not 0 <= terminal_id <= self.MAX_TERMINAL_ID:
+            raise ValueError(f"terminal_id must be between 0 and {self.MAX_TERMINAL_ID}")
+        self.terminal_id = terminal_id
+        self.epoch_ms = epoch_ms
+        self._epoch_ns = epoch_ms * 1_000_000
+        self._terminal_bits = terminal_id << self.SEQUENCE_BITS
+        # 已分配出去的最大 (毫秒 << SEQUENCE_BITS) | 序列号
+        self._last = 0
+        # 当前号段：(所属毫秒结束时的 time_ns, 剩余ID的迭代器)
+        self._block = _NO_BLOCK
+        # 前缀 -> (ID // 10000, 前缀加ID的前15位)
+        self._heads = {}
+        self._lock = threading.Lock()
+
+    def next_id(self, _time_ns=time.time_ns) -> int:
+        """
+        生成下一个数字ID
+
+        Returns:
+            int: 唯一且按时间递增的ID
+        """
+        end_ns, block = self._block
+        if _time_ns() < end_ns:
+            value = next(block, None)
+            if value is not None:
+                return value
+        return self._allocate()
+
+    def generate(self, prefix: str, _time_ns=time.time_ns, _digits=_DIGITS) -> str:
+        """
+        生成带前缀的交易ID（同 IdGenerator.generate，内联 next_id 并缓存前15位）
+
+        Args:
+            prefix: ID前缀，例如 "SALE" 或 "RET"
+
+        Returns:
+            str: 交易ID
+        """
+        end_ns, block = self._block
+        value = next(block, None) if _time_ns() < end_ns else None
+        if value is None:
+            value = self._allocate()
+        high, low = divmod(value, 10000)
+        head = self._heads.get(prefix)
+        if head is None or head[0] != high:
+            head = self._heads[prefix] = (high, f"{prefix}-{high:015d}")
+        return head[1] + _digits[low]
+
+    def next_ids(self, count: int) -> list[int]:
+        """
+        批量生成连续ID（只加锁一次，适合批量导入）
+
+        Args:
+            count: ID数量
+
+        Returns:
+            list: 按时间递增的ID列表
+        """
+        now = (time.time_ns() - self._epoch_ns) // 1_000_000 << self.SEQUENCE_BITS
+        with self._lock:
+            first = self._last + 1
+            if now > first:
+                first = now
+            self._last = first + count - 1
+            # 丢弃当前号段剩余的ID，之后的ID都排在这批之后
+            self._block = _NO_BLOCK
+        terminal_bits = self._terminal_bits
+        # 12 = SEQUENCE_BITS，22 = TERMINAL_BITS + SEQUENCE_BITS
+        return [value >> 12 << 22 | terminal_bits | value & 4095
+                for value in range(first, first + count)]
+
+    def _allocate(self) -> int:
+        """
+        分配新号段并返回其第一个ID
+
+        Returns:
+            int: 新号段的第一个ID
+        """
+        with self._lock:
+            now_ns = time.time_ns()
+            # 其他线程可能刚分配过号段
+            end_ns, block = self._block
+            if now_ns < end_ns:
+                value = next(block, None)
+                if value is not None:
+                    return value
+            # 同一毫秒内（或时钟回拨）接着上次的序列号；序列号耗尽时自然进位到下一毫秒
+            first = self._last + 1
+            now = (now_ns - self._epoch_ns) // 1_000_000 << self.SEQUENCE_BITS
+            if now > first:
+                first = now
+            millisecond = first >> self.SEQUENCE_BITS
+            self._last = first | self.SEQUENCE_MASK
+            base = millisecond << (self.TERMINAL_BITS + self.SEQUENCE_BITS) | self._terminal_bits
+            block = iter(range(base + (first & self.SEQUENCE_MASK), base + self.SEQUENCE_MASK + 1))
+            value = next(block)
+            self._block = ((millisecond + 1) * 1_000_000 + self._epoch_ns, block)
+            return value
+
+
+def terminal_id_from_env(default: int = 0) -> int:
+    """
+    读取环境变量 POS_TERMINAL_ID 中的终端ID
+
+    Args:
+        default: 未设置时使用的终端ID
+
+    Returns:
+        int: 终端ID
+
+    Raises:
+        ValueError: 不是 0-1023 之间的整数
+    """
+    value = os.environ.get(TERMINAL_ID_ENV, "").strip()
+    terminal_id = int(value) if value else default
+    if not 0 <= terminal_id <= SnowflakeIdGenerator.MAX_TERMINAL_ID:
+        raise ValueError(f"{TERMINAL_ID_ENV} must be between 0 and "
+                         f"{SnowflakeIdGenerator.MAX_TERMINAL_ID}")
+    return terminal_id
@@ -0,0 +1,255 @@
+"""
+Money Value Object
+Exact monetary amounts stored as integer minor units (cents)
+"""
+
+import re
+from array import array
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from operator import attrgetter
+from typing import Iterable, Optional, Union
+
+
+class Money:
+    """
+    Money value object
+
+    Amounts are stored as an int number of cents, so addition, subtraction
+    and multiplication by quantities are exact. Money is immutable and
+    hashable; it compares equal to (and hashes like) the int or float amount
+    it represents (Money.of(27.5) == 27.50), orders against int, float and
+    Decimal amounts, and supports format specs such as ``f"{money:.2f}"``.
+    """
+
+    __slots__ = ("cents",)
+
+    def __init__(self, cents: int = 0):
+        """
+        Initialize money
+
+        Args:
+            cents: Amount in cents
+        """
+        _set_cents(self, cents)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Money is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Money is immutable")
+
+    def __reduce__(self):
+        return Money, (self.cents,)
+
+    @classmethod
+    def of(cls, amount: Union["Money", int, float, str, Decimal]) -> "Money":
+        """
+        Convert an amount in currency units to Money
+
+        Floats are converted through their shortest decimal representation,
+        so 0.1 becomes exactly 10 cents. Half cents round away from zero.
+
+        Args:
+            amount: Money, or an amount in currency units
+
+        Returns:
+            Money: Money object
+
+        Raises:
+            ValueError: If the amount is not a valid number
+        """
+        if isinstance(amount, Money):
+            return amount
+        if isinstance(amount, int):
+            return cls(amount * 100)
+        if isinstance(amount, str):
+            cents = _parse_plain_amount(amount)
+            if cents is not None:
+                return cls(cents)
+        try:
+            value = Decimal(repr(amount) if isinstance(amount, float) else amount)
+            cents = (value * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+            if not cents.is_finite():
+                raise ValueError(f"Invalid amount: {amount!r}")
+            return cls(int(cents))
+        except (InvalidOperation, TypeError):
+            raise ValueError(f"Invalid amount: {amount!r}") from None
+
+    @staticmethod
+    def sum(amounts: Iterable["Money"]) -> "Money":
+        """
+        Bulk sum of Money objects (integer addition, no per-item allocation)
+
+        Args:
+            amounts: Money objects
+
+        Returns:
+            Money: Total
+        """
+        return Money(sum(map(_cents_of, amounts)))
+
+    @staticmethod
+    def sum_cents(cents: Iterable[int]) -> "Money":
+        """
+        Bulk sum of a column of cents
+
+        An array('q') column is summed with NumPy when it is installed
+        (optional dependency); otherwise the builtin int sum is used.
+
+        Args:
+            cents: Column of cents, e.g. array('q') or list of int
+
+        Returns:
+            Money: Total
+        """
+        if isinstance(cents, array) and cents.typecode == "q":
+            numpy = _optional_numpy()
+            if numpy is not None:
+                return Money(int(numpy.frombuffer(cents, dtype=numpy.int64).sum()))
+        return Money(sum(cents))
+
+    def _coerce(self, other) -> "Money":
+        """Convert the other operand of an arithmetic operation"""
+        if isinstance(other, Money):
+            return other
+        if isinstance(other, (int, float, Decimal)) and not isinstance(other, bool):
+            return Money.of(other)
+        return None
+
+    def __add__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return Money(self.cents + other.cents)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return Money(self.cents - other.cents)
+
+    def __rsub__(self, other):
+        other = self._coerce(other)
+        if other is None:
+            return NotImplemented
+        return Money(other.cents - self.cents)
+
+    def __mul__(self, quantity):
+        if not isinstance(quantity, int) or isinstance(quantity, bool):
+            return NotImplemented
+        return Money(self.cents * quantity)
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money(-self.cents)
+
+    def _compare_key(self, other):
+        """
+        Get (own value, other value) for an exact comparison
+
+        Numbers are compared through their shortest decimal representation,
+        so Money.of(0.1) == 0.1 while Money.of(27.505) != 27.505.
+        """
+        if isinstance(other, Money):
+            return self.cents, other.cents
+        if isinstance(other, (int, float, Decimal)) and not isinstance(other, bool):
+            value = Decimal(repr(other)) if isinstance(other, float) else Decimal(other)
+            return Decimal(self.cents).scaleb(-2), value
+        return None
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.cents == other.cents
+        if isinstance(other, Decimal):
+            # Money(10) equals 0.1, whose hash differs from Decimal("0.1")'s,
+            # so it cannot also equal the Decimal (compare .cents instead)
+            return NotImplemented
+        key = self._compare_key(other)
+        if key is None:
+            return NotImplemented
+        return key[0] == key[1]
+
+    def __lt__(self, other):
+        key = self._compare_key(other)
+        if key is None:
+            return NotImplemented
+        return key[0] < key[1]
+
+    def __le__(self, other):
+        key = self._compare_key(other)
+        if key is None:
+            return NotImplemented
+        return key[0] <= key[1]
+
+    def __gt__(self, other):
+        key = self._compare_key(other)
+        if key is None:
+            return NotImplemented
+        return key[0] > key[1]
+
+    def __ge__(self, other):
+        key = self._compare_key(other)
+        if key is None:
+            return NotImplemented
+        return key[0] >= key[1]
+
+    def __hash__(self):
+        # Equal to the hash of the int or float it equals, e.g.
+        # hash(Money.of(0.1)) == hash(0.1): true division rounds cents / 100
+        # to the float whose shortest repr is the amount
+        cents = self.cents
+        return hash(cents // 100) if cents % 100 == 0 else hash(cents / 100)
+
+    def __bool__(self):
+        return self.cents != 0
+
+    def __float__(self):
+        return self.cents / 100
+
+    def __format__(self, format_spec: str) -> str:
+        if not format_spec:
+            return str(self)
+        return format(Decimal(self.cents).scaleb(-2), format_spec)
+
+    def __str__(self):
+        sign = "-" if self.cents < 0 else ""
+        units, cents = divmod(abs(self.cents), 100)
+        return f"{sign}{units}.{cents:02d}"
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+
+_cents_of = attrgetter("cents")
+# Slot setter used by __init__ (attribute assignment is blocked)
+_set_cents = Money.__dict__["cents"].__set__
+_numpy = None
+_PLAIN_AMOUNT = re.compile(r"\s*-?\d+(?:\.\d\d?)?\s*", re.ASCII).fullmatch
+
+
+def _parse_plain_amount(text: str) -> Optional[int]:
+    """
+    Fast path for plain amounts such as "12", "12.5" or "-0.99"
+
+    Returns:
+        int: Amount in cents, or None if the text needs full Decimal parsing
+    """
+    if _PLAIN_AMOUNT(text) is None:
+        return None
+    units, _, fraction = text.strip().partition(".")
+    return int(units + fraction.ljust(2, "0"))
+
+
+def _optional_numpy():
+    """Import NumPy on first use, or return None if it is not installed"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
@@ -2,18 +2,24 @@
 Product Entity Class
 """
 
+from domain.money import Money
+
 
 class Product:
     """Product class representing a product in the store"""
     
-    def __init__(self, product_id: str, name: str, price: float, stock: int = 0):
+    # No per-instance __dict__ (large catalogs); __weakref__ is kept for
+    # the decoded-product cache of MappedCatalogStore
+    __slots__ = ("product_id", "name", "_price", "stock", "__weakref__")
+    
+    def __init__(self, product_id: str, name: str, price: Money, stock: int = 0):
         """
         Initialize product
         
         Args:
             product_id: Product ID
             name: Product name
-            price: Unit price
+            price: Unit price (Money, or an amount such as 5.50)
             stock: Stock quantity
         """
         self.product_id = product_id
@@ -21,6 +27,15 @@ class Product:
         self.price = price
         self.stock = stock
     
+    @property
+    def price(self) -> Money:
+        """Unit price"""
+        return self._price
+    
+    @price.setter
+    def price(self, value):
+        self._price = Money.of(value)
+    
     def reduce_stock(self, quantity: int) -> bool:
         """
         Reduce stock
@@ -49,4 +64,4 @@ class Product:
         return f"{self.name} (ID: {self.product_id}, Price: ${self.price:.2f}, Stock: {self.stock})"
     
     def __repr__(self):
-        return f"Product(product_id='{self.product_id}', name='{self.name}', price={self.price}, stock={self.stock})"
+        return f"Product(product_id='{self.product_id}', name='{self.name}', price={self.price!r}, stock={self.stock})"
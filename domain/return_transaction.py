@@ -3,7 +3,7 @@ Return Transaction Entity Class
 继承自 Transaction 基类，演示面向对象编程的继承和多态
 """
 
-from datetime import datetime
+from domain.money import Money
 from domain.sale_item import SaleItem
 from domain.transaction import Transaction
 
@@ -15,6 +15,8 @@ class ReturnTransaction(Transaction):
     演示继承和多态的使用
     """
     
+    __slots__ = ("original_sale_id",)
+    
     def __init__(self, return_id: str = None, original_sale_id: str = None):
         """
         初始化退货交易
@@ -27,8 +29,11 @@ class ReturnTransaction(Transaction):
         super().__init__(return_id)
         # 退货特有的属性
         self.original_sale_id = original_sale_id
-        # 为了向后兼容，保留 return_id 属性（指向 transaction_id）
-        self.return_id = self.transaction_id
+    
+    @property
+    def return_id(self) -> str:
+        """退货ID（transaction_id 的旧名称，向后兼容）"""
+        return self.transaction_id
     
     def _generate_id(self) -> str:
         """
@@ -37,23 +42,24 @@ class ReturnTransaction(Transaction):
         Returns:
             str: 退货ID
         """
-        return f"RET-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        return self.id_generator.generate("RET")
     
-    def get_total_amount(self) -> float:
+    def get_total_amount(self) -> Money:
         """
         计算总退款金额（实现抽象方法，演示多态）
+        合计由 add_item/remove_item/update_quantity 增量维护，读取为 O(1)
         
         Returns:
-            float: 总退款金额
+            Money: 总退款金额
         """
-        return sum(item.get_subtotal() for item in self.items)
+        return self._running_total()
     
-    def get_total_refund(self) -> float:
+    def get_total_refund(self) -> Money:
         """
         计算总退款金额（保留原有方法名，向后兼容）
         
         Returns:
-            float: 总退款金额
+            Money: 总退款金额
         """
         return self.get_total_amount()
     
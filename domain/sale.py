@@ -4,6 +4,7 @@ Sale Entity Class
 """
 
 from datetime import datetime
+from domain.money import Money
 from domain.sale_item import SaleItem
 from domain.transaction import Transaction
 
@@ -15,6 +16,11 @@ class Sale(Transaction):
     演示继承和多态的使用
     """
     
+    __slots__ = ("payment_method", "payment_amount")
+    
+    # 销售ID前缀
+    ID_PREFIX = "SALE"
+    
     def __init__(self, sale_id: str = None):
         """
         初始化销售交易
@@ -26,11 +32,21 @@ class Sale(Transaction):
         super().__init__(sale_id)
         # Sale specific attributes
         self.payment_method = None
-        self.payment_amount = 0.0
-        
-        # Compatibility aliases
-        self.sale_id = self.transaction_id  # old attribute name
-        self.sale_time = self.transaction_time  # maintain old attribute
+        self.payment_amount = Money(0)
+    
+    @property
+    def sale_id(self) -> str:
+        """销售ID（transaction_id 的旧名称，向后兼容）"""
+        return self.transaction_id
+    
+    @property
+    def sale_time(self) -> datetime:
+        """销售时间（transaction_time 的旧名称，向后兼容）"""
+        return self.transaction_time
+    
+    @sale_time.setter
+    def sale_time(self, value: datetime):
+        self.transaction_time = value
     
     def _generate_id(self) -> str:
         """
@@ -39,39 +55,40 @@ class Sale(Transaction):
         Returns:
             str: 销售ID
         """
-        return f"SALE-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        return self.id_generator.generate(self.ID_PREFIX)
     
-    def get_total_amount(self) -> float:
+    def get_total_amount(self) -> Money:
         """
         计算总金额（实现抽象方法，演示多态）
+        合计由 add_item/remove_item/update_quantity 增量维护，读取为 O(1)
         
         Returns:
-            float: 总金额
+            Money: 总金额
         """
-        return sum(item.get_subtotal() for item in self.items)
+        return self._running_total()
     
-    def get_total(self) -> float:
+    def get_total(self) -> Money:
         """
         计算总金额（保留原有方法名，向后兼容）
         
         Returns:
-            float: 总金额
+            Money: 总金额
         """
         return self.get_total_amount()
     
-    def complete(self, payment_method: str, payment_amount: float):
+    def complete(self, payment_method: str, payment_amount: Money):
         """
         完成销售交易（实现抽象方法，演示多态）
         
         Args:
             payment_method: 支付方式
-            payment_amount: 支付金额
+            payment_amount: 支付金额（Money 或数值）
         """
         self.payment_method = payment_method
-        self.payment_amount = payment_amount
+        self.payment_amount = Money.of(payment_amount)
         self.is_completed = True
     
-    def complete_sale(self, payment_method: str, payment_amount: float):
+    def complete_sale(self, payment_method: str, payment_amount: Money):
         """
         完成销售交易（保留原有方法名，向后兼容）
         
@@ -81,16 +98,16 @@ class Sale(Transaction):
         """
         self.complete(payment_method, payment_amount)
     
-    def get_change(self) -> float:
+    def get_change(self) -> Money:
         """
         计算找零
         
         Returns:
-            float: 找零金额
+            Money: 找零金额
         """
         if self.is_completed:
             return self.payment_amount - self.get_total_amount()
-        return 0.0
+        return Money(0)
     
     def get_transaction_type(self) -> str:
         """
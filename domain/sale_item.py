@@ -2,34 +2,68 @@
 Sale Item Entity Class
 """
 
+from domain.money import Money
 from domain.product import Product
 
 
 class SaleItem:
-    """Sale item class representing a single product item in a sale"""
+    """
+    Sale item class representing a single product item in a sale
+    
+    The product ID, name and unit price are copied from the product when
+    the item is created, so a completed sale keeps the price it was sold
+    at and does not keep the (mutable) product alive.
+    """
+    
+    __slots__ = ("product_id", "name", "unit_price", "quantity")
     
     def __init__(self, product: Product, quantity: int):
         """
         Initialize sale item
         
         Args:
-            product: Product object
+            product: Product object (its ID, name and price are copied)
             quantity: Purchase quantity
         """
-        self.product = product
+        self.product_id = product.product_id
+        self.name = product.name
+        self.unit_price = product.price
         self.quantity = quantity
     
-    def get_subtotal(self) -> float:
+    @classmethod
+    def from_snapshot(cls, product_id: str, name: str, unit_price: Money,
+                      quantity: int) -> "SaleItem":
+        """
+        Rebuild a sale item from recorded product data (journal, snapshot)
+        
+        Args:
+            product_id: Product ID
+            name: Product name at sale time
+            unit_price: Unit price at sale time
+            quantity: Purchase quantity
+            
+        Returns:
+            SaleItem: Sale item
+        """
+        item = cls.__new__(cls)
+        item.product_id = product_id
+        item.name = name
+        item.unit_price = unit_price
+        item.quantity = quantity
+        return item
+    
+    def get_subtotal(self) -> Money:
         """
         Calculate subtotal
         
         Returns:
-            float: Subtotal amount
+            Money: Subtotal amount
         """
-        return self.product.price * self.quantity
+        return self.unit_price * self.quantity
     
     def __str__(self):
-        return f"{self.product.name} x{self.quantity} = ${self.get_subtotal():.2f}"
+        return f"{self.name} x{self.quantity} = ${self.get_subtotal():.2f}"
     
     def __repr__(self):
-        return f"SaleItem(product={self.product}, quantity={self.quantity})"
+        return (f"SaleItem(product_id='{self.product_id}', name='{self.name}', "
+                f"unit_price={self.unit_price!r}, quantity={self.quantity})")
@@ -5,8 +5,10 @@ Transaction Abstract Base Class
 
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import List
+from typing import Dict, List
+from domain.money import Money
 from domain.sale_item import SaleItem
+from domain.id_generator import IdGenerator, SnowflakeIdGenerator
 
 
 class Transaction(ABC):
@@ -16,6 +18,27 @@ class Transaction(ABC):
     演示继承和多态的使用
     """
     
+    # 历史交易大量常驻内存：用 __slots__ 省去每个实例的 __dict__
+    # （保留 __weakref__：库存预留以弱引用记录预留已过期的销售单）
+    __slots__ = ("transaction_id", "items", "transaction_time", "is_completed",
+                 "_total_cents", "_total_quantity", "_quantities", "__weakref__")
+    
+    # 所有交易子类共享的ID生成器
+    id_generator: IdGenerator = SnowflakeIdGenerator()
+    
+    # 一致性检查模式：每次读取合计时与全量重算比对（测试用）
+    verify_totals = False
+    
+    @classmethod
+    def set_id_generator(cls, generator: IdGenerator):
+        """
+        替换共享的ID生成器（例如为每个终端配置不同的终端ID）
+        
+        Args:
+            generator: ID生成器
+        """
+        Transaction.id_generator = generator
+    
     def __init__(self, transaction_id: str = None):
         """
         初始化交易
@@ -27,6 +50,10 @@ class Transaction(ABC):
         self.items: List[SaleItem] = []
         self.transaction_time = datetime.now()
         self.is_completed = False
+        # 增量维护的合计，读取为 O(1)
+        self._total_cents = 0
+        self._total_quantity = 0
+        self._quantities: Dict[str, int] = {}
     
     @abstractmethod
     def _generate_id(self) -> str:
@@ -47,15 +74,107 @@ class Transaction(ABC):
             item: 交易项目对象
         """
         self.items.append(item)
+        self._apply_quantity(item, item.quantity)
+    
+    def load_items(self, items: List[SaleItem], total_cents: int, total_quantity: int,
+                   quantities: Dict[str, int]):
+        """
+        一次性载入全部项目及其已计算好的合计（批量结账用，省去逐项 add_item）
+        
+        Args:
+            items: 交易项目列表
+            total_cents: 合计（分）
+            total_quantity: 总数量
+            quantities: 每个产品的数量
+        """
+        self.items = items
+        self._total_cents = total_cents
+        self._total_quantity = total_quantity
+        self._quantities = quantities
+    
+    def remove_item(self, item: SaleItem) -> bool:
+        """
+        移除交易项目（通用方法，所有子类共享）
+        
+        Args:
+            item: 交易项目对象
+            
+        Returns:
+            bool: 如果项目存在并已移除返回True
+        """
+        for index, existing in enumerate(self.items):
+            if existing is item:
+                del self.items[index]
+                self._apply_quantity(item, -item.quantity)
+                return True
+        return False
+    
+    def update_quantity(self, item: SaleItem, quantity: int):
+        """
+        修改交易项目数量（通用方法，所有子类共享）
+        
+        Args:
+            item: 交易项目对象
+            quantity: 新数量
+        """
+        self._apply_quantity(item, quantity - item.quantity)
+        item.quantity = quantity
+    
+    def _apply_quantity(self, item: SaleItem, delta: int):
+        """
+        按数量变化增量更新合计、总数量和每个产品的数量
+        
+        Args:
+            item: 交易项目对象
+            delta: 数量变化
+        """
+        product_id = item.product_id
+        self._total_cents += item.unit_price.cents * delta
+        self._total_quantity += delta
+        quantity = self._quantities.get(product_id, 0) + delta
+        if quantity:
+            self._quantities[product_id] = quantity
+        else:
+            self._quantities.pop(product_id, None)
+    
+    def _running_total(self) -> Money:
+        """
+        读取增量维护的合计（供子类的 get_total_amount 使用）
+        
+        Returns:
+            Money: 合计金额
+        """
+        if Transaction.verify_totals:
+            self.check_totals()
+        return Money(self._total_cents)
+    
+    def check_totals(self):
+        """
+        将增量维护的合计与全量重算结果比对
+        
+        Raises:
+            AssertionError: 增量结果与重算结果不一致
+        """
+        total = Money.sum(item.get_subtotal() for item in self.items)
+        quantities: Dict[str, int] = {}
+        for item in self.items:
+            product_id = item.product_id
+            quantities[product_id] = quantities.get(product_id, 0) + item.quantity
+        assert self._total_cents == total.cents, \
+            f"running total {Money(self._total_cents)} != recomputed {total}"
+        assert self._total_quantity == sum(quantities.values()), \
+            f"running quantity {self._total_quantity} != recomputed {sum(quantities.values())}"
+        assert self._quantities == quantities, \
+            f"running per-product quantities {self._quantities} != recomputed {quantities}"
     
     @abstractmethod
-    def get_total_amount(self) -> float:
+    def get_total_amount(self) -> Money:
         """
         计算总金额（抽象方法，演示多态）
         不同交易类型有不同的计算方式
         
         Returns:
-            float: 总金额
+            Money: 总金额
         """
         pass
     
@@ -80,6 +199,27 @@ class Transaction(ABC):
         """
         return len(self.items)
     
+    def get_total_quantity(self) -> int:
+        """
+        获取所有项目的总数量（通用方法，O(1)）
+        
+        Returns:
+            int: 总数量
+        """
+        return self._total_quantity
+    
+    def get_quantity(self, product_id: str) -> int:
+        """
+        获取某个产品在交易中的数量（通用方法，O(1)）
+        
+        Args:
+            product_id: 产品ID
+            
+        Returns:
+            int: 数量
+        """
+        return self._quantities.get(product_id, 0)
+    
     def is_empty(self) -> bool:
         """
         检查交易是否为空（通用方法）
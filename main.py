@@ -2,24 +2,61 @@
 POS System Main Entry Point - CLI Version
 """
 
+import os
+
+from domain.id_generator import SnowflakeIdGenerator, terminal_id_from_env
+from domain.transaction import Transaction
 from service.inventory_service import InventoryService
 from service.sale_service import SaleService
 from service.return_service import ReturnService
+from persistence.transaction_journal import TransactionJournal
+from persistence.snapshot import SnapshotManager, recover
+from persistence.catalog_file import MappedCatalogStore
 from ui.pos_ui import POSUI
 
+# Durable transaction journal, replayed on startup
+JOURNAL_PATH = "data/transactions.journal"
+# Prebuilt catalog (python -m persistence.catalog_file products.csv data/catalog.bin)
+CATALOG_PATH = "data/catalog.bin"
+# Barcode aliases (CSV columns: barcode,product_id,multiplier)
+BARCODES_PATH = "data/barcodes.csv"
+
 
 def main():
     """Main function"""
+    # Terminal ID from POS_TERMINAL_ID: every lane needs its own, so
+    # transaction IDs of different terminals never collide
+    Transaction.set_id_generator(SnowflakeIdGenerator(terminal_id_from_env()))
+    
     # Initialize service layer
-    inventory_service = InventoryService()
-    sale_service = SaleService(inventory_service)
-    return_service = ReturnService(inventory_service, sale_service)
+    journal = TransactionJournal(JOURNAL_PATH)
+    if os.path.exists(CATALOG_PATH):
+        inventory_service = InventoryService(store=MappedCatalogStore(CATALOG_PATH))
+    else:
+        inventory_service = InventoryService()
+    if os.path.exists(BARCODES_PATH):
+        inventory_service.import_barcodes(BARCODES_PATH)
+    sale_service = SaleService(inventory_service, journal)
+    return_service = ReturnService(inventory_service, sale_service, journal)
+    
+    # Rebuild stock from the latest snapshot and the journal tail (the history
+    # the snapshot covers is decoded on first use)
+    recover(journal, sale_service, return_service)
+    if journal.replay_failures:
+        print(f"Warning: stock of {len(journal.replay_failures)} replayed transactions or "
+              f"snapshot entries could not be re-applied: {', '.join(journal.replay_failures[:10])}")
+    snapshots = SnapshotManager(journal)
+    snapshots.start()
     
     # Initialize UI layer
     ui = POSUI(sale_service, return_service, inventory_service)
     
     # Run system
-    ui.run()
+    try:
+        ui.run()
+    finally:
+        snapshots.stop()
+        journal.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,96 @@
+"""
+POS System Main Entry Point - HTTP API Server (back office serving many lanes)
+
+Usage:
+    python main_server.py [--host 127.0.0.1] [--port 8080] [--terminal-id 0]
+                          [--metrics-dump metrics.json]
+"""
+
+import argparse
+import asyncio
+import os
+
+from domain.id_generator import SnowflakeIdGenerator, terminal_id_from_env
+from domain.transaction import Transaction
+from service.inventory_service import InventoryService
+from service.sale_service import SaleService
+from service.return_service import ReturnService
+from service.metrics import metrics
+from service.events import LowStock
+from persistence.transaction_journal import TransactionJournal
+from persistence.snapshot import SnapshotManager, recover
+from persistence.catalog_file import MappedCatalogStore
+from api.http_server import POSServer
+from main import JOURNAL_PATH, CATALOG_PATH, BARCODES_PATH
+
+
+async def serve(server: POSServer, host: str, port: int):
+    """Serve until cancelled"""
+    http_server = await server.serve(host, port)
+    print(f"POS API listening on http://{host}:{http_server.sockets[0].getsockname()[1]}")
+    async with http_server:
+        await http_server.serve_forever()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="POS HTTP API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--journal", default=JOURNAL_PATH,
+                        help="Transaction journal path")
+    parser.add_argument("--terminal-id", type=int, default=terminal_id_from_env(),
+                        help="Terminal ID in transaction IDs, unique per terminal "
+                             "(0-1023, default from POS_TERMINAL_ID)")
+    parser.add_argument("--metrics-dump", metavar="PATH",
+                        help="Record operation metrics and dump them here every minute")
+    args = parser.parse_args()
+    if not 0 <= args.terminal_id <= SnowflakeIdGenerator.MAX_TERMINAL_ID:
+        parser.error(f"--terminal-id must be between 0 and {SnowflakeIdGenerator.MAX_TERMINAL_ID}")
+    Transaction.set_id_generator(SnowflakeIdGenerator(args.terminal_id))
+
+    # Initialize service layer
+    journal = TransactionJournal(args.journal)
+    if os.path.exists(CATALOG_PATH):
+        inventory_service = InventoryService(store=MappedCatalogStore(CATALOG_PATH))
+    else:
+        inventory_service = InventoryService()
+    if os.path.exists(BARCODES_PATH):
+        inventory_service.import_barcodes(BARCODES_PATH)
+    sale_service = SaleService(inventory_service, journal)
+    return_service = ReturnService(inventory_service, sale_service, journal)
+    
+    # Rebuild stock from the latest snapshot and the journal tail (the history
+    # the snapshot covers is decoded on first use)
+    recover(journal, sale_service, return_service)
+    if journal.replay_failures:
+        print(f"Warning: stock of {len(journal.replay_failures)} replayed transactions or "
+              f"snapshot entries could not be re-applied: {', '.join(journal.replay_failures[:10])}")
+    snapshots = SnapshotManager(journal)
+    snapshots.start()
+    # Log low stock off the request path
+    inventory_service.events.subscribe(
+        LowStock, lambda event: print(f"Low stock: {event.product_id} has {event.stock} left "
+                                      f"(threshold {event.threshold})", flush=True),
+        asynchronous=True)
+    
+    if args.metrics_dump:
+        metrics.enable()
+        metrics.start_dump(args.metrics_dump)
+    
+    # Run server (it also releases the stock of abandoned sales on its
+    # event loop, so stock is only changed from that thread)
+    server = POSServer(sale_service, return_service, inventory_service)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        metrics.stop_dump()
+        inventory_service.events.close(timeout=5)
+        snapshots.stop()
+        journal.close()
+
+
+if __name__ == "__main__":
+    main()
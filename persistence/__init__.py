@@ -0,0 +1,3 @@
+"""
+Persistence Layer - Contains durable storage components
+"""
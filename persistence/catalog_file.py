@@ -0,0 +1,282 @@
+"""
+Memory-Mapped Catalog File
+Prebuilt fixed-record product catalog, decoded lazily on first access
+
+File layout (little endian):
+    header:  magic (8s) | record count (I) | record size (I)
+    records: product_id (24s) | name (64s) | price_cents (q) | stock (q)
+Records are sorted by product_id so lookups are a binary search over the map.
+
+Compile a catalog from CSV (columns: product_id,name,price,stock):
+    python -m persistence.catalog_file products.csv data/catalog.bin
+"""
+
+import csv
+import mmap
+import os
+import struct
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from domain.money import Money
+from domain.product import Product
+from persistence.product_store import ProductStore
+
+
+MAGIC = b"POSCAT01"
+_HEADER = struct.Struct("<8sII")
+_RECORD = struct.Struct("<24s64sqq")
+ID_SIZE = 24
+NAME_SIZE = 64
+
+
+class MappedCatalogStore(ProductStore):
+    """
+    Product store over a memory-mapped catalog file
+
+    Opening the file only maps it; a product is decoded on its first
+    get() and kept as the working copy afterwards, so memory grows with
+    the products actually touched. Stock changes stay in memory (the
+    file is a read-only snapshot; history is rebuilt from the journal).
+
+    With a cache_size, decoded products form a bounded LRU of hot SKUs.
+    Products whose stock differs from the file (seen by save_stock or at
+    eviction) and added products are pinned instead, since they are the
+    only copy of that state. An evicted product still referenced
+    elsewhere (e.g. by a sale in progress) is found again by a weak
+    reference, so there is never more than one working copy.
+    """
+
+    def __init__(self, path: str, cache_size: Optional[int] = None):
+        """
+        Initialize store
+
+        Args:
+            path: Catalog file path
+            cache_size: Maximum number of decoded products kept besides
+                        pinned ones (None keeps every decoded product)
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, record_size = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or record_size != _RECORD.size:
+            raise ValueError(f"Not a catalog file: {path}")
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Decoded products (least recently used first when bounded), and
+        # products that must stay in memory: added or changed and evicted
+        self._products: "OrderedDict[str, Product]" = OrderedDict()
+        self._pinned: Dict[str, Product] = {}
+        self._evicted: "weakref.WeakValueDictionary[str, Product]" = weakref.WeakValueDictionary()
+        # Products added after the file was built
+        self._added: Dict[str, Product] = {}
+        self._lock = threading.Lock()
+
+    def get(self, product_id: str, default=None) -> Optional[Product]:
+        if self.cache_size is None:
+            product = self._products.get(product_id)
+            if product is not None:
+                self.cache_hits += 1
+                return product
+        with self._lock:
+            product = self._products.get(product_id)
+            if product is not None:
+                self._products.move_to_end(product_id)
+                self.cache_hits += 1
+                return product
+            product = self._pinned.get(product_id)
+            if product is not None:
+                self.cache_hits += 1
+                return product
+            product = self._evicted.pop(product_id, None)
+            if product is None:
+                self.cache_misses += 1
+                index = self._find(product_id)
+                if index < 0:
+                    return default
+                product = self._decode(index)
+            else:
+                self.cache_hits += 1
+            self._products[product_id] = product
+            if self.cache_size is not None and len(self._products) > self.cache_size:
+                self._evict()
+            return product
+
+    def add(self, product: Product):
+        with self._lock:
+            self._products.pop(product.product_id, None)
+            self._pinned[product.product_id] = product
+            if self._find(product.product_id) < 0:
+                self._added[product.product_id] = product
+
+    def all(self) -> List[Product]:
+        products = []
+        for index in range(self._count):
+            product_id = self._read_id(index)
+            product = (self._products.get(product_id) or self._pinned.get(product_id)
+                       or self._evicted.get(product_id))
+            products.append(product if product is not None else self._decode(index))
+        products.extend(self._added.values())
+        return products
+
+    def save_stock(self, changes: Iterable[Tuple[Product, int]]):
+        if self.cache_size is None:
+            return
+        with self._lock:
+            for product, _ in changes:
+                product_id = product.product_id
+                if product_id in self._products and product.stock != self._file_stock(product_id):
+                    del self._products[product_id]
+                    self._pinned[product_id] = product
+
+    def decoded_count(self) -> int:
+        """
+        Get number of products decoded or added so far
+
+        Returns:
+            int: Number of products held in memory
+        """
+        return len(self._products) + len(self._pinned)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return {"hits": self.cache_hits, "misses": self.cache_misses,
+                "size": len(self._products), "capacity": self.cache_size or 0}
+
+    def _evict(self):
+        """Drop least recently used products beyond cache_size (lock held)"""
+        while len(self._products) > self.cache_size:
+            product_id, product = self._products.popitem(last=False)
+            if product.stock != self._file_stock(product_id):
+                self._pinned[product_id] = product
+            else:
+                self._evicted[product_id] = product
+
+    def _file_stock(self, product_id: str) -> int:
+        """Read the stock of a product as stored in the file"""
+        index = self._find(product_id)
+        return _RECORD.unpack_from(self._map, _HEADER.size + index * _RECORD.size)[3]
+
+    def close(self):
+        """Unmap and close the catalog file"""
+        self._map.close()
+        self._file.close()
+
+    def _find(self, product_id: str) -> int:
+        """Binary search a product_id, returning its record index or -1"""
+        key = product_id.encode("utf-8")
+        if len(key) > ID_SIZE:
+            return -1
+        key = key.ljust(ID_SIZE, b"\0")
+        data = self._map
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            offset = _HEADER.size + middle * _RECORD.size
+            probe = data[offset:offset + ID_SIZE]
+            if probe < key:
+                low = middle + 1
+            elif probe > key:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def _read_id(self, index: int) -> str:
+        """Read the product_id of a record"""
+        offset = _HEADER.size + index * _RECORD.size
+        return self._map[offset:offset + ID_SIZE].rstrip(b"\0").decode("utf-8")
+
+    def _decode(self, index: int) -> Product:
+        """Decode the record at index into a Product"""
+        product_id, name, price_cents, stock = _RECORD.unpack_from(
+            self._map, _HEADER.size + index * _RECORD.size)
+        return Product(product_id.rstrip(b"\0").decode("utf-8"),
+                       name.rstrip(b"\0").decode("utf-8"),
+                       Money(price_cents), stock)
+
+    def __contains__(self, product_id) -> bool:
+        return (product_id in self._products or product_id in self._pinned
+                or self._find(product_id) >= 0)
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self._count):
+            yield self._read_id(index)
+        yield from list(self._added)
+
+    def __len__(self) -> int:
+        return self._count + len(self._added)
+
+
+def write_catalog(products: Iterable[Product], output_path: str) -> int:
+    """
+    Write products to a catalog file
+
+    Args:
+        products: Products to write
+        output_path: Catalog file path
+
+    Returns:
+        int: Number of records written
+
+    Raises:
+        ValueError: If a product ID is too long or duplicated
+    """
+    records = []
+    for product in products:
+        key = product.product_id.encode("utf-8")
+        if len(key) > ID_SIZE:
+            raise ValueError(f"Product ID longer than {ID_SIZE} bytes: {product.product_id}")
+        name = product.name.encode("utf-8")[:NAME_SIZE].decode("utf-8", "ignore").encode("utf-8")
+        records.append((key.ljust(ID_SIZE, b"\0"), name, product.price.cents, product.stock))
+    records.sort(key=lambda record: record[0])
+    for previous, current in zip(records, records[1:]):
+        if previous[0] == current[0]:
+            product_id = current[0].rstrip(b"\0").decode("utf-8")
+            raise ValueError(f"Duplicate product ID: {product_id}")
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = output_path + ".tmp"
+    with open(temporary_path, "wb") as catalog_file:
+        catalog_file.write(_HEADER.pack(MAGIC, len(records), _RECORD.size))
+        pack = _RECORD.pack
+        catalog_file.writelines(pack(*record) for record in records)
+    os.replace(temporary_path, output_path)
+    return len(records)
+
+
+def compile_catalog(csv_path: str, output_path: str) -> int:
+    """
+    Compile a catalog file from CSV (columns: product_id,name,price,stock)
+
+    Args:
+        csv_path: Source CSV file path
+        output_path: Catalog file path
+
+    Returns:
+        int: Number of records written
+    """
+    with open(csv_path, newline="", encoding="utf-8") as csv_file:
+        rows = csv.DictReader(csv_file)
+        return write_catalog((Product(row["product_id"], row["name"], row["price"],
+                                      int(row.get("stock") or 0))
+                              for row in rows), output_path)
+
+
+def main():
+    """Command line entry point"""
+    if len(sys.argv) != 3:
+        print("Usage: python -m persistence.catalog_file <products.csv> <catalog.bin>")
+        sys.exit(1)
+    count = compile_catalog(sys.argv[1], sys.argv[2])
+    print(f"Compiled {count} products into {sys.argv[2]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Product Import Readers
+Streaming readers for CSV and JSONL product/restock files
+"""
+
+import csv
+import json
+import os
+from typing import Iterator, Union
+
+
+def read_rows(path: Union[str, os.PathLike]) -> Iterator[dict]:
+    """
+    Stream rows from a CSV (header row required) or JSONL file
+
+    The format is chosen by file extension (.jsonl / .ndjson for JSON
+    lines, anything else is read as CSV). Only one row is held at a time.
+
+    Args:
+        path: File path
+
+    Returns:
+        Iterator: Iterator of row dicts
+    """
+    if str(path).lower().endswith((".jsonl", ".ndjson")):
+        return _read_jsonl(path)
+    return _read_csv(path)
+
+
+def _read_csv(path) -> Iterator[dict]:
+    """Stream CSV rows as dicts keyed by the header row"""
+    with open(path, newline="", encoding="utf-8") as csv_file:
+        reader = csv.reader(csv_file)
+        header = [column.strip() for column in next(reader, [])]
+        for row in reader:
+            yield dict(zip(header, row))
+
+
+def _read_jsonl(path) -> Iterator[dict]:
+    """Stream JSON lines; an unparsable line is yielded as an error marker"""
+    with open(path, encoding="utf-8") as jsonl_file:
+        for line in jsonl_file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                yield {"__error__": f"Invalid JSON: {error.msg}"}
@@ -0,0 +1,368 @@
+"""
+Product Storage Backends
+Storage interface behind InventoryService, with in-memory and SQLite implementations
+"""
+
+import queue
+import sqlite3
+import threading
+import weakref
+from abc import abstractmethod
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from domain.money import Money
+from domain.product import Product
+
+
+class ProductStore(Mapping):
+    """
+    Product storage backend interface
+
+    A store is a read-only Mapping of product_id to Product. The stock of
+    the Product objects it returns is available stock: open sales reserve
+    by changing it in memory. The store keeps on-hand stock instead (units
+    held by open sales are still on the shelf), and save_stock applies
+    changes of on-hand stock as deltas, so a sale's stock updates are
+    written in one batch and holds never reach the store.
+    """
+
+    # Whether stock survives a restart (journal replay must not re-apply it)
+    durable = False
+
+    @abstractmethod
+    def get(self, product_id: str, default=None) -> Optional[Product]:
+        """
+        Get product by ID
+
+        Args:
+            product_id: Product ID
+            default: Value returned when the product does not exist
+
+        Returns:
+            Product: Product object, or default if not found
+        """
+        pass
+
+    @abstractmethod
+    def add(self, product: Product):
+        """
+        Add or replace a product
+
+        Args:
+            product: Product object
+        """
+        pass
+
+    def add_many(self, products: Iterable[Product]):
+        """
+        Add or replace several products
+
+        Args:
+            products: Product objects
+        """
+        for product in products:
+            self.add(product)
+
+    @abstractmethod
+    def all(self) -> List[Product]:
+        """
+        Get all products
+
+        Returns:
+            list: List of all products
+        """
+        pass
+
+    def save_stock(self, changes: Iterable[Tuple[Product, int]]):
+        """
+        Persist changes of on-hand stock in one batch
+
+        Args:
+            changes: (product, units added to its on-hand stock; negative
+                     for units removed) of each changed product
+        """
+        pass
+
+    def close(self):
+        """Release resources held by the store"""
+        pass
+
+    def cache_stats(self) -> Dict[str, int]:
+        """
+        Get the counters of the store's cache of hot products
+
+        Returns:
+            dict: hits, misses, size and capacity (0 means unbounded);
+                  empty if the store keeps everything in memory
+        """
+        return {}
+
+    def __getitem__(self, product_id: str) -> Product:
+        product = self.get(product_id)
+        if product is None:
+            raise KeyError(product_id)
+        return product
+
+
+class DictProductStore(ProductStore):
+    """In-memory product store backed by a dict"""
+
+    def __init__(self):
+        """Initialize store"""
+        self.products: Dict[str, Product] = {}
+
+    def get(self, product_id: str, default=None) -> Optional[Product]:
+        return self.products.get(product_id, default)
+
+    def add(self, product: Product):
+        self.products[product.product_id] = product
+
+    def add_many(self, products: Iterable[Product]):
+        self.products.update((product.product_id, product) for product in products)
+
+    def all(self) -> List[Product]:
+        return list(self.products.values())
+
+    def __contains__(self, product_id) -> bool:
+        return product_id in self.products
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.products)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+
+# Statements are kept as constants so sqlite3's per-connection statement
+# cache reuses the compiled (prepared) statement on every call.
+_CREATE_TABLE = (
+    "CREATE TABLE IF NOT EXISTS products ("
+    "product_id TEXT PRIMARY KEY, name TEXT NOT NULL, "
+    "price_cents INTEGER NOT NULL, stock INTEGER NOT NULL) WITHOUT ROWID"
+)
+_SELECT_ONE = "SELECT product_id, name, price_cents, stock FROM products WHERE product_id = ?"
+_SELECT_ALL = "SELECT product_id, name, price_cents, stock FROM products"
+_SELECT_IDS = "SELECT product_id FROM products"
+_COUNT = "SELECT COUNT(*) FROM products"
+_UPSERT = "INSERT OR REPLACE INTO products (product_id, name, price_cents, stock) VALUES (?, ?, ?, ?)"
+_UPDATE_STOCK = "UPDATE products SET stock = stock + ? WHERE product_id = ?"
+
+
+class SQLiteProductStore(ProductStore):
+    """
+    SQLite product store (WAL mode)
+
+    Uses a small pool of connections and an LRU cache of hot rows. Cached
+    Product objects are the working copies; the database keeps on-hand
+    stock and save_stock adds its deltas to it, so stock merely held by
+    open carts never reaches the database. A row whose available stock
+    differs from the database (it has holds) is pinned instead of evicted,
+    and an evicted row still referenced elsewhere is revived by get(), so
+    there is never a second copy of a product whose holds could be lost.
+    """
+
+    durable = True
+
+    def __init__(self, path: str, pool_size: int = 4, cache_size: int = 10000):
+        """
+        Initialize store
+
+        Args:
+            path: Database file path
+            pool_size: Number of pooled connections
+            cache_size: Maximum number of cached hot rows
+        """
+        self.path = path
+        self.cache_size = cache_size
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        with self._connection() as connection:
+            connection.execute(_CREATE_TABLE)
+
+        # product_id -> [Product, on-hand stock in the database]; rows with
+        # holds are pinned when evicted, unchanged ones are remembered (with
+        # their saved stock) while still referenced
+        self._cache: "OrderedDict[str, list]" = OrderedDict()
+        self._pinned: Dict[str, list] = {}
+        self._evicted: "weakref.WeakValueDictionary[str, Product]" = weakref.WeakValueDictionary()
+        self._evicted_stock: Dict[str, int] = {}
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a pooled connection"""
+        connection = sqlite3.connect(self.path, check_same_thread=False,
+                                     isolation_level=None, cached_statements=64)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a connection from the pool"""
+        connection = self._pool.get()
+        try:
+            yield connection
+        finally:
+            self._pool.put(connection)
+
+    @contextmanager
+    def _transaction(self):
+        """Borrow a connection and run one write transaction on it"""
+        with self._connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def get(self, product_id: str, default=None) -> Optional[Product]:
+        with self._cache_lock:
+            entry = self._cache.get(product_id)
+            if entry is not None:
+                self._cache.move_to_end(product_id)
+                self.cache_hits += 1
+                return entry[0]
+            product = self._revive(product_id)
+            if product is not None:
+                self.cache_hits += 1
+                return product
+            self.cache_misses += 1
+
+        with self._connection() as connection:
+            row = connection.execute(_SELECT_ONE, (product_id,)).fetchone()
+        if row is None:
+            return default
+
+        with self._cache_lock:
+            # Another thread may have loaded the row meanwhile; keep its object
+            entry = self._cache.get(product_id)
+            if entry is not None:
+                return entry[0]
+            product = self._revive(product_id)
+            if product is None:
+                product = _row_to_product(row)
+                self._cache[product_id] = [product, row[3]]
+                self._evict()
+            return product
+
+    def add(self, product: Product):
+        self.add_many([product])
+
+    def add_many(self, products: Iterable[Product]):
+        products = list(products)
+        with self._transaction() as connection:
+            connection.executemany(_UPSERT, [(p.product_id, p.name, p.price.cents, p.stock)
+                                             for p in products])
+        with self._cache_lock:
+            for product in products:
+                product_id = product.product_id
+                self._evicted.pop(product_id, None)
+                self._evicted_stock.pop(product_id, None)
+                if product_id in self._pinned:
+                    del self._pinned[product_id]
+                    self._cache[product_id] = [product, product.stock]
+                elif product_id in self._cache:
+                    self._cache[product_id] = [product, product.stock]
+            self._evict()
+
+    def all(self) -> List[Product]:
+        with self._connection() as connection:
+            rows = connection.execute(_SELECT_ALL).fetchall()
+        with self._cache_lock:
+            products = []
+            for row in rows:
+                entry = self._cache.get(row[0]) or self._pinned.get(row[0])
+                product = entry[0] if entry is not None else self._evicted.get(row[0])
+                products.append(product if product is not None else _row_to_product(row))
+            return products
+
+    def save_stock(self, changes: Iterable[Tuple[Product, int]]):
+        with self._cache_lock:
+            updates = []
+            for product, delta in changes:
+                if not delta:
+                    continue
+                product_id = product.product_id
+                entry = self._cache.get(product_id) or self._pinned.get(product_id)
+                if entry is not None:
+                    entry[1] += delta
+                elif product_id in self._evicted_stock:
+                    self._evicted_stock[product_id] += delta
+                updates.append((delta, product_id))
+        if updates:
+            with self._transaction() as connection:
+                connection.executemany(_UPDATE_STOCK, updates)
+
+    def close(self):
+        """
+        Drop the cache and close all connections
+
+        Unsaved stock changes are discarded: they are holds of open carts,
+        which end with the process.
+        """
+        with self._cache_lock:
+            self._cache.clear()
+            self._pinned.clear()
+            self._evicted.clear()
+            self._evicted_stock.clear()
+        while not self._pool.empty():
+            self._pool.get().close()
+
+    def cache_stats(self) -> Dict[str, int]:
+        return {"hits": self.cache_hits, "misses": self.cache_misses,
+                "size": len(self._cache), "capacity": self.cache_size}
+
+    def _evict(self):
+        """Drop least recently used rows beyond cache_size (cache lock held)"""
+        while len(self._cache) > self.cache_size:
+            product_id, entry = self._cache.popitem(last=False)
+            if entry[0].stock != entry[1]:
+                self._pinned[product_id] = entry
+            else:
+                self._evicted[product_id] = entry[0]
+                self._evicted_stock[product_id] = entry[1]
+        if len(self._evicted_stock) > 2 * max(self.cache_size, len(self._evicted)):
+            # Forget the saved stock of rows no longer referenced
+            evicted = self._evicted
+            self._evicted_stock = {product_id: stock for product_id, stock
+                                   in self._evicted_stock.items() if product_id in evicted}
+
+    def _revive(self, product_id: str) -> Optional[Product]:
+        """Move a pinned or still referenced evicted row back into the cache (cache lock held)"""
+        entry = self._pinned.pop(product_id, None)
+        if entry is None:
+            product = self._evicted.pop(product_id, None)
+            saved = self._evicted_stock.pop(product_id, None)
+            if product is None:
+                return None
+            # A caller may have changed it after eviction
+            entry = [product, saved]
+        self._cache[product_id] = entry
+        self._evict()
+        return entry[0]
+
+    def __contains__(self, product_id) -> bool:
+        return self.get(product_id) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        with self._connection() as connection:
+            rows = connection.execute(_SELECT_IDS).fetchall()
+        return (row[0] for row in rows)
+
+    def __len__(self) -> int:
+        with self._connection() as connection:
+            return connection.execute(_COUNT).fetchone()[0]
+
+
+def _row_to_product(row: tuple) -> Product:
+    """Build a Product from a (product_id, name, price_cents, stock) row"""
+    product_id, name, price_cents, stock = row
+    return Product(product_id, name, Money(price_cents), stock)
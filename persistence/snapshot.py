@@ -0,0 +1,256 @@
+"""
+Snapshots
+Point-in-time stock and history counters of the journal, so recovery
+replays only the journal segments written after it; the segments it
+covers are kept as history segments and decoded on first use
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from persistence.transaction_journal import (
+    TransactionJournal, encode_record, read_framed,
+    records_to_history, replay_journal,
+)
+
+
+# Snapshot file name suffix (next to the journal segments)
+SNAPSHOT_SUFFIX = ".snapshot"
+
+# History segment name infix: path.history.000001, ...
+HISTORY_INFIX = ".history."
+
+# Default interval between background snapshots
+DEFAULT_INTERVAL_SECONDS = 300.0
+
+
+class SnapshotManager:
+    """
+    Writes snapshots of a journal and compacts it
+
+    A snapshot is a single framed record: the first journal segment not
+    covered, the net stock change per product and the history counters
+    (sales, returns, revenue, refunds). It is built by rotating the
+    journal and folding the closed segments into the previous snapshot,
+    so it is consistent by construction, checkouts only wait for the
+    rotation, and its size and cost depend on the catalog and the
+    segments written since the last one, not on the age of the store.
+    Covered segments are then renamed to history segments, which hold
+    the transaction history without ever being replayed.
+    """
+
+    def __init__(self, journal: TransactionJournal,
+                 interval_seconds: float = DEFAULT_INTERVAL_SECONDS):
+        """
+        Initialize snapshot manager
+
+        Args:
+            journal: Transaction journal to snapshot
+            interval_seconds: Interval between background snapshots
+        """
+        self.journal = journal
+        self.path = journal.path + SNAPSHOT_SUFFIX
+        self.interval_seconds = interval_seconds
+        # Last error of the background thread (it keeps retrying)
+        self.last_error: Optional[Exception] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start taking snapshots in the background"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._snapshot_loop,
+                                            name="journal-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread (waits for a running snapshot)"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def read_header(self) -> Optional[dict]:
+        """
+        Read the current snapshot
+
+        Returns:
+            dict: Snapshot record, or None if there is no snapshot yet
+        """
+        if not os.path.exists(self.path):
+            return None
+        return next(read_framed(self.path))
+
+    def snapshot(self) -> int:
+        """
+        Write a new snapshot now and move the journal segments it covers
+        to history segments
+
+        Returns:
+            int: First journal segment not covered by the snapshot
+        """
+        with self._lock:
+            end = self.journal.rotate()
+            header = self.read_header() or {"type": "snapshot", "segment": 0, "stock": {},
+                                            "sales": 0, "returns": 0,
+                                            "revenue_cents": 0, "refund_cents": 0}
+            start = header["segment"]
+            segments = [number for number in self.journal.segments() if start <= number < end]
+
+            # Fold the net stock changes and counters of the new records in
+            stock: Dict[str, int] = dict(header["stock"])
+            counts = {"sales": header["sales"], "returns": header["returns"],
+                      "revenue_cents": header["revenue_cents"],
+                      "refund_cents": header["refund_cents"]}
+            for number in segments:
+                for record in read_framed(self.journal.segment_path(number)):
+                    is_sale = record["type"] == "sale"
+                    sign = -1 if is_sale else 1
+                    cents = 0
+                    for product_id, _, price_cents, quantity in record["items"]:
+                        stock[product_id] = stock.get(product_id, 0) + sign * quantity
+                        cents += price_cents * quantity
+                    counts["sales" if is_sale else "returns"] += 1
+                    counts["revenue_cents" if is_sale else "refund_cents"] += cents
+            header = {"type": "snapshot", "segment": end, **counts,
+                      "stock": {product_id: delta for product_id, delta in stock.items() if delta}}
+
+            temporary_path = self.path + ".tmp"
+            with open(temporary_path, "wb") as snapshot_file:
+                snapshot_file.write(encode_record(header))
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            os.replace(temporary_path, self.path)
+
+            # Renamed, not copied; segments a crash left behind are moved too
+            for number in self.journal.segments():
+                if number >= min(end, self.journal.segment):
+                    break
+                os.replace(self.journal.segment_path(number), history_path(self.journal, number))
+            _sync_directory(self.path)
+            return end
+
+    def _snapshot_loop(self):
+        """Background snapshots"""
+        while not self._stopped.wait(self.interval_seconds):
+            try:
+                self.snapshot()
+                self.last_error = None
+            except OSError as error:
+                self.last_error = error
+
+
+class HistoryArchive:
+    """
+    Completed sales and returns of the segments covered by a snapshot,
+    decoded once on first load()
+    """
+
+    def __init__(self, paths: List[str]):
+        """
+        Initialize archive
+
+        Args:
+            paths: Framed files holding the covered records, in journal order
+        """
+        self.paths = paths
+        self._history: Optional[Tuple[list, list]] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> Tuple[list, list]:
+        """
+        Decode the archived history (only the first call reads the files)
+
+        Returns:
+            tuple: (sales, returns) in journal order
+        """
+        with self._lock:
+            if self._history is None:
+                self._history = records_to_history(
+                    record for path in self.paths for record in read_framed(path))
+            return self._history
+
+
+def history_path(journal: TransactionJournal, number: int) -> str:
+    """
+    Get the file path of a history segment
+
+    Args:
+        journal: Transaction journal
+        number: Number of the journal segment it was
+
+    Returns:
+        str: History segment file path
+    """
+    return f"{journal.path}{HISTORY_INFIX}{number:06d}"
+
+
+def history_paths(journal: TransactionJournal, first_segment: int) -> List[str]:
+    """
+    Get the files holding the history covered by a snapshot: history
+    segments, and journal segments below first_segment not yet moved
+
+    Args:
+        journal: Transaction journal
+        first_segment: First journal segment not covered by the snapshot
+
+    Returns:
+        list: File paths in journal order
+    """
+    directory = os.path.dirname(journal.path) or "."
+    prefix = os.path.basename(journal.path) + HISTORY_INFIX
+    numbered = [(int(name[len(prefix):]), os.path.join(directory, name))
+                for name in os.listdir(directory)
+                if name.startswith(prefix) and name[len(prefix):].isdigit()]
+    numbered.extend((number, journal.segment_path(number))
+                    for number in journal.segments() if number < first_segment)
+    return [path for _, path in sorted(numbered)]
+
+
+def recover(journal: TransactionJournal, sale_service, return_service) -> int:
+    """
+    Rebuild stock from the latest snapshot and the journal tail
+
+    The history covered by the snapshot is attached to the services
+    undecoded (see HistoryArchive), so recovery reads one snapshot record
+    and the segments written since. Snapshot stock changes that cannot
+    be re-applied (unknown product, stock too low) are reported in
+    journal.replay_failures as "snapshot:<product_id>", before the
+    journal's own failures.
+
+    Args:
+        journal: Transaction journal
+        sale_service: Sale service to restore sales into
+        return_service: Return service to restore returns into
+
+    Returns:
+        int: Number of journal records replayed
+    """
+    inventory_service = sale_service.inventory_service
+    path = journal.path + SNAPSHOT_SUFFIX
+    first_segment = 0
+    failures = []
+    if os.path.exists(path):
+        header = next(read_framed(path))
+        first_segment = header["segment"]
+        if not inventory_service.store.durable:
+            for product_id, delta in header["stock"].items():
+                if not inventory_service.update_stock(product_id, -delta):
+                    failures.append(f"snapshot:{product_id}")
+        archive = HistoryArchive(history_paths(journal, first_segment))
+        sale_service.attach_archive(archive, header["revenue_cents"])
+        return_service.attach_archive(archive, header["refund_cents"])
+    count = replay_journal(journal, sale_service, return_service, first_segment)
+    journal.replay_failures[:0] = failures
+    return count
+
+
+def _sync_directory(path: str):
+    """Persist a rename in the directory of path"""
+    descriptor = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
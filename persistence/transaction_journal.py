@@ -0,0 +1,457 @@
+"""
+Transaction Journal
+Append-only, length-prefixed binary log of completed sales and returns,
+split into numbered segment files
+"""
+
+import json
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from domain.money import Money
+from domain.return_transaction import ReturnTransaction
+from domain.sale import Sale
+from domain.sale_item import SaleItem
+
+
+# Fsync policies
+FSYNC_ALWAYS = "always"    # fsync before every commit returns
+FSYNC_GROUP = "group"      # background fsync every group_commit_ms
+FSYNC_NONE = "none"        # leave flushing to the OS page cache
+
+# Record header: payload length and CRC32 of the payload
+_HEADER = struct.Struct("<II")
+
+# Default size at which the active segment is closed and a new one started
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+
+
+class TransactionJournal:
+    """
+    Append-only transaction journal
+
+    Each record is written as a fixed header (payload length, CRC32)
+    followed by a UTF-8 JSON payload. A torn or corrupted tail record
+    is detected by its length/CRC and ignored on replay.
+
+    Records go to the active segment; segment 0 is the file at path,
+    later segments are path.000001, path.000002, ... A new segment is
+    started when the journal is reopened, when the active one grows past
+    segment_bytes and on rotate(), so segments already covered by a
+    snapshot can be removed.
+    """
+
+    def __init__(self, path: str, fsync_policy: str = FSYNC_GROUP,
+                 group_commit_ms: int = 5, segment_bytes: int = DEFAULT_SEGMENT_BYTES):
+        """
+        Initialize journal
+
+        Args:
+            path: Journal file path (segment 0)
+            fsync_policy: FSYNC_ALWAYS, FSYNC_GROUP or FSYNC_NONE
+            group_commit_ms: Group commit interval in milliseconds
+            segment_bytes: Size at which a new segment is started
+        """
+        if fsync_policy not in (FSYNC_ALWAYS, FSYNC_GROUP, FSYNC_NONE):
+            raise ValueError(f"Unknown fsync policy: {fsync_policy}")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.group_commit_ms = group_commit_ms
+        self.segment_bytes = segment_bytes
+        # Continue in a fresh segment, so records appended after a torn
+        # tail of the previous run are not hidden behind it
+        segments = self.segments()
+        self.segment = 0
+        if segments:
+            self.segment = segments[-1]
+            if os.path.getsize(self.segment_path(self.segment)):
+                self.segment += 1
+        self._fd = self._open_segment(self.segment)
+        self._segment_size = os.fstat(self._fd).st_size
+        self._lock = threading.Lock()
+        self._dirty = False
+        # IDs of transactions whose stock replay_journal could not re-apply
+        # (recover() adds snapshot entries as "snapshot:<product_id>")
+        self.replay_failures: List[str] = []
+        self._closed = threading.Event()
+        self._sync_thread: Optional[threading.Thread] = None
+
+        if fsync_policy == FSYNC_GROUP:
+            self._sync_thread = threading.Thread(target=self._group_commit_loop,
+                                                 name="journal-sync", daemon=True)
+            self._sync_thread.start()
+
+    def segment_path(self, number: int) -> str:
+        """
+        Get the file path of a segment
+
+        Args:
+            number: Segment number
+
+        Returns:
+            str: Segment file path
+        """
+        return self.path if number == 0 else f"{self.path}.{number:06d}"
+
+    def segments(self) -> List[int]:
+        """
+        Get the numbers of the existing segments
+
+        Returns:
+            list: Segment numbers in ascending order
+        """
+        directory = os.path.dirname(self.path) or "."
+        prefix = os.path.basename(self.path) + "."
+        numbers = [int(name[len(prefix):]) for name in os.listdir(directory)
+                   if name.startswith(prefix) and name[len(prefix):].isdigit()]
+        if os.path.exists(self.path):
+            numbers.append(0)
+        return sorted(numbers)
+
+    def rotate(self) -> int:
+        """
+        Close the active segment and start a new one
+
+        Returns:
+            int: Number of the new segment (every record appended before
+                 the call is in a lower-numbered segment)
+        """
+        with self._lock:
+            self._start_segment()
+            return self.segment
+
+    def remove_segments(self, before: int) -> int:
+        """
+        Delete closed segments (after a snapshot covering them was written)
+
+        Args:
+            before: Delete segments numbered below this (never the active one)
+
+        Returns:
+            int: Number of segments deleted
+        """
+        removed = 0
+        for number in self.segments():
+            if number >= min(before, self.segment):
+                break
+            os.remove(self.segment_path(number))
+            removed += 1
+        return removed
+
+    def append(self, record: dict):
+        """
+        Append a record to the journal
+
+        Args:
+            record: JSON-serializable record
+        """
+        self._write(encode_record(record))
+
+    def append_many(self, records: Iterable[dict]):
+        """
+        Append several records with a single write
+
+        Args:
+            records: JSON-serializable records
+        """
+        data = b"".join(map(encode_record, records))
+        if data:
+            self._write(data)
+
+    def append_sale(self, sale: Sale):
+        """
+        Append a completed sale
+
+        Args:
+            sale: Completed sale object
+        """
+        self.append(sale_to_record(sale))
+
+    def append_return(self, return_transaction: ReturnTransaction):
+        """
+        Append a completed return
+
+        Args:
+            return_transaction: Completed return transaction object
+        """
+        self.append(return_to_record(return_transaction))
+
+    def read_records(self, first_segment: int = 0) -> Iterator[dict]:
+        """
+        Read all intact records in append order
+
+        Args:
+            first_segment: Skip segments numbered below this
+                           (those covered by a snapshot)
+
+        Returns:
+            Iterator: Iterator of records
+        """
+        for number in self.segments():
+            if number >= first_segment:
+                yield from read_framed(self.segment_path(number))
+
+    def sync(self):
+        """Force all appended records to stable storage"""
+        with self._lock:
+            os.fsync(self._fd)
+            self._dirty = False
+
+    def close(self):
+        """Flush and close the journal"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._sync_thread is not None:
+            self._sync_thread.join()
+        self.sync()
+        os.close(self._fd)
+
+    def _write(self, data: bytes):
+        """Append encoded records to the active segment"""
+        with self._lock:
+            if self._segment_size >= self.segment_bytes:
+                self._start_segment()
+            os.write(self._fd, data)
+            self._segment_size += len(data)
+            if self.fsync_policy == FSYNC_ALWAYS:
+                os.fsync(self._fd)
+            else:
+                self._dirty = True
+
+    def _open_segment(self, number: int) -> int:
+        """Open a segment file for appending"""
+        return os.open(self.segment_path(number), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _start_segment(self):
+        """Flush and close the active segment and open the next (caller holds the lock)"""
+        os.fsync(self._fd)
+        os.close(self._fd)
+        self._dirty = False
+        self.segment += 1
+        self._fd = self._open_segment(self.segment)
+        self._segment_size = 0
+
+    def _group_commit_loop(self):
+        """Background group commit"""
+        interval = self.group_commit_ms / 1000.0
+        while not self._closed.wait(interval):
+            if self._dirty:
+                self._dirty = False
+                try:
+                    os.fsync(self._fd)
+                except OSError:
+                    # Segment closed by a concurrent rotation (already synced)
+                    pass
+
+
+def encode_record(record: dict) -> bytes:
+    """
+    Encode a record as header plus JSON payload
+
+    Args:
+        record: JSON-serializable record
+
+    Returns:
+        bytes: Framed record
+    """
+    payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_framed(path: str) -> Iterator[dict]:
+    """
+    Read the intact records of one framed file, stopping at a torn tail
+
+    Args:
+        path: File path
+
+    Returns:
+        Iterator: Iterator of records
+    """
+    with open(path, "rb") as framed_file:
+        while True:
+            header = framed_file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, checksum = _HEADER.unpack(header)
+            payload = framed_file.read(length)
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                # Torn write at the tail, stop here
+                return
+            yield json.loads(payload.decode("utf-8"))
+
+
+def sale_to_record(sale: Sale) -> dict:
+    """
+    Convert a sale to a journal record
+
+    Args:
+        sale: Sale object
+
+    Returns:
+        dict: Journal record
+    """
+    return {
+        "type": "sale",
+        "id": sale.transaction_id,
+        "time": sale.transaction_time.timestamp(),
+        "items": [_item_to_record(item) for item in sale.items],
+        "payment_method": sale.payment_method,
+        "payment_cents": sale.payment_amount.cents,
+    }
+
+
+def return_to_record(return_transaction: ReturnTransaction) -> dict:
+    """
+    Convert a return transaction to a journal record
+
+    Args:
+        return_transaction: Return transaction object
+
+    Returns:
+        dict: Journal record
+    """
+    return {
+        "type": "return",
+        "id": return_transaction.transaction_id,
+        "time": return_transaction.transaction_time.timestamp(),
+        "items": [_item_to_record(item) for item in return_transaction.items],
+        "original_sale_id": return_transaction.original_sale_id,
+    }
+
+
+def record_to_sale(record: dict) -> Sale:
+    """
+    Rebuild a completed sale from a journal record
+
+    Args:
+        record: Journal record
+
+    Returns:
+        Sale: Completed sale object
+    """
+    sale = Sale(record["id"])
+    sale.transaction_time = datetime.fromtimestamp(record["time"])
+    for item_record in record["items"]:
+        sale.add_item(_record_to_item(item_record))
+    sale.complete(record["payment_method"], Money(record["payment_cents"]))
+    return sale
+
+
+def record_to_return(record: dict) -> ReturnTransaction:
+    """
+    Rebuild a completed return from a journal record
+
+    Args:
+        record: Journal record
+
+    Returns:
+        ReturnTransaction: Completed return transaction object
+    """
+    return_transaction = ReturnTransaction(record["id"], record["original_sale_id"])
+    return_transaction.transaction_time = datetime.fromtimestamp(record["time"])
+    for item_record in record["items"]:
+        return_transaction.add_item(_record_to_item(item_record))
+    return_transaction.complete()
+    return return_transaction
+
+
+def records_to_history(records: Iterable[dict]) -> Tuple[List[Sale], List[ReturnTransaction]]:
+    """
+    Rebuild many completed sales and returns at once (snapshot loading);
+    totals are computed while decoding
+
+    Args:
+        records: Journal records
+
+    Returns:
+        tuple: (sales, returns) in record order
+    """
+    # (product_id, name, price_cents) -> shared (product_id, name, Money), so
+    # items of the same product at the same price share their field objects
+    snapshots: Dict[Tuple[str, str, int], Tuple[str, str, Money]] = {}
+    sales: List[Sale] = []
+    returns: List[ReturnTransaction] = []
+    for record in records:
+        if record["type"] == "sale":
+            transaction = Sale(record["id"])
+            sales.append(transaction)
+        elif record["type"] == "return":
+            transaction = ReturnTransaction(record["id"], record["original_sale_id"])
+            returns.append(transaction)
+        else:
+            continue
+        transaction.transaction_time = datetime.fromtimestamp(record["time"])
+        items = []
+        quantities: Dict[str, int] = {}
+        total_cents = total_quantity = 0
+        for product_id, name, price_cents, quantity in record["items"]:
+            key = (product_id, name, price_cents)
+            snapshot = snapshots.get(key)
+            if snapshot is None:
+                snapshot = snapshots[key] = (product_id, name, Money(price_cents))
+            items.append(SaleItem.from_snapshot(*snapshot, quantity))
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+            total_cents += price_cents * quantity
+            total_quantity += quantity
+        transaction.load_items(items, total_cents, total_quantity, quantities)
+        if record["type"] == "sale":
+            transaction.complete(record["payment_method"], Money(record["payment_cents"]))
+        else:
+            transaction.complete()
+    return sales, returns
+
+
+def replay_journal(journal: TransactionJournal, sale_service, return_service,
+                   first_segment: int = 0) -> int:
+    """
+    Replay the journal to rebuild history and stock
+
+    Transactions whose stock could not be re-applied (unknown product,
+    stock too low) are still restored; their IDs are collected in
+    journal.replay_failures for the caller to report.
+
+    Args:
+        journal: Transaction journal
+        sale_service: Sale service to restore sales into
+        return_service: Return service to restore returns into
+        first_segment: Skip segments numbered below this
+                       (those covered by a snapshot)
+
+    Returns:
+        int: Number of records replayed
+    """
+    count = 0
+    failures = journal.replay_failures = []
+    for record in journal.read_records(first_segment):
+        if record["type"] == "sale":
+            ok = sale_service.restore_sale(record_to_sale(record))
+        elif record["type"] == "return":
+            ok = return_service.restore_return(record_to_return(record))
+        else:
+            ok = True
+        if not ok:
+            failures.append(record.get("id"))
+        count += 1
+    return count
+
+
+def _item_to_record(item: SaleItem) -> list:
+    """Encode a sale item as [product_id, name, price_cents, quantity]"""
+    return [item.product_id, item.name, item.unit_price.cents, item.quantity]
+
+
+def _record_to_item(item_record: list) -> SaleItem:
+    """Decode a sale item with the product data recorded at sale time"""
+    product_id, name, price_cents, quantity = item_record
+    return SaleItem.from_snapshot(product_id, name, Money(price_cents), quantity)
@@ -0,0 +1,259 @@
+"""
+Sales Analytics Service
+Column-oriented (NumPy) reporting over completed sales
+"""
+
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from domain.money import Money
+from domain.sale import Sale
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only analytics needs it
+    np = None
+
+
+# Timestamps are seconds since this naive epoch, so buckets follow the
+# local wall-clock time recorded on each sale
+_EPOCH = datetime(1970, 1, 1)
+_HOUR = 3600
+_DAY = 86400
+_COLUMN_NAMES = ("sale", "timestamp", "product", "quantity", "unit_cents", "payment")
+
+
+class SalesColumns:
+    """
+    Line items of completed sales stored as NumPy columns
+
+    One row per sale item. Rows of the same sale are contiguous and share
+    the sale number, timestamp and payment method code. Product IDs and
+    payment methods are dictionary-encoded as int codes.
+    """
+
+    def __init__(self, sale, timestamp, product, quantity, unit_cents, payment,
+                 product_ids: List[str], payment_methods: List[str]):
+        """
+        Initialize columns
+
+        Args:
+            sale: Sale number of each line (int64, non-decreasing)
+            timestamp: Sale time in seconds since 1970-01-01 local time (int64)
+            product: Product code of each line, index into product_ids (int64)
+            quantity: Quantity of each line (int64)
+            unit_cents: Unit price in cents of each line (int64)
+            payment: Payment method code, index into payment_methods (int64)
+            product_ids: Product ID of each product code
+            payment_methods: Payment method of each payment code
+        """
+        self.sale = sale
+        self.timestamp = timestamp
+        self.product = product
+        self.quantity = quantity
+        self.unit_cents = unit_cents
+        self.payment = payment
+        self.product_ids = product_ids
+        self.payment_methods = payment_methods
+
+    def __len__(self) -> int:
+        return len(self.sale)
+
+
+class SalesAnalytics:
+    """
+    Sales analytics over a SaleService's history
+
+    Completed sales are materialized into columns once (new sales are
+    appended incrementally on the next query); every report is then a
+    vectorized group-by over those columns.
+    """
+
+    def __init__(self, sale_service=None):
+        """
+        Initialize analytics
+
+        Args:
+            sale_service: Sale service whose history is analyzed (optional;
+                          without it, load columns with load_columns)
+
+        Raises:
+            ImportError: If NumPy is not installed
+        """
+        if np is None:
+            raise ImportError("Sales analytics requires NumPy (pip install numpy)")
+        self.sale_service = sale_service
+        self._sales_loaded = 0
+        self._product_codes: Dict[str, int] = {}
+        self._payment_codes: Dict[str, int] = {}
+        # Lines of sales not yet merged into the NumPy columns
+        self._builders = {name: array("q") for name in _COLUMN_NAMES}
+        self._columns: Optional[SalesColumns] = None
+
+    def load_columns(self, columns: SalesColumns):
+        """
+        Analyze prebuilt columns instead of a sale service
+
+        Args:
+            columns: Sales columns
+        """
+        self.sale_service = None
+        self._columns = columns
+
+    def columns(self) -> SalesColumns:
+        """
+        Get the materialized columns, appending sales completed since the last call
+
+        Returns:
+            SalesColumns: Sales columns
+        """
+        if self.sale_service is not None:
+            new_sales = self.sale_service.sales_history[self._sales_loaded:]
+            if new_sales or self._columns is None:
+                for sale in new_sales:
+                    self._append_sale(sale)
+                    self._sales_loaded += 1
+                self._columns = self._merge_builders()
+        return self._columns
+
+    def revenue_by_hour(self) -> Dict[datetime, Money]:
+        """
+        Get revenue per calendar hour
+
+        Returns:
+            dict: Hour start -> revenue, in time order
+        """
+        return self._revenue_by_period(_HOUR)
+
+    def revenue_by_day(self) -> Dict[datetime, Money]:
+        """
+        Get revenue per calendar day
+
+        Returns:
+            dict: Day start -> revenue, in time order
+        """
+        return self._revenue_by_period(_DAY)
+
+    def top_products(self, n: int = 10, by: str = "revenue") -> List[Tuple[str, int, Money]]:
+        """
+        Get best-selling products
+
+        Args:
+            n: Number of products
+            by: Ranking key, "revenue" or "quantity"
+
+        Returns:
+            list: (product_id, quantity sold, revenue), best first
+        """
+        if by not in ("revenue", "quantity"):
+            raise ValueError(f"Unknown ranking: {by}")
+        columns = self.columns()
+        size = len(columns.product_ids)
+        revenue = _group_sum(columns.product, _line_cents(columns), size)
+        quantity = _group_sum(columns.product, columns.quantity, size)
+        key = revenue if by == "revenue" else quantity
+        n = min(n, size)
+        if n <= 0:
+            return []
+        # Partial selection, then sort only the winners (stable on code order)
+        best = np.argpartition(-key, n - 1)[:n]
+        best = best[np.lexsort((best, -key[best]))]
+        return [(columns.product_ids[code], int(quantity[code]), Money(int(revenue[code])))
+                for code in best]
+
+    def basket_size_distribution(self) -> Dict[int, int]:
+        """
+        Get the distribution of basket sizes (total quantity per sale)
+
+        Returns:
+            dict: Basket size -> number of sales, by ascending size
+        """
+        columns = self.columns()
+        if not len(columns):
+            return {}
+        first = _sale_starts(columns)
+        sizes = np.add.reduceat(columns.quantity, first)
+        values, counts = np.unique(sizes, return_counts=True)
+        return dict(zip(values.tolist(), counts.tolist()))
+
+    def payment_mix(self) -> Dict[str, Tuple[int, Money]]:
+        """
+        Get number of sales and revenue per payment method
+
+        Returns:
+            dict: Payment method -> (number of sales, revenue)
+        """
+        columns = self.columns()
+        size = len(columns.payment_methods)
+        if not len(columns):
+            return {}
+        first = _sale_starts(columns)
+        counts = np.bincount(columns.payment[first], minlength=size)
+        revenue = _group_sum(columns.payment, _line_cents(columns), size)
+        return {method: (int(counts[code]), Money(int(revenue[code])))
+                for code, method in enumerate(columns.payment_methods) if counts[code]}
+
+    def _revenue_by_period(self, seconds: int) -> Dict[datetime, Money]:
+        """Group line revenue by timestamp // seconds"""
+        columns = self.columns()
+        if not len(columns):
+            return {}
+        # Periods span a bounded range (hours/days between the first and last
+        # sale), so offsets from the first period are dense bincount codes
+        periods = columns.timestamp // seconds
+        first_period = int(periods.min())
+        offsets = periods - first_period
+        lines = np.bincount(offsets)
+        revenue = _group_sum(offsets, _line_cents(columns), len(lines))
+        return {_EPOCH + timedelta(seconds=(first_period + int(offset)) * seconds):
+                Money(int(revenue[offset])) for offset in np.flatnonzero(lines)}
+
+    def _merge_builders(self) -> SalesColumns:
+        """Append the buffered lines to the NumPy columns and clear the buffers"""
+        merged = []
+        for name in _COLUMN_NAMES:
+            new = np.array(self._builders[name], dtype=np.int64)
+            self._builders[name] = array("q")
+            if self._columns is not None:
+                new = np.concatenate((getattr(self._columns, name), new))
+            merged.append(new)
+        return SalesColumns(*merged, product_ids=list(self._product_codes),
+                            payment_methods=list(self._payment_codes))
+
+    def _append_sale(self, sale: Sale):
+        """Buffer the items of one completed sale"""
+        builders = self._builders
+        sale_number = self._sales_loaded
+        timestamp = int((sale.transaction_time - _EPOCH).total_seconds())
+        payment = self._payment_codes.setdefault(sale.payment_method or "",
+                                                 len(self._payment_codes))
+        product_codes = self._product_codes
+        for item in sale.items:
+            builders["sale"].append(sale_number)
+            builders["timestamp"].append(timestamp)
+            builders["product"].append(product_codes.setdefault(item.product_id,
+                                                                len(product_codes)))
+            builders["quantity"].append(item.quantity)
+            builders["unit_cents"].append(item.unit_price.cents)
+            builders["payment"].append(payment)
+
+
+def _line_cents(columns: SalesColumns):
+    """Revenue of each line in cents"""
+    return columns.quantity * columns.unit_cents
+
+
+def _sale_starts(columns: SalesColumns):
+    """Index of the first line of each sale"""
+    return np.flatnonzero(np.diff(columns.sale, prepend=columns.sale[0] - 1))
+
+
+def _group_sum(codes, values, size: int):
+    """
+    Sum int64 values per code (exact)
+
+    bincount only takes float64 weights, so the sum is exact as long as
+    each group's total stays below 2**53 cents.
+    """
+    return np.rint(np.bincount(codes, weights=values, minlength=size)).astype(np.int64)
@@ -0,0 +1,118 @@
+"""
+Barcode Alias Index
+Maps scanned codes (EAN/UPC/GTIN or store codes) to a product and a pack
+multiplier, so several barcodes and pack sizes can sell one product
+"""
+
+from typing import Dict, Optional, Tuple, Union
+
+
+# Normalized code: numeric codes as int, other codes as text
+Code = Union[int, str]
+
+
+class BarcodeIndex:
+    """
+    Compact barcode -> (product_id, multiplier) table
+
+    Numeric codes are stored as integers, so UPC-A, EAN-13 and GTIN-14
+    forms of the same number (which differ only in leading zeros) are one
+    key, and a key takes less memory than its string. Multipliers are
+    only stored for pack barcodes (multiplier other than 1).
+    """
+
+    def __init__(self):
+        """Initialize empty index"""
+        self._products: Dict[Code, str] = {}
+        self._multipliers: Dict[Code, int] = {}
+        # Lookup counters (hits are codes found in the table)
+        self.lookups = 0
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def __contains__(self, code) -> bool:
+        return normalize_barcode(code) in self._products
+
+    def add(self, code: str, product_id: str, multiplier: int = 1):
+        """
+        Add or replace a barcode
+
+        Args:
+            code: Barcode as scanned
+            product_id: Product ID the barcode sells
+            multiplier: Units of the product per scan (pack size)
+
+        Raises:
+            ValueError: If the code is empty or the multiplier is not positive
+        """
+        key = normalize_barcode(code)
+        if key == "":
+            raise ValueError("Empty barcode")
+        if multiplier < 1:
+            raise ValueError(f"Pack multiplier must be greater than 0: {multiplier}")
+        self._products[key] = product_id
+        if multiplier == 1:
+            self._multipliers.pop(key, None)
+        else:
+            self._multipliers[key] = multiplier
+
+    def remove(self, code: str) -> bool:
+        """
+        Remove a barcode
+
+        Args:
+            code: Barcode
+
+        Returns:
+            bool: Whether the barcode was present
+        """
+        key = normalize_barcode(code)
+        self._multipliers.pop(key, None)
+        return self._products.pop(key, None) is not None
+
+    def resolve(self, code: str) -> Optional[Tuple[str, int]]:
+        """
+        Look up a scanned code
+
+        Args:
+            code: Barcode as scanned
+
+        Returns:
+            tuple: (product_id, multiplier), or None if the code is unknown
+        """
+        self.lookups += 1
+        key = normalize_barcode(code)
+        product_id = self._products.get(key)
+        if product_id is None:
+            return None
+        self.hits += 1
+        return product_id, self._multipliers.get(key, 1)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get table size and lookup counters
+
+        Returns:
+            dict: barcodes, packs, lookups and hits
+        """
+        return {"barcodes": len(self._products), "packs": len(self._multipliers),
+                "lookups": self.lookups, "hits": self.hits}
+
+
+def normalize_barcode(code: str) -> Code:
+    """
+    Normalize a scanned code
+
+    Args:
+        code: Barcode as scanned
+
+    Returns:
+        int for all-digit codes (leading zeros dropped), otherwise the
+        stripped text
+    """
+    code = code.strip()
+    if code.isdigit() and code.isascii():
+        return int(code)
+    return code
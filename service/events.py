@@ -0,0 +1,313 @@
+"""
+Event Bus
+In-process publish/subscribe for service events (sales and returns
+completed, stock changes, low stock), with synchronous delivery and
+queued delivery on a background thread so slow subscribers never block
+checkout
+"""
+
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, Optional, Set, Tuple
+
+
+# What publish() does when the asynchronous queue is full
+DROP_NEWEST = "drop_newest"   # discard the event being published
+DROP_OLDEST = "drop_oldest"   # discard the oldest queued event
+BLOCK = "block"               # wait for room (backpressure), up to block_timeout
+
+DEFAULT_MAX_QUEUE = 10_000
+
+
+class Event:
+    """Base class of events"""
+
+    def __init__(self):
+        """Initialize event"""
+        self.time = datetime.now()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in vars(self).items()
+                           if name != "time")
+        return f"{type(self).__name__}({fields})"
+
+
+class SaleCompleted(Event):
+    """A sale was completed and recorded"""
+
+    def __init__(self, sale):
+        """
+        Initialize event
+
+        Args:
+            sale: Completed Sale
+        """
+        super().__init__()
+        self.sale = sale
+
+
+class ReturnCompleted(Event):
+    """A return was completed and recorded"""
+
+    def __init__(self, return_transaction):
+        """
+        Initialize event
+
+        Args:
+            return_transaction: Completed ReturnTransaction
+        """
+        super().__init__()
+        self.return_transaction = return_transaction
+
+
+class StockChanged(Event):
+    """Available stock of a product changed"""
+
+    def __init__(self, product_id: str, stock: int):
+        """
+        Initialize event
+
+        Args:
+            product_id: Product ID
+            stock: Available stock after the change
+        """
+        super().__init__()
+        self.product_id = product_id
+        self.stock = stock
+
+
+class LowStock(Event):
+    """Available stock of a product fell below its threshold"""
+
+    def __init__(self, product_id: str, stock: int, threshold: int):
+        """
+        Initialize event
+
+        Args:
+            product_id: Product ID
+            stock: Available stock after the change
+            threshold: Low-stock threshold of the product
+        """
+        super().__init__()
+        self.product_id = product_id
+        self.stock = stock
+        self.threshold = threshold
+
+
+Handler = Callable[[Event], None]
+
+
+class EventBus:
+    """
+    Publish/subscribe by event type
+
+    Synchronous handlers run inside publish(), on the publisher's thread.
+    Asynchronous handlers run on one dispatcher thread, in publishing
+    order, fed by a bounded queue; when the queue is full the overflow
+    policy decides whether an event is dropped or the publisher waits.
+    Handler exceptions are counted and kept in last_error, never raised
+    to the publisher. Handler tables are replaced on (un)subscribe rather
+    than modified, so publishing takes no lock.
+    """
+
+    def __init__(self, max_queue: int = DEFAULT_MAX_QUEUE, overflow: str = DROP_NEWEST,
+                 block_timeout: Optional[float] = None):
+        """
+        Initialize event bus
+
+        Args:
+            max_queue: Capacity of the asynchronous queue
+            overflow: DROP_NEWEST, DROP_OLDEST or BLOCK
+            block_timeout: Longest wait for room under BLOCK, in seconds
+                           (None waits indefinitely; the event is dropped
+                           on timeout)
+        """
+        if overflow not in (DROP_NEWEST, DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        if max_queue < 1:
+            raise ValueError(f"Queue size must be greater than 0: {max_queue}")
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self._sync: Dict[type, Tuple[Handler, ...]] = {}
+        self._async: Dict[type, Tuple[Handler, ...]] = {}
+        # Event types with at least one handler (checked before building events)
+        self.subscribed: Set[type] = set()
+        self._subscribe_lock = threading.Lock()
+        self._queue: Deque[Tuple[Event, Tuple[Handler, ...]]] = deque()
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        # Counters
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error: Optional[Exception] = None
+
+    def subscribe(self, event_type: type, handler: Handler, asynchronous: bool = False):
+        """
+        Register a handler for one event type
+
+        Args:
+            event_type: Event class (exact type; subclasses are not matched)
+            handler: Callable taking the event
+            asynchronous: Deliver on the dispatcher thread instead of inline
+        """
+        with self._subscribe_lock:
+            table = self._async if asynchronous else self._sync
+            table[event_type] = table.get(event_type, ()) + (handler,)
+            self.subscribed = self.subscribed | {event_type}
+            if asynchronous and self._thread is None:
+                self._closed = False
+                self._thread = threading.Thread(target=self._dispatch_loop,
+                                                name="event-dispatch", daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self, event_type: type, handler: Handler) -> bool:
+        """
+        Remove a handler
+
+        Args:
+            event_type: Event class it was subscribed to
+            handler: Handler to remove
+
+        Returns:
+            bool: Whether the handler was subscribed
+        """
+        with self._subscribe_lock:
+            for table in (self._sync, self._async):
+                handlers = table.get(event_type, ())
+                if handler in handlers:
+                    remaining = tuple(other for other in handlers if other != handler)
+                    if remaining:
+                        table[event_type] = remaining
+                    else:
+                        del table[event_type]
+                    if event_type not in self._sync and event_type not in self._async:
+                        self.subscribed = self.subscribed - {event_type}
+                    return True
+            return False
+
+    def wants(self, event_type: type) -> bool:
+        """
+        Check whether an event type has subscribers (publishers skip
+        building events nobody receives)
+
+        Args:
+            event_type: Event class
+
+        Returns:
+            bool: Whether publishing it would reach a handler
+        """
+        return event_type in self.subscribed
+
+    def publish(self, event: Event):
+        """
+        Deliver an event to its subscribers
+
+        Args:
+            event: Event object
+        """
+        event_type = type(event)
+        if event_type not in self.subscribed:
+            return
+        self.published += 1
+        for handler in self._sync.get(event_type, ()):
+            self._call(handler, event)
+        handlers = self._async.get(event_type)
+        if handlers:
+            self._enqueue(event, handlers)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued event has been delivered
+
+        Args:
+            timeout: Longest wait in seconds (None waits indefinitely)
+
+        Returns:
+            bool: Whether the queue drained in time
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queue and not self._in_flight,
+                                            timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """
+        Deliver the queued events, then stop the dispatcher thread
+
+        Args:
+            timeout: Longest wait for the queue to drain
+        """
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get delivery counters
+
+        Returns:
+            dict: published, delivered, queued, dropped and errors
+        """
+        return {"published": self.published, "delivered": self.delivered,
+                "queued": len(self._queue), "dropped": self.dropped, "errors": self.errors}
+
+    def _call(self, handler: Handler, event: Event):
+        """Run one handler, counting its failure instead of raising it"""
+        try:
+            handler(event)
+            self.delivered += 1
+        except Exception as error:
+            self.errors += 1
+            self.last_error = error
+
+    def _enqueue(self, event: Event, handlers: Tuple[Handler, ...]):
+        """Queue an event for the dispatcher thread, applying the overflow policy"""
+        with self._condition:
+            queue = self._queue
+            if len(queue) >= self.max_queue:
+                if self.overflow == DROP_NEWEST:
+                    self.dropped += 1
+                    return
+                if self.overflow == DROP_OLDEST:
+                    queue.popleft()
+                    self.dropped += 1
+                elif not self._condition.wait_for(
+                        lambda: len(queue) < self.max_queue or self._closed, self.block_timeout):
+                    self.dropped += 1
+                    return
+            queue.append((event, handlers))
+            if len(queue) == 1:
+                # The dispatcher only waits when the queue is empty
+                self._condition.notify_all()
+
+    def _dispatch_loop(self):
+        """Deliver queued events until closed, taking the whole queue at a time"""
+        condition = self._condition
+        queue = self._queue
+        while True:
+            with condition:
+                condition.wait_for(lambda: queue or self._closed)
+                if not queue:
+                    return
+                batch = list(queue)
+                queue.clear()
+                self._in_flight += len(batch)
+                if self.overflow == BLOCK:
+                    # Wake publishers waiting for room
+                    condition.notify_all()
+            for event, handlers in batch:
+                for handler in handlers:
+                    self._call(handler, event)
+            with condition:
+                self._in_flight -= len(batch)
+                if not queue:
+                    condition.notify_all()
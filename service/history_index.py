@@ -0,0 +1,298 @@
+"""
+Transaction History Index
+Compact columns over a transaction history for paged, filtered and sorted views
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from domain.money import Money
+from domain.transaction import Transaction
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; filters then scan in Python
+    np = None
+
+
+# Sort keys accepted by HistoryIndex.query
+SORT_BY_TIME = "time"
+SORT_BY_AMOUNT = "amount"
+SORT_BY_PAYMENT = "payment"
+
+
+class HistoryIndex:
+    """
+    Index over completed transactions
+
+    Records are numbered by the order they were added (their position).
+    Time, amount and payment method are kept as compact columns plus a
+    posting list of positions per payment method, so a query returns a
+    sequence of positions (often a range or a slice) without touching the
+    transaction objects. The time order is maintained on every add (a
+    record that arrives late is inserted in place); the amount order is
+    built on first use, off the lock, and then maintained incrementally.
+    Conditions that no order answers are applied to the columns with
+    NumPy when it is installed.
+    """
+
+    def __init__(self):
+        """Initialize index"""
+        self.records: List[Transaction] = []
+        self._times = array("d")
+        self._cents = array("q")
+        self._methods = array("H")
+        self._method_codes: Dict[str, int] = {}
+        self._postings: List[array] = []
+        # Positions sorted by (time, position), with the aligned times;
+        # while every record arrived in time order this is the identity
+        self._time_ordered = True
+        self._time_order = array("q")
+        self._time_keys = array("d")
+        # Positions sorted by (amount, position), with the aligned amounts
+        self._amount_order: Optional[array] = None
+        self._amount_keys: Optional[array] = None
+        self._lock = threading.Lock()
+
+    def add(self, record: Transaction, cents: int, payment_method: Optional[str] = None):
+        """
+        Add a completed transaction
+
+        Args:
+            record: Transaction object (its transaction_time is indexed)
+            cents: Amount in cents
+            payment_method: Payment method (None for returns)
+        """
+        timestamp = record.transaction_time.timestamp()
+        method = payment_method or ""
+        with self._lock:
+            position = len(self.records)
+            code = self._method_codes.get(method)
+            if code is None:
+                code = self._method_codes[method] = len(self._postings)
+                self._postings.append(array("q"))
+            self.records.append(record)
+            self._times.append(timestamp)
+            self._cents.append(cents)
+            self._methods.append(code)
+            self._postings[code].append(position)
+            time_keys = self._time_keys
+            if not time_keys or timestamp >= time_keys[-1]:
+                time_keys.append(timestamp)
+                self._time_order.append(position)
+            else:
+                # Sales are stamped when created, so completions arrive
+                # slightly out of order; insert in place (O(n) memmove)
+                self._time_ordered = False
+                index = bisect_right(time_keys, timestamp)
+                time_keys.insert(index, timestamp)
+                self._time_order.insert(index, position)
+            if self._amount_order is not None:
+                index = bisect_right(self._amount_keys, cents)
+                self._amount_keys.insert(index, cents)
+                self._amount_order.insert(index, position)
+
+    def add_many(self, records: List[Transaction], cents: List[int],
+                 payment_methods: List[Optional[str]]):
+        """
+        Add several completed transactions under one lock
+
+        Args:
+            records: Transaction objects
+            cents: Amount in cents of each record
+            payment_methods: Payment method of each record
+        """
+        with self._lock:
+            times, postings, method_codes = self._times, self._postings, self._method_codes
+            first = position = len(self.records)
+            in_order = True
+            last_time = self._time_keys[-1] if self._time_keys else float("-inf")
+            for record, amount, method in zip(records, cents, payment_methods):
+                timestamp = record.transaction_time.timestamp()
+                if timestamp < last_time:
+                    in_order = False
+                last_time = timestamp
+                method = method or ""
+                code = method_codes.get(method)
+                if code is None:
+                    code = method_codes[method] = len(postings)
+                    postings.append(array("q"))
+                times.append(timestamp)
+                self._methods.append(code)
+                postings[code].append(position)
+                position += 1
+            self.records.extend(records)
+            self._cents.extend(cents)
+            if in_order:
+                self._time_keys.extend(times[first:])
+                self._time_order.extend(range(first, position))
+            else:
+                # Re-sort once rather than many single inserts (sorted is
+                # stable, so equal times stay in position order)
+                self._time_ordered = False
+                order = sorted(range(len(times)), key=times.__getitem__)
+                self._time_order = array("q", order)
+                self._time_keys = array("d", map(times.__getitem__, order))
+            if self._amount_order is not None:
+                # Rebuilt on next use; cheaper than many single inserts
+                self._amount_order = self._amount_keys = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def payment_methods(self) -> List[str]:
+        """
+        Get payment methods seen so far
+
+        Returns:
+            list: Payment methods in name order
+        """
+        return sorted(method for method in self._method_codes if method)
+
+    def amount_order_ready(self) -> bool:
+        """
+        Check whether the amount order is built (queries by amount are then fast)
+
+        Returns:
+            bool: Whether the amount order exists
+        """
+        return self._amount_order is not None
+
+    def prepare_amount_order(self):
+        """
+        Build the amount order (O(n log n); can run on a background thread)
+
+        The sort runs on a copy of the amounts without holding the lock, so
+        transactions keep being added meanwhile; those are merged in after.
+        """
+        if self._amount_order is not None:
+            return
+        with self._lock:
+            cents = array("q", self._cents)
+        order = sorted(range(len(cents)), key=cents.__getitem__)
+        order = array("q", order)
+        keys = array("q", map(cents.__getitem__, order))
+        with self._lock:
+            if self._amount_order is not None:
+                return
+            current = self._cents
+            for position in range(len(cents), len(current)):
+                index = bisect_right(keys, current[position])
+                keys.insert(index, current[position])
+                order.insert(index, position)
+            self._amount_order, self._amount_keys = order, keys
+
+    def query(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+              payment_method: Optional[str] = None, min_amount: Optional[Money] = None,
+              max_amount: Optional[Money] = None, sort_by: str = SORT_BY_TIME,
+              descending: bool = True) -> Sequence[int]:
+        """
+        Get positions of matching records in display order
+
+        Args:
+            start: Earliest transaction time (inclusive)
+            end: Latest transaction time (inclusive)
+            payment_method: Only this payment method
+            min_amount: Smallest amount (inclusive)
+            max_amount: Largest amount (inclusive)
+            sort_by: SORT_BY_TIME, SORT_BY_AMOUNT or SORT_BY_PAYMENT
+            descending: Largest (newest) first
+
+        Returns:
+            Sequence: Record positions (index into records)
+        """
+        if sort_by not in (SORT_BY_TIME, SORT_BY_AMOUNT, SORT_BY_PAYMENT):
+            raise ValueError(f"Unknown sort key: {sort_by}")
+        low_cents = None if min_amount is None else Money.of(min_amount).cents
+        high_cents = None if max_amount is None else Money.of(max_amount).cents
+        low_time = None if start is None else start.timestamp()
+        high_time = None if end is None else end.timestamp()
+        if sort_by == SORT_BY_AMOUNT:
+            self.prepare_amount_order()
+        with self._lock:
+            if sort_by == SORT_BY_AMOUNT:
+                positions = self._by_amount(low_cents, high_cents)
+                positions = self._filter(positions, low_time, high_time, payment_method)
+            elif sort_by == SORT_BY_PAYMENT:
+                groups = [self._by_time(low_time, high_time, method)
+                          for method in sorted(self._method_codes)]
+                positions = array("q")
+                for group in groups:
+                    positions.extend(group)
+                positions = self._filter(positions, None, None, None, low_cents, high_cents)
+            else:
+                positions = self._by_time(low_time, high_time, payment_method)
+                positions = self._filter(positions, None, None, None, low_cents, high_cents)
+        return positions[::-1] if descending else positions
+
+    def _by_time(self, low_time, high_time, payment_method) -> Sequence[int]:
+        """Positions within a time range in time order, optionally for one method"""
+        if payment_method is not None:
+            code = self._method_codes.get(payment_method)
+            if code is None:
+                return range(0)
+        keys = self._time_keys
+        low = 0 if low_time is None else bisect_left(keys, low_time)
+        high = len(keys) if high_time is None else bisect_right(keys, high_time)
+        if self._time_ordered:
+            if payment_method is None:
+                return range(low, high)
+            # Postings are ascending positions, so the time range is a slice of them
+            postings = self._postings[code]
+            return postings[bisect_left(postings, low):bisect_left(postings, high)]
+        positions = self._time_order[low:high]
+        if payment_method is not None:
+            positions = self._filter(positions, payment_method=payment_method)
+        return positions
+
+    def _by_amount(self, low_cents, high_cents) -> Sequence[int]:
+        """Positions within an amount range in amount order (order already built)"""
+        keys = self._amount_keys
+        low = 0 if low_cents is None else bisect_left(keys, low_cents)
+        high = len(keys) if high_cents is None else bisect_right(keys, high_cents)
+        return self._amount_order[low:high]
+
+    def _filter(self, positions, low_time=None, high_time=None, payment_method=None,
+                low_cents=None, high_cents=None) -> Sequence[int]:
+        """Apply the remaining conditions to the columns of the candidate positions"""
+        if low_time is None and high_time is None and payment_method is None \
+                and low_cents is None and high_cents is None:
+            return positions
+        code = self._method_codes.get(payment_method, -1)
+        low_time = float("-inf") if low_time is None else low_time
+        high_time = float("inf") if high_time is None else high_time
+        low_cents = -2 ** 63 if low_cents is None else low_cents
+        high_cents = 2 ** 63 - 1 if high_cents is None else high_cents
+        if np is not None:
+            return self._filter_columns(positions, low_time, high_time,
+                                        None if payment_method is None else code,
+                                        low_cents, high_cents)
+        times, cents, methods = self._times, self._cents, self._methods
+        return [position for position in positions
+                if low_time <= times[position] <= high_time
+                and low_cents <= cents[position] <= high_cents
+                and (payment_method is None or methods[position] == code)]
+
+    def _filter_columns(self, positions, low_time, high_time, code,
+                        low_cents, high_cents) -> array:
+        """Vectorized _filter (called under the lock, so the columns cannot grow)"""
+        if isinstance(positions, range):
+            selected = np.arange(positions.start, positions.stop, positions.step, dtype=np.int64)
+        else:
+            selected = np.frombuffer(array("q", positions), dtype=np.int64)
+        mask = np.ones(len(selected), dtype=bool)
+        if low_time != float("-inf") or high_time != float("inf"):
+            times = np.frombuffer(self._times, dtype=np.float64)[selected]
+            mask &= (times >= low_time) & (times <= high_time)
+        if low_cents != -2 ** 63 or high_cents != 2 ** 63 - 1:
+            cents = np.frombuffer(self._cents, dtype=np.int64)[selected]
+            mask &= (cents >= low_cents) & (cents <= high_cents)
+        if code is not None:
+            mask &= np.frombuffer(self._methods, dtype=np.uint16)[selected] == code
+        # Copied out, so no view of a column outlives the lock
+        result = array("q")
+        result.frombytes(selected[mask].tobytes())
+        return result
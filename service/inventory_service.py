@@ -2,17 +2,107 @@
 Inventory Management Service
 """
 
-from typing import Dict, Optional
+import os
+import threading
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 from domain.product import Product
+from persistence.product_store import ProductStore, DictProductStore
+from persistence.product_import import read_rows
+from service.barcode_index import BarcodeIndex
+from service.events import EventBus, LowStock, StockChanged
+from service.metrics import metrics
+from service.product_search import DEFAULT_LIMIT, ProductSearchIndex
+from service.reorder_index import DEFAULT_REPORT_SIZE, ReorderIndex, ReorderLine
+from service.reservations import DEFAULT_HOLD_SECONDS, ReservationBook
+
+
+# Instrumented operations (see service/metrics.py)
+_GET_PRODUCT = metrics.operation("InventoryService.get_product")
+_UPDATE_STOCK = metrics.operation("InventoryService.update_stock")
+
+# Available stock below which LowStock is published and a product needs
+# reordering (unless set per product)
+DEFAULT_LOW_STOCK_THRESHOLD = 10
+
+
+class BulkResult:
+    """Result of a bulk import or restock"""
+    
+    def __init__(self):
+        """Initialize result"""
+        self.succeeded = 0
+        # (row number starting at 1, error message)
+        self.errors: List[Tuple[int, str]] = []
+    
+    def add_error(self, row_number: int, message: str):
+        """
+        Record a rejected row
+        
+        Args:
+            row_number: Row number (1-based, header excluded)
+            message: Error message
+        """
+        self.errors.append((row_number, message))
+    
+    def __repr__(self):
+        return f"BulkResult(succeeded={self.succeeded}, errors={len(self.errors)})"
 
 
 class InventoryService:
     """Inventory management service class"""
     
-    def __init__(self):
-        """Initialize inventory service"""
-        self.products: Dict[str, Product] = {}
-        self._initialize_sample_products()
+    def __init__(self, concurrent: bool = False, lock_stripes: int = 64,
+                 store: Optional[ProductStore] = None,
+                 hold_seconds: float = DEFAULT_HOLD_SECONDS,
+                 events: Optional[EventBus] = None,
+                 low_stock_threshold: int = DEFAULT_LOW_STOCK_THRESHOLD):
+        """
+        Initialize inventory service
+        
+        Args:
+            concurrent: Guard stock changes with striped per-product locks,
+                        for terminals sharing one service from several threads
+            lock_stripes: Number of lock stripes in concurrent mode
+                          (1 means a single global lock)
+            store: Product storage backend; defaults to an in-memory store
+                   filled with sample products
+            hold_seconds: Idle time after which the stock held by an open
+                          sale is released
+            events: Event bus shared by the services (a new one if omitted)
+            low_stock_threshold: Default low-stock threshold (reorder point)
+                                 of every product
+        """
+        if store is None:
+            self.store: ProductStore = DictProductStore()
+            self._initialize_sample_products()
+        else:
+            self.store = store
+        # Read-only mapping of product_id to Product
+        self.products: ProductStore = self.store
+        self.concurrent = concurrent
+        if concurrent:
+            self._stripes = [threading.Lock() for _ in range(lock_stripes)]
+        else:
+            self._stripes = [nullcontext()]
+        # Scanned barcodes -> (product_id, pack multiplier)
+        self.barcodes = BarcodeIndex()
+        # Search index over names and IDs, built on first search
+        self._search_index: Optional[ProductSearchIndex] = None
+        self._search_index_lock = threading.Lock()
+        # Stock held by open sales (Product.stock is the available stock)
+        self.reservations = ReservationBook(self, hold_seconds)
+        # Stock, sale and return events (see service/events.py)
+        self.events = events if events is not None else EventBus()
+        self.low_stock_threshold = low_stock_threshold
+        self._low_stock_thresholds: Dict[str, int] = {}
+        # Products below their threshold since LowStock was last published
+        self._low_stock: Set[str] = set()
+        # Units sold per day, for days of cover in the reorder report
+        self._daily_demand: Dict[str, float] = {}
+        # Products by reorder urgency, built on first report
+        self._reorder_index: Optional[ReorderIndex] = None
+        self._reorder_index_lock = threading.Lock()
     
     def _initialize_sample_products(self):
         """Initialize sample products"""
@@ -23,8 +113,7 @@ class InventoryService:
             Product("P004", "Bread", 8.50, 60),
             Product("P005", "Egg", 15.00, 40),
         ]
-        for product in sample_products:
-            self.products[product.product_id] = product
+        self.store.add_many(sample_products)
     
     def get_product(self, product_id: str) -> Optional[Product]:
         """
@@ -36,8 +125,91 @@ class InventoryService:
         Returns:
             Product: Product object, or None if not found
         """
-        return self.products.get(product_id)
+        if not _GET_PRODUCT.enabled:
+            return self.store.get(product_id)
+        start = _GET_PRODUCT.begin()
+        product = None
+        try:
+            product = self.store.get(product_id)
+            return product
+        finally:
+            _GET_PRODUCT.end(start, product is not None)
+    
+    def scan(self, code: str) -> Optional[Tuple[Product, int]]:
+        """
+        Resolve a scanned barcode, or a typed product ID
+        
+        Args:
+            code: Barcode or product ID
+            
+        Returns:
+            tuple: (product, units per scan), or None if the code is unknown
+        """
+        resolved = self.barcodes.resolve(code)
+        if resolved is None:
+            product = self.get_product(code.strip())
+            return (product, 1) if product else None
+        product_id, multiplier = resolved
+        product = self.get_product(product_id)
+        return (product, multiplier) if product else None
+    
+    def import_barcodes(self, rows: Union[str, os.PathLike, Iterable]) -> BulkResult:
+        """
+        Load barcode aliases (several barcodes and pack sizes per product)
+        
+        Args:
+            rows: CSV/JSONL file path, or an iterable of dicts with barcode,
+                  product_id and an optional multiplier (default 1)
+            
+        Returns:
+            BulkResult: Number of loaded barcodes and per-row errors
+        """
+        if isinstance(rows, (str, os.PathLike)):
+            rows = read_rows(rows)
+        result = BulkResult()
+        for row_number, row in enumerate(rows, 1):
+            try:
+                _row_error(row)
+                product_id = str(row["product_id"]).strip()
+                multiplier = row.get("multiplier")
+                multiplier = _parse_int(multiplier) if multiplier not in (None, "") else 1
+                if product_id not in self.store:
+                    raise ValueError(f"Unknown product: {product_id}")
+                self.barcodes.add(str(row["barcode"]), product_id, multiplier)
+            except (KeyError, ValueError, TypeError) as error:
+                result.add_error(row_number, _error_message(error))
+                continue
+            result.succeeded += 1
+        return result
     
+    def lookup_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get barcode table and product cache counters (for diagnostics)
+        
+        Returns:
+            dict: {"barcodes": BarcodeIndex.stats(), "product_cache": store cache stats}
+        """
+        return {"barcodes": self.barcodes.stats(), "product_cache": self.store.cache_stats()}
+
+    def get_stock_levels(self, product_id: str) -> Optional[Tuple[int, int]]:
+        """
+        Get on-hand and available stock of a product
+
+        Available stock excludes units held by open sales; on-hand stock
+        includes them (they are still on the shelf until checkout).
+
+        Args:
+            product_id: Product ID
+
+        Returns:
+            tuple: (on_hand, available), or None if the product is unknown
+        """
+        product = self.store.get(product_id)
+        if product is None:
+            return None
+        available = product.stock
+        return available + self.reservations.held_quantity(product_id), available
+
     def get_all_products(self) -> list[Product]:
         """
         Get all products
@@ -45,7 +217,7 @@ class InventoryService:
         Returns:
             list: List of all products
         """
-        return list(self.products.values())
+        return self.store.all()
     
     def add_product(self, product: Product):
         """
@@ -54,7 +226,49 @@ class InventoryService:
         Args:
             product: Product object
         """
-        self.products[product.product_id] = product
+        self.store.add(product)
+        with self._search_index_lock:
+            if self._search_index is not None:
+                self._search_index.add(product)
+        self._index_for_reorder([product])
+    
+    def search_index(self) -> ProductSearchIndex:
+        """
+        Get the product search index, building it over the catalog on first use
+        (the GUI warms it on a background thread at startup)
+        
+        Returns:
+            ProductSearchIndex: Index kept up to date by add_product and import_products
+        """
+        if self._search_index is None:
+            with self._search_index_lock:
+                if self._search_index is None:
+                    self._search_index = ProductSearchIndex(self.store.all())
+        return self._search_index
+    
+    def search_index_ready(self) -> bool:
+        """
+        Check whether the search index is built (search_products then never
+        waits for the build)
+        
+        Returns:
+            bool: Whether the index exists
+        """
+        return self._search_index is not None
+    
+    def search_products(self, query: str, limit: int = DEFAULT_LIMIT) -> List[Product]:
+        """
+        Find products by ID or name prefix, or by similar name (search-as-you-type)
+        
+        Args:
+            query: Typed text (case-insensitive); empty lists the first products by ID
+            limit: Maximum number of results
+            
+        Returns:
+            list: Matching products, best match first
+        """
+        product_ids = self.search_index().search(query, limit)
+        return [product for product in map(self.store.get, product_ids) if product]
     
     def update_stock(self, product_id: str, quantity: int) -> bool:
         """
@@ -67,14 +281,26 @@ class InventoryService:
         Returns:
             bool: Whether update was successful
         """
-        product = self.get_product(product_id)
-        if product:
-            if quantity > 0:
-                return product.reduce_stock(quantity)
-            else:
-                product.increase_stock(-quantity)
-                return True
-        return False
+        start = _UPDATE_STOCK.begin() if _UPDATE_STOCK.enabled else None
+        ok = False
+        try:
+            product = self.store.get(product_id)
+            if product is not None:
+                with self._lock_for(product_id):
+                    if quantity > 0:
+                        changed = product.reduce_stock(quantity)
+                    else:
+                        product.increase_stock(-quantity)
+                        changed = True
+                if changed:
+                    self.store.save_stock([(product, -quantity)])
+                    if self.events.subscribed or self._reorder_index is not None:
+                        self._stock_changed([product])
+                    ok = True
+            return ok
+        finally:
+            if start is not None:
+                _UPDATE_STOCK.end(start, ok)
     
     def restore_stock(self, product_id: str, quantity: int):
         """
@@ -84,6 +310,520 @@ class InventoryService:
             product_id: Product ID
             quantity: Quantity to restore
         """
-        product = self.get_product(product_id)
-        if product:
-            product.increase_stock(quantity)
+        self.restore_many([(product_id, quantity)])
+    
+    def restore_many(self, items: List[Tuple[str, int]],
+                     publish: bool = True) -> List[Product]:
+        """
+        Restore stock of several products, persisted in one batch
+        
+        Args:
+            items: List of (product_id, quantity)
+            publish: Publish the stock events now; callers holding a lock
+                     pass False and call publish_stock_changes() after
+                     releasing it
+            
+        Returns:
+            list: Products whose stock changed
+        """
+        return self._increase_stock(items, True, publish)
+    
+    def release_held(self, items: List[Tuple[str, int]],
+                     publish: bool = True) -> List[Product]:
+        """
+        Return units held by open sales to available stock
+        
+        Nothing is persisted: held units never left on-hand stock, which
+        is what the store keeps.
+        
+        Args:
+            items: List of (product_id, quantity)
+            publish: Publish the stock events now (see restore_many)
+            
+        Returns:
+            list: Products whose stock changed
+        """
+        return self._increase_stock(items, False, publish)
+    
+    def publish_stock_changes(self, products: List[Product]):
+        """
+        Update the reorder index and publish stock events for changed
+        products (after restore_many/release_held with publish=False)
+        
+        Event handlers run here, so this must not be called while holding
+        a lock a handler could need.
+        
+        Args:
+            products: Products whose stock changed
+        """
+        if self.events.subscribed or self._reorder_index is not None:
+            self._stock_changed(products)
+    
+    def save_sold(self, items: Iterable[Tuple[str, int]]):
+        """
+        Persist the units of a completed sale in one batch
+        
+        The units already left available stock when they were reserved;
+        this takes them off the on-hand stock kept by the store.
+        
+        Args:
+            items: (product_id, quantity) of each sale line
+        """
+        quantities: Dict[str, int] = {}
+        for product_id, quantity in items:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        changes = []
+        for product_id, quantity in quantities.items():
+            product = self.store.get(product_id)
+            if product:
+                changes.append((product, -quantity))
+        self.store.save_stock(changes)
+    
+    def try_reserve(self, product_id: str, quantity: int) -> bool:
+        """
+        Atomically check and decrease stock of one product
+        (in memory; persisted by save_sold at checkout)
+        
+        Args:
+            product_id: Product ID
+            quantity: Quantity to reserve
+            
+        Returns:
+            bool: Whether the product exists and had enough stock
+        """
+        return self.reserve_product(product_id, quantity) is not None
+    
+    def reserve_product(self, product_id: str, quantity: int) -> Optional[Product]:
+        """
+        Like try_reserve, but return the reserved product
+        (saves a second lookup when adding it to a sale)
+        
+        Args:
+            product_id: Product ID
+            quantity: Quantity to reserve
+            
+        Returns:
+            Product: Reserved product, or None if unknown, out of stock or
+                     the quantity is not positive
+        """
+        if quantity <= 0:
+            return None
+        product = self.store.get(product_id)
+        if not product:
+            return None
+        with self._lock_for(product_id):
+            if not product.reduce_stock(quantity):
+                return None
+        if self.events.subscribed or self._reorder_index is not None:
+            self._stock_changed([product])
+        return product
+    
+    def reserve_many(self, items: List[Tuple[str, int]]) -> bool:
+        """
+        Atomically decrease stock of several products (all or nothing;
+        in memory, persisted by save_sold at checkout)
+        
+        Locks are taken in ascending stripe order, so concurrent callers
+        with overlapping items cannot deadlock.
+        
+        Args:
+            items: List of (product_id, quantity)
+            
+        Returns:
+            bool: Whether every product exists and had enough stock (False
+                  if any quantity is not positive)
+        """
+        quantities: Dict[str, int] = {}
+        for product_id, quantity in items:
+            if quantity <= 0:
+                return False
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        
+        products = []
+        for product_id, quantity in quantities.items():
+            product = self.store.get(product_id)
+            if not product:
+                return False
+            products.append((product, quantity))
+        
+        locks = [self._stripes[index] for index in
+                 sorted({self._stripe_index(product_id) for product_id in quantities})]
+        for lock in locks:
+            lock.__enter__()
+        try:
+            if any(product.stock < quantity for product, quantity in products):
+                return False
+            for product, quantity in products:
+                product.reduce_stock(quantity)
+        finally:
+            for lock in reversed(locks):
+                lock.__exit__(None, None, None)
+        if self.events.subscribed or self._reorder_index is not None:
+            self._stock_changed([product for product, _ in products])
+        return True
+    
+    def reserve_batch(self, orders: List[Dict[str, int]]) -> List[bool]:
+        """
+        Decrease stock for many orders in one pass, each order all or nothing
+        
+        Orders are checked in sequence against the stock left by the orders
+        before them; the net decrement per product is then applied once,
+        under the locks of every involved product, and persisted in one batch.
+        
+        Args:
+            orders: Quantities per product_id of each order
+            
+        Returns:
+            list: Whether each order was reserved (False if a product is
+                  unknown, a quantity is not positive or stock ran out)
+        """
+        products = {}
+        for product_id in {product_id for order in orders for product_id in order}:
+            product = self.store.get(product_id)
+            if product:
+                products[product_id] = product
+        
+        locks = [self._stripes[index] for index in
+                 sorted({self._stripe_index(product_id) for product_id in products})]
+        for lock in locks:
+            lock.__enter__()
+        try:
+            available = {product_id: product.stock for product_id, product in products.items()}
+            accepted = []
+            for order in orders:
+                try:
+                    ok = all(0 < quantity <= available[product_id]
+                             for product_id, quantity in order.items())
+                except KeyError:
+                    ok = False
+                if ok:
+                    for product_id, quantity in order.items():
+                        available[product_id] -= quantity
+                accepted.append(ok)
+            changes = [(product, available[product_id] - product.stock)
+                       for product_id, product in products.items()
+                       if product.stock != available[product_id]]
+            for product, delta in changes:
+                product.stock += delta
+        finally:
+            for lock in reversed(locks):
+                lock.__exit__(None, None, None)
+        self.store.save_stock(changes)
+        if self.events.subscribed or self._reorder_index is not None:
+            self._stock_changed([product for product, _ in changes])
+        return accepted
+    
+    def import_products(self, source: Union[str, os.PathLike, Iterable],
+                        chunk_size: int = 10000) -> BulkResult:
+        """
+        Stream products into the catalog in chunks with bounded memory
+        
+        Args:
+            source: CSV/JSONL file path, or an iterable of row dicts
+                    (product_id, name, price, stock) or Product objects
+            chunk_size: Number of products written to the store per batch
+            
+        Returns:
+            BulkResult: Imported count and per-row errors (bad rows are skipped)
+        """
+        rows = read_rows(source) if isinstance(source, (str, os.PathLike)) else source
+        result = BulkResult()
+        chunk: List[Product] = []
+        for row_number, row in enumerate(rows, 1):
+            try:
+                product = row if isinstance(row, Product) else _row_to_product(row)
+            except (KeyError, ValueError, TypeError) as error:
+                result.add_error(row_number, _error_message(error))
+                continue
+            chunk.append(product)
+            if len(chunk) >= chunk_size:
+                self._add_chunk(chunk)
+                result.succeeded += len(chunk)
+                chunk = []
+        if chunk:
+            self._add_chunk(chunk)
+            result.succeeded += len(chunk)
+        return result
+    
+    def _add_chunk(self, products: List[Product]):
+        """Add imported products to the store and the search index"""
+        self.store.add_many(products)
+        with self._search_index_lock:
+            if self._search_index is not None:
+                self._search_index.add_many(products)
+        self._index_for_reorder(products)
+    
+    def bulk_restock(self, rows: Union[str, os.PathLike, Iterable]) -> BulkResult:
+        """
+        Validate and apply a whole delivery in one pass
+        
+        Every row is validated first; valid rows are then applied per
+        product under the stock locks and persisted in one batch. Invalid
+        rows are reported without aborting the rest of the delivery.
+        
+        Args:
+            rows: CSV/JSONL file path, or an iterable of (product_id, quantity)
+                  tuples or dicts with product_id and quantity
+            
+        Returns:
+            BulkResult: Number of applied rows and per-row errors
+        """
+        if isinstance(rows, (str, os.PathLike)):
+            rows = read_rows(rows)
+        result = BulkResult()
+        quantities: Dict[str, int] = {}
+        for row_number, row in enumerate(rows, 1):
+            try:
+                if isinstance(row, dict):
+                    _row_error(row)
+                    product_id, quantity = row["product_id"], row["quantity"]
+                else:
+                    product_id, quantity = row
+                product_id = str(product_id).strip()
+                quantity = _parse_int(quantity)
+            except (KeyError, ValueError, TypeError) as error:
+                result.add_error(row_number, _error_message(error))
+                continue
+            if quantity <= 0:
+                result.add_error(row_number, f"Quantity must be greater than 0: {quantity}")
+            elif self.store.get(product_id) is None:
+                result.add_error(row_number, f"Unknown product: {product_id}")
+            else:
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+                result.succeeded += 1
+        
+        self.restore_many(list(quantities.items()))
+        return result
+    
+    def set_low_stock_threshold(self, product_id: str, threshold: Optional[int]):
+        """
+        Set the low-stock threshold (reorder point) of one product
+        
+        Args:
+            product_id: Product ID
+            threshold: LowStock is published, and the product needs
+                       reordering, when available stock falls below this
+                       (None restores the default)
+        """
+        if threshold is None:
+            self._low_stock_thresholds.pop(product_id, None)
+        else:
+            self._low_stock_thresholds[product_id] = threshold
+        if self._reorder_index is not None:
+            self._reorder_index.set_reorder_point(product_id,
+                                                  self.get_low_stock_threshold(product_id))
+    
+    def get_low_stock_threshold(self, product_id: str) -> int:
+        """
+        Get the low-stock threshold of one product
+        
+        Args:
+            product_id: Product ID
+            
+        Returns:
+            int: Threshold (the default unless set for the product)
+        """
+        return self._low_stock_thresholds.get(product_id, self.low_stock_threshold)
+    
+    def set_daily_demand(self, product_id: str, units: Optional[float]):
+        """
+        Set the units of one product sold per day (for days of cover)
+        
+        Args:
+            product_id: Product ID
+            units: Units per day (None if unknown)
+        """
+        if units:
+            self._daily_demand[product_id] = units
+        else:
+            self._daily_demand.pop(product_id, None)
+        if self._reorder_index is not None:
+            self._reorder_index.set_daily_demand(product_id, units or 0)
+    
+    def load_daily_demand(self, demand: Dict[str, float]):
+        """
+        Replace the daily demand of every product
+        (e.g. with SaleService.estimate_daily_demand())
+        
+        Args:
+            demand: Units per day by product ID (products missing are unknown)
+        """
+        for product_id in set(self._daily_demand) - set(demand):
+            self.set_daily_demand(product_id, None)
+        for product_id, units in demand.items():
+            if self._daily_demand.get(product_id) != units:
+                self.set_daily_demand(product_id, units)
+    
+    def get_daily_demand(self, product_id: str) -> float:
+        """
+        Get the units of one product sold per day
+        
+        Args:
+            product_id: Product ID
+            
+        Returns:
+            float: Units per day (0 if unknown)
+        """
+        return self._daily_demand.get(product_id, 0)
+    
+    def reorder_index(self) -> ReorderIndex:
+        """
+        Get the reorder priority index, building it over the catalog on first use
+        (the GUI builds it on a background thread when the report is opened)
+        
+        Returns:
+            ReorderIndex: Index kept up to date by every stock change
+        """
+        if self._reorder_index is None:
+            with self._reorder_index_lock:
+                if self._reorder_index is None:
+                    self._reorder_index = ReorderIndex(
+                        (product.product_id, product.stock,
+                         self.get_low_stock_threshold(product.product_id),
+                         self.get_daily_demand(product.product_id))
+                        for product in self.store.all())
+        return self._reorder_index
+    
+    def reorder_index_ready(self) -> bool:
+        """
+        Check whether the reorder index is built (reorder_report then never
+        waits for the build)
+        
+        Returns:
+            bool: Whether the index exists
+        """
+        return self._reorder_index is not None
+    
+    def reorder_report(self, limit: int = DEFAULT_REPORT_SIZE,
+                       below_only: bool = False) -> List[ReorderLine]:
+        """
+        List the products that most urgently need reordering
+        
+        Products below their reorder point come first, then fewest days
+        of cover, then lowest stock relative to the reorder point.
+        
+        Args:
+            limit: Maximum number of products
+            below_only: Only products below their reorder point
+            
+        Returns:
+            list: Report lines (available stock), most urgent first
+        """
+        return self.reorder_index().top(limit, below_only)
+    
+    def _index_for_reorder(self, products: List[Product]):
+        """Add new or replaced products to the reorder index, if built"""
+        index = self._reorder_index
+        if index is not None:
+            for product in products:
+                product_id = product.product_id
+                index.update(product_id, product.stock, self.get_low_stock_threshold(product_id),
+                             self.get_daily_demand(product_id))
+    
+    def _stock_changed(self, products: List[Product]):
+        """
+        Move changed products in the reorder index; publish StockChanged,
+        and LowStock once per drop below the threshold
+        """
+        if self._reorder_index is not None:
+            self._reorder_index.update_stock(products)
+        events = self.events
+        if not events.subscribed:
+            return
+        publish_changes = events.wants(StockChanged)
+        thresholds = self._low_stock_thresholds
+        low_stock = self._low_stock
+        for product in products:
+            product_id = product.product_id
+            stock = product.stock
+            if publish_changes:
+                events.publish(StockChanged(product_id, stock))
+            threshold = thresholds.get(product_id, self.low_stock_threshold)
+            if stock < threshold:
+                if product_id not in low_stock:
+                    low_stock.add(product_id)
+                    events.publish(LowStock(product_id, stock, threshold))
+            elif product_id in low_stock:
+                low_stock.discard(product_id)
+    
+    def _increase_stock(self, items: List[Tuple[str, int]], persist: bool,
+                        publish: bool) -> List[Product]:
+        """Add units to the available stock of products (and to on-hand stock if persist)"""
+        changes = []
+        for product_id, quantity in items:
+            product = self.store.get(product_id)
+            if product:
+                with self._lock_for(product_id):
+                    product.increase_stock(quantity)
+                changes.append((product, quantity))
+        if persist:
+            self.store.save_stock(changes)
+        products = [product for product, _ in changes]
+        if publish:
+            self.publish_stock_changes(products)
+        return products
+    
+    def _stripe_index(self, product_id: str) -> int:
+        """Get the lock stripe index of a product"""
+        return hash(product_id) % len(self._stripes)
+    
+    def _lock_for(self, product_id: str):
+        """Get the lock guarding a product's stock"""
+        return self._stripes[self._stripe_index(product_id)]
+
+
+def _row_error(row: dict):
+    """Raise the error carried by a row that could not be parsed"""
+    if "__error__" in row:
+        raise ValueError(row["__error__"])
+
+
+def _parse_int(value) -> int:
+    """Parse an integer field, rejecting fractional values"""
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid integer: {value!r}")
+    if type(value) is str:
+        return int(value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return int(str(value).strip())
+
+
+def _field_text(value) -> str:
+    """Text of an import field ("" for a missing (null) value)"""
+    return "" if value is None else str(value).strip()
+
+
+def _row_to_product(row: dict) -> Product:
+    """
+    Validate an import row and build a Product
+    
+    Raises:
+        KeyError: A required field is missing
+        ValueError: A field is invalid
+    """
+    if "__error__" in row:
+        raise ValueError(row["__error__"])
+    # JSONL rows may hold numbers (or null) where CSV rows hold strings
+    product_id = _field_text(row["product_id"])
+    name = _field_text(row["name"])
+    if not product_id:
+        raise ValueError("Empty product_id")
+    if not name:
+        raise ValueError("Empty name")
+    stock = row.get("stock")
+    product = Product(product_id, name, row["price"], _parse_int(stock) if stock else 0)
+    if product.price.cents < 0:
+        raise ValueError(f"Negative price: {product.price}")
+    if product.stock < 0:
+        raise ValueError(f"Negative stock: {product.stock}")
+    return product
+
+
+def _error_message(error: Exception) -> str:
+    """Format a row validation error"""
+    if isinstance(error, KeyError):
+        return f"Missing field: {error.args[0]}"
+    return str(error)
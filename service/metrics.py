@@ -0,0 +1,323 @@
+"""
+Operation Metrics
+Call counts, failure counts and HDR-style latency histograms for service
+operations, with a snapshot API and a periodic JSON dump
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from time import perf_counter_ns
+from typing import Dict, List, Optional
+
+
+# Latencies are timed for one call in this many (a power of two); calls
+# and failures are always counted
+DEFAULT_SAMPLE_EVERY = 64
+
+# Histogram precision: values are kept with 5 significant bits (~3% error)
+_SUB_BUCKET_BITS = 5
+_BUCKET_COUNT = (64 - _SUB_BUCKET_BITS + 1) << _SUB_BUCKET_BITS
+
+# Percentiles reported by snapshots
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of nanosecond values (HDR histogram layout)
+
+    Every power of two is split into 2^5 linear sub-buckets, so any
+    recorded value is reported within about 3% using a fixed array of
+    counts, whatever the range of values.
+    """
+
+    def __init__(self):
+        """Initialize histogram"""
+        self.counts: List[int] = [0] * _BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, value: int):
+        """
+        Record a value
+
+        Args:
+            value: Value in nanoseconds
+        """
+        shift = value.bit_length() - _SUB_BUCKET_BITS - 1
+        if shift < 0:
+            shift = 0
+        self.counts[(shift << _SUB_BUCKET_BITS) + (value >> shift)] += 1
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def percentile(self, percent: float) -> int:
+        """
+        Get the value at a percentile
+
+        Args:
+            percent: Percentile (0-100)
+
+        Returns:
+            int: Upper bound of the bucket holding the percentile (0 if empty)
+        """
+        if not self.count:
+            return 0
+        rank = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.max, _bucket_upper_bound(index))
+        return self.max
+
+    def merge(self, other: "LatencyHistogram"):
+        """
+        Add the values of another histogram
+
+        Args:
+            other: Histogram to merge in
+        """
+        if not other.count:
+            return
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.min = other.min if not self.count else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+
+class OperationMetrics:
+    """
+    Metrics of one operation
+
+    Instrumented methods call begin() on entry only while enabled (a
+    disabled probe costs one attribute test), and end() from a finally
+    block, so a call that raises is counted as a failure:
+
+        start = OPERATION.begin() if OPERATION.enabled else None
+        ok = False
+        try:
+            ...
+            ok = True
+        finally:
+            if start is not None:
+                OPERATION.end(start, ok)
+
+    Only sampled calls read the clock. Counts are updated under a lock
+    per operation, since concurrent services call the probes from
+    several threads.
+    """
+
+    def __init__(self, name: str, sample_every: int = DEFAULT_SAMPLE_EVERY):
+        """
+        Initialize operation metrics
+
+        Args:
+            name: Operation name (e.g. "SaleService.complete_sale")
+            sample_every: Time one call in this many (a power of two)
+        """
+        self.name = name
+        self.enabled = False
+        self.sample_mask = _sample_mask(sample_every)
+        self.calls = 0
+        self.failures = 0
+        self.histogram = LatencyHistogram()
+        self._lock = threading.Lock()
+
+    def begin(self) -> int:
+        """
+        Count a call
+
+        Returns:
+            int: Start time in nanoseconds for a sampled call, otherwise 0
+        """
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        if calls & self.sample_mask:
+            return 0
+        return perf_counter_ns()
+
+    def end(self, start: int, ok: bool = True):
+        """
+        Finish a call started with begin()
+
+        Args:
+            start: Value returned by begin()
+            ok: Whether the operation succeeded
+        """
+        if start:
+            elapsed = perf_counter_ns() - start
+            with self._lock:
+                self.histogram.record(elapsed)
+                if not ok:
+                    self.failures += 1
+        elif not ok:
+            with self._lock:
+                self.failures += 1
+
+    def reset(self):
+        """Clear counts and latencies"""
+        with self._lock:
+            self.calls = 0
+            self.failures = 0
+            self.histogram = LatencyHistogram()
+
+    def snapshot(self) -> dict:
+        """
+        Get the current values
+
+        Returns:
+            dict: calls, failures, sampled calls and latencies in microseconds
+        """
+        # Copy under the lock so the fields agree with each other
+        histogram = LatencyHistogram()
+        with self._lock:
+            calls = self.calls
+            failures = self.failures
+            histogram.merge(self.histogram)
+        snapshot = {
+            "calls": calls,
+            "failures": failures,
+            "sampled": histogram.count,
+            "mean_us": round(histogram.total / histogram.count / 1000, 3) if histogram.count else 0,
+            "max_us": round(histogram.max / 1000, 3),
+        }
+        for percent in PERCENTILES:
+            snapshot[f"p{percent:g}_us"] = round(histogram.percentile(percent) / 1000, 3)
+        return snapshot
+
+
+class MetricsRegistry:
+    """Named operation metrics, enabled and disabled together"""
+
+    def __init__(self):
+        """Initialize registry"""
+        self.operations: Dict[str, OperationMetrics] = {}
+        self.enabled = False
+        self.sample_every = DEFAULT_SAMPLE_EVERY
+        self._dump_stop: Optional[threading.Event] = None
+        self._dump_thread: Optional[threading.Thread] = None
+
+    def operation(self, name: str) -> OperationMetrics:
+        """
+        Get or create the metrics of an operation
+
+        Args:
+            name: Operation name
+
+        Returns:
+            OperationMetrics: Metrics object (kept for the registry's lifetime)
+        """
+        operation = self.operations.get(name)
+        if operation is None:
+            operation = self.operations[name] = OperationMetrics(name, self.sample_every)
+            operation.enabled = self.enabled
+        return operation
+
+    def enable(self, sample_every: int = DEFAULT_SAMPLE_EVERY):
+        """
+        Start recording from zero
+
+        Args:
+            sample_every: Time one call in this many (a power of two)
+        """
+        mask = _sample_mask(sample_every)
+        self.sample_every = sample_every
+        for operation in self.operations.values():
+            operation.reset()
+            operation.sample_mask = mask
+            operation.enabled = True
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording (collected values are kept)"""
+        self.enabled = False
+        for operation in self.operations.values():
+            operation.enabled = False
+
+    def reset(self):
+        """Clear all collected values"""
+        for operation in self.operations.values():
+            operation.reset()
+
+    def snapshot(self) -> dict:
+        """
+        Get the current values of every operation
+
+        Returns:
+            dict: {"time", "enabled", "operations": {name: values}}
+        """
+        return {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "enabled": self.enabled,
+            "operations": {name: operation.snapshot()
+                           for name, operation in sorted(self.operations.items())},
+        }
+
+    def dump(self, path: str):
+        """
+        Write a snapshot as JSON (replacing the file atomically)
+
+        Args:
+            path: Output file path
+        """
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as dump_file:
+            json.dump(self.snapshot(), dump_file, indent=2)
+        os.replace(temporary_path, path)
+
+    def start_dump(self, path: str, interval_seconds: float = 60.0):
+        """
+        Dump snapshots periodically on a background thread
+
+        Args:
+            path: Output file path
+            interval_seconds: Interval between dumps
+        """
+        self.stop_dump()
+        stop = self._dump_stop = threading.Event()
+
+        def dump_loop():
+            while not stop.wait(interval_seconds):
+                try:
+                    self.dump(path)
+                except OSError:
+                    pass
+
+        self._dump_thread = threading.Thread(target=dump_loop, name="metrics-dump", daemon=True)
+        self._dump_thread.start()
+
+    def stop_dump(self):
+        """Stop periodic dumps"""
+        if self._dump_thread is not None:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_thread = None
+
+
+def _sample_mask(sample_every: int) -> int:
+    """Mask selecting one call in sample_every (a power of two)"""
+    if sample_every < 1 or sample_every & (sample_every - 1):
+        raise ValueError(f"sample_every must be a power of two: {sample_every}")
+    return sample_every - 1
+
+
+def _bucket_upper_bound(index: int) -> int:
+    """Largest value that falls in a histogram bucket"""
+    shift = max(0, (index >> _SUB_BUCKET_BITS) - 1)
+    mantissa = index - (shift << _SUB_BUCKET_BITS)
+    return ((mantissa + 1) << shift) - 1
+
+
+# Process-wide registry used by the services
+metrics = MetricsRegistry()
@@ -0,0 +1,318 @@
+"""
+Product Search Index
+Prefix and fuzzy (n-gram) search over product names and IDs, for
+search-as-you-type over large catalogs
+"""
+
+import heapq
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List
+
+from domain.product import Product
+
+
+# N-gram length of the fuzzy index
+NGRAM = 3
+
+# Minimum similarity (Dice coefficient of n-gram sets) of a fuzzy word match
+FUZZY_MIN_SIMILARITY = 0.5
+
+# Products collected per query word by fuzzy search (the most similar
+# words are taken first)
+MAX_CANDIDATES = 2_000
+
+DEFAULT_LIMIT = 10
+
+_WORD = re.compile(r"\w+")
+
+
+class _SortedKeys:
+    """Sorted normalized keys with the product ordinal of each key"""
+
+    def __init__(self):
+        """Initialize empty key list"""
+        self.keys: List[str] = []
+        self.ordinals = array("I")
+
+    def build(self, pairs: List[tuple]):
+        """
+        Replace the content
+
+        Args:
+            pairs: (key, ordinal) tuples in any order
+        """
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.ordinals = array("I", [ordinal for _, ordinal in pairs])
+
+    def insert(self, key: str, ordinal: int):
+        """Insert one key"""
+        index = bisect_left(self.keys, key)
+        while (index < len(self.keys) and self.keys[index] == key
+               and self.ordinals[index] < ordinal):
+            index += 1
+        self.keys.insert(index, key)
+        self.ordinals.insert(index, ordinal)
+
+    def remove(self, key: str, ordinal: int):
+        """Remove one key (no-op if absent)"""
+        index = bisect_left(self.keys, key)
+        while index < len(self.keys) and self.keys[index] == key:
+            if self.ordinals[index] == ordinal:
+                del self.keys[index]
+                del self.ordinals[index]
+                return
+            index += 1
+
+    def prefixed(self, prefix: str) -> Iterator[int]:
+        """Yield ordinals of keys starting with prefix, in key order"""
+        keys, ordinals = self.keys, self.ordinals
+        index = bisect_left(keys, prefix)
+        while index < len(keys) and keys[index].startswith(prefix):
+            yield ordinals[index]
+            index += 1
+
+
+class ProductSearchIndex:
+    """
+    In-memory search index over product IDs and names
+
+    Three sorted key lists give prefix matches in O(log n + k): product
+    IDs, whole names, and the later words of names ("milk" finds "Whole
+    Milk"). For typos, the distinct words of all names are indexed by
+    n-gram, and a posting list per word gives the products using it; a
+    catalog has far fewer distinct words than products, so the fuzzy
+    index stays small and cheap to build. Products are numbered by the order they were
+    indexed; the index keeps only normalized strings, not the products.
+    """
+
+    def __init__(self, products: Iterable[Product] = ()):
+        """
+        Initialize index
+
+        Args:
+            products: Products to index
+        """
+        self._product_ids: List[str] = []
+        self._names: List[str] = []
+        self._ordinals: Dict[str, int] = {}
+        self._id_keys = _SortedKeys()
+        self._name_keys = _SortedKeys()
+        self._word_keys = _SortedKeys()
+        # Fuzzy index: products per name word, and n-grams of the words
+        self._word_postings: Dict[str, array] = {}
+        self._vocabulary: List[str] = []
+        self._vocabulary_grams: Dict[str, array] = {}
+        self._lock = threading.Lock()
+        self.add_many(products)
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def add(self, product: Product):
+        """
+        Index a product, replacing its previous name if already indexed
+
+        Args:
+            product: Product object
+        """
+        self.add_many([product])
+
+    def add_many(self, products: Iterable[Product]):
+        """
+        Index several products
+
+        Large batches rebuild the sorted key lists in one sort instead of
+        inserting key by key.
+
+        Args:
+            products: Product objects
+        """
+        products = list(products)
+        with self._lock:
+            if len(products) > max(1_000, len(self._ordinals) // 10):
+                for product in products:
+                    self._add_entry(product.product_id, product.name)
+                self._rebuild_keys()
+                return
+            for product in products:
+                ordinal = self._ordinals.get(product.product_id)
+                if ordinal is not None:
+                    self._remove_keys(ordinal)
+                ordinal = self._add_entry(product.product_id, product.name)
+                self._insert_keys(ordinal)
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> List[str]:
+        """
+        Find products matching what has been typed so far
+
+        Prefix matches come first (product ID, then whole name, then a
+        later word of the name, each in alphabetical order, equal keys in
+        indexing order); fuzzy matches fill the remaining slots.
+
+        Args:
+            query: Search text (case-insensitive); empty lists the first IDs
+            limit: Maximum number of results
+
+        Returns:
+            list: Product IDs, best match first
+        """
+        results = self.prefix_search(query, limit)
+        if len(results) < limit:
+            found = set(results)
+            results.extend(product_id for product_id in self.fuzzy_search(query, limit)
+                           if product_id not in found)
+        return results[:limit]
+
+    def prefix_search(self, query: str, limit: int = DEFAULT_LIMIT) -> List[str]:
+        """
+        Find products whose ID, name or a word of the name starts with query
+
+        Args:
+            query: Search text (case-insensitive)
+            limit: Maximum number of results
+
+        Returns:
+            list: Product IDs
+        """
+        prefix = _normalize(query)
+        results: List[int] = []
+        seen = set()
+        with self._lock:
+            for keys in (self._id_keys, self._name_keys, self._word_keys):
+                for ordinal in keys.prefixed(prefix):
+                    if len(results) >= limit:
+                        break
+                    if ordinal not in seen:
+                        seen.add(ordinal)
+                        results.append(ordinal)
+            return [self._product_ids[ordinal] for ordinal in results]
+
+    def fuzzy_search(self, query: str, limit: int = DEFAULT_LIMIT) -> List[str]:
+        """
+        Find products whose name words resemble the words of query (typo tolerant)
+
+        Each query word is matched against the vocabulary of name words by
+        shared n-grams; a product scores the best similarity found for
+        each query word.
+
+        Args:
+            query: Search text (case-insensitive)
+            limit: Maximum number of results
+
+        Returns:
+            list: Product IDs, most similar first
+        """
+        scores: Dict[int, float] = {}
+        with self._lock:
+            for word in _WORD.findall(_normalize(query)):
+                best: Dict[int, float] = {}
+                for similarity, similar in self._similar_words(word):
+                    for ordinal in self._word_postings[similar]:
+                        if ordinal not in best:
+                            best[ordinal] = similarity
+                    if len(best) >= MAX_CANDIDATES:
+                        break
+                for ordinal, similarity in best.items():
+                    scores[ordinal] = scores.get(ordinal, 0.0) + similarity
+            names = self._names
+            ranked = heapq.nsmallest(limit, scores.items(),
+                                     key=lambda item: (-item[1], names[item[0]]))
+            return [self._product_ids[ordinal] for ordinal, _ in ranked]
+
+    def _similar_words(self, word: str) -> List[tuple]:
+        """Vocabulary words sharing enough n-grams with word, most similar first"""
+        hits: Counter = Counter()
+        for gram in set(_ngrams(word)):
+            hits.update(self._vocabulary_grams.get(gram, ()))
+        vocabulary = self._vocabulary
+        similar = []
+        for index, shared in hits.items():
+            candidate = vocabulary[index]
+            # Dice coefficient of the two n-gram lists
+            similarity = 2 * shared / (len(word) + len(candidate) + 2 * (3 - NGRAM))
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                similar.append((-similarity, candidate))
+        similar.sort()
+        return [(-similarity, candidate) for similarity, candidate in similar]
+
+    def _add_entry(self, product_id: str, name: str) -> int:
+        """Record a product's normalized name and words; returns its ordinal"""
+        name = _normalize(name)
+        ordinal = self._ordinals.get(product_id)
+        if ordinal is None:
+            ordinal = self._ordinals[product_id] = len(self._product_ids)
+            self._product_ids.append(product_id)
+            self._names.append(name)
+        else:
+            for word in set(_WORD.findall(self._names[ordinal])):
+                posting = self._word_postings[word]
+                del posting[posting.index(ordinal)]
+            self._names[ordinal] = name
+        postings = self._word_postings
+        for word in set(_WORD.findall(name)):
+            posting = postings.get(word)
+            if posting is None:
+                posting = postings[word] = array("I")
+                self._add_vocabulary(word)
+            posting.append(ordinal)
+        return ordinal
+
+    def _add_vocabulary(self, word: str):
+        """Add a new name word to the n-gram index of the vocabulary"""
+        index = len(self._vocabulary)
+        self._vocabulary.append(word)
+        for gram in set(_ngrams(word)):
+            posting = self._vocabulary_grams.get(gram)
+            if posting is None:
+                posting = self._vocabulary_grams[gram] = array("I")
+            posting.append(index)
+
+    def _insert_keys(self, ordinal: int):
+        """Insert the keys of one product into the sorted key lists"""
+        name = self._names[ordinal]
+        self._id_keys.insert(_normalize(self._product_ids[ordinal]), ordinal)
+        self._name_keys.insert(name, ordinal)
+        for word in _later_words(name):
+            self._word_keys.insert(word, ordinal)
+
+    def _remove_keys(self, ordinal: int):
+        """Remove the keys of one product from the sorted key lists"""
+        name = self._names[ordinal]
+        self._id_keys.remove(_normalize(self._product_ids[ordinal]), ordinal)
+        self._name_keys.remove(name, ordinal)
+        for word in _later_words(name):
+            self._word_keys.remove(word, ordinal)
+
+    def _rebuild_keys(self):
+        """Rebuild the sorted key lists from all entries"""
+        names = self._names
+        self._id_keys.build([(_normalize(product_id), ordinal)
+                             for ordinal, product_id in enumerate(self._product_ids)])
+        self._name_keys.build([(name, ordinal) for ordinal, name in enumerate(names)])
+        self._word_keys.build([(word, ordinal) for ordinal, name in enumerate(names)
+                               for word in _later_words(name)])
+
+
+def _normalize(text: str) -> str:
+    """Case-folded text with runs of whitespace collapsed"""
+    return " ".join(text.casefold().split())
+
+
+def _later_words(name: str) -> List[str]:
+    """Words of a normalized name after the first (the first is a name prefix)"""
+    words = [sys.intern(word) for word in _WORD.findall(name)]
+    return words[1:] if words and name.startswith(words[0]) else words
+
+
+def _ngrams(text: str) -> List[str]:
+    """N-grams of text padded with a space on each side"""
+    if not text:
+        return []
+    padded = f" {text} "
+    return [padded[index:index + NGRAM] for index in range(len(padded) - NGRAM + 1)]
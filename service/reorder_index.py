@@ -0,0 +1,299 @@
+"""
+Reorder Priority Index
+Keeps every product ordered by how urgently it needs reordering, so the
+most urgent products can be listed without scanning the catalog
+"""
+
+import heapq
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from domain.product import Product
+
+
+# Products listed by the reorder report unless a limit is given
+DEFAULT_REPORT_SIZE = 50
+
+_INFINITY = float("inf")
+
+
+class ReorderLine:
+    """One product of the reorder report"""
+
+    def __init__(self, product_id: str, stock: int, reorder_point: int,
+                 daily_demand: float):
+        """
+        Initialize report line
+
+        Args:
+            product_id: Product ID
+            stock: Available stock
+            reorder_point: Stock below which the product needs reordering
+            daily_demand: Units sold per day (0 if unknown)
+        """
+        self.product_id = product_id
+        self.stock = stock
+        self.reorder_point = reorder_point
+        self.daily_demand = daily_demand
+
+    @property
+    def below_reorder_point(self) -> bool:
+        """Whether stock is below the reorder point"""
+        return self.stock < self.reorder_point
+
+    @property
+    def days_of_cover(self) -> Optional[float]:
+        """Days until stock runs out at the daily demand (None if demand is unknown)"""
+        if self.daily_demand <= 0:
+            return None
+        return self.stock / self.daily_demand
+
+    @property
+    def shortfall(self) -> int:
+        """Units needed to get back to the reorder point"""
+        return max(self.reorder_point - self.stock, 0)
+
+    def __repr__(self):
+        return (f"ReorderLine(product_id='{self.product_id}', stock={self.stock}, "
+                f"reorder_point={self.reorder_point}, daily_demand={self.daily_demand})")
+
+
+def urgency(stock: int, reorder_point: int, daily_demand: float) -> Tuple[int, float, float]:
+    """
+    Get the sort key of a product (smaller is more urgent)
+
+    Products below their reorder point come first; then fewest days of
+    cover first (products without demand last), then lowest stock
+    relative to the reorder point.
+
+    Args:
+        stock: Available stock
+        reorder_point: Reorder point
+        daily_demand: Units sold per day (0 if unknown)
+
+    Returns:
+        tuple: (0 below the reorder point else 1, days of cover, stock / reorder point)
+    """
+    return (0 if stock < reorder_point else 1,
+            stock / daily_demand if daily_demand > 0 else _INFINITY,
+            stock / reorder_point if reorder_point > 0 else _INFINITY)
+
+
+class ReorderIndex:
+    """
+    Products in a binary min-heap by urgency, with each product's heap
+    position tracked
+
+    A stock, reorder point or demand change moves the product up or down
+    the heap from its tracked position in O(log n). Listing the k most
+    urgent products walks the top of the heap with a frontier heap in
+    O(k log k), without touching the rest of the catalog.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, int, int, float]] = ()):
+        """
+        Initialize index
+
+        Args:
+            entries: (product_id, stock, reorder_point, daily_demand) of
+                     each product
+        """
+        # product_id -> [key, heap position, product_id, stock, reorder_point, daily_demand]
+        self._entries: Dict[str, list] = {
+            product_id: [urgency(stock, point, demand), 0, product_id, stock, point, demand]
+            for product_id, stock, point, demand in entries}
+        # Lists compare by key first (product IDs are unique, so ties end there)
+        heap = list(self._entries.values())
+        heapq.heapify(heap)
+        for position, entry in enumerate(heap):
+            entry[1] = position
+        self._heap = heap
+        self._below = sum(1 for entry in heap if entry[0][0] == 0)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, product_id) -> bool:
+        return product_id in self._entries
+
+    @property
+    def below_count(self) -> int:
+        """Number of products below their reorder point"""
+        return self._below
+
+    def update(self, product_id: str, stock: int, reorder_point: int, daily_demand: float):
+        """
+        Add a product or replace its values
+
+        Args:
+            product_id: Product ID
+            stock: Available stock
+            reorder_point: Reorder point
+            daily_demand: Units sold per day (0 if unknown)
+        """
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is None:
+                entry = [None, len(self._heap), product_id, stock, reorder_point, daily_demand]
+                self._entries[product_id] = entry
+                self._heap.append(entry)
+            else:
+                entry[3:] = stock, reorder_point, daily_demand
+            self._reposition(entry)
+
+    def update_stock(self, products: Iterable[Product]):
+        """
+        Take the current stock of products (ignoring products not indexed)
+
+        Stock is read under the index lock, so the last of several
+        concurrent updates always leaves the latest stock in the index.
+
+        Args:
+            products: Products whose stock changed
+        """
+        entries = self._entries
+        with self._lock:
+            for product in products:
+                entry = entries.get(product.product_id)
+                if entry is not None and entry[3] != product.stock:
+                    entry[3] = product.stock
+                    self._reposition(entry)
+
+    def set_reorder_point(self, product_id: str, reorder_point: int):
+        """
+        Change the reorder point of a product
+
+        Args:
+            product_id: Product ID
+            reorder_point: Reorder point
+        """
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is not None:
+                entry[4] = reorder_point
+                self._reposition(entry)
+
+    def set_daily_demand(self, product_id: str, daily_demand: float):
+        """
+        Change the daily demand of a product
+
+        Args:
+            product_id: Product ID
+            daily_demand: Units sold per day (0 if unknown)
+        """
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is not None:
+                entry[5] = daily_demand
+                self._reposition(entry)
+
+    def remove(self, product_id: str) -> bool:
+        """
+        Remove a product
+
+        Args:
+            product_id: Product ID
+
+        Returns:
+            bool: Whether the product was indexed
+        """
+        with self._lock:
+            entry = self._entries.pop(product_id, None)
+            if entry is None:
+                return False
+            if entry[0][0] == 0:
+                self._below -= 1
+            heap = self._heap
+            last = heap.pop()
+            if last is not entry:
+                last[1] = entry[1]
+                heap[entry[1]] = last
+                self._sift_down(last)
+                self._sift_up(last)
+            return True
+
+    def top(self, limit: int = DEFAULT_REPORT_SIZE,
+            below_only: bool = False) -> List[ReorderLine]:
+        """
+        List the most urgent products
+
+        Args:
+            limit: Maximum number of products
+            below_only: Only products below their reorder point
+
+        Returns:
+            list: Report lines, most urgent first
+        """
+        lines = []
+        with self._lock:
+            heap = self._heap
+            if not heap or limit <= 0:
+                return lines
+            # Frontier of heap positions whose parents were taken; it never
+            # holds more than limit + 1 positions
+            frontier = [(heap[0][0], 0)]
+            while frontier and len(lines) < limit:
+                key, position = heapq.heappop(frontier)
+                if below_only and key[0]:
+                    break
+                _, _, product_id, stock, point, demand = heap[position]
+                lines.append(ReorderLine(product_id, stock, point, demand))
+                for child in (2 * position + 1, 2 * position + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child][0], child))
+        return lines
+
+    def _reposition(self, entry: list):
+        """Recompute an entry's key and restore the heap order around it"""
+        old_key = entry[0]
+        key = entry[0] = urgency(entry[3], entry[4], entry[5])
+        if old_key is None:
+            self._below += key[0] == 0
+            self._sift_up(entry)
+            return
+        self._below += (key[0] == 0) - (old_key[0] == 0)
+        if key < old_key:
+            self._sift_up(entry)
+        elif key > old_key:
+            self._sift_down(entry)
+
+    def _sift_up(self, entry: list):
+        """Move an entry towards the root while its key is smaller than its parent's"""
+        heap = self._heap
+        key = entry[0]
+        position = entry[1]
+        while position:
+            parent_position = (position - 1) >> 1
+            parent = heap[parent_position]
+            if not key < parent[0]:
+                break
+            heap[position] = parent
+            parent[1] = position
+            position = parent_position
+        heap[position] = entry
+        entry[1] = position
+
+    def _sift_down(self, entry: list):
+        """Move an entry towards the leaves while a child has a smaller key"""
+        heap = self._heap
+        size = len(heap)
+        key = entry[0]
+        position = entry[1]
+        while True:
+            child_position = 2 * position + 1
+            if child_position >= size:
+                break
+            child = heap[child_position]
+            right_position = child_position + 1
+            if right_position < size and heap[right_position][0] < child[0]:
+                child_position = right_position
+                child = heap[right_position]
+            if not child[0] < key:
+                break
+            heap[position] = child
+            child[1] = position
+            position = child_position
+        heap[position] = entry
+        entry[1] = position
+
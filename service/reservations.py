@@ -0,0 +1,372 @@
+"""
+Stock Reservations
+Time-limited holds on the stock of open sales (carts), so the stock of an
+abandoned cart returns to sale even if the sale is never cancelled
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import weakref
+from typing import Callable, Dict, List, Optional, Tuple
+
+from domain.product import Product
+from domain.sale import Sale
+
+
+# Idle time after which the holds of an open sale expire
+DEFAULT_HOLD_SECONDS = 15 * 60
+
+# Interval between background expiry sweeps
+DEFAULT_SWEEP_SECONDS = 5.0
+
+
+class _CartHold:
+    """Stock held by one open sale"""
+
+    def __init__(self, sale: Sale, sequence: int, expires_at: float):
+        """
+        Initialize hold
+
+        Args:
+            sale: Open sale
+            sequence: Tie-breaker of the heap entry
+            expires_at: Deadline (clock seconds)
+        """
+        self.sale = sale
+        self.sequence = sequence
+        self.expires_at = expires_at
+        self.quantities: Dict[str, int] = {}
+
+
+class ReservationBook:
+    """
+    Stock held by open sales, released when a sale is idle too long
+
+    Reserving takes units off Product.stock (available stock) right away;
+    the store keeps on-hand stock (available plus held), which only drops
+    when the sale completes, so holds never reach the database. Every sale holding stock has one
+    entry in a min-heap of deadlines. Activity on a sale only moves the
+    deadline in its record (O(1)); a heap entry that comes due with a later
+    deadline is pushed back, so expiring a sale costs O(log n). A sale whose
+    holds expired keeps its lines: its next change or its checkout reserves
+    them again, and fails if the stock has been sold meanwhile.
+    """
+
+    def __init__(self, inventory_service, hold_seconds: float = DEFAULT_HOLD_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize reservation book
+
+        Args:
+            inventory_service: Inventory service whose stock is held
+            hold_seconds: Idle time after which a sale's holds expire
+            clock: Time source in seconds (monotonic)
+        """
+        self.inventory_service = inventory_service
+        self.hold_seconds = hold_seconds
+        self._clock = clock
+        # sale_id -> holds of the sale
+        self._holds: Dict[str, _CartHold] = {}
+        # product_id -> units held by all sales
+        self._held: Dict[str, int] = {}
+        # (deadline, sequence, hold); entries of dropped holds are skipped
+        self._heap: List[Tuple[float, int, _CartHold]] = []
+        self._sequence = itertools.count()
+        # Lines of open sales whose holds expired (forgotten with the sale)
+        self._expired: "weakref.WeakKeyDictionary[Sale, Dict[str, int]]" = \
+            weakref.WeakKeyDictionary()
+        self.expired_count = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._holds)
+
+    def held_quantity(self, product_id: str) -> int:
+        """
+        Get units of a product held by open sales
+
+        Args:
+            product_id: Product ID
+
+        Returns:
+            int: Held units
+        """
+        return self._held.get(product_id, 0)
+
+    def is_expired(self, sale: Sale) -> bool:
+        """
+        Check whether a sale's holds expired (its lines are not reserved)
+
+        Args:
+            sale: Open sale
+
+        Returns:
+            bool: Whether the holds expired
+        """
+        return sale in self._expired
+
+    def reserve(self, sale: Sale, product_id: str, quantity: int) -> Optional[Product]:
+        """
+        Reserve stock for a sale line and hold it
+
+        Also renews the holds of the sale, reserving its lines again if
+        they expired (all or nothing).
+
+        Args:
+            sale: Open sale
+            product_id: Product ID
+            quantity: Quantity to reserve
+
+        Returns:
+            Product: Reserved product, or None if unknown or out of stock
+        """
+        now = self._clock()
+        heap = self._heap
+        if heap and heap[0][0] <= now:
+            self.expire(now)
+        with self._lock:
+            expired = self._touch(sale, now)
+        if expired is None:
+            product = self.inventory_service.reserve_product(product_id, quantity)
+            if product is not None:
+                with self._lock:
+                    self._hold(sale, product_id, quantity, now)
+            return product
+        items = list(expired.items())
+        items.append((product_id, quantity))
+        if not self.inventory_service.reserve_many(items):
+            with self._lock:
+                self._expired[sale] = expired
+            return None
+        with self._lock:
+            for held_id, held_quantity in items:
+                self._hold(sale, held_id, held_quantity, now)
+        return self.inventory_service.get_product(product_id)
+
+    def renew(self, sale: Sale) -> bool:
+        """
+        Restart the hold period of a sale (reserving its lines again if
+        its holds expired)
+
+        Args:
+            sale: Open sale
+
+        Returns:
+            bool: Whether the sale's lines are held
+        """
+        now = self._clock()
+        with self._lock:
+            expired = self._touch(sale, now)
+        if expired is None:
+            return True
+        if not self.inventory_service.reserve_many(list(expired.items())):
+            with self._lock:
+                self._expired[sale] = expired
+            return False
+        with self._lock:
+            for product_id, quantity in expired.items():
+                self._hold(sale, product_id, quantity, now)
+        return True
+
+    def release(self, sale: Sale, product_id: str, quantity: int):
+        """
+        Release part of a sale's holds (stock is restored unless it
+        already was by expiry)
+
+        Args:
+            sale: Open sale
+            product_id: Product ID
+            quantity: Quantity no longer in the sale
+        """
+        with self._lock:
+            hold = self._holds.get(sale.sale_id)
+            if hold is not None:
+                hold.expires_at = self._clock() + self.hold_seconds
+                self._unhold(hold, product_id, quantity)
+                if not hold.quantities:
+                    del self._holds[sale.sale_id]
+                restore = True
+            else:
+                expired = self._expired.get(sale)
+                restore = expired is None
+                if expired is not None:
+                    _subtract(expired, product_id, quantity)
+        if restore:
+            self.inventory_service.release_held([(product_id, quantity)])
+
+    def release_all(self, sale: Sale):
+        """
+        Release every hold of a sale (cancel)
+
+        Args:
+            sale: Open sale
+        """
+        with self._lock:
+            hold = self._holds.pop(sale.sale_id, None)
+            if hold is not None:
+                items = list(hold.quantities.items())
+                for product_id, quantity in items:
+                    _subtract(self._held, product_id, quantity)
+            elif self._expired.pop(sale, None) is not None:
+                items = []
+            else:
+                # Lines reserved without holds
+                items = [(item.product_id, item.quantity) for item in sale.items]
+        self.inventory_service.release_held(items)
+
+    def commit(self, sale: Sale) -> bool:
+        """
+        Turn a sale's holds into sold stock (checkout)
+
+        The holds are dropped in one step under the book lock, so expiry
+        cannot release them halfway. Lines whose holds expired are
+        reserved again first.
+
+        Args:
+            sale: Sale being completed
+
+        Returns:
+            bool: Whether all lines are reserved (False if expired lines
+                  are no longer in stock)
+        """
+        with self._lock:
+            hold = self._holds.pop(sale.sale_id, None)
+            if hold is not None:
+                for product_id, quantity in hold.quantities.items():
+                    _subtract(self._held, product_id, quantity)
+                return True
+            expired = self._expired.pop(sale, None)
+        if expired is None or self.inventory_service.reserve_many(list(expired.items())):
+            return True
+        with self._lock:
+            self._expired[sale] = expired
+        return False
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """
+        Release the holds of sales idle past their deadline
+
+        Args:
+            now: Current clock time (defaults to the clock)
+
+        Returns:
+            int: Number of sales whose holds expired
+        """
+        if now is None:
+            now = self._clock()
+        heap = self._heap
+        released = []
+        changed = []
+        count = 0
+        with self._lock:
+            while heap and heap[0][0] <= now:
+                _, sequence, hold = heapq.heappop(heap)
+                if self._holds.get(hold.sale.sale_id) is not hold:
+                    continue
+                if hold.expires_at > now:
+                    heapq.heappush(heap, (hold.expires_at, sequence, hold))
+                    continue
+                del self._holds[hold.sale.sale_id]
+                for product_id, quantity in hold.quantities.items():
+                    _subtract(self._held, product_id, quantity)
+                released.extend(hold.quantities.items())
+                self._expired[hold.sale] = hold.quantities
+                count += 1
+            # Restored under the lock so a checkout never sees the sale
+            # expired before its stock is back; events are published after
+            # it is released, so handlers may call back into the book
+            if released:
+                changed = self.inventory_service.release_held(released, publish=False)
+            self.expired_count += count
+        if changed:
+            self.inventory_service.publish_stock_changes(changed)
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get hold counts
+
+        Returns:
+            dict: sales holding stock, held units, expired sales so far
+        """
+        with self._lock:
+            return {"sales": len(self._holds), "units": sum(self._held.values()),
+                    "expired": self.expired_count}
+
+    def start(self, interval_seconds: float = DEFAULT_SWEEP_SECONDS):
+        """
+        Expire holds in the background
+
+        Holds are also expired whenever stock is reserved, so this is only
+        needed for stock to come back while no sale is being rung up.
+
+        Args:
+            interval_seconds: Interval between sweeps
+        """
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._sweep_loop, args=(interval_seconds,),
+                                            name="reservation-expiry", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background sweeps"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _sweep_loop(self, interval_seconds: float):
+        """Background sweeps"""
+        while not self._stopped.wait(interval_seconds):
+            self.expire()
+
+    def _touch(self, sale: Sale, now: float) -> Optional[Dict[str, int]]:
+        """Move a sale's deadline; returns (and forgets) its expired lines"""
+        hold = self._holds.get(sale.sale_id)
+        if hold is not None:
+            hold.expires_at = now + self.hold_seconds
+            return None
+        if not self._expired:
+            return None
+        return self._expired.pop(sale, None)
+
+    def _hold(self, sale: Sale, product_id: str, quantity: int, now: float):
+        """Add a reserved quantity to a sale's holds"""
+        hold = self._holds.get(sale.sale_id)
+        if hold is None:
+            hold = self._holds[sale.sale_id] = _CartHold(sale, next(self._sequence),
+                                                         now + self.hold_seconds)
+            heap = self._heap
+            heapq.heappush(heap, (hold.expires_at, hold.sequence, hold))
+            # Drop entries of completed and cancelled sales in one pass
+            # when they outnumber the live ones
+            if len(heap) > 2 * len(self._holds) + 1_024:
+                heap[:] = [(live.expires_at, live.sequence, live)
+                           for live in self._holds.values()]
+                heapq.heapify(heap)
+        hold.expires_at = now + self.hold_seconds
+        quantities = hold.quantities
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+        held = self._held
+        held[product_id] = held.get(product_id, 0) + quantity
+
+    def _unhold(self, hold: _CartHold, product_id: str, quantity: int):
+        """Remove quantity of a product from a sale's holds"""
+        quantity = min(quantity, hold.quantities.get(product_id, 0))
+        if quantity:
+            _subtract(hold.quantities, product_id, quantity)
+            _subtract(self._held, product_id, quantity)
+
+
+def _subtract(quantities: Dict[str, int], product_id: str, quantity: int):
+    """Decrease a quantity, dropping it at zero"""
+    remaining = quantities.get(product_id, 0) - quantity
+    if remaining > 0:
+        quantities[product_id] = remaining
+    else:
+        quantities.pop(product_id, None)
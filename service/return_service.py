@@ -2,27 +2,106 @@
 Return Service
 """
 
-from typing import List, Optional
+import threading
+from typing import Dict, List, Optional
+from domain.money import Money
 from domain.return_transaction import ReturnTransaction
 from domain.sale_item import SaleItem
 from service.inventory_service import InventoryService
 from service.sale_service import SaleService
+from service.history_index import HistoryIndex
+from service.metrics import metrics
+from service.events import ReturnCompleted
+from persistence.transaction_journal import TransactionJournal
+
+
+# Instrumented operations (see service/metrics.py)
+_COMPLETE_RETURN = metrics.operation("ReturnService.complete_return")
 
 
 class ReturnService:
     """Return service class"""
     
-    def __init__(self, inventory_service: InventoryService, sale_service: SaleService):
+    def __init__(self, inventory_service: InventoryService, sale_service: SaleService,
+                 journal: Optional[TransactionJournal] = None):
         """
         Initialize return service
         
         Args:
             inventory_service: Inventory service object
             sale_service: Sale service object
+            journal: Transaction journal for durable history (optional)
         """
         self.inventory_service = inventory_service
         self.sale_service = sale_service
-        self.return_history: List[ReturnTransaction] = []
+        self.journal = journal
+        self._refund_cents = 0
+        self._reset_history()
+        # Lines of each product per original sale, built on its first return
+        self._sold_lines: Dict[str, Dict[str, List[SaleItem]]] = {}
+        self._lock = threading.Lock()
+        # Returns covered by a snapshot, decoded on first use of the history
+        # (see attach_archive)
+        self._archive = None
+        self._archive_lock = threading.RLock()
+    
+    def _reset_history(self):
+        """Start with an empty history and empty indexes"""
+        self._return_history: List[ReturnTransaction] = []
+        # Paged/sorted/filtered views of completed returns (history window)
+        self._history_index = HistoryIndex()
+        # Completed returns per original sale, and quantity returned per
+        # (original sale, product); sold quantities are kept by each Sale
+        self._returns_by_sale: Dict[str, List[ReturnTransaction]] = {}
+        self._returned: Dict[str, Dict[str, int]] = {}
+    
+    @property
+    def return_history(self) -> List[ReturnTransaction]:
+        """Completed returns in completion order"""
+        self.load_archive()
+        return self._return_history
+    
+    @property
+    def history_index(self) -> HistoryIndex:
+        """Paged/sorted/filtered views of completed returns (history window)"""
+        self.load_archive()
+        return self._history_index
+    
+    def attach_archive(self, archive, refund_cents: int):
+        """
+        Take the completed returns covered by a snapshot without decoding them
+        
+        Only the snapshot's refund counter is applied now; the returns are
+        decoded on first use of the history (returnable quantities,
+        history_index, ...) or by load_archive().
+        
+        Args:
+            archive: Snapshot history whose load() returns (sales, returns)
+                     in journal order (see persistence/snapshot.py)
+            refund_cents: Refunds of the archived returns
+        """
+        with self._archive_lock:
+            self._archive = archive
+            self._refund_cents += refund_cents
+    
+    def load_archive(self):
+        """Decode the archived returns now, if still pending (e.g. from a background thread)"""
+        if self._archive is None:
+            return
+        with self._archive_lock:
+            archive = self._archive
+            if archive is None:
+                return
+            _, returns = archive.load()
+            # Archived returns come before those completed since recovery;
+            # their refunds are already counted from the snapshot
+            recent = self._return_history
+            refund_cents = self._refund_cents
+            self._reset_history()
+            self._index_returns(returns)
+            self._index_returns(recent)
+            self._refund_cents = refund_cents
+            self._archive = None
     
     def create_return(self, original_sale_id: str = None) -> ReturnTransaction:
         """
@@ -41,6 +120,12 @@ class ReturnService:
         """
         Add item to return transaction
         
+        With an original sale, the quantity (plus what this return already
+        holds of the product) must not exceed what is still returnable, and
+        the refund uses the unit prices the product was sold at: units are
+        taken from the sale's lines of the product in order, after the
+        units already returned.
+        
         Args:
             return_transaction: Return transaction object
             product_id: Product ID
@@ -49,12 +134,32 @@ class ReturnService:
         Returns:
             bool: Whether addition was successful
         """
+        if quantity <= 0:
+            return False
         product = self.inventory_service.get_product(product_id)
         if not product:
             return False
-        
-        item = SaleItem(product, quantity)
-        return_transaction.add_item(item)
+        sale_id = return_transaction.original_sale_id
+        if sale_id is not None:
+            sale = self.sale_service.get_sale(sale_id)
+            lines = None if sale is None else self._lines_of(sale).get(product_id)
+            if not lines:
+                return False
+            held = return_transaction.get_quantity(product_id)
+            returnable = self.get_returnable_quantity(sale_id, product_id)
+            if held + quantity > returnable:
+                return False
+            # Units sold before these: returned earlier or already in this return
+            skip = sale.get_quantity(product_id) - returnable + held
+            for sold in lines:
+                taken = min(max(sold.quantity - skip, 0), quantity)
+                skip = max(skip - sold.quantity, 0)
+                if taken:
+                    return_transaction.add_item(SaleItem.from_snapshot(
+                        product_id, sold.name, sold.unit_price, taken))
+                    quantity -= taken
+            return True
+        return_transaction.add_item(SaleItem(product, quantity))
         return True
     
     def complete_return(self, return_transaction: ReturnTransaction) -> bool:
@@ -67,16 +172,199 @@ class ReturnService:
         Returns:
             bool: Whether completion was successful
         """
-        if not return_transaction.items:
-            return False
+        start = _COMPLETE_RETURN.begin() if _COMPLETE_RETURN.enabled else None
+        ok = False
+        changed = []
+        try:
+            with self._lock:
+                # Re-check against returns completed since the items were added
+                sale_id = return_transaction.original_sale_id
+                accepted = bool(return_transaction.items) and (
+                    sale_id is None or all(
+                        return_transaction.get_quantity(product_id)
+                        <= self.get_returnable_quantity(sale_id, product_id)
+                        for product_id in {item.product_id
+                                           for item in return_transaction.items}))
+                if accepted:
+                    # Restore stock (events are published after the lock is
+                    # released, so handlers may call back into the service)
+                    changed = self.inventory_service.restore_many(
+                        [(item.product_id, item.quantity) for item in return_transaction.items],
+                        publish=False)
+                    
+                    return_transaction.complete_return()
+                    if self.journal:
+                        self.journal.append_return(return_transaction)
+                    self._record_return(return_transaction)
+            if accepted:
+                self.inventory_service.publish_stock_changes(changed)
+                events = self.inventory_service.events
+                if events.wants(ReturnCompleted):
+                    events.publish(ReturnCompleted(return_transaction))
+                ok = True
+            return ok
+        finally:
+            if start is not None:
+                _COMPLETE_RETURN.end(start, ok)
+    
+    def restore_return(self, return_transaction: ReturnTransaction) -> bool:
+        """
+        Restore a completed return replayed from the journal
+        (stock is only re-applied when the product store is not durable)
+        
+        Args:
+            return_transaction: Completed return transaction object
+            
+        Returns:
+            bool: Whether the stock of every line could be re-applied
+                  (False if a product is unknown; the return is recorded
+                  either way)
+        """
+        ok = True
+        if not self.inventory_service.store.durable:
+            for item in return_transaction.items:
+                if self.inventory_service.get_product(item.product_id) is None:
+                    ok = False
+                else:
+                    self.inventory_service.restore_stock(item.product_id, item.quantity)
+        self._record_return(return_transaction)
+        return ok
+    
+    def _index_returns(self, returns: List[ReturnTransaction]):
+        """
+        Append many completed returns to history in one batch
+        
+        Args:
+            returns: Completed return transactions in journal order
+        """
+        refunds = [return_transaction.get_total_refund().cents for return_transaction in returns]
+        self._return_history.extend(returns)
+        self._refund_cents += sum(refunds)
+        self._history_index.add_many(returns, refunds, [None] * len(returns))
+        for return_transaction in returns:
+            self._index_return(return_transaction)
+    
+    def _record_return(self, return_transaction: ReturnTransaction):
+        """
+        Append a completed return to history
         
-        # Restore stock
+        Args:
+            return_transaction: Completed return transaction object
+        """
+        if self._archive is not None:
+            # Not while the archive is being merged in
+            with self._archive_lock:
+                self._append_return(return_transaction)
+        else:
+            self._append_return(return_transaction)
+    
+    def _append_return(self, return_transaction: ReturnTransaction):
+        """Append a completed return to history (see _record_return)"""
+        self._return_history.append(return_transaction)
+        refund_cents = return_transaction.get_total_refund().cents
+        self._refund_cents += refund_cents
+        self._history_index.add(return_transaction, refund_cents)
+        self._index_return(return_transaction)
+    
+    def _index_return(self, return_transaction: ReturnTransaction):
+        """
+        Count a completed return against its original sale
+        
+        Args:
+            return_transaction: Completed return transaction object
+        """
+        sale_id = return_transaction.original_sale_id
+        if sale_id is None:
+            return
+        self._returns_by_sale.setdefault(sale_id, []).append(return_transaction)
+        returned = self._returned.setdefault(sale_id, {})
         for item in return_transaction.items:
-            self.inventory_service.restore_stock(item.product.product_id, item.quantity)
+            product_id = item.product_id
+            returned[product_id] = returned.get(product_id, 0) + item.quantity
+    
+    def _lines_of(self, sale) -> Dict[str, List[SaleItem]]:
+        """
+        Get the lines of a completed sale grouped by product (built once per sale)
         
-        return_transaction.complete_return()
-        self.return_history.append(return_transaction)
-        return True
+        Args:
+            sale: Completed sale
+            
+        Returns:
+            dict: product_id -> sale lines of the product, in sale order
+        """
+        lines = self._sold_lines.get(sale.sale_id)
+        if lines is None:
+            lines = {}
+            for item in sale.items:
+                lines.setdefault(item.product_id, []).append(item)
+            self._sold_lines[sale.sale_id] = lines
+        return lines
+    
+    def get_returnable_quantity(self, sale_id: str, product_id: str) -> int:
+        """
+        Get the quantity of a product that can still be returned against a sale (O(1))
+        
+        Args:
+            sale_id: Original sale ID
+            product_id: Product ID
+            
+        Returns:
+            int: Sold quantity minus quantity already returned
+                 (0 if the sale is unknown or not completed)
+        """
+        self.load_archive()
+        sale = self.sale_service.get_sale(sale_id)
+        if sale is None or not sale.is_completed:
+            return 0
+        returned = self._returned.get(sale_id)
+        return sale.get_quantity(product_id) - (returned.get(product_id, 0) if returned else 0)
+    
+    def get_returnable_items(self, sale_id: str) -> Dict[str, int]:
+        """
+        Get every product that can still be returned against a sale
+        
+        Args:
+            sale_id: Original sale ID
+            
+        Returns:
+            dict: product_id -> returnable quantity (products fully returned omitted)
+        """
+        sale = self.sale_service.get_sale(sale_id)
+        if sale is None:
+            return {}
+        returnable = {}
+        for item in sale.items:
+            product_id = item.product_id
+            if product_id not in returnable:
+                returnable[product_id] = self.get_returnable_quantity(sale_id, product_id)
+        return {product_id: quantity for product_id, quantity in returnable.items() if quantity > 0}
+    
+    def get_returns_for_sale(self, sale_id: str) -> List[ReturnTransaction]:
+        """
+        Get the completed returns made against a sale
+        
+        Args:
+            sale_id: Original sale ID
+            
+        Returns:
+            list: Return transactions in completion order
+        """
+        self.load_archive()
+        return list(self._returns_by_sale.get(sale_id, ()))
+    
+    def get_refunds_for_sale(self, sale_id: str) -> Money:
+        """
+        Get the total refunded against a sale
+        
+        Args:
+            sale_id: Original sale ID
+            
+        Returns:
+            Money: Sum of the refunds of its completed returns
+        """
+        self.load_archive()
+        return Money(sum(return_transaction.get_total_refund().cents
+                         for return_transaction in self._returns_by_sale.get(sale_id, ())))
     
     def get_return_history(self) -> List[ReturnTransaction]:
         """
@@ -87,6 +375,15 @@ class ReturnService:
         """
         return self.return_history.copy()
     
+    def get_total_refunds(self) -> Money:
+        """
+        Get total refund amount of all completed returns (exact, O(1))
+        
+        Returns:
+            Money: Total refunds
+        """
+        return Money(self._refund_cents)
+    
     def find_sale_by_id(self, sale_id: str) -> Optional:
         """
         Find sale by ID
@@ -97,7 +394,4 @@ class ReturnService:
         Returns:
             Sale: Sale object, or None if not found
         """
-        for sale in self.sale_service.get_sales_history():
-            if sale.sale_id == sale_id:
-                return sale
-        return None
+        return self.sale_service.get_sale(sale_id)
@@ -2,25 +2,132 @@
 Sale Service
 """
 
-from typing import List
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from domain.money import Money
 from domain.sale import Sale
 from domain.sale_item import SaleItem
 from domain.product import Product
 from service.inventory_service import InventoryService
+from service.history_index import HistoryIndex
+from service.metrics import metrics
+from service.events import SaleCompleted
+from persistence.transaction_journal import TransactionJournal, sale_to_record
+
+
+# Instrumented operations (see service/metrics.py)
+_ADD_ITEM_TO_SALE = metrics.operation("SaleService.add_item_to_sale")
+_COMPLETE_SALE = metrics.operation("SaleService.complete_sale")
+
+
+class OrderResult:
+    """Outcome of one order in a batch checkout"""
+    
+    def __init__(self, sale: Optional[Sale] = None, error: Optional[str] = None):
+        """
+        Initialize result
+        
+        Args:
+            sale: Completed sale (on success)
+            error: Reason the order was rejected (on failure)
+        """
+        self.sale = sale
+        self.error = error
+    
+    @property
+    def success(self) -> bool:
+        """Whether the order was completed"""
+        return self.sale is not None
+    
+    def __repr__(self):
+        if self.sale is not None:
+            return f"OrderResult(sale_id='{self.sale.sale_id}')"
+        return f"OrderResult(error='{self.error}')"
 
 
 class SaleService:
     """Sale service class"""
     
-    def __init__(self, inventory_service: InventoryService):
+    def __init__(self, inventory_service: InventoryService,
+                 journal: Optional[TransactionJournal] = None):
         """
         Initialize sale service
         
         Args:
             inventory_service: Inventory service object
+            journal: Transaction journal for durable history (optional)
         """
         self.inventory_service = inventory_service
-        self.sales_history: List[Sale] = []
+        self.journal = journal
+        self._revenue_cents = 0
+        self._reset_history()
+        # Sales covered by a snapshot, decoded on first use of the history
+        # (see attach_archive)
+        self._archive = None
+        self._archive_lock = threading.RLock()
+    
+    def _reset_history(self):
+        """Start with an empty history and empty indexes"""
+        self._sales_history: List[Sale] = []
+        # Indexes over completed sales
+        self._sales_by_id: Dict[str, Sale] = {}
+        self._time_keys: List[datetime] = []
+        self._time_sales: List[Sale] = []
+        # Sale totals in cents, aligned with the time index
+        self._time_totals = array("q")
+        # Paged/sorted/filtered views of completed sales (history window)
+        self._history_index = HistoryIndex()
+    
+    @property
+    def sales_history(self) -> List[Sale]:
+        """Completed sales in completion order"""
+        self.load_archive()
+        return self._sales_history
+    
+    @property
+    def history_index(self) -> HistoryIndex:
+        """Paged/sorted/filtered views of completed sales (history window)"""
+        self.load_archive()
+        return self._history_index
+    
+    def attach_archive(self, archive, revenue_cents: int):
+        """
+        Take the completed sales covered by a snapshot without decoding them
+        
+        Only the snapshot's revenue counter is applied now; the sales are
+        decoded on first use of the history (get_sale, sales_between,
+        history_index, ...) or by load_archive().
+        
+        Args:
+            archive: Snapshot history whose load() returns (sales, returns)
+                     in journal order (see persistence/snapshot.py)
+            revenue_cents: Revenue of the archived sales
+        """
+        with self._archive_lock:
+            self._archive = archive
+            self._revenue_cents += revenue_cents
+    
+    def load_archive(self):
+        """Decode the archived sales now, if still pending (e.g. from a background thread)"""
+        if self._archive is None:
+            return
+        with self._archive_lock:
+            archive = self._archive
+            if archive is None:
+                return
+            sales, _ = archive.load()
+            # Archived sales come before those completed since recovery;
+            # their revenue is already counted from the snapshot
+            recent = self._sales_history
+            revenue_cents = self._revenue_cents
+            self._reset_history()
+            self._record_sales(sales)
+            self._record_sales(recent)
+            self._revenue_cents = revenue_cents
+            self._archive = None
     
     def create_sale(self) -> Sale:
         """
@@ -33,7 +140,8 @@ class SaleService:
     
     def add_item_to_sale(self, sale: Sale, product_id: str, quantity: int) -> bool:
         """
-        Add item to sale
+        Add item to sale (its stock is held until checkout, see
+        service/reservations.py)
         
         Args:
             sale: Sale object
@@ -43,46 +151,302 @@ class SaleService:
         Returns:
             bool: Whether addition was successful
         """
-        product = self.inventory_service.get_product(product_id)
-        if not product:
-            return False
+        start = _ADD_ITEM_TO_SALE.begin() if _ADD_ITEM_TO_SALE.enabled else None
+        ok = False
+        try:
+            product = self.inventory_service.reservations.reserve(sale, product_id, quantity)
+            if product is not None:
+                sale.add_item(SaleItem(product, quantity))
+                ok = True
+            return ok
+        finally:
+            if start is not None:
+                _ADD_ITEM_TO_SALE.end(start, ok)
+    
+    def add_scanned_item(self, sale: Sale, code: str, count: int = 1) -> bool:
+        """
+        Add a scanned barcode (or typed product ID) to a sale
+        
+        A pack barcode adds its multiplier in units per scan.
         
-        if not product.reduce_stock(quantity):
+        Args:
+            sale: Sale object
+            code: Barcode or product ID
+            count: Number of scans
+            
+        Returns:
+            bool: Whether addition was successful
+        """
+        resolved = self.inventory_service.barcodes.resolve(code)
+        if resolved is None:
+            return self.add_item_to_sale(sale, code.strip(), count)
+        product_id, multiplier = resolved
+        return self.add_item_to_sale(sale, product_id, count * multiplier)
+    
+    def remove_item_from_sale(self, sale: Sale, item: SaleItem) -> bool:
+        """
+        Remove item from sale (release its stock)
+        
+        Args:
+            sale: Sale object
+            item: Sale item to remove
+            
+        Returns:
+            bool: Whether removal was successful
+        """
+        if not sale.remove_item(item):
             return False
+        self.inventory_service.reservations.release(sale, item.product_id, item.quantity)
+        return True
+    
+    def update_item_quantity(self, sale: Sale, item: SaleItem, quantity: int) -> bool:
+        """
+        Change quantity of a sale item (reserve or release the difference)
         
-        item = SaleItem(product, quantity)
-        sale.add_item(item)
+        Args:
+            sale: Sale object
+            item: Sale item
+            quantity: New quantity
+            
+        Returns:
+            bool: Whether update was successful
+        """
+        if quantity <= 0:
+            return False
+        delta = quantity - item.quantity
+        product_id = item.product_id
+        reservations = self.inventory_service.reservations
+        if delta > 0 and reservations.reserve(sale, product_id, delta) is None:
+            return False
+        if delta < 0:
+            reservations.release(sale, product_id, -delta)
+        sale.update_quantity(item, quantity)
         return True
     
-    def complete_sale(self, sale: Sale, payment_method: str, payment_amount: float) -> bool:
+    def complete_sale(self, sale: Sale, payment_method: str, payment_amount: Money) -> bool:
         """
         Complete sale
         
+        The sale's stock holds are committed in one step; if they expired,
+        its lines are reserved again and the sale fails if they are no
+        longer in stock.
+        
         Args:
             sale: Sale object
             payment_method: Payment method
-            payment_amount: Payment amount
+            payment_amount: Payment amount (Money or a number)
             
         Returns:
-            bool: Whether completion was successful
+            bool: Whether completion was successful (False on insufficient
+                  payment or stock)
         """
-        total = sale.get_total()
-        if payment_amount < total:
-            return False
+        start = _COMPLETE_SALE.begin() if _COMPLETE_SALE.enabled else None
+        ok = False
+        try:
+            payment_amount = Money.of(payment_amount)
+            if (payment_amount >= sale.get_total()
+                    and self.inventory_service.reservations.commit(sale)):
+                sale.complete_sale(payment_method, payment_amount)
+                self.inventory_service.save_sold((item.product_id, item.quantity)
+                                                for item in sale.items)
+                if self.journal:
+                    self.journal.append_sale(sale)
+                self._record_sale(sale)
+                events = self.inventory_service.events
+                if events.wants(SaleCompleted):
+                    events.publish(SaleCompleted(sale))
+                ok = True
+            return ok
+        finally:
+            if start is not None:
+                _COMPLETE_SALE.end(start, ok)
+    
+    def complete_sales_batch(self, orders: Iterable[dict]) -> List[OrderResult]:
+        """
+        Complete many orders in one pass (offline terminal backlogs, web orders)
         
-        sale.complete_sale(payment_method, payment_amount)
-        self.sales_history.append(sale)
-        return True
+        Each order is a dict with "items" (a list of (product_id, quantity)),
+        "payment_method", "payment_amount" and optionally "time" (datetime of
+        the original checkout). Every order is validated and priced, and its
+        payment checked, before any stock is touched; a malformed order only
+        fails itself. Products are looked up once per batch, stock decrements
+        are grouped per product (see InventoryService.reserve_batch), and
+        the completed sales are journaled and recorded in one step.
+        
+        Args:
+            orders: Orders to complete, in order
+            
+        Returns:
+            list: One OrderResult per order, in the same order
+        """
+        orders = list(orders)
+        results: List[Optional[OrderResult]] = [None] * len(orders)
+        products: Dict[str, Optional[Product]] = {}
+        
+        # Validate and price every order and check its payment
+        priced = []
+        for index, order in enumerate(orders):
+            try:
+                if not isinstance(order, dict):
+                    raise ValueError(f"Invalid order: {order!r}")
+                items = []
+                quantities: Dict[str, int] = {}
+                total_cents = total_quantity = 0
+                for line in order["items"]:
+                    if not isinstance(line, (tuple, list)) or len(line) != 2:
+                        raise ValueError(f"Invalid item: {line!r}")
+                    product_id, quantity = line
+                    if not isinstance(product_id, str):
+                        raise ValueError(f"Invalid product ID: {product_id!r}")
+                    if product_id not in products:
+                        products[product_id] = self.inventory_service.get_product(product_id)
+                    product = products[product_id]
+                    if product is None:
+                        raise ValueError(f"Unknown product: {product_id}")
+                    if type(quantity) is not int or quantity <= 0:
+                        raise ValueError(f"Invalid quantity for {product_id}: {quantity!r}")
+                    items.append(SaleItem(product, quantity))
+                    quantities[product_id] = quantities.get(product_id, 0) + quantity
+                    total_cents += product.price.cents * quantity
+                    total_quantity += quantity
+                if not items:
+                    raise ValueError("Order has no items")
+                payment_method = order["payment_method"]
+                if not isinstance(payment_method, str) or not payment_method:
+                    raise ValueError(f"Invalid payment method: {payment_method!r}")
+                sale_time = order.get("time")
+                if sale_time is not None and not isinstance(sale_time, datetime):
+                    raise ValueError(f"Invalid time: {sale_time!r}")
+                payment_amount = Money.of(order["payment_amount"])
+                if payment_amount.cents < total_cents:
+                    raise ValueError("Insufficient payment amount")
+            except KeyError as error:
+                results[index] = OrderResult(error=f"Missing field: {error.args[0]}")
+                continue
+            except (ValueError, TypeError) as error:
+                results[index] = OrderResult(error=str(error))
+                continue
+            priced.append((index, items, quantities, total_cents, total_quantity,
+                           payment_method, payment_amount, sale_time))
+        
+        # Reserve stock, each order all or nothing
+        reserved = self.inventory_service.reserve_batch([entry[2] for entry in priced])
+        
+        completed = []
+        sale_ids = iter(Sale.id_generator.generate_many(Sale.ID_PREFIX, reserved.count(True)))
+        now = datetime.now()
+        for entry, ok in zip(priced, reserved):
+            (index, items, quantities, total_cents, total_quantity,
+             payment_method, payment_amount, sale_time) = entry
+            if not ok:
+                results[index] = OrderResult(error="Insufficient stock")
+                continue
+            sale = Sale(next(sale_ids))
+            sale.transaction_time = sale_time or now
+            sale.load_items(items, total_cents, total_quantity, quantities)
+            sale.complete(payment_method, payment_amount)
+            completed.append(sale)
+            results[index] = OrderResult(sale)
+        
+        if self.journal and completed:
+            self.journal.append_many(sale_to_record(sale) for sale in completed)
+        self._record_sales(completed)
+        events = self.inventory_service.events
+        if events.wants(SaleCompleted):
+            for sale in completed:
+                events.publish(SaleCompleted(sale))
+        return results
+    
+    def restore_sale(self, sale: Sale) -> bool:
+        """
+        Restore a completed sale replayed from the journal
+        (stock is only re-applied when the product store is not durable)
+        
+        Args:
+            sale: Completed sale object
+            
+        Returns:
+            bool: Whether the stock of every line could be re-applied
+                  (False if a product is unknown or its stock too low;
+                  the sale is recorded either way)
+        """
+        ok = True
+        if not self.inventory_service.store.durable:
+            for item in sale.items:
+                if not self.inventory_service.update_stock(item.product_id, item.quantity):
+                    ok = False
+        self._record_sale(sale)
+        return ok
+    
+    def _record_sale(self, sale: Sale):
+        """
+        Append a completed sale to history and indexes
+        
+        Args:
+            sale: Completed sale object
+        """
+        if self._archive is not None:
+            # Not while the archive is being merged in
+            with self._archive_lock:
+                self._index_sale(sale)
+        else:
+            self._index_sale(sale)
+    
+    def _index_sale(self, sale: Sale):
+        """Append a completed sale to history and indexes (see _record_sale)"""
+        self._sales_history.append(sale)
+        self._sales_by_id[sale.sale_id] = sale
+        total_cents = sale.get_total().cents
+        self._revenue_cents += total_cents
+        
+        # Sales usually complete in time order, so this is an append
+        position = bisect_right(self._time_keys, sale.transaction_time)
+        self._time_keys.insert(position, sale.transaction_time)
+        self._time_sales.insert(position, sale)
+        self._time_totals.insert(position, total_cents)
+        self._history_index.add(sale, total_cents, sale.payment_method)
+    
+    def _record_sales(self, sales: List[Sale]):
+        """
+        Append many completed sales to history and indexes
+        
+        Args:
+            sales: Completed sale objects
+        """
+        if not sales:
+            return
+        if self._archive is not None:
+            with self._archive_lock:
+                self._index_sales(sales)
+        else:
+            self._index_sales(sales)
+    
+    def _index_sales(self, sales: List[Sale]):
+        """Append many completed sales to history and indexes (see _record_sales)"""
+        totals = [sale._total_cents for sale in sales]
+        times = [sale.transaction_time for sale in sales]
+        if times != sorted(times) or (self._time_keys and times[0] < self._time_keys[-1]):
+            # Out-of-order backlog: fall back to per-sale insertion
+            for sale in sales:
+                self._index_sale(sale)
+            return
+        
+        self._sales_history.extend(sales)
+        self._sales_by_id.update((sale.sale_id, sale) for sale in sales)
+        self._revenue_cents += sum(totals)
+        self._time_keys.extend(times)
+        self._time_sales.extend(sales)
+        self._time_totals.extend(totals)
+        self._history_index.add_many(sales, totals, [sale.payment_method for sale in sales])
     
     def cancel_sale(self, sale: Sale):
         """
-        Cancel sale (restore stock)
+        Cancel sale (release its stock)
         
         Args:
             sale: Sale object
         """
-        for item in sale.items:
-            self.inventory_service.restore_stock(item.product.product_id, item.quantity)
+        self.inventory_service.reservations.release_all(sale)
     
     def get_sales_history(self) -> List[Sale]:
         """
@@ -92,3 +456,85 @@ class SaleService:
             List: List of sales history
         """
         return self.sales_history.copy()
+    
+    def get_sale(self, sale_id: str) -> Optional[Sale]:
+        """
+        Get completed sale by ID
+        
+        Args:
+            sale_id: Sale ID
+            
+        Returns:
+            Sale: Sale object, or None if not found
+        """
+        self.load_archive()
+        return self._sales_by_id.get(sale_id)
+    
+    def sales_between(self, start: datetime, end: datetime) -> List[Sale]:
+        """
+        Get completed sales whose transaction time is within [start, end]
+        
+        Args:
+            start: Range start (inclusive)
+            end: Range end (inclusive)
+            
+        Returns:
+            List: Sales in transaction time order
+        """
+        self.load_archive()
+        low = bisect_left(self._time_keys, start)
+        high = bisect_right(self._time_keys, end)
+        return self._time_sales[low:high]
+    
+    def estimate_daily_demand(self, days: int = 28,
+                              now: Optional[datetime] = None) -> Dict[str, float]:
+        """
+        Get the average units of each product sold per day over recent sales
+        (for InventoryService.load_daily_demand)
+        
+        Args:
+            days: Length of the window in days
+            now: End of the window (defaults to now)
+            
+        Returns:
+            dict: Units per day by product ID, for products sold in the window
+        """
+        now = now or datetime.now()
+        start = now - timedelta(days=days)
+        sales = self.sales_between(start, now)
+        if not sales:
+            return {}
+        # A younger history is averaged over its own length (at least a day)
+        start = max(start, self._time_keys[0])
+        elapsed_days = max((now - start).total_seconds() / 86400, 1.0)
+        quantities: Dict[str, int] = {}
+        for sale in sales:
+            for item in sale.items:
+                product_id = item.product_id
+                quantities[product_id] = quantities.get(product_id, 0) + item.quantity
+        return {product_id: quantity / elapsed_days for product_id, quantity in quantities.items()}
+    
+    def get_total_revenue(self) -> Money:
+        """
+        Get total amount of all completed sales (exact, O(1))
+        
+        Returns:
+            Money: Total revenue
+        """
+        return Money(self._revenue_cents)
+    
+    def revenue_between(self, start: datetime, end: datetime) -> Money:
+        """
+        Get total amount of completed sales within [start, end] (exact bulk sum)
+        
+        Args:
+            start: Range start (inclusive)
+            end: Range end (inclusive)
+            
+        Returns:
+            Money: Total revenue in the range
+        """
+        self.load_archive()
+        low = bisect_left(self._time_keys, start)
+        high = bisect_right(self._time_keys, end)
+        return Money.sum_cents(self._time_totals[low:high])
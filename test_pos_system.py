@@ -3,13 +3,36 @@ POS系统功能测试脚本
 用于验证核心功能是否正常工作
 """
 
+import copy
+import json
+import os
+import pickle
+import tempfile
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
 from domain.product import Product
 from domain.sale import Sale
 from domain.sale_item import SaleItem
 from domain.return_transaction import ReturnTransaction
+from domain.id_generator import SnowflakeIdGenerator, terminal_id_from_env
+from domain.money import Money
+from domain.transaction import Transaction
 from service.inventory_service import InventoryService
 from service.sale_service import SaleService
 from service.return_service import ReturnService
+from service.metrics import LatencyHistogram, OperationMetrics, metrics
+from service.reservations import ReservationBook
+from service.events import (EventBus, LowStock, ReturnCompleted, SaleCompleted, StockChanged,
+                            DROP_NEWEST, DROP_OLDEST, BLOCK)
+from service.reorder_index import ReorderIndex, urgency
+from persistence.transaction_journal import (TransactionJournal, FSYNC_NONE, replay_journal,
+                                             record_to_sale, sale_to_record)
+from persistence.product_store import SQLiteProductStore
+from persistence.catalog_file import MappedCatalogStore, compile_catalog
 
 
 def test_product():
@@ -124,6 +147,1586 @@ def test_return_service():
     print("[OK] ReturnService测试通过")
 
 
+def test_transaction_journal():
+    """测试TransactionJournal重放"""
+    print("测试TransactionJournal...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "transactions.journal")
+        
+        journal = TransactionJournal(path, fsync_policy=FSYNC_NONE)
+        inventory_service = InventoryService()
+        sale_service = SaleService(inventory_service, journal)
+        return_service = ReturnService(inventory_service, sale_service, journal)
+        
+        sale = sale_service.create_sale()
+        sale_service.add_item_to_sale(sale, "P001", 10)
+        sale_service.add_item_to_sale(sale, "P003", 2)
+        sale_service.complete_sale(sale, "Cash", 100.00)
+        return_transaction = return_service.create_return(sale.sale_id)
+        return_service.add_item_to_return(return_transaction, "P001", 4)
+        return_service.complete_return(return_transaction)
+        journal.close()
+        
+        # 模拟截断的尾部记录（崩溃时写了一半）
+        with open(path, "ab") as journal_file:
+            journal_file.write(b"\x10\x00")
+        
+        # 重启后重放
+        journal = TransactionJournal(path, fsync_policy=FSYNC_NONE)
+        inventory_service = InventoryService()
+        sale_service = SaleService(inventory_service, journal)
+        return_service = ReturnService(inventory_service, sale_service, journal)
+        assert replay_journal(journal, sale_service, return_service) == 2
+        assert journal.replay_failures == []
+        
+        # 截断记录之后追加的记录在下次重放时不会被它挡住
+        later = sale_service.create_sale()
+        assert sale_service.add_item_to_sale(later, "P003", 1)
+        assert sale_service.complete_sale(later, "Cash", 100)
+        journal.close()
+        journal = TransactionJournal(path, fsync_policy=FSYNC_NONE)
+        replayed_inventory = InventoryService()
+        replayed_sales = SaleService(replayed_inventory)
+        replayed_returns = ReturnService(replayed_inventory, replayed_sales)
+        assert replay_journal(journal, replayed_sales, replayed_returns) == 3
+        assert journal.replay_failures == []
+        
+        # 无法重新扣减库存的交易仍被恢复，但会被报告
+        replayed_inventory = InventoryService()
+        replayed_inventory.get_product("P003").stock = 0
+        replayed_sales = SaleService(replayed_inventory)
+        replayed_returns = ReturnService(replayed_inventory, replayed_sales)
+        assert replay_journal(journal, replayed_sales, replayed_returns) == 3
+        assert journal.replay_failures == [sale.sale_id, later.sale_id]
+        assert len(replayed_sales.get_sales_history()) == 2
+        journal.close()
+        
+        restored_sale = sale_service.get_sales_history()[0]
+        assert restored_sale.sale_id == sale.sale_id
+        assert restored_sale.get_total() == sale.get_total()
+        assert restored_sale.payment_method == "Cash"
+        assert return_service.get_return_history()[0].original_sale_id == sale.sale_id
+        assert inventory_service.get_product("P001").stock == 94  # 100 - 10 + 4
+        assert inventory_service.get_product("P003").stock == 47
+    
+    print("[OK] TransactionJournal测试通过")
+
+
+def test_snapshot_recovery():
+    """测试快照 + 日志尾部恢复与日志压缩"""
+    print("测试快照恢复...")
+    from persistence.snapshot import SnapshotManager, history_paths, recover
+    from persistence.transaction_journal import encode_record, read_framed
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "transactions.journal")
+        
+        def start():
+            journal = TransactionJournal(path, fsync_policy=FSYNC_NONE)
+            inventory_service = InventoryService()
+            sale_service = SaleService(inventory_service, journal)
+            return_service = ReturnService(inventory_service, sale_service, journal)
+            count = recover(journal, sale_service, return_service)
+            return journal, inventory_service, sale_service, return_service, count
+        
+        def sell(sale_service, quantity):
+            sale = sale_service.create_sale()
+            assert sale_service.add_item_to_sale(sale, "P001", quantity)
+            assert sale_service.complete_sale(sale, "Cash", 100)
+            return sale
+        
+        journal, inventory_service, sale_service, return_service, _ = start()
+        snapshots = SnapshotManager(journal)
+        first = sell(sale_service, 3)
+        sell(sale_service, 2)
+        assert snapshots.snapshot() == 1
+        return_transaction = return_service.create_return(first.sale_id)
+        return_service.add_item_to_return(return_transaction, "P001", 1)
+        return_service.complete_return(return_transaction)
+        assert snapshots.snapshot() == 2
+        
+        # 已被快照覆盖的日志段移为历史段，快照只含库存与计数
+        assert journal.segments() == [2]
+        assert [os.path.basename(path) for path in history_paths(journal, 2)] == \
+            ["transactions.journal.history.000000", "transactions.journal.history.000001"]
+        header = snapshots.read_header()
+        assert header["sales"] == 2 and header["returns"] == 1
+        assert header["revenue_cents"] == 2750 and header["refund_cents"] == 550
+        assert header["stock"] == {"P001": -4}
+        assert len(list(read_framed(path + ".snapshot"))) == 1
+        
+        # 快照之后的尾部记录（进行中的销售不计入）
+        sell(sale_service, 4)
+        open_sale = sale_service.create_sale()
+        assert sale_service.add_item_to_sale(open_sale, "P003", 5)
+        journal.close()
+        
+        journal, inventory_service, sale_service, return_service, count = start()
+        assert count == 1                                          # 只重放尾部
+        assert inventory_service.get_product("P001").stock == 92   # 100 - 3 - 2 + 1 - 4
+        assert inventory_service.get_product("P003").stock == 50
+        # 历史在首次使用时才解码；计数来自快照
+        assert sale_service._archive is not None and return_service._archive is not None
+        assert sale_service.get_total_revenue() == Money(4950)
+        assert return_service.get_total_refunds() == Money(550)
+        assert return_service.get_returnable_quantity(first.sale_id, "P001") == 2
+        assert len(sale_service.get_sales_history()) == 3
+        assert sale_service.get_sales_history()[0].sale_id == first.sale_id
+        assert sale_service.get_sale(first.sale_id).get_total() == first.get_total()
+        assert sale_service.get_total_revenue() == Money(4950)
+        assert len(return_service.get_return_history()) == 1
+        assert len(sale_service.history_index) == 3 and len(return_service.history_index) == 1
+        assert return_service.get_total_refunds() == Money(550)
+        
+        # 快照中的未知商品计入重放失败
+        snapshots = SnapshotManager(journal)
+        assert snapshots.snapshot() == 4
+        journal.close()
+        header = snapshots.read_header()
+        header["stock"]["P404"] = -1
+        with open(path + ".snapshot", "wb") as snapshot_file:
+            snapshot_file.write(encode_record(header))
+        journal, inventory_service, sale_service, return_service, count = start()
+        assert count == 0 and journal.replay_failures == ["snapshot:P404"]
+        assert inventory_service.get_product("P001").stock == 92
+        assert len(sale_service.get_sales_history()) == 3
+        journal.close()
+    
+    print("[OK] 快照恢复测试通过")
+
+
+def test_sale_indexes():
+    """测试SaleService的ID索引和时间索引"""
+    print("测试SaleService索引...")
+    inventory_service = InventoryService()
+    sale_service = SaleService(inventory_service)
+    return_service = ReturnService(inventory_service, sale_service)
+    
+    base_time = datetime(2025, 1, 1, 9, 0, 0)
+    for hour in (3, 1, 2, 0):
+        sale = Sale(f"SALE-H{hour}")
+        sale.transaction_time = base_time + timedelta(hours=hour)
+        sale.add_item(SaleItem(inventory_service.get_product("P002"), 1))
+        assert sale_service.complete_sale(sale, "Cash", 10.00) == True
+    
+    assert sale_service.get_sale("SALE-H2").sale_id == "SALE-H2"
+    assert sale_service.get_sale("SALE-UNKNOWN") is None
+    assert return_service.find_sale_by_id("SALE-H3").sale_id == "SALE-H3"
+    
+    in_range = sale_service.sales_between(base_time + timedelta(hours=1),
+                                          base_time + timedelta(hours=2))
+    assert [sale.sale_id for sale in in_range] == ["SALE-H1", "SALE-H2"]
+    assert len(sale_service.sales_between(base_time, base_time + timedelta(days=1))) == 4
+    
+    print("[OK] SaleService索引测试通过")
+
+
+def test_id_generator():
+    """测试Snowflake ID生成器"""
+    print("测试SnowflakeIdGenerator...")
+    generator = SnowflakeIdGenerator(terminal_id=7)
+    results = []
+    
+    def worker():
+        results.append([generator.next_id() for _ in range(20000)])
+    
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    all_ids = [value for ids in results for value in ids]
+    assert len(set(all_ids)) == len(all_ids)
+    # 每个线程内ID严格递增，且包含终端ID
+    for ids in results:
+        assert ids == sorted(ids)
+    assert (all_ids[0] >> SnowflakeIdGenerator.SEQUENCE_BITS) & 0x3FF == 7
+    batch = generator.next_ids(10000)
+    assert batch == sorted(set(batch)) and batch[0] > max(all_ids)
+    assert generator.next_id() > batch[-1]
+    sale_id = generator.generate("SALE")
+    assert sale_id == f"SALE-{int(sale_id[5:]):019d}" and int(sale_id[5:]) > batch[-1]
+    
+    # 终端ID可由环境变量设置
+    os.environ["POS_TERMINAL_ID"] = "12"
+    try:
+        assert terminal_id_from_env() == 12
+        os.environ["POS_TERMINAL_ID"] = "1024"
+        try:
+            terminal_id_from_env()
+            assert False, "terminal ID out of range"
+        except ValueError:
+            pass
+    finally:
+        del os.environ["POS_TERMINAL_ID"]
+    assert terminal_id_from_env() == 0
+    
+    # 同一秒内创建的交易ID不再冲突，且保留前缀
+    sales = [Sale() for _ in range(1000)]
+    assert len({sale.sale_id for sale in sales}) == 1000
+    assert all(sale.sale_id.startswith("SALE-") for sale in sales)
+    assert [sale.sale_id for sale in sales] == sorted(sale.sale_id for sale in sales)
+    assert ReturnTransaction().return_id.startswith("RET-")
+    
+    print("[OK] SnowflakeIdGenerator测试通过")
+
+
+def _hammer_inventory(inventory_service, product_ids, threads=32, operations=2000):
+    """32个线程并发抢购同一批SKU，返回 (已售数量, 每秒操作数, 观察到的最小库存)"""
+    sold = [0] * threads
+    lowest = [0] * threads
+    
+    def worker(index):
+        rng = random.Random(index)
+        lowest[index] = min(p.stock for p in inventory_service.get_all_products())
+        for _ in range(operations):
+            if rng.random() < 0.5:
+                product_id = rng.choice(product_ids)
+                if inventory_service.try_reserve(product_id, 1):
+                    sold[index] += 1
+            else:
+                items = [(rng.choice(product_ids), 1) for _ in range(3)]
+                if inventory_service.reserve_many(items):
+                    sold[index] += 3
+            lowest[index] = min(lowest[index],
+                                min(inventory_service.get_product(p).stock for p in product_ids))
+    
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return sum(sold), threads * operations / elapsed, min(lowest)
+
+
+def test_concurrent_inventory():
+    """测试多终端并发库存（分段锁 vs 全局锁）"""
+    print("测试并发InventoryService...")
+    product_ids = ["P001", "P002", "P003"]
+    for stripes, label in ((64, "分段锁"), (1, "全局锁")):
+        inventory_service = InventoryService(concurrent=True, lock_stripes=stripes)
+        initial = sum(inventory_service.get_product(p).stock for p in product_ids)
+        sold, throughput, lowest = _hammer_inventory(inventory_service, product_ids)
+        final = sum(inventory_service.get_product(p).stock for p in product_ids)
+        
+        # 库存从不为负，且没有超卖
+        assert lowest >= 0
+        assert all(inventory_service.get_product(p).stock >= 0 for p in product_ids)
+        assert sold == initial - final
+        print(f"  {label}({stripes}): {throughput:,.0f} ops/s")
+    
+    # reserve_many 全部成功或全部失败
+    inventory_service = InventoryService(concurrent=True)
+    assert inventory_service.reserve_many([("P005", 40), ("P004", 61)]) == False
+    assert inventory_service.get_product("P005").stock == 40
+    assert inventory_service.reserve_many([("P005", 40), ("P004", 60)]) == True
+    assert inventory_service.get_product("P004").stock == 0
+    
+    # 非正数量被拒绝，不会反向增加库存
+    assert inventory_service.reserve_many([("P001", 1), ("P004", -5)]) == False
+    assert inventory_service.reserve_product("P004", -5) is None
+    assert inventory_service.reserve_batch([{"P004": -5}, {"P001": 0}, {"P001": 1}]) == \
+        [False, False, True]
+    assert inventory_service.get_product("P004").stock == 0
+    assert inventory_service.get_product("P001").stock == 99
+    
+    print("[OK] 并发InventoryService测试通过")
+
+
+def test_running_totals():
+    """测试增量维护的交易合计"""
+    print("测试增量合计...")
+    Transaction.verify_totals = True
+    try:
+        inventory_service = InventoryService()
+        sale_service = SaleService(inventory_service)
+        sale = sale_service.create_sale()
+        
+        rng = random.Random(42)
+        product_ids = ["P001", "P002", "P003", "P004", "P005"]
+        for _ in range(200):
+            action = rng.random()
+            if action < 0.6 or not sale.items:
+                sale_service.add_item_to_sale(sale, rng.choice(product_ids), rng.randint(1, 2))
+            elif action < 0.8:
+                sale_service.remove_item_from_sale(sale, rng.choice(sale.items))
+            else:
+                sale_service.update_item_quantity(sale, rng.choice(sale.items), rng.randint(1, 3))
+            sale.get_total()  # 一致性检查模式下与全量重算比对
+        
+        expected = {}
+        for item in sale.items:
+            expected[item.product_id] = expected.get(item.product_id, 0) + item.quantity
+        for product_id in product_ids:
+            assert sale.get_quantity(product_id) == expected.get(product_id, 0)
+            # 库存 + 购物车数量 = 初始库存
+            initial = InventoryService().get_product(product_id).stock
+            assert inventory_service.get_product(product_id).stock + sale.get_quantity(product_id) == initial
+        assert sale.get_total_quantity() == sum(expected.values())
+    finally:
+        Transaction.verify_totals = False
+    
+    print("[OK] 增量合计测试通过")
+
+
+def test_money():
+    """测试整数分存储的Money类型"""
+    print("测试Money...")
+    assert Money.of(5.50).cents == 550
+    assert Money.of("0.10") == 0.1
+    # 相等的值哈希也相等（可作字典键），且不可修改
+    assert hash(Money.of("0.10")) == hash(0.1) and hash(Money(500)) == hash(5)
+    assert {0.1: "a", 4.99: "b"}[Money(10)] == "a" and Money(499) in {4.99}
+    assert Money(10) != Decimal("0.1") and Money(10) < Decimal("0.2")
+    try:
+        Money(10).cents = 20
+        assert False, "Money must be immutable"
+    except AttributeError:
+        pass
+    assert copy.deepcopy(Money(10)) == Money(10)
+    assert pickle.loads(pickle.dumps(Money(-25))) == Money(-25)
+    assert Money.of(27.505) == Money(2751)  # 四舍五入到分
+    assert Money.of(0.1) * 3 == Money.of(0.3)  # 浮点数下 0.1 * 3 != 0.3
+    assert f"{Money.of(12):.2f}" == "12.00"
+    assert str(Money(-150)) == "-1.50"
+    assert 30.0 - Money.of(27.5) == 2.50
+    assert Money.of(27.5) < 30 and Money.of(27.5) > 27.49
+    
+    # 大量明细汇总保持精确
+    amounts = [Money.of(0.1)] * 100000
+    assert Money.sum(amounts) == 10000
+    assert sum(amounts) == Money.sum(amounts)
+    assert sum(0.1 for _ in range(100000)) != 10000
+    
+    # 服务层的历史合计
+    inventory_service = InventoryService()
+    sale_service = SaleService(inventory_service)
+    return_service = ReturnService(inventory_service, sale_service)
+    for _ in range(3):
+        sale = sale_service.create_sale()
+        sale_service.add_item_to_sale(sale, "P002", 3)  # 3.80 * 3
+        assert sale_service.complete_sale(sale, "Cash", "11.40") == True
+        assert sale.get_change() == 0
+    assert sale_service.get_total_revenue() == Money.of("34.20")
+    assert sale_service.revenue_between(datetime.min, datetime.max) == Money.of("34.20")
+    return_transaction = return_service.create_return(sale.sale_id)
+    return_service.add_item_to_return(return_transaction, "P002", 1)
+    return_service.complete_return(return_transaction)
+    assert return_service.get_total_refunds() == 3.80
+    
+    print("[OK] Money测试通过")
+
+
+def test_sqlite_product_store():
+    """测试SQLite商品存储（连接池、热点缓存、按销售批量写库存）"""
+    print("测试SQLiteProductStore...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "catalog.db")
+        store = SQLiteProductStore(path, pool_size=2, cache_size=8)
+        store.add_many(Product(f"S{i:05d}", f"Item {i}", "1.25", 10) for i in range(100))
+        inventory_service = InventoryService(store=store)
+        sale_service = SaleService(inventory_service)
+        
+        assert len(inventory_service.products) == 100
+        assert inventory_service.get_product("S00042").price == 1.25
+        assert inventory_service.get_product("S00042") is inventory_service.get_product("S00042")
+        assert inventory_service.get_product("MISSING") is None
+        
+        sale = sale_service.create_sale()
+        assert sale_service.add_item_to_sale(sale, "S00001", 4) == True
+        assert sale_service.add_item_to_sale(sale, "S00002", 11) == False
+        assert sale_service.complete_sale(sale, "Cash", 5) == True
+        
+        # 扫过大量商品使缓存淘汰：未保存的预留不被淘汰也不写库，
+        # 仍被引用的商品不会被重新加载成第二个对象
+        assert inventory_service.try_reserve("S00003", 2) == True
+        in_use = inventory_service.get_product("S00005")
+        for i in range(10, 60):
+            inventory_service.get_product(f"S{i:05d}")
+        assert inventory_service.get_product("S00003").stock == 8
+        assert inventory_service.get_product("S00005") is in_use
+        assert inventory_service.update_stock("S00005", 1)
+        assert in_use.stock == 9
+        inventory_service.restore_stock("S00004", 5)
+        
+        # 两个购物车同时持有库存：完成其中一个只写入它售出的数量
+        cart_a = sale_service.create_sale()
+        cart_b = sale_service.create_sale()
+        assert sale_service.add_item_to_sale(cart_a, "S00006", 5)
+        assert sale_service.add_item_to_sale(cart_b, "S00006", 3)
+        assert sale_service.complete_sale(cart_b, "Cash", 10)
+        assert inventory_service.get_stock_levels("S00006") == (7, 2)
+        store.close()
+        
+        # 重启后库存仍在
+        store = SQLiteProductStore(path)
+        inventory_service = InventoryService(store=store)
+        assert inventory_service.get_product("S00001").stock == 6
+        assert inventory_service.get_product("S00002").stock == 10
+        assert inventory_service.get_product("S00004").stock == 15
+        assert inventory_service.get_product("S00003").stock == 10
+        assert inventory_service.get_product("S00005").stock == 9
+        assert inventory_service.get_product("S00006").stock == 7
+        assert len(inventory_service.get_all_products()) == 100
+        store.close()
+    
+    print("[OK] SQLiteProductStore测试通过")
+
+
+def test_mapped_catalog():
+    """测试内存映射商品目录（按需解码）"""
+    print("测试MappedCatalogStore...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, "products.csv")
+        catalog_path = os.path.join(tmp_dir, "catalog.bin")
+        with open(csv_path, "w", encoding="utf-8") as csv_file:
+            csv_file.write("product_id,name,price,stock\n")
+            for i in reversed(range(500)):
+                csv_file.write(f"C{i:04d},商品{i},{i % 7}.99,{i}\n")
+        assert compile_catalog(csv_path, catalog_path) == 500
+        
+        store = MappedCatalogStore(catalog_path)
+        inventory_service = InventoryService(store=store)
+        assert store.decoded_count() == 0
+        product = inventory_service.get_product("C0123")
+        assert product.name == "商品123" and product.price == 4.99 and product.stock == 123
+        assert inventory_service.get_product("C0123") is product
+        assert inventory_service.get_product("C9999") is None
+        assert store.decoded_count() == 1
+        assert len(inventory_service.products) == 500
+        
+        sale_service = SaleService(inventory_service)
+        sale = sale_service.create_sale()
+        assert sale_service.add_item_to_sale(sale, "C0010", 3) == True
+        assert sale_service.complete_sale(sale, "Cash", 100) == True
+        assert inventory_service.get_product("C0010").stock == 7
+        
+        inventory_service.add_product(Product("NEW1", "New", 1, 5))
+        assert len(inventory_service.get_all_products()) == 501
+        store.close()
+    
+    print("[OK] MappedCatalogStore测试通过")
+
+
+def test_bulk_import_and_restock():
+    """测试流式批量导入与批量补货"""
+    print("测试批量导入...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, "products.csv")
+        with open(csv_path, "w", encoding="utf-8") as csv_file:
+            csv_file.write("product_id,name,price,stock\n")
+            for i in range(25):
+                csv_file.write(f"B{i:03d},商品{i},{i}.25,{i}\n")
+            csv_file.write("B900,坏价格,abc,1\n")
+            csv_file.write("B901,负库存,1.00,-5\n")
+            csv_file.write(",无编号,1.00,1\n")
+        
+        inventory_service = InventoryService()
+        result = inventory_service.import_products(csv_path, chunk_size=10)
+        assert result.succeeded == 25
+        assert [row for row, _ in result.errors] == [26, 27, 28]
+        assert inventory_service.get_product("B007").price == Money(725)
+        assert inventory_service.get_product("B900") is None
+        
+        jsonl_path = os.path.join(tmp_dir, "products.jsonl")
+        with open(jsonl_path, "w", encoding="utf-8") as jsonl_file:
+            jsonl_file.write('{"product_id": "J1", "name": "Juice", "price": "4.50", "stock": 3}\n')
+            jsonl_file.write('{"product_id": "J2", "name": "Jam"\n')
+            jsonl_file.write('{"product_id": "J3", "price": "1"}\n')
+            jsonl_file.write('{"product_id": 4004, "name": 7, "price": 2, "stock": 1}\n')
+            jsonl_file.write('{"product_id": null, "name": "Nothing", "price": 2}\n')
+        result = inventory_service.import_products(jsonl_path)
+        assert result.succeeded == 2 and len(result.errors) == 3
+        assert result.errors[1] == (3, "Missing field: name")
+        assert result.errors[2] == (5, "Empty product_id")
+        assert inventory_service.get_product("4004").name == "7"
+        
+        print("测试批量补货...")
+        result = inventory_service.bulk_restock([("J1", 2), ("P001", 5), ("J1", 1),
+                                                 ("NOPE", 1), ("P002", 0),
+                                                 {"product_id": "P003", "quantity": "x"}])
+        assert result.succeeded == 3
+        assert [row for row, _ in result.errors] == [4, 5, 6]
+        assert inventory_service.get_product("J1").stock == 6
+        assert inventory_service.get_product("P001").stock == 105
+        assert inventory_service.get_product("P002").stock == 80
+    
+    print("[OK] 批量导入与补货测试通过")
+
+
+def test_sales_analytics():
+    """测试列式销售分析"""
+    print("测试SalesAnalytics...")
+    from service.analytics_service import SalesAnalytics
+    inventory_service = InventoryService()
+    sale_service = SaleService(inventory_service)
+    analytics = SalesAnalytics(sale_service)
+    assert analytics.revenue_by_day() == {} and analytics.payment_mix() == {}
+    
+    baskets = [
+        (datetime(2025, 3, 1, 9, 15), [("P001", 2), ("P003", 1)], "Cash"),     # 23.00
+        (datetime(2025, 3, 1, 9, 45), [("P002", 1)], "Card"),                  # 3.80
+        (datetime(2025, 3, 1, 14, 5), [("P001", 1), ("P005", 2)], "Cash"),     # 35.50
+        (datetime(2025, 3, 2, 10, 0), [("P003", 3)], "Card"),                  # 36.00
+    ]
+    for sale_time, items, payment_method in baskets[:2]:
+        sale = sale_service.create_sale()
+        sale.transaction_time = sale_time
+        for product_id, quantity in items:
+            assert sale_service.add_item_to_sale(sale, product_id, quantity)
+        assert sale_service.complete_sale(sale, payment_method, 100)
+    assert analytics.payment_mix() == {"Cash": (1, Money(2300)), "Card": (1, Money(380))}
+    
+    # 新完成的销售在下次查询时增量追加
+    for sale_time, items, payment_method in baskets[2:]:
+        sale = sale_service.create_sale()
+        sale.transaction_time = sale_time
+        for product_id, quantity in items:
+            assert sale_service.add_item_to_sale(sale, product_id, quantity)
+        assert sale_service.complete_sale(sale, payment_method, 100)
+    
+    assert analytics.revenue_by_hour() == {
+        datetime(2025, 3, 1, 9): Money(2680),
+        datetime(2025, 3, 1, 14): Money(3550),
+        datetime(2025, 3, 2, 10): Money(3600),
+    }
+    assert analytics.revenue_by_day() == {
+        datetime(2025, 3, 1): Money(6230),
+        datetime(2025, 3, 2): Money(3600),
+    }
+    assert sum(analytics.revenue_by_day().values(), Money(0)) == sale_service.get_total_revenue()
+    assert analytics.top_products(2) == [("P003", 4, Money(4800)), ("P005", 2, Money(3000))]
+    assert analytics.top_products(1, by="quantity")[0][:2] == ("P003", 4)
+    assert analytics.basket_size_distribution() == {1: 1, 3: 3}
+    assert analytics.payment_mix() == {"Cash": (2, Money(5850)), "Card": (2, Money(3980))}
+    
+    print("[OK] SalesAnalytics测试通过")
+
+
+class _FakeTree:
+    """只实现 Treeview 条目接口的内存树，记录操作次数（无需显示器）"""
+    
+    def __init__(self):
+        self.children = []
+        self.values = {}
+        self.operations = []
+        self.idle_callbacks = []
+    
+    def insert(self, parent, index, iid=None, values=()):
+        self.operations.append(("insert", iid))
+        self.children.insert(index, iid)
+        self.values[iid] = values
+    
+    def delete(self, iid):
+        self.operations.append(("delete", iid))
+        self.children.remove(iid)
+        del self.values[iid]
+    
+    def item(self, iid, values=()):
+        self.operations.append(("item", iid))
+        self.values[iid] = values
+    
+    def move(self, iid, parent, index):
+        self.operations.append(("move", iid))
+        self.children.remove(iid)
+        self.children.insert(index, iid)
+    
+    def after_idle(self, callback):
+        self.idle_callbacks.append(callback)
+    
+    def winfo_exists(self):
+        return True
+    
+    def run_idle(self):
+        callbacks, self.idle_callbacks = self.idle_callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+def test_treeview_sync():
+    """测试按行键增量同步 Treeview"""
+    print("测试TreeviewSync...")
+    from ui.tree_sync import TreeviewSync
+    tree = _FakeTree()
+    rows = [("a", ("Apple", 1)), ("b", ("Banana", 2))]
+    sync = TreeviewSync(tree, lambda: rows)
+    
+    # 同一空闲周期内的多次刷新请求只执行一次
+    sync.schedule()
+    sync.schedule()
+    sync.schedule()
+    assert len(tree.idle_callbacks) == 1
+    tree.run_idle()
+    assert tree.children == ["a", "b"] and len(tree.operations) == 2
+    
+    # 只更新变化的行
+    tree.operations.clear()
+    rows[1] = ("b", ("Banana", 3))
+    rows.append(("c", ("Cherry", 1)))
+    sync.refresh()
+    assert tree.operations == [("item", "b"), ("insert", "c")]
+    assert tree.values["b"] == ("Banana", 3)
+    
+    tree.operations.clear()
+    sync.refresh()
+    assert tree.operations == []
+    
+    # 删除和重新排序
+    del rows[0]
+    rows.reverse()
+    sync.refresh()
+    assert tree.children == ["c", "b"] and "a" not in tree.values
+    assert ("delete", "a") in tree.operations
+    
+    print("[OK] TreeviewSync测试通过")
+
+
+def test_history_index():
+    """测试历史记录索引（分页、筛选、排序）"""
+    print("测试HistoryIndex...")
+    from service.history_index import SORT_BY_AMOUNT, SORT_BY_PAYMENT
+    from ui.virtual_list import PageLoader
+    inventory_service = InventoryService()
+    sale_service = SaleService(inventory_service)
+    index = sale_service.history_index
+    
+    base = datetime(2025, 5, 1, 10, 0)
+    methods = ["Cash", "Card", "Mobile"]
+    for i in range(30):
+        sale = sale_service.create_sale()
+        sale.transaction_time = base + timedelta(hours=i)
+        assert sale_service.add_item_to_sale(sale, "P001", i % 5 + 1)
+        assert sale_service.complete_sale(sale, methods[i % 3], 100)
+    assert len(index) == 30
+    
+    # 默认：最新的在前，不需要物化
+    rows = index.query()
+    assert isinstance(rows, range) and len(rows) == 30 and rows[0] == 29
+    
+    rows = index.query(start=base + timedelta(hours=5), end=base + timedelta(hours=9),
+                       descending=False)
+    assert list(rows) == [5, 6, 7, 8, 9]
+    rows = index.query(payment_method="Card", start=base, end=base + timedelta(hours=10))
+    assert list(rows) == [10, 7, 4, 1]
+    assert list(index.query(payment_method="Cheque")) == []
+    
+    rows = index.query(sort_by=SORT_BY_AMOUNT, min_amount=Money(1500), descending=False)
+    amounts = [index.records[position].get_total().cents for position in rows]
+    assert amounts == sorted(amounts) and min(amounts) >= 1500 and len(amounts) == 18
+    assert index.amount_order_ready()
+    
+    # 排序索引在新增销售后增量维护
+    sale = sale_service.create_sale()
+    sale.transaction_time = base - timedelta(days=1)   # 迟到的记录
+    assert sale_service.add_item_to_sale(sale, "P005", 6)
+    assert sale_service.complete_sale(sale, "Cash", 100)
+    assert index.query(sort_by=SORT_BY_AMOUNT)[0] == 30
+    assert index.query(descending=False)[0] == 30
+    groups = [index.records[position].payment_method
+              for position in index.query(sort_by=SORT_BY_PAYMENT, descending=False)]
+    assert groups == sorted(groups)
+
+    # 迟到的记录之后，时间顺序与列筛选仍然正确（有无NumPy结果一致）
+    import service.history_index as history_module
+    times = [index.records[position].transaction_time for position in index.query(descending=False)]
+    assert times == sorted(times) and len(times) == 31
+    numpy_module = history_module.np
+    by_time = list(index.query(descending=False))
+    def expected(keep):
+        return [position for position in by_time if keep(index.records[position])]
+    for module in ([numpy_module, None] if numpy_module is not None else [None]):
+        history_module.np = module
+        rows = index.query(payment_method="Cash", min_amount=Money(1000), descending=False)
+        assert list(rows) == expected(lambda record: record.payment_method == "Cash"
+                                      and record.get_total().cents >= 1000)
+        assert rows[0] == 30
+        rows = index.query(end=base + timedelta(hours=3), max_amount=Money(1500))
+        assert list(rows) == expected(lambda record: record.transaction_time <= base + timedelta(hours=3)
+                                      and record.get_total().cents <= 1500)[::-1]
+        assert len(rows) >= 2
+    history_module.np = numpy_module
+
+    # 后台线程格式化当前页及预取窗口
+    loader = PageLoader(lambda position: (index.records[position].sale_id,),
+                        page_size=5, prefetch=3)
+    rows = index.query()
+    loader.request(rows, 10)
+    deadline = time.time() + 5
+    while loader.busy() and time.time() < deadline:
+        loader.collect()
+        time.sleep(0.001)
+    assert all(loader.get(position) for position in rows[7:18])
+    assert loader.get(rows[0]) is None
+    loader.close()
+    
+    # 新请求取代正在执行的请求时，旧请求未交付的行重新排队
+    started, gate = threading.Event(), threading.Event()
+    def slow_format(position):
+        started.set()
+        gate.wait(5)
+        return (position,)
+    loader = PageLoader(slow_format, page_size=5, prefetch=10)
+    loader.request(range(100), 0)
+    assert started.wait(5)
+    loader.request(range(100), 12)
+    gate.set()
+    deadline = time.time() + 5
+    while loader.busy() and time.time() < deadline:
+        loader.collect()
+        time.sleep(0.001)
+    loader.collect()
+    assert all(loader.get(position) == (position,) for position in range(12, 17))
+    loader.close()
+    
+    print("[OK] HistoryIndex测试通过")
+
+
+def test_http_api():
+    """测试 HTTP API（keep-alive 与流水线请求）"""
+    print("测试HTTP API...")
+    import asyncio
+    import json
+    from api.http_server import POSServer
+    inventory_service = InventoryService()
+    sale_service = SaleService(inventory_service)
+    return_service = ReturnService(inventory_service, sale_service)
+    server = POSServer(sale_service, return_service, inventory_service)
+    
+    status, product = server.handle("GET", "/products/P003")
+    assert status == 200 and product["price"] == "12.00" and product["stock"] == 50
+    assert server.handle("GET", "/products/NOPE")[0] == 404
+    assert server.handle("DELETE", "/sales")[0] == 405
+    assert server.handle("POST", "/sales/x/items", b"{bad")[0] == 400
+    
+    def request(method, path, body=None):
+        payload = b"" if body is None else json.dumps(body).encode("utf-8")
+        return (f"{method} {path} HTTP/1.1\r\nContent-Length: {len(payload)}\r\n\r\n"
+                .encode("latin-1") + payload)
+    
+    async def read_response(reader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+        return int(head[9:12]), json.loads(await reader.readexactly(length))
+    
+    async def client():
+        http_server = await server.serve("127.0.0.1", 0)
+        port = http_server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        
+        writer.write(request("POST", "/sales"))
+        status, sale = await read_response(reader)
+        assert status == 200 and sale["completed"] is False
+        path = f"/sales/{sale['sale_id']}"
+        
+        # 同一连接上流水线发送三个请求，按顺序返回
+        writer.write(request("POST", path + "/items", {"product_id": "P001", "quantity": 2})
+                     + request("POST", path + "/items", {"product_id": "P002", "quantity": 500})
+                     + request("POST", path + "/complete",
+                               {"payment_method": "Cash", "payment_amount": "20"}))
+        responses = [await read_response(reader) for _ in range(3)]
+        assert [status for status, _ in responses] == [200, 409, 200]
+        assert responses[2][1]["total"] == "11.00" and responses[2][1]["change"] == "9.00"
+        
+        writer.write(request("POST", "/returns", {"original_sale_id": sale["sale_id"]}))
+        status, return_json = await read_response(reader)
+        return_path = f"/returns/{return_json['return_id']}"
+        writer.write(request("POST", return_path + "/items", {"product_id": "P001", "quantity": 1})
+                     + request("POST", return_path + "/complete"))
+        responses = [await read_response(reader) for _ in range(2)]
+        assert responses[1][0] == 200 and responses[1][1]["refund"] == "5.50"
+        writer.close()
+        
+        # 负的Content-Length与分块传输编码被拒绝并关闭连接
+        for head, status in ((b"Content-Length: -5", 400), (b"Transfer-Encoding: chunked", 501)):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /sales HTTP/1.1\r\n" + head + b"\r\n\r\n0\r\n\r\n")
+            response = await read_response(reader)
+            assert response[0] == status
+            assert await reader.read() == b""
+            writer.close()
+        http_server.close()
+        await http_server.wait_closed()
+    
+    asyncio.run(client())
+    assert sale_service.get_total_revenue() == Money(1100)
+    assert inventory_service.get_product("P001").stock == 99
+    assert server.open_sales == {} and server.open_returns == {}
+    
+    # 服务运行时在事件循环上释放过期的预留，并丢弃闲置的销售与退货
+    inventory_service = InventoryService(hold_seconds=0.05)
+    sale_service = SaleService(inventory_service)
+    return_service = ReturnService(inventory_service, sale_service)
+    server = POSServer(sale_service, return_service, inventory_service, sweep_seconds=0.01)
+    
+    async def abandon():
+        http_server = await server.serve("127.0.0.1", 0)
+        sale_id = server.handle("POST", "/sales")[1]["sale_id"]
+        body = json.dumps({"product_id": "P003", "quantity": 5}).encode("utf-8")
+        assert server.handle("POST", f"/sales/{sale_id}/items", body)[0] == 200
+        assert inventory_service.get_product("P003").stock == 45
+        server.handle("POST", "/returns")
+        assert len(server.open_sales) == 1 and len(server.open_returns) == 1
+        await asyncio.sleep(0.2)
+        http_server.close()
+        await http_server.wait_closed()
+    
+    asyncio.run(abandon())
+    assert inventory_service.get_product("P003").stock == 50
+    assert inventory_service.reservations.stats()["expired"] == 1
+    assert server.open_sales == {} and server.open_returns == {}
+    
+    # 未运行清理时，新开销售也会丢弃闲置的销售并释放其库存
+    server = POSServer(sale_service, return_service, inventory_service, idle_seconds=0)
+    sale_id = server.handle("POST", "/sales")[1]["sale_id"]
+    body = json.dumps({"product_id": "P003", "quantity": 5}).encode("utf-8")
+    assert server.handle("POST", f"/sales/{sale_id}/items", body)[0] == 200
+    server.handle("POST", "/sales")
+    assert sale_id not in server.open_sales and len(server.open_sales) == 1
+    assert server.handle("POST", f"/sales/{sale_id}/items", body)[0] == 404
+    assert inventory_service.get_product("P003").stock == 50
+    
+    print("[OK] HTTP API测试通过")
+
+
+def test_sales_batch():
+    """测试批量结账"""
+    print("测试批量结账...")
+    inventory_service = InventoryService()
+    sale_service = SaleService(inventory_service)
+    inventory_service.get_product("P005").stock = 5
+    
+    results = sale_service.complete_sales_batch([
+        {"items": [("P001", 2), ("P003", 1)], "payment_method": "Cash", "payment_amount": 50},
+        {"items": [("P005", 4)], "payment_method": "Card", "payment_amount": "60.00"},
+        {"items": [("P005", 2)], "payment_method": "Card", "payment_amount": 100},  # 库存不足
+        {"items": [("P002", 1)], "payment_method": "Cash", "payment_amount": 1},    # 金额不足
+        {"items": [("P999", 1)], "payment_method": "Cash", "payment_amount": 10},   # 商品不存在
+        {"items": [("P001", 0)], "payment_method": "Cash", "payment_amount": 10},   # 数量无效
+        {"payment_method": "Cash", "payment_amount": 10},                           # 缺少字段
+    ])
+    assert [result.success for result in results] == [True, True, False, False, False, False, False]
+    assert results[2].error == "Insufficient stock"
+    assert results[3].error == "Insufficient payment amount"
+    assert "P999" in results[4].error
+    assert results[6].error == "Missing field: items"
+    
+    first = results[0].sale
+    assert first.is_completed and first.get_total() == Money(2300)
+    assert first.get_change() == Money(2700)
+    assert results[1].sale.sale_id != first.sale_id
+    
+    # 库存、营业额与历史索引一并更新
+    assert inventory_service.get_product("P001").stock == 98
+    assert inventory_service.get_product("P005").stock == 1
+    assert inventory_service.get_product("P002").stock == 80
+    assert sale_service.get_total_revenue() == Money(8300)
+    assert sale_service.get_sale(first.sale_id) is first
+    assert len(sale_service.history_index) == 2
+    assert sale_service.history_index.payment_methods() == ["Card", "Cash"]
+    
+    # 格式错误的订单只影响自身，且在扣库存之前被拒绝
+    results = sale_service.complete_sales_batch([
+        {"items": [("P001",)], "payment_method": "Cash", "payment_amount": 10},
+        {"items": [(["P001"], 1)], "payment_method": "Cash", "payment_amount": 10},
+        {"items": [("P001", 1)], "payment_amount": 10},
+        {"items": [("P001", 1)], "payment_method": None, "payment_amount": 10},
+        {"items": [("P001", 1)], "payment_method": "Cash", "payment_amount": 10,
+         "time": "2025-05-01"},
+        "P001",
+        {"items": [("P001", 1)], "payment_method": "Cash", "payment_amount": 10},
+    ])
+    assert [result.success for result in results] == [False] * 6 + [True]
+    assert results[2].error == "Missing field: payment_method"
+    assert "time" in results[4].error
+    assert inventory_service.get_product("P001").stock == 97
+    assert len(sale_service.history_index) == 3
+    
+    print("[OK] 批量结账测试通过")
+
+
+def test_benchmark_suite():
+    """测试基准测试套件（JSON 输出与回归比较）"""
+    print("测试基准测试套件...")
+    from benchmarks.suite import compare_results, run_suite
+    
+    results = run_suite(scales=[200], repeat=1)
+    results = json.loads(json.dumps(results))   # 可序列化为 JSON
+    metrics = results["metrics"]
+    for name in ("checkout", "return", "product_lookup", "history_list", "sale_total"):
+        assert metrics[f"{name}@200"]["value"] > 0
+    assert metrics["checkout@200"]["unit"] == "us/op"
+    
+    # 与基线比较：只报告超过阈值的退化
+    baseline = {"metrics": {"checkout@200": {"value": 10.0, "unit": "us/op"},
+                            "return@200": {"value": 10.0, "unit": "us/op"},
+                            "only_in_baseline@1": {"value": 1.0, "unit": "ms"}}}
+    current = {"metrics": {"checkout@200": {"value": 14.0, "unit": "us/op"},
+                           "return@200": {"value": 11.0, "unit": "us/op"},
+                           "only_in_current@1": {"value": 5.0, "unit": "ms"}}}
+    regressions = compare_results(baseline, current, threshold=0.25)
+    assert [name for name, _, _, _ in regressions] == ["checkout@200"]
+    assert abs(regressions[0][3] - 0.4) < 1e-9
+    assert compare_results(baseline, current, threshold=0.5) == []
+    
+    print("[OK] 基准测试套件测试通过")
+
+
+def test_operation_metrics():
+    """测试操作指标（计数、失败数与延迟直方图）"""
+    print("测试操作指标...")
+    histogram = LatencyHistogram()
+    for value in range(1, 100_001):
+        histogram.record(value * 1000)
+    assert histogram.count == 100_000 and histogram.max == 100_000_000
+    for percent in (50, 90, 99):
+        expected = percent * 1000 * 1000
+        assert abs(histogram.percentile(percent) - expected) <= expected * 0.04
+    
+    # 多线程同时记录不丢失计数
+    operation = OperationMetrics("concurrent", sample_every=2)
+    operation.enabled = True
+    
+    def record_calls():
+        for index in range(20_000):
+            start = operation.begin()
+            operation.end(start, ok=index % 4 != 0)
+    
+    threads = [threading.Thread(target=record_calls) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    values = operation.snapshot()
+    assert values["calls"] == 80_000 and values["failures"] == 20_000
+    assert values["sampled"] == 40_000
+    
+    inventory_service = InventoryService()
+    sale_service = SaleService(inventory_service)
+    return_service = ReturnService(inventory_service, sale_service)
+    
+    # 关闭时不记录
+    metrics.disable()
+    metrics.reset()
+    inventory_service.get_product("P001")
+    assert metrics.snapshot()["operations"]["InventoryService.get_product"]["calls"] == 0
+    
+    metrics.enable(sample_every=1)
+    try:
+        sale = sale_service.create_sale()
+        assert sale_service.add_item_to_sale(sale, "P001", 2)
+        assert not sale_service.add_item_to_sale(sale, "P999", 1)   # 商品不存在
+        assert sale_service.complete_sale(sale, "Cash", 100)
+        return_transaction = return_service.create_return(sale.sale_id)
+        return_service.add_item_to_return(return_transaction, "P001", 1)
+        assert return_service.complete_return(return_transaction)
+        assert inventory_service.get_product("P404") is None
+        assert not inventory_service.update_stock("P002", 10 ** 6)      # 库存不足
+        
+        snapshot = metrics.snapshot()
+        assert snapshot["enabled"]
+        operations = snapshot["operations"]
+        add_item = operations["SaleService.add_item_to_sale"]
+        assert add_item["calls"] == 2 and add_item["failures"] == 1 and add_item["sampled"] == 2
+        assert add_item["p50_us"] > 0 and add_item["max_us"] >= add_item["p99_us"]
+        assert operations["SaleService.complete_sale"]["calls"] == 1
+        assert operations["ReturnService.complete_return"]["failures"] == 0
+        assert operations["InventoryService.get_product"]["failures"] == 1
+        assert operations["InventoryService.update_stock"]["failures"] == 1
+        
+        # JSON 导出
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "metrics.json")
+            metrics.dump(path)
+            with open(path, encoding="utf-8") as dump_file:
+                dumped = json.load(dump_file)
+            assert dumped["operations"]["SaleService.add_item_to_sale"]["calls"] == 2
+        
+        # 抛出异常的调用也计为失败
+        class BrokenJournal:
+            def append_sale(self, sale):
+                raise OSError("disk full")
+        
+        sale_service.journal = BrokenJournal()
+        sale = sale_service.create_sale()
+        sale_service.add_item_to_sale(sale, "P001", 1)
+        try:
+            sale_service.complete_sale(sale, "Cash", 100)
+            assert False, "应抛出 OSError"
+        except OSError:
+            pass
+        complete = metrics.snapshot()["operations"]["SaleService.complete_sale"]
+        assert complete["calls"] == 2 and complete["failures"] == 1 and complete["sampled"] == 2
+    finally:
+        metrics.disable()
+        metrics.reset()
+    
+    print("[OK] 操作指标测试通过")
+
+
+def test_product_search():
+    """测试商品搜索索引（前缀、模糊匹配与增量更新）"""
+    print("测试商品搜索...")
+    from service.product_search import ProductSearchIndex
+    
+    inventory_service = InventoryService()
+    inventory_service.add_product(Product("P010", "Whole Milk", 14.00, 20))
+    inventory_service.add_product(Product("B001", "Milk Chocolate", 9.90, 30))
+    assert not inventory_service.search_index_ready()
+    
+    def search(query, limit=10):
+        return [product.product_id for product in inventory_service.search_products(query, limit)]
+    
+    # 前缀：商品ID优先，其次名称开头，再次名称中的单词
+    assert search("p00") == ["P001", "P002", "P003", "P004", "P005"] + search("p00")[5:]
+    assert search("p00", limit=2) == ["P001", "P002"]
+    assert search("milk")[:3] == ["P003", "B001", "P010"]
+    assert search("  WHOLE  m") == ["P010"]
+    assert search("choc") == ["B001"]
+    # 模糊：拼写错误
+    assert search("banan") == ["P002"]
+    assert search("bnana")[0] == "P002"
+    assert search("chocolat milc")[0] == "B001"
+    assert search("xyzzy") == []
+    assert len(search("")) == 7
+    assert inventory_service.search_index_ready()
+    
+    # 增量更新：新增、导入与改名
+    inventory_service.add_product(Product("P011", "Oat Milk", 16.00, 10))
+    assert "P011" in search("oat")
+    inventory_service.import_products([{"product_id": "P012", "name": "Rye Bread",
+                                        "price": "7.00", "stock": "5"}])
+    assert search("rye") == ["P012"]
+    assert search("bread") == ["P004", "P012"]
+    inventory_service.add_product(Product("P011", "Soy Drink", 16.00, 10))
+    assert "P011" not in search("oat") and search("soy") == ["P011"]
+    
+    # 大批量构建与小批量增量结果一致
+    products = [Product(f"X{index:04d}", f"Item {index} Special", 1.0, 1) for index in range(3000)]
+    bulk = ProductSearchIndex(products)
+    incremental = ProductSearchIndex()
+    for product in products:
+        incremental.add(product)
+    for query in ("x01", "item 12", "special", "specal"):
+        assert bulk.search(query) == incremental.search(query)
+    assert len(bulk) == len(incremental) == 3000
+    
+    print("[OK] 商品搜索测试通过")
+
+
+def test_barcode_lookup():
+    """测试条码别名表与热点商品缓存"""
+    print("测试条码查找...")
+    inventory_service = InventoryService()
+    sale_service = SaleService(inventory_service)
+    result = inventory_service.import_barcodes([
+        {"barcode": "0012345678905", "product_id": "P001"},
+        {"barcode": "4006381333931", "product_id": "P002", "multiplier": ""},
+        {"barcode": "4006381333948", "product_id": "P002", "multiplier": "6"},   # 6 个装
+        {"barcode": "STORE-17", "product_id": "P003"},
+        {"barcode": "111", "product_id": "P999"},                                # 商品不存在
+        {"barcode": "222", "product_id": "P001", "multiplier": "0"},             # 倍数无效
+        {"product_id": "P001"},                                                  # 缺少条码
+    ])
+    assert result.succeeded == 4
+    assert [row for row, _ in result.errors] == [5, 6, 7]
+    assert result.errors[0][1] == "Unknown product: P999"
+    assert result.errors[2][1] == "Missing field: barcode"
+    
+    # UPC-A 与 EAN-13 只差前导零，视为同一条码
+    product, multiplier = inventory_service.scan("012345678905")
+    assert product.product_id == "P001" and multiplier == 1
+    assert inventory_service.scan(" 4006381333948\n")[1] == 6
+    assert inventory_service.scan("P004")[0].name == "Bread"    # 直接输入商品ID
+    assert inventory_service.scan("999") is None
+    
+    sale = sale_service.create_sale()
+    assert sale_service.add_scanned_item(sale, "4006381333948", 2)
+    assert sale_service.add_scanned_item(sale, "STORE-17")
+    assert not sale_service.add_scanned_item(sale, "STORE-99")
+    assert [(item.product_id, item.quantity) for item in sale.items] == [("P002", 12), ("P003", 1)]
+    assert inventory_service.get_product("P002").stock == 68
+    stats = inventory_service.lookup_stats()["barcodes"]
+    assert stats["barcodes"] == 4 and stats["packs"] == 1
+    assert stats["hits"] == 4 and stats["lookups"] == 7
+    
+    # 有界热点缓存：淘汰未改动的商品，保留库存已改动的商品
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        catalog_path = os.path.join(tmp_dir, "catalog.bin")
+        from persistence.catalog_file import write_catalog
+        write_catalog([Product(f"C{i:03d}", f"Item {i}", 1.0, 10) for i in range(100)], catalog_path)
+        store = MappedCatalogStore(catalog_path, cache_size=10)
+        inventory_service = InventoryService(store=store)
+        assert inventory_service.update_stock("C000", 3)
+        held = inventory_service.get_product("C001")
+        for i in range(2, 60):
+            inventory_service.get_product(f"C{i:03d}")
+        cache = inventory_service.lookup_stats()["product_cache"]
+        assert cache["size"] == 10 and cache["capacity"] == 10
+        assert inventory_service.get_product("C000").stock == 7    # 已改动，未丢失
+        assert inventory_service.get_product("C001") is held       # 仍被引用，同一对象
+        hits = store.cache_stats()["hits"]
+        inventory_service.get_product("C059")
+        assert store.cache_stats()["hits"] == hits + 1
+        store.close()
+    
+    print("[OK] 条码查找测试通过")
+
+
+def test_returnable_quantities():
+    """测试可退数量索引与原销售单到退货单的反向索引"""
+    print("测试可退数量...")
+    inventory_service = InventoryService()
+    sale_service = SaleService(inventory_service)
+    return_service = ReturnService(inventory_service, sale_service)
+    sale = sale_service.create_sale()
+    sale_service.add_item_to_sale(sale, "P001", 5)
+    sale_service.add_item_to_sale(sale, "P003", 1)
+    sale_service.add_item_to_sale(sale, "P001", 2)
+    sale_service.complete_sale(sale, "Cash", 100)
+    sale_id = sale.sale_id
+    assert return_service.get_returnable_items(sale_id) == {"P001": 7, "P003": 1}
+    
+    # 第一次部分退货
+    first = return_service.create_return(sale_id)
+    assert return_service.add_item_to_return(first, "P001", 4)
+    assert not return_service.add_item_to_return(first, "P001", 4)   # 同一退货单累计超出
+    assert not return_service.add_item_to_return(first, "P002", 1)   # 原销售单中没有
+    assert not return_service.add_item_to_return(first, "P002", 0)
+    assert not return_service.add_item_to_return(first, "P001", -3)  # 数量无效
+    assert first.get_quantity("P001") == 4
+    assert return_service.complete_return(first)
+    assert return_service.get_returnable_quantity(sale_id, "P001") == 3
+    
+    # 两张退货单同时打开：后完成的一张在完成时被拒绝
+    second = return_service.create_return(sale_id)
+    third = return_service.create_return(sale_id)
+    assert return_service.add_item_to_return(second, "P001", 3)
+    assert return_service.add_item_to_return(third, "P001", 2)
+    assert return_service.add_item_to_return(third, "P003", 1)
+    assert return_service.complete_return(second)
+    stock = inventory_service.get_product("P001").stock
+    assert not return_service.complete_return(third)
+    assert not third.is_completed and inventory_service.get_product("P001").stock == stock
+    assert return_service.get_returnable_items(sale_id) == {"P003": 1}
+    
+    # 未知销售单、未完成销售单与无原单退货
+    assert not return_service.add_item_to_return(return_service.create_return("SALE-404"), "P001", 1)
+    assert not return_service.add_item_to_return(return_service.create_return("SALE-404"), "P001", 0)
+    assert not return_service.add_item_to_return(return_service.create_return(), "P004", -1)
+    open_sale = sale_service.create_sale()
+    sale_service.add_item_to_sale(open_sale, "P001", 1)
+    assert return_service.get_returnable_quantity(open_sale.sale_id, "P001") == 0
+    assert return_service.add_item_to_return(return_service.create_return(), "P004", 50)
+    
+    # 反向索引：原销售单 -> 退货单
+    assert return_service.get_returns_for_sale(sale_id) == [first, second]
+    assert return_service.get_refunds_for_sale(sale_id) == Money(3850)
+    assert return_service.get_returns_for_sale("SALE-404") == []
+    
+    # 同一商品在多行以不同价格售出：按行顺序以售出价格退款
+    sale = sale_service.create_sale()
+    sale_service.add_item_to_sale(sale, "P005", 2)                     # 15.00
+    inventory_service.get_product("P005").price = Money.of("16.00")
+    sale_service.add_item_to_sale(sale, "P005", 3)                     # 16.00
+    sale_service.complete_sale(sale, "Cash", 100)
+    first = return_service.create_return(sale.sale_id)
+    assert return_service.add_item_to_return(first, "P005", 1)
+    assert first.get_total_refund() == Money.of("15.00")
+    assert return_service.complete_return(first)
+    second = return_service.create_return(sale.sale_id)
+    assert return_service.add_item_to_return(second, "P005", 1)
+    assert return_service.add_item_to_return(second, "P005", 2)
+    assert second.get_quantity("P005") == 3
+    assert second.get_total_refund() == Money.of("47.00")          # 15.00 + 2 * 16.00
+    assert not return_service.add_item_to_return(second, "P005", 2)
+    
+    # 日志重放后索引一致
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "transactions.journal")
+        journal = TransactionJournal(path, fsync_policy=FSYNC_NONE)
+        sale_service = SaleService(InventoryService(), journal)
+        return_service = ReturnService(sale_service.inventory_service, sale_service, journal)
+        sale = sale_service.create_sale()
+        sale_service.add_item_to_sale(sale, "P002", 3)
+        sale_service.complete_sale(sale, "Cash", 50)
+        return_transaction = return_service.create_return(sale.sale_id)
+        return_service.add_item_to_return(return_transaction, "P002", 2)
+        return_service.complete_return(return_transaction)
+        journal.close()
+        
+        journal = TransactionJournal(path, fsync_policy=FSYNC_NONE)
+        sale_service = SaleService(InventoryService(), journal)
+        return_service = ReturnService(sale_service.inventory_service, sale_service, journal)
+        replay_journal(journal, sale_service, return_service)
+        assert return_service.get_returnable_quantity(sale.sale_id, "P002") == 1
+        assert len(return_service.get_returns_for_sale(sale.sale_id)) == 1
+        journal.close()
+    
+    print("[OK] 可退数量测试通过")
+
+
+def test_stock_reservations():
+    """测试购物车库存预留：超时释放、结账提交、现有/可用库存分开统计"""
+    print("测试库存预留...")
+    now = [0.0]
+    inventory_service = InventoryService()
+    inventory_service.reservations = ReservationBook(inventory_service, 60, clock=lambda: now[0])
+    sale_service = SaleService(inventory_service)
+    
+    first = sale_service.create_sale()
+    assert sale_service.add_item_to_sale(first, "P001", 10)
+    assert inventory_service.get_stock_levels("P001") == (100, 90)
+    abandoned = sale_service.create_sale()
+    assert sale_service.add_item_to_sale(abandoned, "P002", 5)
+    assert inventory_service.get_stock_levels("P002") == (80, 75)
+    assert inventory_service.get_stock_levels("P404") is None
+    
+    # 购物车有操作时续期；闲置超时的预留被释放
+    now[0] = 30
+    assert sale_service.add_item_to_sale(first, "P003", 1)
+    now[0] = 70
+    assert inventory_service.reservations.expire() == 1
+    assert inventory_service.reservations.is_expired(abandoned)
+    assert inventory_service.get_stock_levels("P002") == (80, 80)
+    assert inventory_service.get_stock_levels("P001") == (100, 90)
+    
+    # 过期后库存被别的销售买走：结账失败，取消时不重复恢复库存
+    other = sale_service.create_sale()
+    assert sale_service.add_item_to_sale(other, "P002", 78)
+    assert sale_service.complete_sale(other, "Cash", 1000)
+    assert not sale_service.complete_sale(abandoned, "Cash", 100)
+    assert not abandoned.is_completed
+    sale_service.cancel_sale(abandoned)
+    assert inventory_service.get_product("P002").stock == 2
+    
+    # 过期后库存仍在：结账时重新预留并提交
+    now[0] = 200
+    assert inventory_service.reservations.expire() == 1
+    assert inventory_service.get_product("P001").stock == 100
+    assert sale_service.complete_sale(first, "Cash", 100)
+    assert inventory_service.get_stock_levels("P001") == (90, 90)
+    assert inventory_service.reservations.stats() == {"sales": 0, "units": 0, "expired": 2}
+    
+    # 过期后删除商品或修改数量不会重复恢复库存
+    sale = sale_service.create_sale()
+    sale_service.add_item_to_sale(sale, "P004", 5)
+    sale_service.add_item_to_sale(sale, "P005", 4)
+    now[0] = 300
+    inventory_service.reservations.expire()
+    sale_service.remove_item_from_sale(sale, sale.items[0])
+    assert inventory_service.get_product("P004").stock == 60
+    assert sale_service.update_item_quantity(sale, sale.items[0], 6)
+    assert inventory_service.get_stock_levels("P005") == (40, 34)
+    sale_service.cancel_sale(sale)
+    assert inventory_service.get_stock_levels("P005") == (40, 40)
+    
+    # 大量预留按截止时间顺序过期
+    inventory_service.get_product("P003").stock = 10_000
+    sales = []
+    for index in range(1000):
+        now[0] = 1000 + index * 0.05
+        sale = sale_service.create_sale()
+        sale_service.add_item_to_sale(sale, "P003", 1)
+        sales.append(sale)
+    for sale in sales[::2]:
+        sale_service.complete_sale(sale, "Cash", 100)
+    assert inventory_service.get_stock_levels("P003") == (9500, 9000)
+    assert inventory_service.reservations.expire(now=1060 + 199 * 0.05) == 100
+    assert inventory_service.reservations.expire(now=10_000) == 400
+    assert inventory_service.get_stock_levels("P003") == (9500, 9500)
+    print("[OK] 库存预留测试通过")
+
+
+def test_terminal_simulator():
+    """测试多进程收银终端模拟器：负载混合、延迟统计与不变量检查"""
+    print("测试终端模拟器...")
+    from benchmarks.simulator import SimulationConfig, Terminal, parse_mix, simulate
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config = SimulationConfig(products=200, stock=30, customers=300, duration=None,
+                                  journal_dir=tmp_dir, seed=7)
+        terminal = Terminal(0, config)
+        result = terminal.run()
+    assert result["violation_count"] == 0, result["violations"]
+    counts = result["counts"]
+    assert counts["customers"] == 300
+    assert counts["completed"] > 0 and counts["returned"] > 0 and counts["out_of_stock"] > 0
+    assert result["histograms"]["scan"].count > counts["customers"]
+    
+    # 人为破坏库存与营业额，检查能被发现
+    product = terminal.inventory_service.get_product("P000001")
+    product.stock = -5
+    terminal.revenue_cents += 1
+    terminal.check_invariants()
+    messages = " | ".join(terminal.violations)
+    assert "P000001 negative stock -5" in messages
+    assert "P000001 on hand" in messages and "revenue" in messages
+    
+    # 多进程汇总
+    summary = simulate(SimulationConfig(products=100, customers=50, duration=None), terminals=2)
+    assert summary["terminals"] == 2 and summary["customers"] == 100
+    assert summary["violation_count"] == 0 and not summary["errors"]
+    assert summary["operations"]["scan"]["count"] > 0
+    assert summary["operations"]["scan"]["p99_us"] >= summary["operations"]["scan"]["p50_us"]
+    
+    assert parse_mix("complete=1,return=1") == {"complete": 1, "cancel": 0, "abandon": 0, "return": 1}
+    for bad_mix in ("refund=1", "complete=-1", "complete=0"):
+        try:
+            parse_mix(bad_mix)
+            assert False, bad_mix
+        except ValueError:
+            pass
+    print("[OK] 终端模拟器测试通过")
+
+
+def test_event_bus():
+    """测试事件总线：同步/异步投递、低库存阈值与队列溢出策略"""
+    print("测试事件总线...")
+    inventory_service = InventoryService()
+    sale_service = SaleService(inventory_service)
+    return_service = ReturnService(inventory_service, sale_service)
+    events = inventory_service.events
+    received = []
+    for event_type in (SaleCompleted, ReturnCompleted, StockChanged, LowStock):
+        events.subscribe(event_type, received.append)
+    
+    # 低库存按商品阈值，跌破时只通知一次，回升后重新生效
+    inventory_service.set_low_stock_threshold("P003", 45)
+    assert inventory_service.get_low_stock_threshold("P003") == 45
+    assert inventory_service.get_low_stock_threshold("P001") == 10
+    sale = sale_service.create_sale()
+    sale_service.add_item_to_sale(sale, "P003", 3)
+    sale_service.add_item_to_sale(sale, "P003", 3)
+    sale_service.add_item_to_sale(sale, "P003", 1)
+    low = [event for event in received if isinstance(event, LowStock)]
+    assert [(event.product_id, event.stock, event.threshold) for event in low] == [("P003", 44, 45)]
+    assert [event.stock for event in received if isinstance(event, StockChanged)] == [47, 44, 43]
+    assert sale_service.complete_sale(sale, "Cash", 100)
+    assert isinstance(received[-1], SaleCompleted) and received[-1].sale is sale
+    
+    return_transaction = return_service.create_return(sale.sale_id)
+    return_service.add_item_to_return(return_transaction, "P003", 7)
+    assert return_service.complete_return(return_transaction)
+    assert isinstance(received[-1], ReturnCompleted)
+    assert received[-2].product_id == "P003" and received[-2].stock == 50
+    received.clear()
+    inventory_service.reserve_many([("P003", 6), ("P005", 31)])
+    assert [(event.product_id, event.stock) for event in received
+            if isinstance(event, LowStock)] == [("P003", 44), ("P005", 9)]
+    
+    # 批量结账逐单发布；处理函数异常不影响结账
+    def failing(event):
+        raise RuntimeError("subscriber bug")
+    events.subscribe(SaleCompleted, failing)
+    received.clear()
+    results = sale_service.complete_sales_batch([
+        {"items": [("P001", 1)], "payment_method": "Cash", "payment_amount": 100},
+        {"items": [("P002", 1)], "payment_method": "Card", "payment_amount": 100}])
+    assert all(result.success for result in results)
+    assert [event.sale for event in received if isinstance(event, SaleCompleted)] == \
+        [result.sale for result in results]
+    assert events.errors == 2 and isinstance(events.last_error, RuntimeError)
+    assert events.unsubscribe(SaleCompleted, failing)
+    assert not events.unsubscribe(SaleCompleted, failing)
+    
+    # 事件在释放服务锁之后发布：同步处理函数可以回调服务（过期释放与退货）
+    inventory_service = InventoryService(hold_seconds=0)
+    sale_service = SaleService(inventory_service)
+    return_service = ReturnService(inventory_service, sale_service)
+    callbacks = []
+    def reentrant(event):
+        callbacks.append((inventory_service.reservations.stats()["sales"],
+                          return_service.complete_return(return_service.create_return())))
+    inventory_service.events.subscribe(StockChanged, reentrant)
+    sale = sale_service.create_sale()
+    sale_service.add_item_to_sale(sale, "P004", 1)
+    assert sale_service.complete_sale(sale, "Cash", 100)
+    return_transaction = return_service.create_return(sale.sale_id)
+    return_service.add_item_to_return(return_transaction, "P004", 1)
+    abandoned = sale_service.create_sale()
+    assert sale_service.add_item_to_sale(abandoned, "P004", 2)
+    callbacks.clear()
+    worker = threading.Thread(target=lambda: (inventory_service.reservations.expire(float("inf")),
+                                              return_service.complete_return(return_transaction)),
+                              daemon=True)
+    worker.start()
+    worker.join(5)
+    assert not worker.is_alive(), "同步处理函数回调服务时死锁"
+    assert callbacks == [(0, False), (0, False)] and return_transaction.is_completed
+    
+    # 异步投递：慢订阅者不阻塞发布方，队列满时按策略丢弃或等待
+    def run_policy(overflow):
+        bus = EventBus(max_queue=2, overflow=overflow, block_timeout=0.05)
+        started, gate = threading.Event(), threading.Event()
+        delivered = []
+        def slow(event):
+            started.set()
+            gate.wait()
+            delivered.append(event.stock)
+        bus.subscribe(StockChanged, slow, asynchronous=True)
+        bus.publish(StockChanged("P001", 0))
+        assert started.wait(5)
+        for stock in range(1, 5):
+            bus.publish(StockChanged("P001", stock))
+        stats = bus.stats()
+        gate.set()
+        assert bus.flush(5)
+        bus.close()
+        return delivered, stats
+    assert run_policy(DROP_NEWEST) == ([0, 1, 2], {"published": 5, "delivered": 0, "queued": 2,
+                                                  "dropped": 2, "errors": 0})
+    assert run_policy(DROP_OLDEST)[0] == [0, 3, 4]
+    delivered, stats = run_policy(BLOCK)
+    assert delivered == [0, 1, 2] and stats["dropped"] == 2
+    
+    assert not EventBus().wants(LowStock)
+    try:
+        EventBus(overflow="unbounded")
+        assert False
+    except ValueError:
+        pass
+    print("[OK] 事件总线测试通过")
+
+
+def test_reorder_report():
+    """测试补货优先索引：按再订货点与可售天数排序，库存变化时增量更新"""
+    print("测试补货报告...")
+    inventory_service = InventoryService()
+    sale_service = SaleService(inventory_service)
+    
+    def report_ids(**kwargs):
+        return [line.product_id for line in inventory_service.reorder_report(**kwargs)]
+    
+    # 首次使用时才建立索引
+    assert not inventory_service.reorder_index_ready()
+    
+    # 都未低于再订货点（默认 10）：按库存与再订货点之比排序
+    assert report_ids() == ["P005", "P003", "P004", "P002", "P001"]
+    assert report_ids(limit=2) == ["P005", "P003"]
+    assert inventory_service.reorder_index_ready()
+    assert report_ids(below_only=True) == []
+    
+    inventory_service.set_low_stock_threshold("P003", 60)
+    assert report_ids(limit=1) == ["P003"]
+    assert inventory_service.reorder_index().below_count == 1
+    
+    # 预留库存（加入销售单）即时更新索引
+    sale = sale_service.create_sale()
+    sale_service.add_item_to_sale(sale, "P001", 95)
+    line = inventory_service.reorder_report(limit=1)[0]
+    assert (line.product_id, line.stock, line.reorder_point, line.shortfall) == ("P001", 5, 10, 5)
+    assert line.below_reorder_point and line.days_of_cover is None
+    assert report_ids(below_only=True) == ["P001", "P003"]
+    assert sale_service.complete_sale(sale, "Cash", 1000)
+    
+    # 日需求量来自销售记录，可售天数少的优先
+    demand = sale_service.estimate_daily_demand()
+    assert demand == {"P001": 95.0}
+    inventory_service.load_daily_demand(demand)
+    assert round(inventory_service.reorder_report(limit=1)[0].days_of_cover, 3) == 0.053
+    inventory_service.set_daily_demand("P003", 1000)
+    assert report_ids(limit=2) == ["P003", "P001"]
+    inventory_service.load_daily_demand({})
+    assert inventory_service.get_daily_demand("P003") == 0
+    assert report_ids(below_only=True) == ["P001", "P003"]
+    
+    # 取消销售单释放库存、补货、新增商品
+    other = sale_service.create_sale()
+    sale_service.add_item_to_sale(other, "P002", 76)
+    assert report_ids(limit=1) == ["P002"]
+    sale_service.cancel_sale(other)
+    inventory_service.bulk_restock([("P001", 100)])
+    assert report_ids(below_only=True) == ["P003"]
+    inventory_service.add_product(Product("P006", "Rice", 20.00, 0))
+    assert report_ids(limit=1) == ["P006"]
+    assert inventory_service.reorder_index().below_count == 2
+    
+    # 随机更新后与全量排序结果一致
+    rng = random.Random(7)
+    index = ReorderIndex((f"X{i}", rng.randrange(50), rng.randrange(20), rng.choice([0, 1, 5]))
+                         for i in range(300))
+    values = {line.product_id: (line.stock, line.reorder_point, line.daily_demand)
+              for line in index.top(1000)}
+    assert len(values) == 300
+    for step in range(2000):
+        product_id = f"X{rng.randrange(320)}"
+        if rng.random() < 0.05:
+            assert index.remove(product_id) == (product_id in values)
+            values.pop(product_id, None)
+            continue
+        entry = (rng.randrange(50), rng.randrange(20), rng.choice([0, 1, 5]))
+        index.update(product_id, *entry)
+        values[product_id] = entry
+        if step % 200 == 0:
+            expected = sorted(urgency(*entry) for entry in values.values())
+            assert [urgency(line.stock, line.reorder_point, line.daily_demand)
+                    for line in index.top(50)] == expected[:50]
+            assert index.below_count == sum(1 for key in expected if key[0] == 0)
+    assert len(index) == len(values)
+    print("[OK] 补货报告测试通过")
+
+
+def test_sale_item_snapshot():
+    """测试销售项快照：改价不影响历史销售与退款，领域对象使用 __slots__"""
+    print("测试销售项价格快照...")
+    import gc
+    import weakref
+    for instance in (Product("X", "x", 1, 1), SaleItem(Product("X", "x", 1, 1), 1),
+                     Sale(), ReturnTransaction()):
+        assert not hasattr(instance, "__dict__")
+    
+    inventory_service = InventoryService()
+    sale_service = SaleService(inventory_service)
+    return_service = ReturnService(inventory_service, sale_service)
+    sale = sale_service.create_sale()
+    sale_service.add_item_to_sale(sale, "P001", 4)
+    sale_service.add_item_to_sale(sale, "P003", 1)
+    assert sale_service.complete_sale(sale, "Cash", 100)
+    item = sale.items[0]
+    assert (item.product_id, item.name, item.unit_price) == ("P001", "Apple", Money.of(5.50))
+    
+    # 改价后历史销售的小计与合计不变
+    inventory_service.get_product("P001").price = 9.99
+    assert item.get_subtotal() == 22.00 and str(item) == "Apple x4 = $22.00"
+    Transaction.verify_totals = True
+    try:
+        assert sale.get_total() == 34.00
+    finally:
+        Transaction.verify_totals = False
+    assert sale_service.get_total_revenue() == 34.00
+    
+    # 按原售价退款；新销售使用新价格
+    return_transaction = return_service.create_return(sale.sale_id)
+    assert return_service.add_item_to_return(return_transaction, "P001", 2)
+    assert return_transaction.get_total_refund() == 11.00
+    other = sale_service.create_sale()
+    sale_service.add_item_to_sale(other, "P001", 1)
+    assert other.get_total() == 9.99
+    
+    # 日志重放使用记录时的商品数据，而非当前目录价格
+    restored = record_to_sale(json.loads(json.dumps(sale_to_record(sale))))
+    assert restored.get_total() == 34.00 and restored.items[0].name == "Apple"
+    
+    # 历史记录不再引用商品对象
+    product = Product("P900", "Temporary", 2.00, 5)
+    archived = Sale()
+    archived.add_item(SaleItem(product, 2))
+    reference = weakref.ref(product)
+    del product
+    gc.collect()
+    assert reference() is None and archived.get_total() == 4.00
+    
+    # 兼容别名
+    archived.sale_time = datetime(2024, 1, 1)
+    assert archived.transaction_time == datetime(2024, 1, 1)
+    assert archived.sale_id == archived.transaction_id
+    assert return_transaction.return_id == return_transaction.transaction_id
+    print("[OK] 销售项价格快照测试通过")
+
+
 def run_all_tests():
     """运行所有测试"""
     print("=" * 50)
@@ -136,6 +1739,31 @@ def run_all_tests():
         test_inventory_service()
         test_sale_service()
         test_return_service()
+        test_transaction_journal()
+        test_snapshot_recovery()
+        test_sale_indexes()
+        test_id_generator()
+        test_concurrent_inventory()
+        test_running_totals()
+        test_money()
+        test_sqlite_product_store()
+        test_mapped_catalog()
+        test_bulk_import_and_restock()
+        test_sales_analytics()
+        test_treeview_sync()
+        test_history_index()
+        test_http_api()
+        test_sales_batch()
+        test_benchmark_suite()
+        test_operation_metrics()
+        test_product_search()
+        test_barcode_lookup()
+        test_returnable_quantities()
+        test_stock_reservations()
+        test_terminal_simulator()
+        test_event_bus()
+        test_reorder_report()
+        test_sale_item_snapshot()
         
         print("=" * 50)
         print("[OK] 所有测试通过！")
@@ -3,15 +3,32 @@ POS System Graphical User Interface
 Implemented using Tkinter
 """
 
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, simpledialog
-from typing import Optional
-from datetime import datetime
+from typing import Optional, Tuple
+from datetime import datetime, timedelta
+from domain.money import Money
 from domain.sale import Sale
 from domain.return_transaction import ReturnTransaction
 from service.sale_service import SaleService
 from service.return_service import ReturnService
 from service.inventory_service import InventoryService
+from service.metrics import metrics
+from service.events import LowStock
+from service.history_index import HistoryIndex, SORT_BY_AMOUNT, SORT_BY_PAYMENT, SORT_BY_TIME
+from ui.tree_sync import TreeviewSync
+from ui.virtual_list import VirtualTreeview
+
+
+# Matches listed in the product combobox while typing
+PRODUCT_SEARCH_RESULTS = 20
+# Shown in product lists while the search index is built at startup
+SEARCH_INDEX_BUILDING = "Building product index…"
+# Interval at which such a list checks whether the build finished
+SEARCH_INDEX_POLL_MS = 250
+# Shown in the reorder report while its index is built
+REORDER_INDEX_BUILDING = "Building reorder index…"
 
 
 class POSGUI:
@@ -44,6 +61,13 @@ class POSGUI:
         
         # Create interface
         self.create_main_interface()
+        
+        # Build the product search index in the background
+        threading.Thread(target=inventory_service.search_index, daemon=True).start()
+        
+        # Stock changes happen on this (Tk) thread, so a synchronous handler may touch widgets
+        inventory_service.events.subscribe(LowStock, lambda event: self.update_status(
+            f"Low stock: {event.product_id} has {event.stock} left (threshold {event.threshold})"))
     
     def setup_styles(self):
         """Setup interface styles"""
@@ -112,6 +136,20 @@ class POSGUI:
                                relief=tk.RAISED, bd=3)
         btn_history.grid(row=0, column=3, padx=15, pady=10)
         
+        btn_diagnostics = tk.Button(button_frame, text="Diagnostics", 
+                                    font=('Microsoft YaHei', 12, 'bold'),
+                                    bg='#7f8c8d', fg='white', width=btn_width, height=btn_height,
+                                    command=self.show_diagnostics_window, cursor='hand2',
+                                    relief=tk.RAISED, bd=3)
+        btn_diagnostics.grid(row=1, column=0, padx=15, pady=10)
+        
+        btn_reorder = tk.Button(button_frame, text="Reorder Report", 
+                                font=('Microsoft YaHei', 12, 'bold'),
+                                bg='#e67e22', fg='white', width=btn_width, height=btn_height,
+                                command=self.show_reorder_window, cursor='hand2',
+                                relief=tk.RAISED, bd=3)
+        btn_reorder.grid(row=1, column=1, padx=15, pady=10)
+        
         # Status bar
         status_frame = tk.Frame(self.root, bg='#34495e', height=40)
         status_frame.pack(fill=tk.X, side=tk.BOTTOM)
@@ -160,9 +198,7 @@ class POSGUI:
         product_var = tk.StringVar()
         product_combo = ttk.Combobox(left_frame, textvariable=product_var,
                                     font=('Microsoft YaHei', 10), width=20)
-        products = self.inventory_service.get_all_products()
-        product_combo['values'] = [f"{p.product_id} - {p.name} (¥{p.price:.2f})" 
-                                   for p in products]
+        self._bind_product_search(product_combo, product_var)
         product_combo.grid(row=0, column=1, pady=5, padx=5)
         
         tk.Label(left_frame, text="Quantity:", font=('Microsoft YaHei', 10),
@@ -179,8 +215,8 @@ class POSGUI:
                     messagebox.showwarning("Warning", "Please select a product")
                     return
                 
-                product_id = product_str.split(' - ')[0]
-                quantity = int(quantity_var.get())
+                product_id, multiplier = self._resolve_entry(product_str)
+                quantity = int(quantity_var.get()) * multiplier
                 
                 if quantity <= 0:
                     messagebox.showwarning("Warning", "Quantity must be greater than 0")
@@ -191,6 +227,7 @@ class POSGUI:
                     update_sale_list()
                     update_total()
                     quantity_var.set("1")
+                    product_var.set("")
                 else:
                     messagebox.showerror("Error", "Add failed: Product not found or insufficient stock")
             except ValueError:
@@ -200,6 +237,8 @@ class POSGUI:
                            bg='#3498db', fg='white', command=add_item,
                            width=15, cursor='hand2')
         add_btn.grid(row=2, column=0, columnspan=2, pady=15)
+        # Barcode scanners type the code followed by Enter
+        product_combo.bind('<Return>', lambda event: add_item())
         
         # Right: Sale list
         right_frame = tk.LabelFrame(content_frame, text="Sale Details", 
@@ -226,18 +265,21 @@ class POSGUI:
                               bg='#f0f0f0', fg='#e74c3c')
         total_label.pack(pady=10)
         
-        def update_sale_list():
-            """Update sale list"""
-            for item in sale_tree.get_children():
-                sale_tree.delete(item)
-            
+        def sale_rows():
+            """Current sale rows keyed by sale item"""
             for sale_item in self.current_sale.items:
-                sale_tree.insert('', 'end', values=(
-                    sale_item.product.name,
+                yield id(sale_item), (
+                    sale_item.name,
                     sale_item.quantity,
-                    f"${sale_item.product.price:.2f}",
+                    f"${sale_item.unit_price:.2f}",
                     f"${sale_item.get_subtotal():.2f}"
-                ))
+                )
+        
+        sale_tree_sync = TreeviewSync(sale_tree, sale_rows)
+        
+        def update_sale_list():
+            """Update sale list (changed rows only, once per idle cycle)"""
+            sale_tree_sync.schedule()
         
         def update_total():
             """Update total"""
@@ -287,7 +329,7 @@ class POSGUI:
             
             def confirm_payment():
                 try:
-                    payment_amount = float(payment_amount_var.get())
+                    payment_amount = Money.of(payment_amount_var.get().strip())
                     if payment_amount < total:
                         messagebox.showerror("Error", "Insufficient payment amount")
                         return
@@ -307,7 +349,8 @@ class POSGUI:
                         sale_window.destroy()
                         self.update_status(f"Sale completed: {self.current_sale.sale_id}")
                     else:
-                        messagebox.showerror("Error", "Payment failed")
+                        messagebox.showerror("Error", "Reserved stock expired and is no "
+                                             "longer available, please cancel the sale")
                 except ValueError:
                     messagebox.showerror("Error", "Please enter a valid payment amount")
             
@@ -354,6 +397,11 @@ class POSGUI:
         original_sale_id = simpledialog.askstring("Original Sale", 
                                                   "Enter original sale ID (optional, cancel to skip):",
                                                   parent=return_window)
+        if original_sale_id and not self.return_service.get_returnable_items(original_sale_id):
+            messagebox.showerror("Error", "Sale not found or nothing left to return",
+                                 parent=return_window)
+            return_window.destroy()
+            return
         self.current_return = self.return_service.create_return(
             original_sale_id if original_sale_id else None
         )
@@ -387,9 +435,7 @@ class POSGUI:
         product_var = tk.StringVar()
         product_combo = ttk.Combobox(left_frame, textvariable=product_var,
                                     font=('Microsoft YaHei', 10), width=20)
-        products = self.inventory_service.get_all_products()
-        product_combo['values'] = [f"{p.product_id} - {p.name} (¥{p.price:.2f})" 
-                                   for p in products]
+        self._bind_product_search(product_combo, product_var)
         product_combo.grid(row=0, column=1, pady=5, padx=5)
         
         tk.Label(left_frame, text="Return Quantity:", font=('Microsoft YaHei', 10),
@@ -406,8 +452,8 @@ class POSGUI:
                     messagebox.showwarning("Warning", "Please select a product")
                     return
                 
-                product_id = product_str.split(' - ')[0]
-                quantity = int(quantity_var.get())
+                product_id, multiplier = self._resolve_entry(product_str)
+                quantity = int(quantity_var.get()) * multiplier
                 
                 if quantity <= 0:
                     messagebox.showwarning("Warning", "Quantity must be greater than 0")
@@ -419,8 +465,9 @@ class POSGUI:
                     update_return_list()
                     update_total()
                     quantity_var.set("1")
+                    product_var.set("")
                 else:
-                    messagebox.showerror("Error", "Add failed: Product not found")
+                    messagebox.showerror("Error", "Add failed: Product not found or not returnable")
             except ValueError:
                 messagebox.showerror("Error", "Please enter a valid quantity")
         
@@ -429,6 +476,8 @@ class POSGUI:
                            bg='#3498db', fg='white', command=add_item,
                            width=15, cursor='hand2')
         add_btn.grid(row=2, column=0, columnspan=2, pady=15)
+        # Barcode scanners type the code followed by Enter
+        product_combo.bind('<Return>', lambda event: add_item())
         
         # Right: Return list
         right_frame = tk.LabelFrame(content_frame, text="Return Details", 
@@ -455,18 +504,21 @@ class POSGUI:
                               bg='#f0f0f0', fg='#e74c3c')
         total_label.pack(pady=10)
         
-        def update_return_list():
-            """Update return list"""
-            for item in return_tree.get_children():
-                return_tree.delete(item)
-            
+        def return_rows():
+            """Current return rows keyed by return item"""
             for return_item in self.current_return.items:
-                return_tree.insert('', 'end', values=(
-                    return_item.product.name,
+                yield id(return_item), (
+                    return_item.name,
                     return_item.quantity,
-                    f"${return_item.product.price:.2f}",
+                    f"${return_item.unit_price:.2f}",
                     f"${return_item.get_subtotal():.2f}"
-                ))
+                )
+        
+        return_tree_sync = TreeviewSync(return_tree, return_rows)
+        
+        def update_return_list():
+            """Update return list (changed rows only, once per idle cycle)"""
+            return_tree_sync.schedule()
         
         def update_total():
             """Update total refund"""
@@ -518,6 +570,54 @@ class POSGUI:
         update_return_list()
         update_total()
     
+    def _resolve_entry(self, text: str) -> Tuple[str, int]:
+        """
+        Resolve the product combobox entry: a picked match, a scanned
+        barcode or a typed product ID
+        
+        Returns:
+            tuple: (product_id, units per quantity entered)
+        """
+        code = text.split(' - ')[0].strip()
+        scanned = self.inventory_service.scan(code)
+        if scanned is None:
+            return code, 1
+        product, multiplier = scanned
+        return product.product_id, multiplier
+    
+    def _bind_product_search(self, product_combo: ttk.Combobox, product_var: tk.StringVar):
+        """Refill a product combobox with search matches as the cashier types"""
+        waiting = []
+        
+        def refresh():
+            waiting.clear()
+            if product_combo.winfo_exists():
+                update_matches()
+        
+        def update_matches(event=None):
+            if event is not None and event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+                return
+            text = product_var.get()
+            if ' - ' in text:
+                return  # a match was picked from the list
+            ready = self.inventory_service.search_index_ready()
+            if not ready:
+                # The startup build takes seconds on a large catalog; offer an
+                # exact ID match meanwhile instead of blocking Tk on the build
+                product = self.inventory_service.get_product(text.strip()) if text.strip() else None
+                products = [product] if product else []
+                if not waiting:
+                    waiting.append(product_combo.after(SEARCH_INDEX_POLL_MS, refresh))
+            else:
+                products = self.inventory_service.search_products(text, PRODUCT_SEARCH_RESULTS)
+            values = [f"{p.product_id} - {p.name} (¥{p.price:.2f})" for p in products]
+            if not ready:
+                values.append(SEARCH_INDEX_BUILDING)
+            product_combo['values'] = values
+        
+        product_combo.bind('<KeyRelease>', update_matches)
+        update_matches()
+    
     def show_products_window(self):
         """Show products window"""
         products_window = tk.Toplevel(self.root)
@@ -540,16 +640,18 @@ class POSGUI:
         list_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
         
         # Create table
-        tree = ttk.Treeview(list_frame, columns=('id', 'name', 'price', 'stock'),
+        tree = ttk.Treeview(list_frame, columns=('id', 'name', 'price', 'stock', 'on_hand'),
                            show='headings', height=15)
         tree.heading('id', text='Product ID')
         tree.heading('name', text='Product Name')
         tree.heading('price', text='Price')
-        tree.heading('stock', text='Stock')
+        tree.heading('stock', text='Available')
+        tree.heading('on_hand', text='On Hand')
         tree.column('id', width=100)
         tree.column('name', width=200)
         tree.column('price', width=150)
         tree.column('stock', width=100)
+        tree.column('on_hand', width=100)
         tree.pack(fill=tk.BOTH, expand=True)
         
         # Add scrollbar
@@ -560,15 +662,17 @@ class POSGUI:
         # Fill data
         products = self.inventory_service.get_all_products()
         for product in products:
+            on_hand, available = self.inventory_service.get_stock_levels(product.product_id)
             tree.insert('', 'end', values=(
                 product.product_id,
                 product.name,
                 f"${product.price:.2f}",
-                product.stock
+                available,
+                on_hand
             ))
     
     def show_history_window(self):
-        """Show history window"""
+        """Show history window (paged virtual lists over the history indexes)"""
         history_window = tk.Toplevel(self.root)
         history_window.title("View History")
         history_window.geometry("900x600")
@@ -581,62 +685,295 @@ class POSGUI:
         # Sales history tab
         sales_frame = tk.Frame(notebook, bg='#f0f0f0')
         notebook.add(sales_frame, text="Sales History")
+        sales = self.sale_service.history_index
         
-        sales_tree = ttk.Treeview(sales_frame, 
-                                 columns=('id', 'time', 'items', 'total', 'payment'),
-                                 show='headings', height=20)
-        sales_tree.heading('id', text='Sale ID')
-        sales_tree.heading('time', text='Time')
-        sales_tree.heading('items', text='Items')
-        sales_tree.heading('total', text='Total')
-        sales_tree.heading('payment', text='Payment Method')
-        sales_tree.column('id', width=150)
-        sales_tree.column('time', width=150)
-        sales_tree.column('items', width=100)
-        sales_tree.column('total', width=120)
-        sales_tree.column('payment', width=100)
-        sales_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # Fill sales history
-        sales = self.sale_service.get_sales_history()
-        for sale in sales:
-            sales_tree.insert('', 'end', values=(
+        def format_sale(position):
+            sale = sales.records[position]
+            return (
                 sale.sale_id,
-                sale.sale_time.strftime('%Y-%m-%d %H:%M:%S'),
+                sale.transaction_time.strftime('%Y-%m-%d %H:%M:%S'),
                 len(sale.items),
                 f"${sale.get_total():.2f}",
                 sale.payment_method or "Incomplete"
-            ))
+            )
+        
+        self._build_history_tab(
+            sales_frame, sales, format_sale,
+            columns=[('id', 'Sale ID', 150), ('time', 'Time', 150), ('items', 'Items', 100),
+                     ('total', 'Total', 120), ('payment', 'Payment Method', 100)],
+            sort_columns={'time': SORT_BY_TIME, 'total': SORT_BY_AMOUNT,
+                          'payment': SORT_BY_PAYMENT},
+            with_payment_filter=True)
         
         # Return history tab
         returns_frame = tk.Frame(notebook, bg='#f0f0f0')
         notebook.add(returns_frame, text="Return History")
+        returns = self.return_service.history_index
         
-        returns_tree = ttk.Treeview(returns_frame,
-                                    columns=('id', 'original', 'time', 'items', 'refund'),
-                                    show='headings', height=20)
-        returns_tree.heading('id', text='Return ID')
-        returns_tree.heading('original', text='Original Sale')
-        returns_tree.heading('time', text='Time')
-        returns_tree.heading('items', text='Items')
-        returns_tree.heading('refund', text='Refund Amount')
-        returns_tree.column('id', width=150)
-        returns_tree.column('original', width=150)
-        returns_tree.column('time', width=150)
-        returns_tree.column('items', width=100)
-        returns_tree.column('refund', width=120)
-        returns_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # Fill return history
-        returns = self.return_service.get_return_history()
-        for return_transaction in returns:
-            returns_tree.insert('', 'end', values=(
+        def format_return(position):
+            return_transaction = returns.records[position]
+            return (
                 return_transaction.return_id,
                 return_transaction.original_sale_id or "None",
-                return_transaction.return_time.strftime('%Y-%m-%d %H:%M:%S'),
+                return_transaction.transaction_time.strftime('%Y-%m-%d %H:%M:%S'),
                 len(return_transaction.items),
                 f"${return_transaction.get_total_refund():.2f}"
-            ))
+            )
+        
+        self._build_history_tab(
+            returns_frame, returns, format_return,
+            columns=[('id', 'Return ID', 150), ('original', 'Original Sale', 150),
+                     ('time', 'Time', 150), ('items', 'Items', 100),
+                     ('refund', 'Refund Amount', 120)],
+            sort_columns={'time': SORT_BY_TIME, 'refund': SORT_BY_AMOUNT},
+            with_payment_filter=False)
+    
+    def _build_history_tab(self, frame, index: HistoryIndex, format_row, columns,
+                           sort_columns, with_payment_filter: bool):
+        """
+        Build a filter bar and a virtual list over a history index
+        
+        Args:
+            frame: Tab frame
+            index: History index of the tab
+            format_row: Formats the record at a position (runs on a worker thread)
+            columns: (column id, heading, width) of each column
+            sort_columns: Column id -> sort key, for sortable columns
+            with_payment_filter: Whether to offer the payment method filter
+        """
+        filter_frame = tk.Frame(frame, bg='#f0f0f0')
+        filter_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        
+        fields = {}
+        labels = [('start', 'From (YYYY-MM-DD)'), ('end', 'To')]
+        if with_payment_filter:
+            labels.append(('payment', 'Payment'))
+        labels += [('min', 'Min $'), ('max', 'Max $')]
+        for column, (name, text) in enumerate(labels):
+            tk.Label(filter_frame, text=text, font=('Microsoft YaHei', 9),
+                    bg='#f0f0f0').grid(row=0, column=2 * column, padx=(0, 3))
+            fields[name] = tk.StringVar()
+            if name == 'payment':
+                widget = ttk.Combobox(filter_frame, textvariable=fields[name], width=9,
+                                      values=[""] + index.payment_methods(), state='readonly')
+            else:
+                widget = tk.Entry(filter_frame, textvariable=fields[name], width=11)
+            widget.grid(row=0, column=2 * column + 1, padx=(0, 8))
+        
+        count_label = tk.Label(filter_frame, text="", font=('Microsoft YaHei', 9),
+                               bg='#f0f0f0', fg='#7f8c8d')
+        count_label.grid(row=0, column=2 * len(labels) + 1, padx=8)
+        
+        virtual_list = VirtualTreeview(frame, columns, format_row)
+        virtual_list.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        state = {'sort_by': SORT_BY_TIME, 'descending': True}
+        
+        def parse_date(text, end_of_day=False):
+            if not text:
+                return None
+            day = datetime.strptime(text, '%Y-%m-%d')
+            return day + timedelta(days=1, microseconds=-1) if end_of_day else day
+        
+        def parse_amount(text):
+            return Money.of(text) if text else None
+        
+        def apply_filter():
+            text = {name: variable.get().strip() for name, variable in fields.items()}
+            try:
+                conditions = dict(
+                    start=parse_date(text['start']),
+                    end=parse_date(text['end'], end_of_day=True),
+                    payment_method=text.get('payment') or None,
+                    min_amount=parse_amount(text['min']),
+                    max_amount=parse_amount(text['max']),
+                    sort_by=state['sort_by'], descending=state['descending'])
+            except ValueError:
+                messagebox.showerror("Error", "Please enter valid dates (YYYY-MM-DD) and amounts")
+                return
+            
+            if conditions['sort_by'] == SORT_BY_AMOUNT and not index.amount_order_ready():
+                # First amount sort of a long history: build the order off the Tk thread
+                count_label.config(text="Sorting...")
+                worker = threading.Thread(target=index.prepare_amount_order, daemon=True)
+                worker.start()
+                
+                def wait():
+                    if worker.is_alive():
+                        frame.after(50, wait)
+                    elif frame.winfo_exists():
+                        show(conditions)
+                frame.after(50, wait)
+                return
+            show(conditions)
+        
+        def show(conditions):
+            rows = index.query(**conditions)
+            virtual_list.set_rows(rows)
+            count_label.config(text=f"{len(rows):,} of {len(index):,}")
+        
+        def sort_by(column):
+            key = sort_columns[column]
+            if state['sort_by'] == key:
+                state['descending'] = not state['descending']
+            else:
+                state['sort_by'], state['descending'] = key, True
+            apply_filter()
+        
+        for column in sort_columns:
+            virtual_list.tree.heading(column, command=lambda column=column: sort_by(column))
+        
+        tk.Button(filter_frame, text="Apply", font=('Microsoft YaHei', 9), bg='#3498db',
+                 fg='white', command=apply_filter,
+                 cursor='hand2').grid(row=0, column=2 * len(labels), padx=4)
+        apply_filter()
+    
+    def show_diagnostics_window(self):
+        """Show diagnostics window (operation metrics, refreshed every second)"""
+        diagnostics_window = tk.Toplevel(self.root)
+        diagnostics_window.title("Diagnostics")
+        diagnostics_window.geometry("800x400")
+        diagnostics_window.configure(bg='#f0f0f0')
+        
+        # Operation table
+        list_frame = tk.Frame(diagnostics_window, bg='#f0f0f0')
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+        
+        columns = (('calls', 'Calls'), ('failures', 'Failures'), ('p50_us', 'p50 (us)'),
+                   ('p99_us', 'p99 (us)'), ('p99.9_us', 'p99.9 (us)'), ('max_us', 'Max (us)'))
+        tree = ttk.Treeview(list_frame, columns=[key for key, _ in columns],
+                           show='tree headings', height=8)
+        tree.heading('#0', text='Operation')
+        tree.column('#0', width=240)
+        for key, text in columns:
+            tree.heading(key, text=text)
+            tree.column(key, width=80, anchor=tk.E)
+        tree.pack(fill=tk.BOTH, expand=True)
+        
+        # Enable/disable toggle
+        control_frame = tk.Frame(diagnostics_window, bg='#f0f0f0')
+        control_frame.pack(fill=tk.X, padx=20, pady=(0, 20))
+        
+        def toggle():
+            if metrics.enabled:
+                metrics.disable()
+            else:
+                metrics.enable()
+            refresh()
+        
+        lookups_label = tk.Label(control_frame, font=('Microsoft YaHei', 10),
+                                 bg='#f0f0f0', justify=tk.LEFT)
+        lookups_label.pack(side=tk.RIGHT)
+        
+        toggle_button = ttk.Button(control_frame, command=toggle, style='Action.TButton')
+        toggle_button.pack(side=tk.LEFT)
+        ttk.Button(control_frame, text="Reset", command=lambda: (metrics.reset(), refresh()),
+                   style='Action.TButton').pack(side=tk.LEFT, padx=10)
+        
+        def refresh():
+            toggle_button.config(text="Disable" if metrics.enabled else "Enable")
+            lookups = self.inventory_service.lookup_stats()
+            barcodes = lookups["barcodes"]
+            text = f"Barcode scans: {barcodes['lookups']} ({barcodes['hits']} hits)"
+            cache = lookups["product_cache"]
+            if cache:
+                total = cache["hits"] + cache["misses"]
+                text += (f"\nProduct cache: {cache['size']} hot, "
+                         f"hit rate {cache['hits'] / total if total else 0:.1%}")
+            holds = self.inventory_service.reservations.stats()
+            text += f"\nHeld stock: {holds['units']} units in {holds['sales']} open sales"
+            lookups_label.config(text=text)
+            for name, values in metrics.snapshot()["operations"].items():
+                row = [values[key] for key, _ in columns]
+                if tree.exists(name):
+                    tree.item(name, values=row)
+                else:
+                    tree.insert('', 'end', iid=name, text=name, values=row)
+        
+        def poll():
+            if diagnostics_window.winfo_exists():
+                refresh()
+                diagnostics_window.after(1000, poll)
+        
+        poll()
+    
+    def show_reorder_window(self):
+        """Show reorder report window (most urgent products, refreshed every second)"""
+        reorder_window = tk.Toplevel(self.root)
+        reorder_window.title("Reorder Report")
+        reorder_window.geometry("800x500")
+        reorder_window.configure(bg='#f0f0f0')
+        
+        # Report table
+        list_frame = tk.Frame(reorder_window, bg='#f0f0f0')
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+        
+        columns = (('id', 'Product ID', 90), ('name', 'Product Name', 200),
+                   ('stock', 'Available', 80), ('reorder_point', 'Reorder Point', 100),
+                   ('shortfall', 'Shortfall', 80), ('demand', 'Per Day', 80),
+                   ('cover', 'Days of Cover', 100))
+        tree = ttk.Treeview(list_frame, columns=[key for key, _, _ in columns],
+                           show='headings', height=15)
+        for key, text, width in columns:
+            tree.heading(key, text=text)
+            tree.column(key, width=width, anchor=tk.W if key in ('id', 'name') else tk.E)
+        tree.tag_configure('below', foreground='#c0392b')
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=tree.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.configure(yscrollcommand=scrollbar.set)
+        
+        # Controls
+        control_frame = tk.Frame(reorder_window, bg='#f0f0f0')
+        control_frame.pack(fill=tk.X, padx=20, pady=(0, 20))
+        
+        below_only = tk.BooleanVar(value=False)
+        summary_label = tk.Label(control_frame, font=('Microsoft YaHei', 10), bg='#f0f0f0')
+        summary_label.pack(side=tk.RIGHT)
+        
+        def update_demand():
+            self.inventory_service.load_daily_demand(self.sale_service.estimate_daily_demand())
+            refresh()
+            self.update_status("Daily demand updated from the last 28 days of sales")
+        
+        ttk.Button(control_frame, text="Update Demand", command=update_demand,
+                   style='Action.TButton').pack(side=tk.LEFT)
+        tk.Checkbutton(control_frame, text="Below reorder point only", variable=below_only,
+                       command=lambda: refresh(), bg='#f0f0f0',
+                       font=('Microsoft YaHei', 10)).pack(side=tk.LEFT, padx=10)
+        
+        def refresh():
+            if not self.inventory_service.reorder_index_ready():
+                summary_label.config(text=REORDER_INDEX_BUILDING)
+                return
+            lines = self.inventory_service.reorder_report(below_only=below_only.get())
+            index = self.inventory_service.reorder_index()
+            summary_label.config(
+                text=f"{index.below_count} of {len(index)} products below reorder point")
+            tree.delete(*tree.get_children())
+            for line in lines:
+                product = self.inventory_service.get_product(line.product_id)
+                cover = line.days_of_cover
+                tree.insert('', 'end', values=(
+                    line.product_id,
+                    product.name if product else "",
+                    line.stock,
+                    line.reorder_point,
+                    line.shortfall,
+                    f"{line.daily_demand:.1f}",
+                    "-" if cover is None else f"{cover:.1f}"
+                ), tags=('below',) if line.below_reorder_point else ())
+        
+        def poll():
+            if reorder_window.winfo_exists():
+                refresh()
+                ready = self.inventory_service.reorder_index_ready()
+                reorder_window.after(1000 if ready else SEARCH_INDEX_POLL_MS, poll)
+        
+        # The first build scans the whole catalog; keep it off the Tk thread
+        if not self.inventory_service.reorder_index_ready():
+            threading.Thread(target=self.inventory_service.reorder_index, daemon=True).start()
+        poll()
     
     def update_status(self, message: str):
         """Update status bar"""
@@ -2,12 +2,16 @@
 POS System User Interface (CLI)
 """
 
-from typing import Optional
+from typing import Optional, Tuple
+from domain.money import Money
 from domain.sale import Sale
 from domain.return_transaction import ReturnTransaction
 from service.sale_service import SaleService
 from service.return_service import ReturnService
 from service.inventory_service import InventoryService
+from service.analytics_service import SalesAnalytics
+from service.metrics import metrics
+from service.events import LowStock
 
 
 class POSUI:
@@ -28,6 +32,13 @@ class POSUI:
         self.inventory_service = inventory_service
         self.current_sale: Optional[Sale] = None
         self.current_return: Optional[ReturnTransaction] = None
+        self.analytics: Optional[SalesAnalytics] = None
+        inventory_service.events.subscribe(LowStock, self._on_low_stock)
+    
+    def _on_low_stock(self, event: LowStock):
+        """Warn the cashier when a product runs low"""
+        print(f"[Low Stock] {event.product_id}: {event.stock} left "
+              f"(threshold {event.threshold})")
     
     def display_menu(self):
         """Display main menu"""
@@ -39,6 +50,9 @@ class POSUI:
         print("3. View Products")
         print("4. View Sales History")
         print("5. View Return History")
+        print("6. Sales Report")
+        print("7. Diagnostics")
+        print("8. Reorder Report")
         print("0. Exit")
         print("="*50)
     
@@ -52,12 +66,43 @@ class POSUI:
             print("No products available")
             return
         
-        print(f"{'ID':<8} {'Product Name':<20} {'Price':<12} {'Stock':<10}")
+        print(f"{'ID':<8} {'Product Name':<20} {'Price':<12} {'Available':<10} {'On Hand':<10}")
         print("-"*50)
         for product in products:
-            print(f"{product.product_id:<8} {product.name:<20} ${product.price:<11.2f} {product.stock:<10}")
+            on_hand, available = self.inventory_service.get_stock_levels(product.product_id)
+            print(f"{product.product_id:<8} {product.name:<20} ${product.price:<11.2f} "
+                  f"{available:<10} {on_hand:<10}")
         print("-"*50)
     
+    def _select_product(self) -> Optional[Tuple[str, int]]:
+        """
+        Scan a barcode, or search products by ID or name and let the user pick one
+        
+        Returns:
+            tuple: (product ID, units per quantity entered; the pack size
+                   of a scanned pack barcode), or None if nothing was selected
+        """
+        query = input("\nScan barcode, or enter Product ID or search text: ").strip()
+        scanned = self.inventory_service.scan(query) if query else None
+        if scanned:
+            product, multiplier = scanned
+            if multiplier > 1:
+                print(f"{product.name} x {multiplier} pack")
+            return product.product_id, multiplier
+        matches = self.inventory_service.search_products(query)
+        if not matches:
+            print("No matching products")
+            return None
+        
+        print(f"{'#':<4} {'ID':<8} {'Product Name':<20} {'Price':<12} {'Stock':<10}")
+        for number, product in enumerate(matches, 1):
+            print(f"{number:<4} {product.product_id:<8} {product.name:<20} ${product.price:<11.2f} {product.stock:<10}")
+        choice = input("Select product number: ").strip()
+        if choice.isdigit() and 1 <= int(choice) <= len(matches):
+            return matches[int(choice) - 1].product_id, 1
+        print("Invalid choice")
+        return None
+    
     def process_sale(self):
         """Process sale flow"""
         print("\n" + "-"*50)
@@ -79,8 +124,8 @@ class POSUI:
             if choice == "1":
                 self._add_item_to_sale()
             elif choice == "2":
-                self._complete_sale()
-                break
+                if self._complete_sale():
+                    break
             elif choice == "3":
                 self._cancel_sale()
                 break
@@ -89,8 +134,10 @@ class POSUI:
     
     def _add_item_to_sale(self):
         """Add item to sale"""
-        self.display_products()
-        product_id = input("\nEnter Product ID: ").strip()
+        selected = self._select_product()
+        if selected is None:
+            return
+        product_id, multiplier = selected
         try:
             quantity = int(input("Enter Quantity: ").strip())
             if quantity <= 0:
@@ -100,7 +147,7 @@ class POSUI:
             print("Invalid quantity")
             return
         
-        if self.sale_service.add_item_to_sale(self.current_sale, product_id, quantity):
+        if self.sale_service.add_item_to_sale(self.current_sale, product_id, quantity * multiplier):
             print(f"[Success] Item added successfully")
             print(f"Current Sale:")
             for item in self.current_sale.items:
@@ -108,11 +155,17 @@ class POSUI:
         else:
             print("[Failed] Add failed: Product not found or insufficient stock")
     
-    def _complete_sale(self):
-        """Complete sale"""
+    def _complete_sale(self) -> bool:
+        """
+        Complete sale
+        
+        Returns:
+            bool: Whether the sale is finished (completed, or cancelled
+                  because its stock is gone); otherwise it stays open
+        """
         if not self.current_sale.items:
             print("Sale is empty, cannot complete")
-            return
+            return False
         
         print(f"\nSale Details:")
         for item in self.current_sale.items:
@@ -121,10 +174,14 @@ class POSUI:
         
         payment_method = input("\nEnter Payment Method (Cash/Card/Mobile): ").strip() or "Cash"
         try:
-            payment_amount = float(input("Enter Payment Amount: ").strip())
+            payment_amount = Money.of(input("Enter Payment Amount: ").strip())
         except ValueError:
             print("Invalid payment amount")
-            return
+            return False
+        
+        if payment_amount < self.current_sale.get_total():
+            print("[Failed] Insufficient payment amount")
+            return False
         
         if self.sale_service.complete_sale(self.current_sale, payment_method, payment_amount):
             change = self.current_sale.get_change()
@@ -134,9 +191,13 @@ class POSUI:
             if change > 0:
                 print(f"Change: ${change:.2f}")
             print(f"\nSale ID: {self.current_sale.sale_id}")
+            return True
         else:
-            print("[Failed] Insufficient payment amount")
+            # Held stock expired and was sold meanwhile: release the rest
+            self.sale_service.cancel_sale(self.current_sale)
+            print("[Failed] Reserved stock expired and is no longer available, sale cancelled")
             self.current_sale = None
+            return True
     
     def _cancel_sale(self):
         """Cancel sale"""
@@ -152,6 +213,14 @@ class POSUI:
         print("-"*50)
         
         original_sale_id = input("Enter Original Sale ID (optional, press Enter to skip): ").strip()
+        if original_sale_id:
+            returnable = self.return_service.get_returnable_items(original_sale_id)
+            if not returnable:
+                print("Sale not found or nothing left to return")
+                return
+            print("Returnable Items:")
+            for product_id, quantity in returnable.items():
+                print(f"  {product_id}: {quantity}")
         self.current_return = self.return_service.create_return(
             original_sale_id if original_sale_id else None
         )
@@ -179,8 +248,10 @@ class POSUI:
     
     def _add_item_to_return(self):
         """Add item to return"""
-        self.display_products()
-        product_id = input("\nEnter Product ID: ").strip()
+        selected = self._select_product()
+        if selected is None:
+            return
+        product_id, multiplier = selected
         try:
             quantity = int(input("Enter Return Quantity: ").strip())
             if quantity <= 0:
@@ -190,13 +261,14 @@ class POSUI:
             print("Invalid quantity")
             return
         
-        if self.return_service.add_item_to_return(self.current_return, product_id, quantity):
+        if self.return_service.add_item_to_return(self.current_return, product_id,
+                                                  quantity * multiplier):
             print(f"[Success] Return item added successfully")
             print(f"Current Return:")
             for item in self.current_return.items:
                 print(f"  - {item}")
         else:
-            print("[Failed] Add failed: Product not found")
+            print("[Failed] Add failed: Product not found or not returnable")
     
     def _complete_return(self):
         """Complete return"""
@@ -255,6 +327,91 @@ class POSUI:
         for return_transaction in returns:
             print(f"\n{return_transaction}")
     
+    def view_sales_report(self):
+        """View sales report (revenue by day, top products, basket sizes, payment mix)"""
+        print("\n" + "-"*50)
+        print("Sales Report")
+        print("-"*50)
+        if self.analytics is None:
+            try:
+                self.analytics = SalesAnalytics(self.sale_service)
+            except ImportError as error:
+                print(error)
+                return
+        
+        revenue_by_day = self.analytics.revenue_by_day()
+        if not revenue_by_day:
+            print("No sales records")
+            return
+        
+        print("Revenue by Day:")
+        for day, revenue in revenue_by_day.items():
+            print(f"  {day:%Y-%m-%d}  ${revenue:.2f}")
+        print("\nTop Products:")
+        for product_id, quantity, revenue in self.analytics.top_products(5):
+            print(f"  {product_id:<8} x{quantity:<6} ${revenue:.2f}")
+        print("\nBasket Sizes (items: sales):")
+        for size, count in self.analytics.basket_size_distribution().items():
+            print(f"  {size}: {count}")
+        print("\nPayment Mix:")
+        for method, (count, revenue) in self.analytics.payment_mix().items():
+            print(f"  {method:<10} {count} sales, ${revenue:.2f}")
+    
+    def view_diagnostics(self):
+        """View operation metrics (call/failure counts and latency percentiles)"""
+        print("\n" + "-"*50)
+        print("Diagnostics")
+        print("-"*50)
+        print(f"Metrics recording: {'ON' if metrics.enabled else 'OFF'}")
+        operations = metrics.snapshot()["operations"]
+        print(f"{'Operation':<32} {'Calls':>8} {'Failed':>7} {'p50 us':>8} {'p99 us':>8} {'max us':>8}")
+        for name, values in operations.items():
+            print(f"{name:<32} {values['calls']:>8} {values['failures']:>7} "
+                  f"{values['p50_us']:>8.1f} {values['p99_us']:>8.1f} {values['max_us']:>8.1f}")
+        
+        lookups = self.inventory_service.lookup_stats()
+        barcodes = lookups["barcodes"]
+        print(f"Barcodes: {barcodes['barcodes']} ({barcodes['packs']} packs), "
+              f"scans {barcodes['lookups']}, hits {barcodes['hits']}")
+        cache = lookups["product_cache"]
+        if cache:
+            lookups_total = cache["hits"] + cache["misses"]
+            hit_rate = cache["hits"] / lookups_total if lookups_total else 0
+            print(f"Product cache: {cache['size']}/{cache['capacity'] or 'unbounded'} hot products, "
+                  f"hit rate {hit_rate:.1%} ({cache['hits']} hits, {cache['misses']} misses)")
+        
+        choice = input("\nToggle recording? (y/n): ").strip().lower()
+        if choice == 'y':
+            if metrics.enabled:
+                metrics.disable()
+            else:
+                metrics.enable()
+            print(f"Metrics recording: {'ON' if metrics.enabled else 'OFF'}")
+    
+    def view_reorder_report(self):
+        """View the products that most urgently need reordering"""
+        while True:
+            print("\n" + "-"*50)
+            print("Reorder Report")
+            print("-"*50)
+            lines = self.inventory_service.reorder_report()
+            index = self.inventory_service.reorder_index()
+            print(f"{index.below_count} of {len(index)} products below their reorder point")
+            print(f"{'ID':<8} {'Product Name':<20} {'Available':>9} {'Reorder':>8} "
+                  f"{'Short':>6} {'Per Day':>8} {'Days Cover':>10}")
+            for line in lines:
+                product = self.inventory_service.get_product(line.product_id)
+                name = product.name if product else ""
+                cover = line.days_of_cover
+                print(f"{line.product_id:<8} {name[:20]:<20} {line.stock:>9} {line.reorder_point:>8} "
+                      f"{line.shortfall:>6} {line.daily_demand:>8.1f} "
+                      f"{'-' if cover is None else f'{cover:.1f}':>10}")
+            
+            choice = input("\nUpdate daily demand from the last 28 days of sales? (y/n): ")
+            if choice.strip().lower() != 'y':
+                break
+            self.inventory_service.load_daily_demand(self.sale_service.estimate_daily_demand())
+    
     def run(self):
         """Run main loop"""
         while True:
@@ -271,6 +428,12 @@ class POSUI:
                 self.view_sales_history()
             elif choice == "5":
                 self.view_return_history()
+            elif choice == "6":
+                self.view_sales_report()
+            elif choice == "7":
+                self.view_diagnostics()
+            elif choice == "8":
+                self.view_reorder_report()
             elif choice == "0":
                 print("\nThank you for using POS System. Goodbye!")
                 break
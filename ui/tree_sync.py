@@ -0,0 +1,77 @@
+"""
+Treeview Synchronization
+Row-keyed, diff-based updates of a ttk.Treeview from a list of rows
+"""
+
+from typing import Callable, Dict, Hashable, Iterable, List, Tuple
+
+
+class TreeviewSync:
+    """
+    Keeps a Treeview in sync with a row source by row key
+
+    Only rows whose values changed are touched: new keys are inserted,
+    missing keys deleted, changed values updated in place and rows moved
+    only when their order changed. schedule() coalesces any number of
+    refresh requests into one refresh per Tk idle cycle.
+    """
+
+    def __init__(self, tree, row_source: Callable[[], Iterable[Tuple[Hashable, tuple]]]):
+        """
+        Initialize synchronizer
+
+        Args:
+            tree: ttk.Treeview (or any widget with the same item API)
+            row_source: Returns the current (key, values) rows in display order
+        """
+        self.tree = tree
+        self.row_source = row_source
+        self._keys: List[str] = []
+        self._values: Dict[str, tuple] = {}
+        self._pending = False
+
+    def schedule(self):
+        """Request a refresh; repeated requests before the next idle cycle run once"""
+        if not self._pending:
+            self._pending = True
+            self.tree.after_idle(self._run_scheduled)
+
+    def _run_scheduled(self):
+        """Idle callback for schedule()"""
+        self._pending = False
+        # The window may have been closed before the idle cycle
+        if self.tree.winfo_exists():
+            self.refresh()
+
+    def refresh(self):
+        """Reconcile the Treeview with the row source now"""
+        tree = self.tree
+        old_values = self._values
+        new_keys: List[str] = []
+        new_values: Dict[str, tuple] = {}
+        for key, values in self.row_source():
+            key = str(key)
+            new_keys.append(key)
+            new_values[key] = tuple(values)
+
+        for key in self._keys:
+            if key not in new_values:
+                tree.delete(key)
+
+        for index, key in enumerate(new_keys):
+            values = new_values[key]
+            previous = old_values.get(key)
+            if previous is None:
+                tree.insert("", index, iid=key, values=values)
+            elif previous != values:
+                tree.item(key, values=values)
+
+        # Rows kept from the last refresh normally keep their relative order
+        kept_old = [key for key in self._keys if key in new_values]
+        kept_new = [key for key in new_keys if key in old_values]
+        if kept_old != kept_new:
+            for index, key in enumerate(new_keys):
+                tree.move(key, "", index)
+
+        self._keys = new_keys
+        self._values = new_values
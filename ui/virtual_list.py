@@ -0,0 +1,259 @@
+"""
+Virtual List
+Treeview that shows one page of a large row sequence at a time, with rows
+formatted on a background thread
+"""
+
+import queue
+import threading
+import tkinter as tk
+from itertools import chain
+from tkinter import ttk
+from typing import Callable, Dict, Hashable, List, Sequence, Tuple
+
+from ui.tree_sync import TreeviewSync
+
+
+class PageLoader:
+    """
+    Formats the rows around the visible page on a background thread
+
+    request() queues the visible page first, then a prefetch window on
+    both sides; collect() moves finished rows into the cache and must be
+    called from the UI thread. Requests made stale by a newer one are
+    skipped by the worker; the newer request queues again every key the
+    stale one had not delivered.
+    """
+
+    def __init__(self, format_row: Callable[[Hashable], tuple],
+                 page_size: int = 50, prefetch: int = 200):
+        """
+        Initialize loader
+
+        Args:
+            format_row: Returns the display values of one row key
+                        (called on the worker thread)
+            page_size: Number of visible rows
+            prefetch: Number of rows formatted ahead and behind the page
+        """
+        self.format_row = format_row
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self._cache: Dict[Hashable, tuple] = {}
+        # Key -> generation of the request that will deliver it
+        self._pending: Dict[Hashable, int] = {}
+        self._generation = 0
+        self._requests: "queue.Queue" = queue.Queue()
+        self._results: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._work, name="row-formatter", daemon=True)
+        self._thread.start()
+
+    def request(self, rows: Sequence[Hashable], offset: int):
+        """
+        Queue formatting of the page at offset and its prefetch window
+
+        Args:
+            rows: Row keys in display order
+            offset: Index of the first visible row
+        """
+        page_end = min(len(rows), offset + self.page_size)
+        low = max(0, offset - self.prefetch)
+        high = min(len(rows), page_end + self.prefetch)
+        window = list(chain(rows[offset:page_end], rows[page_end:high], rows[low:offset]))
+        cache, pending = self._cache, self._pending
+        wanted = [key for key in window if key not in cache]
+
+        # Keep the cache bounded to a few windows
+        if len(cache) > 4 * (self.page_size + 2 * self.prefetch):
+            keep = set(window)
+            self._cache = {key: values for key, values in cache.items() if key in keep}
+
+        # A new request cancels the running one, so it takes over the keys
+        # still pending as well (unless they all belong to the current one)
+        generation = self._generation
+        if any(pending.get(key) != generation for key in wanted):
+            generation = self._generation = generation + 1
+            pending.update(dict.fromkeys(wanted, generation))
+            self._requests.put((generation, wanted))
+
+    def collect(self) -> bool:
+        """
+        Move formatted rows into the cache (UI thread)
+
+        Returns:
+            bool: Whether any row arrived
+        """
+        arrived = False
+        while True:
+            try:
+                batch = self._results.get_nowait()
+            except queue.Empty:
+                return arrived
+            generation, rows = batch
+            for key, values in rows:
+                if self._pending.get(key) == generation:
+                    del self._pending[key]
+                if values is not None:
+                    self._cache[key] = values
+                    arrived = True
+
+    def get(self, key: Hashable):
+        """
+        Get the formatted values of a row
+
+        Returns:
+            tuple: Display values, or None if not formatted yet
+        """
+        return self._cache.get(key)
+
+    def busy(self) -> bool:
+        """
+        Check whether rows are still being formatted
+
+        Returns:
+            bool: Whether a request is outstanding
+        """
+        return bool(self._pending)
+
+    def close(self):
+        """Stop the worker thread"""
+        self._requests.put(None)
+
+    def _work(self):
+        """Worker loop"""
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            generation, keys = request
+            for start in range(0, len(keys), self.page_size):
+                batch = keys[start:start + self.page_size]
+                if generation != self._generation:
+                    # A newer window was requested; release these keys unformatted
+                    self._results.put((generation, [(key, None) for key in keys[start:]]))
+                    break
+                self._results.put((generation, [(key, self.format_row(key)) for key in batch]))
+
+
+class VirtualTreeview:
+    """
+    Treeview over a large sequence of row keys
+
+    Only the visible page is inserted in the Treeview; scrolling moves a
+    window over the sequence. Rows not formatted yet show a placeholder
+    until the PageLoader delivers them.
+    """
+
+    POLL_MS = 15
+
+    def __init__(self, parent, columns: List[Tuple[str, str, int]],
+                 format_row: Callable[[Hashable], tuple],
+                 page_size: int = 20, prefetch: int = 200):
+        """
+        Initialize virtual list
+
+        Args:
+            parent: Parent widget
+            columns: (column id, heading text, width) of each column
+            format_row: Returns the display values of one row key
+                        (called on a worker thread)
+            page_size: Number of visible rows
+            prefetch: Number of rows formatted ahead and behind the page
+        """
+        self.frame = tk.Frame(parent, bg='#f0f0f0')
+        self.tree = ttk.Treeview(self.frame, columns=[column for column, _, _ in columns],
+                                 show='headings', height=page_size)
+        for column, text, width in columns:
+            self.tree.heading(column, text=text)
+            self.tree.column(column, width=width)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self._on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.page_size = page_size
+        self.rows: Sequence[Hashable] = ()
+        self.offset = 0
+        self.loader = PageLoader(format_row, page_size, prefetch)
+        self._placeholder = ("…",) + ("",) * (len(columns) - 1)
+        self._sync = TreeviewSync(self.tree, self._visible_rows)
+        self._polling = False
+
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel)
+        self.tree.bind("<Prior>", lambda event: self.scroll_to(self.offset - self.page_size))
+        self.tree.bind("<Next>", lambda event: self.scroll_to(self.offset + self.page_size))
+        self.tree.bind("<Destroy>", lambda event: self.loader.close())
+
+    def pack(self, **kwargs):
+        """Pack the list frame"""
+        self.frame.pack(**kwargs)
+
+    def set_rows(self, rows: Sequence[Hashable]):
+        """
+        Show a new row sequence from the top
+
+        Args:
+            rows: Row keys in display order
+        """
+        self.rows = rows
+        self.scroll_to(0)
+
+    def scroll_to(self, offset: int):
+        """
+        Move the visible page
+
+        Args:
+            offset: Index of the first visible row
+        """
+        self.offset = max(0, min(offset, len(self.rows) - self.page_size))
+        self.loader.request(self.rows, self.offset)
+        self._update_scrollbar()
+        self._sync.schedule()
+        self._start_polling()
+
+    def _visible_rows(self):
+        """Rows of the visible page for TreeviewSync"""
+        get = self.loader.get
+        for key in self.rows[self.offset:self.offset + self.page_size]:
+            yield key, get(key) or self._placeholder
+
+    def _start_polling(self):
+        """Poll the loader unless a poll is already scheduled"""
+        if not self._polling:
+            self._polling = True
+            self.tree.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        """Pick up formatted rows until the loader is idle"""
+        self._polling = False
+        if not self.tree.winfo_exists():
+            return
+        if self.loader.collect():
+            self._sync.schedule()
+        if self.loader.busy():
+            self._start_polling()
+
+    def _update_scrollbar(self):
+        """Reflect the window position in the scrollbar"""
+        total = len(self.rows)
+        if total <= self.page_size:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.offset / total, (self.offset + self.page_size) / total)
+
+    def _on_scroll(self, action, amount, unit=None):
+        """Scrollbar command"""
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.rows)))
+        elif unit == "pages":
+            self.scroll_to(self.offset + int(amount) * self.page_size)
+        else:
+            self.scroll_to(self.offset + int(amount))
+
+    def _on_wheel(self, event):
+        """Mouse wheel scrolling (Windows/macOS delta, X11 buttons 4/5)"""
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return "break"